@@ -16,7 +16,19 @@ echo "Installing dependencies..."
 venv/bin/pip install -r requirements.txt
 
 # Run the FastAPI server using the venv's python, with sudo for hardware access
-echo "Starting server on port 80..."
 # Ensure PYTHONPATH includes the current directory so 'src' is found
 export PYTHONPATH=$PYTHONPATH:$(pwd)
-sudo -E venv/bin/uvicorn src.main:app --host 0.0.0.0 --port 80
+
+# API_WORKERS > 1 runs a hardware daemon (owns GPIO/SPI/camera) behind N API workers
+API_WORKERS=${API_WORKERS:-1}
+if [ "$API_WORKERS" -gt 1 ]; then
+    echo "Starting hardware daemon..."
+    sudo -E ZP_HARDWARE_MODE=daemon venv/bin/python -m src.daemon &
+    DAEMON_PID=$!
+    trap "sudo kill $DAEMON_PID" EXIT
+    echo "Starting $API_WORKERS API workers on port 80..."
+    sudo -E ZP_HARDWARE_MODE=client venv/bin/uvicorn src.main:app --host 0.0.0.0 --port 80 --workers "$API_WORKERS"
+else
+    echo "Starting server on port 80..."
+    sudo -E venv/bin/uvicorn src.main:app --host 0.0.0.0 --port 80
+fi
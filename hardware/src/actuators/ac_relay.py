@@ -1,23 +1,34 @@
 from gpiozero import DigitalOutputDevice
 from src.config import AC_RELAY_GPIO
+from src.actuators.journal import actuator_journal
+from src.hardware.rpc import hardware_singleton
 
 class ACRelayController:
     def __init__(self):
         # Digital Loggers IoT Relay V2 is Active HIGH (3.3V turns Normally Off outlets ON)
         # initial_value=False ensures it starts in the OFF state.
         self.device = DigitalOutputDevice(AC_RELAY_GPIO, active_high=True, initial_value=False)
+        # Number of OFF->ON and ON->OFF switches: lets a temporary user tell whether
+        # someone else switched the relay since it did
+        self.transitions = 0
 
     def turn_on(self):
         """Activates the AC relay (Normally Off outlets turn ON)."""
+        if not self.device.is_active:
+            self.transitions += 1
         self.device.on()
+        actuator_journal.record("ac_relay", True)
 
     def turn_off(self):
         """Deactivates the AC relay (Normally Off outlets turn OFF)."""
+        if self.device.is_active:
+            self.transitions += 1
         self.device.off()
+        actuator_journal.record("ac_relay", False)
 
     @property
     def is_active(self):
         """Returns the current state of the relay."""
         return self.device.is_active
 
-ac_relay = ACRelayController()
+ac_relay = hardware_singleton("ac_relay", ACRelayController)
@@ -0,0 +1,136 @@
+import asyncio
+import logging
+import time
+from typing import Dict, List, Optional
+
+from src.config import PUMP_MAX_ON_SECONDS, CONTROL_BATCH_MAX_ACTIONS, CONTROL_BATCH_MAX_SECONDS
+from src.models import PumpID
+from src.actuators.pumps import pump_controller
+from src.actuators.ac_relay import ac_relay
+from src.hardware.rpc import hardware_singleton
+
+logger = logging.getLogger("batch")
+
+RELAY = "ac_relay"
+
+def plan_batch(actions: List[dict], mode: str) -> List[dict]:
+    """
+    Validates a batch and lays it out on a timeline: each action gets a
+    `start` and `stop` offset in seconds from the start of the batch. Raises
+    ValueError for a plan that can't run as a whole.
+    """
+    if not actions:
+        raise ValueError("A batch needs at least one action.")
+    if len(actions) > CONTROL_BATCH_MAX_ACTIONS:
+        raise ValueError(f"A batch is limited to {CONTROL_BATCH_MAX_ACTIONS} actions.")
+
+    plan = []
+    cursor = 0.0
+    for i, action in enumerate(actions):
+        device, state, duration = action["device"], action.get("state", "on"), action.get("duration")
+        if device != RELAY:
+            if device not in PumpID.__members__:
+                raise ValueError(f"Action {i}: pump {device} not found.")
+            if state != "on" or duration is None:
+                raise ValueError(f"Action {i}: pumps run ON for a duration.")
+            limit = PUMP_MAX_ON_SECONDS.get(device)
+            if limit is not None and duration > limit:
+                raise ValueError(f"Action {i}: {device} may run at most {limit}s at a time.")
+        start = (cursor if mode == "sequential" else 0.0) + action.get("delay", 0.0)
+        stop = start + (duration or 0.0)
+        cursor = stop
+        plan.append({"device": device, "state": state, "duration": duration, "start": start, "stop": stop})
+
+    if max(step["stop"] for step in plan) > CONTROL_BATCH_MAX_SECONDS:
+        raise ValueError(f"A batch may last at most {CONTROL_BATCH_MAX_SECONDS}s.")
+    by_device: Dict[str, List[dict]] = {}
+    for step in plan:
+        by_device.setdefault(step["device"], []).append(step)
+    for device, steps in by_device.items():
+        steps = sorted(steps, key=lambda step: step["start"])
+        for before, after in zip(steps, steps[1:]):
+            if after["start"] < before["stop"] or after["start"] == before["start"]:
+                raise ValueError(f"{device} has overlapping actions in the batch.")
+    return plan
+
+class ActuatorBatch:
+    """
+    Runs a validated plan against one monotonic clock. Every action sleeps
+    until its own planned offset, so a late action doesn't push the others
+    back. Pumps stop on the watchdog's exact deadline (see
+    PumpController.dispense). If anything fails, the remaining actions are
+    cancelled: pumps switch off and a timed relay action restores the state
+    it found.
+    """
+
+    async def _run_step(self, step: dict, anchor: float, result: dict, previous: Optional[asyncio.Task]):
+        loop = asyncio.get_running_loop()
+        await asyncio.sleep(max(0.0, anchor + step["start"] - loop.time()))
+        if previous is not None:
+            # Back-to-back runs of one device: its previous action must have switched it off first
+            await previous
+        device, duration = step["device"], step["duration"]
+        if device == RELAY:
+            on = step["state"] == "on"
+            # A timed action puts the relay back the way it found it (e.g. a light already on stays on)
+            was_active = ac_relay.is_active
+            self._set_relay(on)
+            result["started_at"] = time.time()
+            if duration is not None:
+                try:
+                    await asyncio.sleep(max(0.0, anchor + step["stop"] - loop.time()))
+                finally:
+                    self._set_relay(was_active)
+            result["stopped_at"] = time.time()
+        else:
+            result["started_at"] = time.time()
+            try:
+                await pump_controller.dispense(device, duration)
+            finally:
+                result["stopped_at"] = time.time()
+
+    @staticmethod
+    def _set_relay(on: bool):
+        if on:
+            ac_relay.turn_on()
+        else:
+            ac_relay.turn_off()
+
+    async def run(self, actions: List[dict], mode: str = "sequential") -> dict:
+        """Executes a batch (see plan_batch) and reports planned and actual times per action."""
+        plan = plan_batch(actions, mode)
+        loop = asyncio.get_running_loop()
+        anchor = loop.time()
+        started_at = time.time()
+        results = [
+            {
+                "device": step["device"], "state": step["state"],
+                "planned_start": started_at + step["start"], "planned_stop": started_at + step["stop"],
+                "started_at": None, "stopped_at": None,
+            }
+            for step in plan
+        ]
+        tasks: List[Optional[asyncio.Task]] = [None] * len(plan)
+        last: Dict[str, asyncio.Task] = {}
+        for i in sorted(range(len(plan)), key=lambda i: plan[i]["start"]):
+            step = plan[i]
+            tasks[i] = asyncio.create_task(self._run_step(step, anchor, results[i], last.get(step["device"])))
+            last[step["device"]] = tasks[i]
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            logger.error("Batch aborted; remaining actions cancelled.")
+            raise
+        return {
+            "status": "success",
+            "mode": mode,
+            "started_at": started_at,
+            "completed_at": time.time(),
+            "actions": results,
+        }
+
+# Global instance (runs next to the pumps, in the daemon when there is one)
+actuator_batch = hardware_singleton("actuator_batch", ActuatorBatch)
@@ -0,0 +1,182 @@
+import logging
+import time
+from typing import Dict, Iterator, Optional, Tuple
+
+from src.config import (
+    ACTUATOR_STATS_FILE, ACTUATOR_STATS_HOURLY_RETENTION_HOURS,
+    ACTUATOR_STATS_DAILY_RETENTION_DAYS, PUMP_FLOW_ML_PER_SEC
+)
+from src.storage import load_json, atomic_write_json
+
+logger = logging.getLogger("duty")
+
+HOUR = 3600
+DAY = 24 * HOUR
+# Buckets returned when the caller gives no `since`
+DEFAULT_SPAN = {"hour": DAY, "day": 30 * DAY}
+
+def segments(start: float, end: float) -> Iterator[Tuple[int, float]]:
+    """Splits [start, end) at hour boundaries: (hour start, seconds within it)."""
+    while start < end:
+        hour = int(start // HOUR * HOUR)
+        stop = min(end, hour + HOUR)
+        yield hour, stop - start
+        start = stop
+
+def local_day(t: float) -> str:
+    return time.strftime("%Y-%m-%d", time.localtime(t))
+
+class DutyCycleStats:
+    """
+    ON seconds and activation counts per actuator, rolled up per hour and per
+    local day, plus lifetime totals.
+
+    The actuator journal feeds every transition through transition(), which
+    only updates a few [seconds, cycles] counters in memory. A run is added
+    when it ends, split across the hours it covered; runs still in progress
+    are included in reports without being stored. Saving happens at startup
+    and shutdown: `through` is the time of the last journal entry counted, so
+    after a crash the journal replay adds exactly what the file is missing.
+    """
+
+    def __init__(self, path: str = ACTUATOR_STATS_FILE):
+        self.path = path
+        # hour start (Unix time) -> device -> [seconds, cycles]
+        self.hourly: Dict[int, Dict[str, list]] = {}
+        # local date (YYYY-MM-DD) -> device -> [seconds, cycles]
+        self.daily: Dict[str, Dict[str, list]] = {}
+        self.totals: Dict[str, list] = {}
+        self.through = 0.0
+        # device -> Unix time it was switched ON
+        self._open: Dict[str, float] = {}
+        self._latest = 0.0
+        self._dirty = False
+        self._loaded = False
+
+    # --- Storage ---
+
+    def load(self):
+        """(Re)reads the saved counters, dropping anything in memory."""
+        data = load_json(self.path, {}) or {}
+        self.hourly = {int(hour): devices for hour, devices in data.get("hourly", {}).items()}
+        self.daily = data.get("daily", {})
+        self.totals = data.get("totals", {})
+        self.through = float(data.get("through", 0.0))
+        self._open = {}
+        self._latest = self.through
+        self._dirty = False
+        self._loaded = True
+
+    def _ensure_loaded(self):
+        if not self._loaded:
+            self.load()
+
+    def _prune(self, now: float):
+        oldest_hour = now - ACTUATOR_STATS_HOURLY_RETENTION_HOURS * HOUR
+        self.hourly = {hour: devices for hour, devices in self.hourly.items() if hour >= oldest_hour}
+        oldest_day = local_day(now - ACTUATOR_STATS_DAILY_RETENTION_DAYS * DAY)
+        self.daily = {day: devices for day, devices in self.daily.items() if day >= oldest_day}
+
+    def save(self, through: Optional[float] = None):
+        """Writes the counters; `through` marks every journal entry up to then as counted."""
+        self._ensure_loaded()
+        through = max(self.through, self._latest, through or 0.0)
+        if not self._dirty and through == self.through:
+            return
+        self.through = through
+        self._prune(time.time())
+        atomic_write_json(self.path, {
+            "through": self.through,
+            "hourly": {str(hour): devices for hour, devices in self.hourly.items()},
+            "daily": self.daily,
+            "totals": self.totals,
+        })
+        self._dirty = False
+
+    # --- Counting ---
+
+    def _add(self, hour: int, device: str, seconds: float, cycles: int):
+        for counts in (
+            self.hourly.setdefault(hour, {}).setdefault(device, [0.0, 0]),
+            self.daily.setdefault(local_day(hour), {}).setdefault(device, [0.0, 0]),
+            self.totals.setdefault(device, [0.0, 0]),
+        ):
+            counts[0] += seconds
+            counts[1] += cycles
+
+    def transition(self, device: str, on: bool, t: float, count: bool = True):
+        """
+        One ON/OFF transition at Unix time `t`. With count=False (journal
+        entries the saved counters already include) only the open run is
+        tracked, so a later OFF still knows when it started.
+        """
+        self._ensure_loaded()
+        if on:
+            self._open[device] = t
+            if count:
+                self._add(int(t // HOUR * HOUR), device, 0.0, 1)
+        else:
+            start = self._open.pop(device, None)
+            if start is not None and count:
+                for hour, seconds in segments(start, t):
+                    self._add(hour, device, seconds, 0)
+        if count:
+            self._dirty = True
+            self._latest = max(self._latest, t)
+
+    def discard_open(self):
+        """Forgets runs with no OFF record (forced off at startup; their duration is unknown)."""
+        self._open = {}
+
+    # --- Queries ---
+
+    @staticmethod
+    def _counts(device: str, seconds: float, cycles: int) -> dict:
+        rate = PUMP_FLOW_ML_PER_SEC.get(device)
+        return {
+            "seconds": round(seconds, 3),
+            "cycles": cycles,
+            "ml": None if rate is None else round(seconds * rate, 1),
+        }
+
+    def report(self, period: str = "hour", since: Optional[float] = None, now: Optional[float] = None) -> dict:
+        """
+        Buckets of one period ("hour" or "day") that end after `since`, oldest
+        first, and lifetime totals, both including runs in progress.
+        """
+        if period not in DEFAULT_SPAN:
+            raise ValueError(f"Unknown period: {period}")
+        self._ensure_loaded()
+        now = time.time() if now is None else now
+        since = now - DEFAULT_SPAN[period] if since is None else since
+
+        source = self.hourly if period == "hour" else self.daily
+        buckets = {key: {d: list(c) for d, c in devices.items()} for key, devices in source.items()}
+        totals = {d: list(c) for d, c in self.totals.items()}
+        for device, start in self._open.items():
+            for hour, seconds in segments(start, now):
+                key = hour if period == "hour" else local_day(hour)
+                buckets.setdefault(key, {}).setdefault(device, [0.0, 0])[0] += seconds
+                totals.setdefault(device, [0.0, 0])[0] += seconds
+
+        rows = []
+        for key, devices in buckets.items():
+            if period == "hour":
+                start, length = float(key), HOUR
+                label = time.strftime("%Y-%m-%d %H:00", time.localtime(key))
+            else:
+                start, length = time.mktime(time.strptime(key, "%Y-%m-%d")), DAY
+                label = key
+            if start + length <= since:
+                continue
+            rows.append({
+                "start": start,
+                "label": label,
+                "devices": {d: self._counts(d, *c) for d, c in sorted(devices.items())},
+            })
+        rows.sort(key=lambda row: row["start"])
+        return {
+            "period": period,
+            "totals": {d: self._counts(d, *c) for d, c in sorted(totals.items())},
+            "buckets": rows,
+        }
@@ -0,0 +1,220 @@
+import json
+import logging
+import os
+import threading
+import time
+from typing import Dict, List, Optional
+
+from src.config import ACTUATOR_JOURNAL_FILE, ACTUATOR_JOURNAL_FSYNC_SECONDS, ACTUATOR_STATS_FILE
+from src.hardware.rpc import hardware_singleton
+from src.hardware.trace import trace_recorder
+from src.actuators.duty import DutyCycleStats
+
+logger = logging.getLogger("journal")
+
+class ActuatorJournal:
+    """
+    Append-only record of every pump and AC relay transition.
+
+    Each transition is written (and flushed to the OS) before record() returns,
+    so it survives a process crash; a background thread batches fsyncs to
+    bound what a power cut can lose. At startup reconcile() replays the file
+    to find devices that were left ON and to restore per-device runtime totals.
+    Transitions also feed the hourly/daily duty-cycle counters in `stats`.
+    """
+
+    def __init__(
+        self, path: str = ACTUATOR_JOURNAL_FILE, fsync_interval: float = ACTUATOR_JOURNAL_FSYNC_SECONDS,
+        stats_path: str = ACTUATOR_STATS_FILE
+    ):
+        self.path = path
+        self.fsync_interval = fsync_interval
+        self.stats = DutyCycleStats(stats_path)
+
+        # device -> {"seconds": total ON time, "cycles": number of activations}
+        self.totals: Dict[str, dict] = {}
+        # device -> time.monotonic() when it was turned ON
+        self._on_since: Dict[str, float] = {}
+        self.interrupted: List[dict] = []
+
+        self._file = None
+        self._lock = threading.Lock()
+        self._dirty = threading.Event()
+        self._closing = False
+        self._thread: Optional[threading.Thread] = None
+
+    # --- Writing ---
+
+    def _ensure_open(self):
+        # Caller holds self._lock
+        if self._file is not None:
+            return
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self._file = open(self.path, "a")
+        self._closing = False
+        self._thread = threading.Thread(target=self._fsync_loop, name="actuator-journal", daemon=True)
+        self._thread.start()
+
+    def _write(self, entry: dict):
+        # Caller holds self._lock
+        self._ensure_open()
+        self._file.write(json.dumps(entry) + "\n")
+        self._file.flush()
+        self._dirty.set()
+
+    def _fsync_loop(self):
+        while True:
+            self._dirty.wait()
+            if self._closing:
+                return
+            time.sleep(self.fsync_interval)
+            with self._lock:
+                self._dirty.clear()
+                if self._file is None:
+                    return
+                try:
+                    os.fsync(self._file.fileno())
+                except (OSError, ValueError) as e:
+                    logger.error(f"Actuator journal fsync failed: {e}")
+
+    def record(self, device: str, on: bool):
+        """Logs a transition. Calls that don't change the device's state are ignored."""
+        now = time.monotonic()
+        t = time.time()
+        with self._lock:
+            was_on = device in self._on_since
+            if on == was_on:
+                return
+            totals = self.totals.setdefault(device, {"seconds": 0.0, "cycles": 0})
+            if on:
+                self._on_since[device] = now
+                totals["cycles"] += 1
+            else:
+                totals["seconds"] += now - self._on_since.pop(device)
+            self.stats.transition(device, on, t)
+            trace_recorder.actuator(device, on, t)
+            try:
+                self._write({"t": t, "device": device, "state": "on" if on else "off"})
+            except OSError as e:
+                # Never let bookkeeping block switching hardware
+                logger.error(f"Actuator journal write failed: {e}")
+
+    def close(self):
+        with self._lock:
+            try:
+                self.stats.save()
+            except OSError as e:
+                logger.error(f"Failed to save duty-cycle stats: {e}")
+            if self._file is None:
+                return
+            self._closing = True
+            self._dirty.set()
+            try:
+                self._file.flush()
+                os.fsync(self._file.fileno())
+            finally:
+                self._file.close()
+                self._file = None
+
+    # --- Accounting ---
+
+    def runtime(self) -> Dict[str, dict]:
+        """Total ON seconds and activation count per device, including a run in progress."""
+        now = time.monotonic()
+        with self._lock:
+            result = {}
+            for device, totals in self.totals.items():
+                seconds = totals["seconds"]
+                if device in self._on_since:
+                    seconds += now - self._on_since[device]
+                result[device] = {
+                    "seconds": round(seconds, 3),
+                    "cycles": totals["cycles"],
+                    "on": device in self._on_since,
+                }
+            return result
+
+    def duty_cycle(self, period: str = "hour", since: Optional[float] = None) -> dict:
+        """Hourly or daily ON time, activations and mL dispensed per device (see DutyCycleStats.report)."""
+        with self._lock:
+            return self.stats.report(period, since)
+
+    # --- Startup ---
+
+    def _replay(self) -> Dict[str, dict]:
+        """Rebuilds totals from the file; returns devices whose last record is ON."""
+        self.totals = {}
+        on_at: Dict[str, float] = {}
+        try:
+            with open(self.path, "r") as f:
+                lines = f.readlines()
+        except FileNotFoundError:
+            return {}
+
+        for line in lines:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                # A torn final line from a crash mid-write
+                continue
+            if "checkpoint" in entry:
+                self.totals = {d: dict(t) for d, t in entry["checkpoint"].items()}
+                continue
+            device = entry["device"]
+            # Entries up to the last stats save are already counted there
+            self.stats.transition(device, entry["state"] == "on", entry["t"], count=entry["t"] > self.stats.through)
+            totals = self.totals.setdefault(device, {"seconds": 0.0, "cycles": 0})
+            if entry["state"] == "on":
+                if device not in on_at:
+                    totals["cycles"] += 1
+                on_at[device] = entry["t"]
+            elif device in on_at:
+                totals["seconds"] += max(0.0, entry["t"] - on_at.pop(device))
+        return {device: {"device": device, "since": t} for device, t in on_at.items()}
+
+    def reconcile(self, safe_state) -> List[dict]:
+        """
+        Call once at startup, before anything switches hardware.
+
+        Replays the journal, calls `safe_state()` to force every actuator OFF,
+        and compacts the file into a single checkpoint. Returns (and keeps in
+        `interrupted`) the devices that were still ON when the process died.
+        """
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+            self.stats.load()
+            open_runs = self._replay()
+            self._on_since = {}
+            self.stats.discard_open()
+
+        now = time.time()
+        self.interrupted = [
+            {**run, "detected_at": now}
+            for run in sorted(open_runs.values(), key=lambda r: r["since"])
+        ]
+        for run in self.interrupted:
+            logger.warning(
+                f"{run['device']} was left ON since {time.ctime(run['since'])} by an interrupted operation; forcing it OFF."
+            )
+
+        safe_state()
+
+        # Before compacting: the replayed entries are about to leave the journal
+        with self._lock:
+            self.stats.save(through=now)
+
+        # Compact: totals so far + the forced OFF transitions
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, "w") as f:
+            f.write(json.dumps({"t": now, "checkpoint": self.totals}) + "\n")
+            for run in self.interrupted:
+                f.write(json.dumps({"t": now, "device": run["device"], "state": "off", "reconciled": True}) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, self.path)
+        return self.interrupted
+
+# Global instance
+actuator_journal = hardware_singleton("actuator_journal", ActuatorJournal)
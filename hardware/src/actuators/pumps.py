@@ -4,9 +4,14 @@ from src.config import (
     PUMP_WATER_IN_GPIO,
     PUMP_FLORA_MICRO_GPIO,
     PUMP_FLORA_GRO_GPIO,
-    PUMP_FLORA_BLOOM_GPIO
+    PUMP_FLORA_BLOOM_GPIO,
+    PUMP_MAX_ON_SECONDS
 )
+from src.actuators.journal import actuator_journal
+from src.actuators.watchdog import pump_watchdog
+from src.hardware.rpc import hardware_singleton
 import asyncio
+from typing import Dict, Optional
 
 class PumpController:
     def __init__(self):
@@ -25,21 +30,54 @@ class PumpController:
             "flora_bloom": self.flora_bloom
         }
 
+    def states(self) -> Dict[str, bool]:
+        """ON/OFF of every pump. Use this rather than `pumps` (the gpiozero devices) across RPC."""
+        return {pump_id: bool(device.is_active) for pump_id, device in self.pumps.items()}
+
     def activate_pump(self, pump_id: str):
+        """
+        Turns a pump on with a hard deadline (PUMP_MAX_ON_SECONDS): the watchdog
+        switches it off at the deadline even if the caller is stalled.
+        """
+        self._switch_on(pump_id, PUMP_MAX_ON_SECONDS.get(pump_id))
+        return True
+
+    def _switch_on(self, pump_id: str, max_seconds: Optional[float], exact: bool = False):
         if pump_id not in self.pumps:
             raise ValueError(f"Pump {pump_id} not found.")
+        if max_seconds is None:
+            self._on(pump_id)
+        else:
+            # Switched on by the watchdog, under its lock, once the new deadline replaces any old one
+            pump_watchdog.arm(pump_id, max_seconds, self._watchdog_off, exact=exact, on=self._on)
+
+    def _on(self, pump_id: str):
         self.pumps[pump_id].on()
-        return True
+        actuator_journal.record(pump_id, True)
+
+    def _watchdog_off(self, pump_id: str):
+        self.pumps[pump_id].off()
+        actuator_journal.record(pump_id, False)
 
     def deactivate_pump(self, pump_id: str):
          if pump_id not in self.pumps:
             raise ValueError(f"Pump {pump_id} not found.")
          self.pumps[pump_id].off()
+         actuator_journal.record(pump_id, False)
+         pump_watchdog.disarm(pump_id)
          return True
 
+    def all_off(self):
+        for pump_id in self.pumps:
+            self.deactivate_pump(pump_id)
+
     async def dispense(self, pump_id: str, duration: float):
-        self.activate_pump(pump_id)
-        await asyncio.sleep(duration)
-        self.deactivate_pump(pump_id)
+        # The watchdog deadline is the intended stop time, not just a safety limit
+        self._switch_on(pump_id, max_seconds=duration, exact=True)
+        try:
+            await asyncio.sleep(duration)
+        finally:
+            # Also on cancellation: never leave a dosing pump running
+            self.deactivate_pump(pump_id)
 
-pump_controller = PumpController()
\ No newline at end of file
+pump_controller = hardware_singleton("pump_controller", PumpController)
\ No newline at end of file
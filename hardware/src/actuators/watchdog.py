@@ -0,0 +1,172 @@
+import heapq
+import logging
+import os
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, List, Optional, Tuple
+
+from src.config import WATCHDOG_HISTORY, WATCHDOG_EXACT_GRACE_SECONDS
+from src.hardware.rpc import hardware_singleton
+
+logger = logging.getLogger("watchdog")
+
+class PumpWatchdog:
+    """
+    Hard deadlines for pump runs, enforced by a dedicated thread.
+
+    Every activation arms a deadline on a monotonic min-heap. If the pump is
+    still on when its deadline passes, the thread switches it off itself, so a
+    stalled event loop (blocking camera capture, audio recording, pH sampling)
+    can no longer stretch a dose or a fill. Blocking work in this codebase runs
+    in subprocesses or C calls that release the GIL, so the thread gets to run.
+
+    Each shutoff of an exact deadline (a timed dispense) is recorded with how
+    late it happened, whether the caller or the watchdog switched it off. The
+    watchdog waits `grace` seconds past an exact deadline before stepping in,
+    so it doesn't race a caller that is stopping the pump on time.
+    """
+
+    def __init__(self, history: int = WATCHDOG_HISTORY, grace: float = WATCHDOG_EXACT_GRACE_SECONDS):
+        self.grace = grace
+        # (fire at, seq, device); entries superseded by a re-arm or disarm are skipped
+        self._heap: List[Tuple[float, int, str]] = []
+        # device -> (deadline, seq, exact, off)
+        self._armed: Dict[str, Tuple[float, int, bool, Callable[[str], None]]] = {}
+        self._seq = 0
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = False
+
+        self.recent: deque = deque(maxlen=history)
+        self.shutoffs = 0
+        self.forced = 0
+        self.max_late = 0.0
+        self._total_late = 0.0
+
+    # --- Thread ---
+
+    def _ensure_started(self):
+        # Caller holds self._cond
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stopping = False
+        self._thread = threading.Thread(target=self._run, name="pump-watchdog", daemon=True)
+        self._thread.start()
+
+    def _raise_priority(self):
+        # Best effort: a negative nice value needs CAP_SYS_NICE
+        try:
+            os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), -10)
+        except (AttributeError, OSError):
+            pass
+
+    def _run(self):
+        self._raise_priority()
+        with self._cond:
+            while not self._stopping:
+                now = time.monotonic()
+                while self._heap and self._heap[0][0] <= now:
+                    _, seq, device = heapq.heappop(self._heap)
+                    armed = self._armed.get(device)
+                    if armed is None or armed[1] != seq:
+                        # Superseded by a re-arm or disarmed
+                        continue
+                    del self._armed[device]
+                    # Switched off under the lock so a concurrent re-activation can't be cut short
+                    try:
+                        armed[3](device)
+                    except Exception as e:
+                        logger.error(f"Watchdog failed to switch off {device}: {e}")
+                        continue
+                    # Lateness is measured from the intended stop, grace included
+                    late = time.monotonic() - armed[0]
+                    logger.warning(f"Watchdog switched off {device} ({late * 1000:.1f} ms after its deadline)")
+                    self._record(device, late, forced=True)
+                timeout = self._heap[0][0] - time.monotonic() if self._heap else None
+                self._cond.wait(timeout)
+
+    def stop(self):
+        with self._cond:
+            self._stopping = True
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+            self._thread = None
+
+    # --- Deadlines ---
+
+    def arm(
+        self, device: str, seconds: float, off: Callable[[str], None], exact: bool = False,
+        on: Optional[Callable[[str], None]] = None
+    ):
+        """
+        Switches `device` off via `off(device)` after `seconds` unless disarmed first.
+        `exact` marks the deadline as the intended stop time (a timed dispense)
+        rather than a safety limit, so its shutoff lateness is recorded.
+
+        `on(device)`, if given, switches the device on under the same lock the
+        watchdog thread switches it off under, after the old deadline has been
+        replaced: when a re-activation races an expiring deadline, the
+        watchdog either switches the old run off before the device comes on
+        again, or finds its deadline superseded.
+        """
+        with self._cond:
+            self._seq += 1
+            deadline = time.monotonic() + seconds
+            self._armed[device] = (deadline, self._seq, exact, off)
+            if on is not None:
+                try:
+                    on(device)
+                except BaseException:
+                    del self._armed[device]
+                    raise
+            heapq.heappush(self._heap, (deadline + (self.grace if exact else 0.0), self._seq, device))
+            self._ensure_started()
+            self._cond.notify()
+
+    def disarm(self, device: str):
+        """Called when the device is switched off normally."""
+        with self._cond:
+            armed = self._armed.pop(device, None)
+        if armed is not None and armed[2]:
+            self._record(device, time.monotonic() - armed[0], forced=False)
+
+    def armed(self) -> Dict[str, float]:
+        """Seconds until each armed deadline."""
+        now = time.monotonic()
+        with self._cond:
+            return {device: round(entry[0] - now, 3) for device, entry in self._armed.items()}
+
+    # --- Metrics ---
+
+    def _record(self, device: str, late: float, forced: bool):
+        # Condition wraps an RLock, so this is safe from the watchdog thread too
+        with self._cond:
+            # Callers that stop slightly early are on time
+            late = max(0.0, late)
+            self.shutoffs += 1
+            if forced:
+                self.forced += 1
+            self.max_late = max(self.max_late, late)
+            self._total_late += late
+            self.recent.append({
+                "device": device,
+                "late_ms": round(late * 1000, 3),
+                "by": "watchdog" if forced else "caller",
+                "at": time.time(),
+            })
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "shutoffs": self.shutoffs,
+                "forced": self.forced,
+                "max_late_ms": round(self.max_late * 1000, 3),
+                "mean_late_ms": round(self._total_late / self.shutoffs * 1000, 3) if self.shutoffs else 0.0,
+                "armed": self.armed(),
+                "recent": list(self.recent),
+            }
+
+# Global instance
+pump_watchdog = hardware_singleton("pump_watchdog", PumpWatchdog)
@@ -0,0 +1,150 @@
+import asyncio
+import math
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Deque, Dict, Optional
+
+from fastapi import HTTPException, Request
+
+from src.config import ADMISSION_QUEUES
+
+# Weight of the latest request in the running service time estimate
+SERVICE_SMOOTHING = 0.3
+
+def client_id(request: Request) -> str:
+    """Identity used for fair sharing: X-Client-Id if the caller sets one, else its address."""
+    header = request.headers.get("x-client-id")
+    if header:
+        return header
+    return request.client.host if request.client else "unknown"
+
+class ResourceQueue:
+    """
+    Admission control for one slow resource (camera, microphone, ...).
+
+    Up to `concurrency` requests hold the resource; the rest wait in one FIFO
+    per client, and a freed slot goes to the next client in round-robin order,
+    so a client sending a burst can't starve the others. Waiting is bounded
+    (overall and per client) and limited by a deadline. Refusals carry a
+    Retry-After based on the queue ahead and the measured service time.
+    """
+
+    def __init__(
+        self, name: str, concurrency: int = 1, max_waiting: int = 8, max_per_client: int = 2,
+        deadline: float = 30.0, estimate: float = 5.0
+    ):
+        self.name = name
+        self.concurrency = concurrency
+        self.max_waiting = max_waiting
+        self.max_per_client = max_per_client
+        self.deadline = deadline
+        self.service_seconds = float(estimate)
+        self.active = 0
+        self.waiting = 0
+        self.rejected = 0
+        # client -> its waiters, oldest first; dict order is the round-robin order
+        self._queues: "OrderedDict[str, Deque[asyncio.Future]]" = OrderedDict()
+
+    def expected_wait(self, ahead: Optional[int] = None) -> float:
+        """Seconds until a request queued behind `ahead` others (default: everyone) could start."""
+        ahead = self.waiting if ahead is None else ahead
+        busy = self.active + ahead - self.concurrency + 1
+        return max(0, busy) * self.service_seconds / self.concurrency
+
+    def retry_after(self) -> int:
+        return max(1, math.ceil(self.expected_wait()))
+
+    def _refuse(self, status_code: int, detail: str):
+        self.rejected += 1
+        raise HTTPException(
+            status_code=status_code,
+            detail=f"{detail}; retry in about {self.retry_after()}s.",
+            headers={"Retry-After": str(self.retry_after())}
+        )
+
+    def _grant(self):
+        while self.active < self.concurrency and self._queues:
+            client, queue = next(iter(self._queues.items()))
+            waiter = queue.popleft()
+            if queue:
+                self._queues.move_to_end(client)
+            else:
+                del self._queues[client]
+            self.waiting -= 1
+            self.active += 1
+            waiter.set_result(None)
+
+    def _release(self, started: float):
+        self.active -= 1
+        elapsed = time.monotonic() - started
+        self.service_seconds += SERVICE_SMOOTHING * (elapsed - self.service_seconds)
+        self._grant()
+
+    async def _wait(self, client: str, deadline: float):
+        if self.waiting >= self.max_waiting:
+            self._refuse(503, f"The {self.name} queue is full")
+        queue = self._queues.get(client)
+        if queue is not None and len(queue) >= self.max_per_client:
+            self._refuse(429, f"Too many queued {self.name} requests from this client")
+        if self.expected_wait() > deadline:
+            self._refuse(503, f"The {self.name} is booked for longer than the request is willing to wait")
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._queues.setdefault(client, deque()).append(waiter)
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(waiter, timeout=deadline)
+        except BaseException as e:
+            if waiter.done() and not waiter.cancelled():
+                # Granted as the wait ended: hand the slot on
+                self.active -= 1
+                self._grant()
+            else:
+                queue = self._queues.get(client)
+                if queue is not None and waiter in queue:
+                    queue.remove(waiter)
+                    self.waiting -= 1
+                    if not queue:
+                        del self._queues[client]
+            if isinstance(e, asyncio.TimeoutError):
+                self._refuse(503, f"Timed out waiting for the {self.name}")
+            raise
+
+    @asynccontextmanager
+    async def admit(self, client: str, deadline: Optional[float] = None) -> AsyncIterator[None]:
+        """Holds one slot of the resource for the body, waiting up to `deadline` seconds for it."""
+        deadline = self.deadline if deadline is None else min(deadline, self.deadline)
+        if self.active < self.concurrency and not self._queues:
+            self.active += 1
+        else:
+            await self._wait(client, deadline)
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self._release(started)
+
+    def stats(self) -> dict:
+        return {
+            "active": self.active,
+            "waiting": self.waiting,
+            "clients_waiting": len(self._queues),
+            "rejected": self.rejected,
+            "service_seconds": round(self.service_seconds, 2),
+            "expected_wait_seconds": round(self.expected_wait(), 1),
+        }
+
+# One queue per resource (per API process)
+admission_queues: Dict[str, ResourceQueue] = {
+    name: ResourceQueue(name, **settings) for name, settings in ADMISSION_QUEUES.items()
+}
+
+def admit(resource: str, request: Request):
+    """`async with admit("camera", request):` - admission for an endpoint handler."""
+    max_wait = request.headers.get("x-max-wait")
+    try:
+        deadline = float(max_wait) if max_wait else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="X-Max-Wait must be a number of seconds.")
+    return admission_queues[resource].admit(client_id(request), deadline)
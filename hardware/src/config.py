@@ -1,3 +1,5 @@
+import os
+
 # Pin Configuration
 
 # Relay / Pumps
@@ -32,3 +34,260 @@ AC_RELAY_GPIO = 16
 # Pump Calibration
 # Default flow rate estimation (can be tuned per pump if needed later)
 PUMP_CALIBRATION_ML_PER_SEC = 1.0
+
+# Persistent Data
+# Runtime state (schedules, indexes, history) lives here, relative to the working directory.
+DATA_DIR = "data"
+
+# Scheduler
+SCHEDULES_FILE = f"{DATA_DIR}/schedules.json"
+# A missed cron run is replayed once after a restart if it is at most this old.
+SCHEDULE_MISFIRE_GRACE_SECONDS = 3600
+
+# Timelapse Storage Tiers
+# Frames newer than this are kept untouched at full resolution.
+TIMELAPSE_FULL_RES_DAYS = 7
+# Older frames are thinned to one per interval and downscaled to this width.
+TIMELAPSE_REDUCED_INTERVAL_MINUTES = 120
+TIMELAPSE_REDUCED_WIDTH = 960
+# Reduced frames older than this are packed into per-day tar archives
+# and no longer take part in the generated video.
+TIMELAPSE_ARCHIVE_AFTER_DAYS = 60
+
+# Media
+# /sensors/camera/plant reuses a photo taken within this many seconds.
+PLANT_PHOTO_CACHE_SECONDS = 60
+
+# Image Derivatives
+# Downscaled copies served via ?size=thumb|medium on the camera endpoints.
+# width is the maximum width in pixels; quality is ffmpeg's JPEG -q:v (2 = best, 31 = worst).
+IMAGE_DERIVATIVE_SIZES = {
+    "thumb": {"width": 320, "quality": 5},
+    "medium": {"width": 1280, "quality": 3},
+}
+IMAGE_DERIVATIVE_CACHE_DIR = "captures/derivatives"
+# Least recently used derivatives are evicted once the cache exceeds this size.
+IMAGE_DERIVATIVE_CACHE_BYTES = 200 * 1024 * 1024
+IMAGE_DERIVATIVE_WORKERS = 2
+
+# DHT11 Reader
+# The DHT11 needs ~1-2s between reads; a background thread polls at this rate.
+DHT_READ_INTERVAL = 2.0
+# Consecutive failed reads back off exponentially up to this delay.
+DHT_MAX_BACKOFF = 30.0
+# Readings older than this are reported with quality "stale".
+DHT_STALE_AFTER = 30.0
+
+# Job Deduplication
+# How long an Idempotency-Key on POST /jobs/ keeps pointing at its job.
+JOB_IDEMPOTENCY_TTL_SECONDS = 24 * 3600
+# Finished jobs stay in memory (GET /jobs/{id}, max_age result reuse) this long,
+# then only the history file has them. No shorter than the Idempotency-Key TTL,
+# so a key never points at a forgotten job.
+JOB_RETENTION_SECONDS = JOB_IDEMPOTENCY_TTL_SECONDS
+# Finished jobs (status, timings, result) are appended here for later analysis.
+JOBS_HISTORY_FILE = f"{DATA_DIR}/history/jobs.jsonl"
+
+# Pipelines
+# Step outcomes of feed/flush pipelines are persisted here, one file per run.
+PIPELINE_STATE_DIR = f"{DATA_DIR}/pipelines"
+# An unfinished run of the same pipeline is resumed if it was last updated within this window;
+# older runs start over (the tank may have changed since).
+PIPELINE_RESUME_WINDOW_SECONDS = 6 * 3600
+# Number of run files kept on disk.
+PIPELINE_HISTORY = 50
+
+# Actuator Journal
+# Append-only log of every pump / AC relay transition, replayed at startup.
+ACTUATOR_JOURNAL_FILE = f"{DATA_DIR}/actuators.journal"
+# Writes reach the OS immediately; fsync is batched to at most once per interval.
+ACTUATOR_JOURNAL_FSYNC_SECONDS = 0.5
+
+# Actuator Duty Cycle
+# ON time and activation counts rolled up per hour and per (local) day. The
+# journal is the durable record between saves, so the file is only written at
+# startup and shutdown.
+ACTUATOR_STATS_FILE = f"{DATA_DIR}/actuator_stats.json"
+ACTUATOR_STATS_HOURLY_RETENTION_HOURS = 7 * 24
+ACTUATOR_STATS_DAILY_RETENTION_DAYS = 400
+# Converts pump ON time into mL dispensed (devices not listed report no volume).
+PUMP_FLOW_ML_PER_SEC = {
+    "flora_micro": PUMP_CALIBRATION_ML_PER_SEC,
+    "flora_gro": PUMP_CALIBRATION_ML_PER_SEC,
+    "flora_bloom": PUMP_CALIBRATION_ML_PER_SEC,
+}
+
+# Pump Watchdog
+# Hard upper bound on a single pump run when the caller gives none. A watchdog
+# thread switches the pump off at the deadline even if the event loop is stalled.
+PUMP_MAX_ON_SECONDS = {
+    "water_out": 300,
+    "water_in": 300,
+    "flora_micro": 60,
+    "flora_gro": 60,
+    "flora_bloom": 60,
+}
+# Number of recent shutoffs kept for the lateness metric.
+WATCHDOG_HISTORY = 100
+# A timed dispense is the caller's to stop: the watchdog steps in only this
+# long after the intended stop, so normal completions aren't counted as forced.
+WATCHDOG_EXACT_GRACE_SECONDS = 0.1
+
+# Batched Control
+# Limits for one POST /control/batch plan.
+CONTROL_BATCH_MAX_ACTIONS = 20
+CONTROL_BATCH_MAX_SECONDS = 600
+
+# Sensor Sampler
+# All sensors are sampled at this interval; samples feed the anomaly engine
+# and are appended to one JSONL file per day.
+SAMPLER_INTERVAL_SECONDS = 10
+SENSOR_HISTORY_DIR = f"{DATA_DIR}/history"
+
+# Anomaly Detection
+# Samples kept per metric (360 x 10 s = 1 hour).
+ANOMALY_WINDOW = 360
+# No statistical checks until a metric has this many samples.
+ANOMALY_MIN_SAMPLES = 30
+# Rolling z-score above which a single sample is a spike.
+ANOMALY_Z_THRESHOLD = 4.0
+# Change point: mean of the last N samples vs the rest of the window, in standard deviations.
+ANOMALY_SHIFT_SAMPLES = 18
+ANOMALY_SHIFT_THRESHOLD = 3.0
+# Identical readings for this many samples (15 min) means the probe is stuck (real ADC readings jitter).
+ANOMALY_STUCK_SAMPLES = 90
+# Missing readings for this many consecutive samples is a dropout.
+ANOMALY_DROPOUT_SAMPLES = 6
+# Fastest plausible change per minute, per metric.
+ANOMALY_MAX_RATE_PER_MINUTE = {
+    "ph": 0.5,
+    "tds_ppm": 150.0,
+    "temperature_f": 3.0,
+    "humidity_percent": 10.0,
+}
+# Standard deviation floor per metric, so a very quiet signal doesn't turn noise into huge z-scores.
+ANOMALY_MIN_STD = {
+    "ph": 0.02,
+    "tds_ppm": 5.0,
+    "temperature_f": 0.5,
+    "humidity_percent": 1.0,
+}
+# The same (metric, kind) alert is not repeated within this many seconds.
+ALERT_COOLDOWN_SECONDS = 1800
+ALERTS_FILE = f"{DATA_DIR}/alerts.jsonl"
+ALERT_HISTORY = 500
+
+# Vision Features
+# Timelapse frames are decoded at this width for analysis (ffmpeg -> RGB array).
+VISION_ANALYSIS_WIDTH = 320
+# Worker processes for feature extraction (NumPy work holds the GIL).
+VISION_WORKERS = 2
+# Per-frame features are appended here, next to the sensor history.
+FRAME_FEATURES_FILE = f"{SENSOR_HISTORY_DIR}/frame_features.jsonl"
+# Excess-green threshold (2g - r - b on chromatic coordinates) for canopy pixels.
+VISION_EXG_THRESHOLD = 0.05
+# Pixels darker than this (0-255 mean RGB) are ignored: shadows, soil, background.
+VISION_MIN_BRIGHTNESS = 40
+
+# Capture Change Index
+# Perceptual hashes (64-bit dHash) of timelapse frames and plant photos.
+CAPTURE_HASHES_FILE = f"{SENSOR_HISTORY_DIR}/capture_hashes.jsonl"
+# Hamming distance (out of 64 bits) from the previous keyframe at which a capture counts as changed.
+PHASH_CHANGE_THRESHOLD = 6
+# Leave near-duplicate frames out of the generated timelapse video.
+TIMELAPSE_SKIP_DUPLICATES = True
+
+# Process Layout
+# local:  one process owns the hardware and serves the API (default).
+# daemon: `python -m src.daemon` owns the hardware, runs the background services
+#         and serves device calls over HARDWARE_SOCKET.
+# client: API workers (uvicorn --workers N) that proxy device calls to the daemon.
+HARDWARE_MODE = os.environ.get("ZP_HARDWARE_MODE", "local")
+HARDWARE_SOCKET = os.environ.get("ZP_HARDWARE_SOCKET", f"{DATA_DIR}/hardware.sock")
+# Longest blocking device call (camera capture, 30 s microphone clip) plus margin
+HARDWARE_RPC_TIMEOUT_SECONDS = 60
+# flock()ed by whichever process holds the system lock (daemon and client modes)
+SYSTEM_LOCK_FILE = f"{DATA_DIR}/system.lock"
+
+# Telemetry Ring
+# Memory-mapped ring of recent sensor samples that any local process can read
+# without touching the hardware. /dev/shm keeps it in RAM (off the SD card).
+TELEMETRY_RING_FILE = "/dev/shm/zombieplant_telemetry" if os.path.isdir("/dev/shm") else f"{DATA_DIR}/telemetry.ring"
+# 1 hour of samples at SAMPLER_INTERVAL_SECONDS
+TELEMETRY_RING_RECORDS = 360
+# Readers fall back to the hardware when the newest sample is older (a missed sample is tolerated)
+TELEMETRY_MAX_AGE_SECONDS = 2 * SAMPLER_INTERVAL_SECONDS
+
+# Acoustic Monitor
+# Always-on microphone listener that checks pump noise against commanded pump states.
+ACOUSTIC_MONITOR_ENABLED = True
+# 44.1 kHz capture is averaged in blocks of 4 samples -> 11.025 kHz (pump noise is well below 5 kHz)
+ACOUSTIC_DECIMATION = 4
+ACOUSTIC_BLOCK_SECONDS = 1.0
+ACOUSTIC_FFT_SIZE = 1024
+# Band energies reported per block (Hz); ACOUSTIC_PUMP_BAND is the one checked against pump state
+ACOUSTIC_BANDS = {
+    "low": (20, 150),
+    "pump": (150, 2000),
+    "mid": (2000, 4000),
+    "high": (4000, 5500),
+}
+ACOUSTIC_PUMP_BAND = "pump"
+# Blocks after a pump or relay switches before the sound is judged
+ACOUSTIC_SETTLE_SECONDS = 2.0
+# Quiet blocks (no pump on) averaged into the background level before checks start
+ACOUSTIC_BASELINE_BLOCKS = 60
+# A running pump must be at least this much louder than the background...
+ACOUSTIC_PUMP_MIN_RATIO = 2.0
+# ...and with every pump off, this much louder than the background is unexpected noise
+ACOUSTIC_NOISE_RATIO = 4.0
+# Consecutive suspicious blocks before an alert
+ACOUSTIC_ALERT_BLOCKS = 5
+ACOUSTIC_HISTORY_SECONDS = 600
+
+# Live Camera Stream
+# One rpicam-vid MJPEG pipeline shared by every /sensors/camera/stream viewer.
+STREAM_WIDTH = 1280
+STREAM_HEIGHT = 720
+STREAM_FRAMERATE = 10
+STREAM_QUALITY = 80
+# The pipeline is stopped this long after the last viewer disconnects
+STREAM_IDLE_SECONDS = 5
+
+# Admission Control
+# Expensive endpoints wait in a bounded queue per resource, served round-robin
+# between clients (X-Client-Id header, else the client address).
+#   concurrency:    requests using the resource at once
+#   max_waiting:    queued requests beyond which new ones get 503 + Retry-After
+#   max_per_client: queued requests per client beyond which new ones get 429
+#   deadline:       longest wait in seconds (X-Max-Wait may shorten it); a request
+#                   that can't start in time is refused up front
+#   estimate:       initial service time guess in seconds, refined as requests complete
+ADMISSION_QUEUES = {
+    "camera": {"concurrency": 1, "max_waiting": 8, "max_per_client": 2, "deadline": 30, "estimate": 5},
+    "microphone": {"concurrency": 1, "max_waiting": 4, "max_per_client": 1, "deadline": 90, "estimate": 10},
+    "diagnose": {"concurrency": 1, "max_waiting": 2, "max_per_client": 1, "deadline": 300, "estimate": 60},
+}
+
+# History Export
+# GET /export streams tables in chunks of this many rows (one gzip member,
+# Arrow record batch or Parquet row group each), so memory use doesn't grow with the range.
+EXPORT_CHUNK_ROWS = 5000
+
+# Trace Recording
+# Float-switch edges, ADC samples, DHT readings and actuator commands are
+# appended to one JSONL file per day, for replaying control logic offline at
+# virtual time (python -m src.logic.replay). Set ZP_TRACE=0 to disable.
+TRACE_ENABLED = os.environ.get("ZP_TRACE", "1") == "1"
+TRACE_DIR = f"{DATA_DIR}/traces"
+# Each ADC channel is recorded at most this often (a pH reading alone is 20 conversions)
+TRACE_ADC_INTERVAL_SECONDS = 5
+TRACE_RETENTION_DAYS = 31
+
+# Debug Endpoints
+# /debug/profile and /debug/tasks answer only when ZP_DEBUG_TOKEN is set, and
+# only to callers sending it in the X-Debug-Token header.
+DEBUG_TOKEN = os.environ.get("ZP_DEBUG_TOKEN")
+PROFILE_MAX_SECONDS = 120
+# 100 Hz: one pass over every thread's stack per sample
+PROFILE_SAMPLE_INTERVAL_SECONDS = 0.01
@@ -0,0 +1,85 @@
+"""
+Hardware daemon: the one process that owns the GPIO, SPI, camera and
+microphone devices. It runs the background services (scheduler, sampler,
+overflow monitor, watchdog) and the job manager, and serves device calls,
+jobs, schedules and alerts to the API workers over a Unix socket.
+
+    ZP_HARDWARE_MODE=daemon python -m src.daemon
+    ZP_HARDWARE_MODE=client uvicorn src.main:app --workers 4
+"""
+import asyncio
+import logging
+import signal
+import sys
+
+from src.config import HARDWARE_MODE, HARDWARE_SOCKET
+from src.hardware.rpc import RPCServer
+from src.hardware.adc import adc_device
+from src.actuators.pumps import pump_controller
+from src.actuators.ac_relay import ac_relay
+from src.actuators.journal import actuator_journal
+from src.actuators.watchdog import pump_watchdog
+from src.actuators.batch import actuator_batch
+from src.sensors.float_switches import water_level
+from src.sensors.tds import tds_sensor
+from src.sensors.ph import ph_sensor
+from src.sensors.dht import dht_sensor
+from src.sensors.camera import camera
+from src.sensors.microphone import microphone
+from src.logic.acoustic import acoustic_monitor
+from src.logic.jobs import job_manager
+from src.logic.scheduler import scheduler
+from src.logic.anomaly import anomaly_engine
+from src.logic.routines import control_routines
+from src.profiling import hardware_profiler, install_task_clock
+from src.runtime import start_services, stop_services
+
+logger = logging.getLogger("daemon")
+
+# Names must match the hardware_singleton() targets used by the proxies
+HARDWARE_TARGETS = {
+    "pump_controller": pump_controller,
+    "ac_relay": ac_relay,
+    "water_level": water_level,
+    "adc_device": adc_device,
+    "tds_sensor": tds_sensor,
+    "ph_sensor": ph_sensor,
+    "dht_sensor": dht_sensor,
+    "camera": camera,
+    "microphone": microphone,
+    "actuator_journal": actuator_journal,
+    "pump_watchdog": pump_watchdog,
+    "actuator_batch": actuator_batch,
+    "acoustic_monitor": acoustic_monitor,
+    "hardware_profiler": hardware_profiler,
+    # Jobs, schedules and alerts exist once, here, for every API worker
+    "job_manager": job_manager,
+    "scheduler": scheduler,
+    "anomaly_engine": anomaly_engine,
+    # Tank routines, so workers never poll the hardware from their own loop
+    "control_routines": control_routines,
+}
+
+async def run_daemon(path: str = HARDWARE_SOCKET):
+    server = RPCServer(path, HARDWARE_TARGETS)
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+    # Task ages for /debug/tasks?process=hardware
+    install_task_clock(loop)
+
+    await start_services()
+    try:
+        await server.start()
+        await stop.wait()
+    finally:
+        await server.close()
+        await stop_services()
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    if HARDWARE_MODE != "daemon":
+        # In local mode the API process already owns the hardware
+        sys.exit("Set ZP_HARDWARE_MODE=daemon to run the hardware daemon")
+    asyncio.run(run_daemon())
@@ -1,4 +1,6 @@
 import spidev
+from src.hardware.rpc import hardware_singleton
+from src.hardware.trace import trace_recorder
 
 class MCP3008:
     def __init__(self, bus=0, device=0):
@@ -14,10 +16,11 @@ class MCP3008:
         # 8 + channel << 4 provides the control bits
         adc = self.spi.xfer2([1, (8 + channel) << 4, 0])
         data = ((adc[1] & 3) << 8) + adc[2]
+        trace_recorder.adc(channel, data)
         return data
 
     def close(self):
         self.spi.close()
 
 # Singleton instance
-adc_device = MCP3008()
+adc_device = hardware_singleton("adc_device", MCP3008)
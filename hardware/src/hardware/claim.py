@@ -0,0 +1,29 @@
+import threading
+
+class DeviceClaim:
+    """
+    Exclusive use of a device that can only be opened once (USB microphone,
+    camera). Long-running background users (monitors, live streams) poll
+    `contended` and hand the device over when an on-demand user is waiting.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._waiters_lock = threading.Lock()
+        self._waiters = 0
+
+    @property
+    def contended(self) -> bool:
+        """True while someone is waiting to claim the device."""
+        return self._waiters > 0
+
+    def __enter__(self):
+        with self._waiters_lock:
+            self._waiters += 1
+        self._lock.acquire()
+        with self._waiters_lock:
+            self._waiters -= 1
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._lock.release()
@@ -0,0 +1,94 @@
+"""
+Inert stand-ins for the device libraries (gpiozero, spidev, adafruit_dht,
+board, pyaudio), for a process that imports src/ but must never touch the
+hardware: the offline replay (python -m src.logic.replay), which may run on
+the Pi next to the live daemon or on a machine without the Pi's libraries.
+
+install() has to run before anything under src/ is imported: the hardware
+singletons open their devices when their modules are imported.
+"""
+import os
+import sys
+import types
+
+class _OutputDevice:
+    def __init__(self, pin=None, *, active_high=True, initial_value=False, **kwargs):
+        self.pin = pin
+        self.value = bool(initial_value)
+
+    def on(self):
+        self.value = True
+
+    def off(self):
+        self.value = False
+
+    @property
+    def is_active(self):
+        return self.value
+
+    def close(self):
+        pass
+
+class _Button:
+    def __init__(self, pin=None, **kwargs):
+        self.pin = pin
+        self.is_pressed = False
+        self.when_pressed = None
+        self.when_released = None
+
+    def close(self):
+        pass
+
+class _SpiDev:
+    def __init__(self):
+        self.max_speed_hz = 0
+
+    def open(self, bus, device):
+        pass
+
+    def xfer2(self, data):
+        return [0] * len(data)
+
+    def close(self):
+        pass
+
+class _DHT11:
+    def __init__(self, pin):
+        self.pin = pin
+
+    @property
+    def temperature(self):
+        raise RuntimeError("No DHT11 in offline mode")
+
+    @property
+    def humidity(self):
+        raise RuntimeError("No DHT11 in offline mode")
+
+    def exit(self):
+        pass
+
+class _PyAudio:
+    def open(self, *args, **kwargs):
+        raise OSError("No audio input in offline mode")
+
+    def terminate(self):
+        pass
+
+def _module(name: str, **attrs) -> types.ModuleType:
+    module = types.ModuleType(name)
+    vars(module).update(attrs)
+    return module
+
+def install():
+    """Local hardware mode and inert device libraries for the rest of this process."""
+    if "src.config" in sys.modules:
+        raise RuntimeError("Offline mode must be installed before src is imported.")
+    # No proxies to (or lock file shared with) a running daemon
+    os.environ["ZP_HARDWARE_MODE"] = "local"
+    sys.modules.update({
+        "gpiozero": _module("gpiozero", DigitalOutputDevice=_OutputDevice, Button=_Button),
+        "spidev": _module("spidev", SpiDev=_SpiDev),
+        "adafruit_dht": _module("adafruit_dht", DHT11=_DHT11),
+        "board": _module("board", **{f"D{gpio}": gpio for gpio in range(28)}),
+        "pyaudio": _module("pyaudio", paInt16=8, PyAudio=_PyAudio),
+    })
@@ -0,0 +1,392 @@
+import asyncio
+import inspect
+import itertools
+import json
+import logging
+import os
+import socket
+import struct
+import threading
+from functools import lru_cache
+from typing import Any, Callable, Dict, Optional, Set, get_type_hints
+
+from fastapi import HTTPException
+from pydantic import BaseModel, TypeAdapter
+
+from src.config import HARDWARE_MODE, HARDWARE_SOCKET, HARDWARE_RPC_TIMEOUT_SECONDS
+
+logger = logging.getLogger("rpc")
+
+# Frames are a 4-byte big-endian length followed by a JSON document
+HEADER = struct.Struct("!I")
+MAX_FRAME_BYTES = 16 * 1024 * 1024
+
+# Raised with their own type on the calling side, so existing handlers keep working
+PASSTHROUGH_ERRORS = {
+    error.__name__: error
+    for error in (ValueError, KeyError, TimeoutError, RuntimeError, FileNotFoundError)
+}
+
+class RemoteError(RuntimeError):
+    """An exception raised inside the hardware daemon with no local equivalent."""
+
+def passthrough(error: type) -> type:
+    """Registers an exception type to be raised as itself on the calling side (by class name)."""
+    PASSTHROUGH_ERRORS[error.__name__] = error
+    return error
+
+def _jsonable(value: Any) -> Any:
+    # Models (job status, schedule rules, alerts) travel as their JSON form
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json")
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def encode(message: dict) -> bytes:
+    body = json.dumps(message, default=_jsonable).encode()
+    return HEADER.pack(len(body)) + body
+
+@lru_cache(maxsize=None)
+def _adapter(hint: Any) -> Optional[TypeAdapter]:
+    try:
+        return TypeAdapter(hint)
+    except Exception:
+        # Not a type pydantic can validate (e.g. numpy arrays): passed as is
+        return None
+
+def _coerce(func: Callable, args: list, kwargs: dict):
+    """Rebuilds models and enums that arrived as JSON, from the method's annotations."""
+    try:
+        hints = get_type_hints(func)
+        signature = inspect.signature(func)
+    except (TypeError, ValueError, NameError):
+        return args, kwargs
+    try:
+        bound = signature.bind(*args, **kwargs)
+    except TypeError as e:
+        raise ValueError(str(e)) from e
+    for name, value in bound.arguments.items():
+        kind = signature.parameters[name].kind
+        hint = hints.get(name)
+        if hint is None or kind in (inspect.Parameter.VAR_POSITIONAL, inspect.Parameter.VAR_KEYWORD):
+            continue
+        adapter = _adapter(hint)
+        if adapter is not None:
+            bound.arguments[name] = adapter.validate_python(value)
+    return bound.args, bound.kwargs
+
+# --- Server ---
+
+class RPCServer:
+    """
+    Serves the hardware singletons over a Unix socket.
+
+    A request names a target (e.g. "pump_controller"), a public attribute and
+    either `get` (read a property) or call arguments. Blocking methods run in
+    worker threads; coroutine methods run on the daemon's loop. Targets whose
+    state belongs to the loop (jobs, schedules, alerts) set RPC_ON_LOOP and
+    have their plain methods called on the loop too. Arguments are rebuilt
+    from the method's annotations, so models and enums arrive as such. Each
+    connection is handled in order, so clients open one connection per
+    calling thread.
+    """
+
+    def __init__(self, path: str, targets: Dict[str, Any]):
+        self.path = path
+        self.targets = targets
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._connections: Set[asyncio.StreamWriter] = set()
+
+    async def start(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        # Left behind by a daemon that did not shut down cleanly
+        if os.path.exists(self.path):
+            os.remove(self.path)
+        self._server = await asyncio.start_unix_server(self._handle, path=self.path)
+        os.chmod(self.path, 0o660)
+        logger.info(f"Hardware RPC listening on {self.path}")
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            # Open client connections would otherwise keep being served
+            for writer in list(self._connections):
+                writer.close()
+            await self._server.wait_closed()
+            self._server = None
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self._connections.add(writer)
+        try:
+            while True:
+                (length,) = HEADER.unpack(await reader.readexactly(HEADER.size))
+                if length > MAX_FRAME_BYTES:
+                    logger.error(f"Dropping RPC connection: {length} byte frame")
+                    break
+                request = json.loads(await reader.readexactly(length))
+                writer.write(await self.dispatch(request))
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        except ValueError as e:
+            logger.error(f"Malformed RPC request: {e}")
+        finally:
+            self._connections.discard(writer)
+            writer.close()
+
+    async def dispatch(self, request: dict) -> bytes:
+        request_id = request.get("id")
+        try:
+            result = await self._call(
+                request.get("target"), request.get("name", ""),
+                request.get("args", []), request.get("kwargs", {}), request.get("get", False)
+            )
+            return encode({"id": request_id, "result": result})
+        except HTTPException as e:
+            # Routines report failures as HTTP errors; the worker answers with the same status
+            return encode({
+                "id": request_id, "error": e.detail, "type": "HTTPException",
+                "status_code": e.status_code, "headers": e.headers,
+            })
+        except Exception as e:
+            return encode({"id": request_id, "error": str(e), "type": type(e).__name__})
+
+    async def _call(self, target: str, name: str, args: list, kwargs: dict, get: bool) -> Any:
+        if target not in self.targets or name.startswith("_"):
+            raise ValueError(f"Unknown hardware call: {target}.{name}")
+        instance = self.targets[target]
+        attr = getattr(instance, name)
+        if get:
+            return attr
+        args, kwargs = _coerce(attr, args, kwargs)
+        if inspect.iscoroutinefunction(attr):
+            return await attr(*args, **kwargs)
+        if getattr(instance, "RPC_ON_LOOP", False):
+            return attr(*args, **kwargs)
+        return await asyncio.to_thread(attr, *args, **kwargs)
+
+# --- Client ---
+
+_DEFAULT = object()
+
+class RPCClient:
+    """Blocking client for the hardware daemon, one connection per calling thread."""
+
+    def __init__(self, path: str = HARDWARE_SOCKET, timeout: float = HARDWARE_RPC_TIMEOUT_SECONDS):
+        self.path = path
+        self.timeout = timeout
+        self._local = threading.local()
+        self._ids = itertools.count()
+
+    def _connect(self) -> socket.socket:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.connect(self.path)
+        except OSError as e:
+            sock.close()
+            raise ConnectionError(f"Hardware daemon unavailable at {self.path}: {e}") from e
+        return sock
+
+    def _reset(self):
+        sock = getattr(self._local, "sock", None)
+        self._local.sock = None
+        if sock is not None:
+            sock.close()
+
+    @staticmethod
+    def _receive_exactly(sock: socket.socket, size: int) -> bytes:
+        data = bytearray()
+        while len(data) < size:
+            chunk = sock.recv(size - len(data))
+            if not chunk:
+                raise ConnectionResetError("Hardware daemon closed the connection")
+            data += chunk
+        return bytes(data)
+
+    def _exchange(self, sock: socket.socket, request: dict, timeout: Optional[float]) -> dict:
+        sock.settimeout(timeout)
+        sock.sendall(encode(request))
+        (length,) = HEADER.unpack(self._receive_exactly(sock, HEADER.size))
+        return json.loads(self._receive_exactly(sock, length))
+
+    def _request(self, target: str, name: str, args, kwargs: Optional[dict], get: bool) -> dict:
+        return {
+            "id": next(self._ids), "target": target, "name": name,
+            "args": list(args), "kwargs": kwargs or {}, "get": get,
+        }
+
+    @staticmethod
+    def _result(response: dict) -> Any:
+        if response.get("type") == "HTTPException":
+            raise HTTPException(
+                status_code=response["status_code"], detail=response["error"], headers=response.get("headers")
+            )
+        if "error" in response:
+            error = PASSTHROUGH_ERRORS.get(response.get("type"), RemoteError)
+            raise error(response["error"])
+        return response["result"]
+
+    def call(
+        self, target: str, name: str, args=(), kwargs: Optional[dict] = None,
+        get: bool = False, timeout: Any = _DEFAULT
+    ) -> Any:
+        """
+        Calls (or with `get`, reads) target.name in the daemon. A timeout of
+        None waits for as long as the call takes.
+        """
+        timeout = self.timeout if timeout is _DEFAULT else timeout
+        request = self._request(target, name, args, kwargs, get)
+        sock = getattr(self._local, "sock", None)
+        reused = sock is not None
+        if sock is None:
+            sock = self._local.sock = self._connect()
+        try:
+            response = self._exchange(sock, request, timeout)
+        except socket.timeout as e:
+            # A late reply would be read as the answer to the next call
+            self._reset()
+            raise TimeoutError(f"Hardware call {target}.{name} timed out") from e
+        except ConnectionError:
+            self._reset()
+            if not reused:
+                raise
+            # The daemon restarted since this connection was opened: the old
+            # process never saw the request, so sending it again is safe
+            sock = self._local.sock = self._connect()
+            try:
+                response = self._exchange(sock, request, timeout)
+            except (OSError, ValueError):
+                self._reset()
+                raise
+        return self._result(response)
+
+    async def call_async(
+        self, target: str, name: str, args=(), kwargs: Optional[dict] = None,
+        get: bool = False, timeout: Any = _DEFAULT
+    ) -> Any:
+        """
+        call() for coroutines. Each call has a connection of its own, so a
+        long call (a fill, a long-poll) holds neither the loop nor a thread.
+        """
+        timeout = self.timeout if timeout is _DEFAULT else timeout
+        request = self._request(target, name, args, kwargs, get)
+        try:
+            reader, writer = await asyncio.open_unix_connection(self.path)
+        except OSError as e:
+            raise ConnectionError(f"Hardware daemon unavailable at {self.path}: {e}") from e
+        try:
+            writer.write(encode(request))
+            await writer.drain()
+            header = await asyncio.wait_for(reader.readexactly(HEADER.size), timeout)
+            (length,) = HEADER.unpack(header)
+            response = json.loads(await reader.readexactly(length))
+        except asyncio.TimeoutError as e:
+            raise TimeoutError(f"Hardware call {target}.{name} timed out") from e
+        except asyncio.IncompleteReadError as e:
+            raise ConnectionResetError("Hardware daemon closed the connection") from e
+        finally:
+            writer.close()
+        return self._result(response)
+
+    def close(self):
+        self._reset()
+
+# --- Proxies ---
+
+def _ensure_off_loop(target: str, name: str):
+    """
+    Blocking calls to the daemon are for threads (sync handlers, to_thread).
+    On an event loop they would stall every request of the worker.
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return
+    raise RuntimeError(
+        f"Blocking hardware call {target}.{name} on the event loop; "
+        "use `await offload(...)` or asyncio.to_thread"
+    )
+
+class RemoteMethod:
+    """A blocking method of a proxied singleton; `offload()` awaits it without blocking the loop."""
+
+    def __init__(self, proxy: "RemoteProxy", name: str):
+        self._proxy = proxy
+        self._name = name
+
+    def __call__(self, *args, **kwargs):
+        _ensure_off_loop(self._proxy._target, self._name)
+        return self._proxy._rpc().call(self._proxy._target, self._name, args, kwargs)
+
+    async def call_async(self, *args, **kwargs):
+        return await self._proxy._rpc().call_async(self._proxy._target, self._name, args, kwargs)
+
+async def offload(method: Callable, *args, **kwargs) -> Any:
+    """
+    Calls a blocking method of a hardware singleton from a coroutine. A proxy
+    method goes to the daemon over the async client; a local method is called
+    right away, on the loop, as before.
+    """
+    if isinstance(method, RemoteMethod):
+        return await method.call_async(*args, **kwargs)
+    return method(*args, **kwargs)
+
+class RemoteProxy:
+    """
+    Stands in for a hardware singleton in an API worker. Public methods and
+    properties of the original class are forwarded to the daemon; coroutine
+    methods stay awaitable (over the async client). Values come back in their
+    JSON form: models as dicts, tuples as lists.
+
+    Plain methods and properties block on the daemon's reply, so they are
+    only used from threads: sync handlers (FastAPI runs them in its pool) or
+    asyncio.to_thread. Called on an event loop they raise; coroutines use
+    `await offload(proxy.method, ...)`.
+    """
+
+    def __init__(self, target: str, cls: type, client: Optional[RPCClient] = None):
+        self._target = target
+        self._cls = cls
+        self._client = client
+
+    def _rpc(self) -> RPCClient:
+        return self._client or hardware_client()
+
+    def __getattr__(self, name: str):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        try:
+            attr = inspect.getattr_static(self._cls, name)
+        except AttributeError:
+            # Instance attribute set in __init__
+            attr = None
+
+        if inspect.iscoroutinefunction(attr):
+            async def call_async(*args, **kwargs):
+                return await self._rpc().call_async(self._target, name, args, kwargs, timeout=None)
+            return call_async
+        if callable(attr) and not isinstance(attr, property):
+            return RemoteMethod(self, name)
+        _ensure_off_loop(self._target, name)
+        return self._rpc().call(self._target, name, get=True)
+
+    def __repr__(self) -> str:
+        return f"<RemoteProxy {self._target} ({self._cls.__name__})>"
+
+_client: Optional[RPCClient] = None
+
+def hardware_client() -> RPCClient:
+    global _client
+    if _client is None:
+        _client = RPCClient()
+    return _client
+
+def hardware_singleton(target: str, cls: type, *args, **kwargs):
+    """
+    The device object itself in the process that owns the hardware, or a
+    proxy to the daemon's instance in API workers (HARDWARE_MODE=client).
+    """
+    if HARDWARE_MODE == "client":
+        return RemoteProxy(target, cls)
+    return cls(*args, **kwargs)
@@ -0,0 +1,178 @@
+import bisect
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from src.config import TRACE_DIR, TRACE_ADC_INTERVAL_SECONDS, TRACE_RETENTION_DAYS
+
+logger = logging.getLogger("trace")
+
+# Event kinds
+LEVEL = "level"        # float switches: {"full", "empty"}, on every edge
+ADC = "adc"            # {"channel", "raw"}, rate-limited per channel
+DHT = "dht"            # {"temperature_f", "humidity_percent"}, every good read
+ACTUATOR = "actuator"  # {"device", "on"}, every transition
+
+def _day(t: float) -> str:
+    return datetime.fromtimestamp(t).strftime("%Y-%m-%d")
+
+class TraceRecorder:
+    """
+    Production trace of what the control logic sees and does, for replaying
+    it offline (src/logic/replay.py).
+
+    The hardware classes report through the hooks below; each call is a
+    no-op until start() and otherwise appends one JSON line to the current
+    day's file (buffered, flushed on every write like the sensor history).
+    ADC channels are sampled at most every TRACE_ADC_INTERVAL_SECONDS: the
+    replay holds the last value, which is what the slow water chemistry
+    looks like anyway.
+    """
+
+    def __init__(self, root: str = TRACE_DIR, adc_interval: float = TRACE_ADC_INTERVAL_SECONDS):
+        self.root = root
+        self.adc_interval = adc_interval
+        self.active = False
+        self._lock = threading.Lock()
+        self._file = None
+        self._day: Optional[str] = None
+        self._adc_last: Dict[int, float] = {}
+
+    def _path(self, day: str) -> str:
+        return os.path.join(self.root, f"{day}.jsonl")
+
+    def start(self, retention_days: int = TRACE_RETENTION_DAYS):
+        os.makedirs(self.root, exist_ok=True)
+        oldest = _day(time.time() - retention_days * 86400)
+        for name in os.listdir(self.root):
+            if name.endswith(".jsonl") and name[:-len(".jsonl")] < oldest:
+                try:
+                    os.remove(os.path.join(self.root, name))
+                except OSError as e:
+                    logger.warning(f"Could not remove old trace {name}: {e}")
+        self.active = True
+
+    def stop(self):
+        with self._lock:
+            self.active = False
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+                self._day = None
+
+    def _write(self, event: dict):
+        line = json.dumps(event) + "\n"
+        day = _day(event["t"])
+        with self._lock:
+            if not self.active:
+                return
+            try:
+                if day != self._day:
+                    if self._file is not None:
+                        self._file.close()
+                    self._file = open(self._path(day), "a")
+                    self._day = day
+                self._file.write(line)
+                self._file.flush()
+            except OSError as e:
+                # Never let tracing get in the way of the hardware
+                logger.error(f"Trace write failed: {e}")
+
+    # --- Hooks ---
+
+    def level(self, full: bool, empty: bool):
+        if self.active:
+            self._write({"t": time.time(), "kind": LEVEL, "full": bool(full), "empty": bool(empty)})
+
+    def adc(self, channel: int, raw: int):
+        if not self.active:
+            return
+        now = time.time()
+        if now - self._adc_last.get(channel, float("-inf")) < self.adc_interval:
+            return
+        self._adc_last[channel] = now
+        self._write({"t": now, "kind": ADC, "channel": channel, "raw": raw})
+
+    def dht(self, reading: dict):
+        if self.active:
+            self._write({
+                "t": time.time(), "kind": DHT,
+                "temperature_f": reading["temperature_f"], "humidity_percent": reading["humidity_percent"],
+            })
+
+    def actuator(self, device: str, on: bool, t: Optional[float] = None):
+        if self.active:
+            self._write({"t": time.time() if t is None else t, "kind": ACTUATOR, "device": device, "on": on})
+
+class Trace:
+    """
+    Recorded events over a time range, indexed per signal (level, ADC
+    channel, DHT) so a replay can ask for the value at any instant: the
+    most recent event at or before it (sample-and-hold).
+    """
+
+    def __init__(self, events: List[dict], start: Optional[float] = None, end: Optional[float] = None):
+        events = sorted(events, key=lambda event: event["t"])
+        self.start = start if start is not None else (events[0]["t"] if events else 0.0)
+        self.end = end if end is not None else (events[-1]["t"] if events else self.start)
+        # signal -> (times, events), both oldest first
+        self._series: Dict[Tuple, Tuple[List[float], List[dict]]] = {}
+        self.commands: List[dict] = []
+        for event in events:
+            if event["kind"] == ACTUATOR:
+                if self.start <= event["t"] <= self.end:
+                    self.commands.append(event)
+                continue
+            times, values = self._series.setdefault(self._key(event), ([], []))
+            times.append(event["t"])
+            values.append(event)
+
+    @staticmethod
+    def _key(event: dict) -> Tuple:
+        if event["kind"] == ADC:
+            return (ADC, event["channel"])
+        return (event["kind"],)
+
+    @classmethod
+    def load(cls, start: float, end: float, root: str = TRACE_DIR) -> "Trace":
+        """Events in [start, end] plus the day before, so every signal has a value at `start`."""
+        return cls(list(read_events(start - 86400, end, root)), start, end)
+
+    def at(self, t: float, kind: str, channel: Optional[int] = None) -> Optional[dict]:
+        """The latest event of one signal at or before `t` (None before the first)."""
+        key = (kind, channel) if kind == ADC else (kind,)
+        series = self._series.get(key)
+        if series is None:
+            return None
+        times, values = series
+        i = bisect.bisect_right(times, t) - 1
+        return values[i] if i >= 0 else None
+
+    def signals(self) -> Dict[str, int]:
+        """Event count per signal, e.g. {"level": 120, "adc:0": 5000}."""
+        return {":".join(str(part) for part in key): len(times) for key, (times, _) in self._series.items()}
+
+def read_events(start: float, end: float, root: str = TRACE_DIR) -> Iterator[dict]:
+    """Trace events with start <= t <= end, oldest file first."""
+    day = datetime.fromtimestamp(start).date()
+    last_day = datetime.fromtimestamp(end).date()
+    while day <= last_day:
+        try:
+            with open(os.path.join(root, f"{day.strftime('%Y-%m-%d')}.jsonl"), "r") as f:
+                for line in f:
+                    try:
+                        event: Dict[str, Any] = json.loads(line)
+                    except ValueError:
+                        continue
+                    if start <= event["t"] <= end:
+                        yield event
+        except FileNotFoundError:
+            pass
+        day += timedelta(days=1)
+
+# Global instance (one per process; only the process that owns the hardware starts it)
+trace_recorder = TraceRecorder()
@@ -0,0 +1,230 @@
+import asyncio
+import logging
+import threading
+import time
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from src.config import (
+    ACOUSTIC_DECIMATION, ACOUSTIC_BLOCK_SECONDS, ACOUSTIC_FFT_SIZE, ACOUSTIC_BANDS,
+    ACOUSTIC_PUMP_BAND, ACOUSTIC_SETTLE_SECONDS, ACOUSTIC_BASELINE_BLOCKS,
+    ACOUSTIC_PUMP_MIN_RATIO, ACOUSTIC_NOISE_RATIO, ACOUSTIC_ALERT_BLOCKS,
+    ACOUSTIC_HISTORY_SECONDS
+)
+from src.models import Alert, AlertKind
+from src.hardware.rpc import hardware_singleton
+from src.actuators.pumps import pump_controller
+from src.actuators.ac_relay import ac_relay
+from src.sensors.microphone import microphone
+from src.logic.anomaly import AnomalyEngine, anomaly_engine
+
+logger = logging.getLogger("acoustic")
+
+# Wait before reopening the microphone after an error
+RETRY_SECONDS = 30
+# Floor for the background level (a digitally silent input would divide by zero)
+MIN_BASELINE = 1e-9
+
+class BandAnalyzer:
+    """
+    Band energies of a block of 16-bit PCM.
+
+    The block is averaged in groups of `decimation` samples (boxcar low-pass +
+    downsample), cut into FFT frames, and every frame is transformed in one
+    vectorized rfft. Band sums are a single matrix product with precomputed
+    bin masks.
+    """
+
+    def __init__(
+        self, rate: int, decimation: int = ACOUSTIC_DECIMATION,
+        fft_size: int = ACOUSTIC_FFT_SIZE, bands: Dict[str, Tuple[float, float]] = ACOUSTIC_BANDS
+    ):
+        self.decimation = decimation
+        self.fft_size = fft_size
+        self.band_names = list(bands)
+        freqs = np.fft.rfftfreq(fft_size, d=decimation / rate)
+        self.masks = np.stack([(freqs >= lo) & (freqs < hi) for lo, hi in bands.values()]).astype(np.float32)
+        self.window = np.hanning(fft_size).astype(np.float32)
+
+    def features(self, pcm: np.ndarray) -> dict:
+        x = pcm.astype(np.float32) / 32768.0
+        rms = float(np.sqrt(np.mean(x ** 2))) if len(x) else 0.0
+
+        n = len(x) // self.decimation * self.decimation
+        x = x[:n].reshape(-1, self.decimation).mean(axis=1)
+        frames = len(x) // self.fft_size
+        if frames == 0:
+            return {"rms": rms, "bands": {name: 0.0 for name in self.band_names}}
+        x = x[:frames * self.fft_size].reshape(frames, self.fft_size)
+        x = x - x.mean(axis=1, keepdims=True)
+        power = (np.abs(np.fft.rfft(x * self.window, axis=1)) ** 2).mean(axis=0) / self.fft_size
+        energies = self.masks @ power
+        return {
+            "rms": round(rms, 6),
+            "bands": {name: float(e) for name, e in zip(self.band_names, energies)},
+        }
+
+def expected_state() -> Tuple[Tuple[str, ...], bool]:
+    """(pumps commanded on, AC relay on) - the relay also powers the air stones."""
+    pumps_on = tuple(sorted(pid for pid, on in pump_controller.states().items() if on))
+    return pumps_on, bool(ac_relay.is_active)
+
+class AcousticMonitor:
+    """
+    Always-on listener that checks what the microphone hears against what
+    the pumps were told to do.
+
+    A capture thread reads the microphone in ACOUSTIC_BLOCK_SECONDS blocks and
+    reduces each to band energies; the event loop then judges the pump band:
+    - with every pump off, blocks update the background level (one per relay
+      state, since the air stones are loud) and sustained noise well above it
+      raises `unexpected_noise` (leak, air-lock, a relay stuck on)
+    - with a pump on, a pump band no louder than the background raises
+      `pump_silent` (dry-running or dead pump)
+    Blocks shortly after a pump or the relay switched are not judged. The
+    microphone is handed over whenever an on-demand recording claims it.
+    """
+
+    def __init__(self, alerts: AnomalyEngine = anomaly_engine, analyzer: Optional[BandAnalyzer] = None):
+        self.alerts = alerts
+        self.analyzer = analyzer or BandAnalyzer(rate=44100)
+        self.features: deque = deque(maxlen=int(ACOUSTIC_HISTORY_SECONDS / ACOUSTIC_BLOCK_SECONDS))
+        # relay on? -> mean pump-band energy with every pump off
+        self.baselines: Dict[bool, float] = {}
+        self._baseline_blocks: Dict[bool, int] = {}
+        self._state: Optional[Tuple[Tuple[str, ...], bool]] = None
+        self._state_since = 0.0
+        self._suspect_blocks = 0
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    # --- Judging (event loop) ---
+
+    def calibrated(self, relay_on: bool) -> bool:
+        return self._baseline_blocks.get(relay_on, 0) >= ACOUSTIC_BASELINE_BLOCKS
+
+    def _update_baseline(self, relay_on: bool, energy: float):
+        # Running mean while calibrating, then an exponential average over the same span
+        count = self._baseline_blocks.get(relay_on, 0) + 1
+        self._baseline_blocks[relay_on] = count
+        weight = 1.0 / min(count, ACOUSTIC_BASELINE_BLOCKS)
+        previous = self.baselines.get(relay_on, energy)
+        self.baselines[relay_on] = previous + weight * (energy - previous)
+
+    def process(self, t: float, features: dict, state: Optional[Tuple[Tuple[str, ...], bool]] = None) -> Optional[Alert]:
+        """Records one analysed block and checks it against the expected pump state."""
+        pumps_on, relay_on = state if state is not None else expected_state()
+        now = time.monotonic()
+        if (pumps_on, relay_on) != self._state:
+            self._state = (pumps_on, relay_on)
+            self._state_since = now
+            self._suspect_blocks = 0
+        self.features.append({**features, "t": t, "pumps_on": list(pumps_on), "relay_on": relay_on})
+
+        if now - self._state_since < ACOUSTIC_SETTLE_SECONDS:
+            return None
+        energy = features["bands"][ACOUSTIC_PUMP_BAND]
+        baseline = max(self.baselines.get(relay_on, 0.0), MIN_BASELINE)
+
+        if not pumps_on:
+            if self.calibrated(relay_on) and energy > baseline * ACOUSTIC_NOISE_RATIO:
+                # Not learned as background: it would teach the monitor to ignore it
+                self._suspect_blocks += 1
+                if self._suspect_blocks == ACOUSTIC_ALERT_BLOCKS:
+                    ratio = energy / baseline
+                    return self.alerts.report(
+                        AlertKind.unexpected_noise, "acoustic", ratio,
+                        f"Pump-like noise ({ratio:.1f}x background) for {ACOUSTIC_ALERT_BLOCKS} blocks while every pump is off",
+                        {"energy": energy, "baseline": baseline},
+                        ratio=ratio / ACOUSTIC_NOISE_RATIO, now=t
+                    )
+                return None
+            self._suspect_blocks = 0
+            self._update_baseline(relay_on, energy)
+            return None
+
+        if not self.calibrated(relay_on):
+            return None
+        if energy < baseline * ACOUSTIC_PUMP_MIN_RATIO:
+            self._suspect_blocks += 1
+            if self._suspect_blocks == ACOUSTIC_ALERT_BLOCKS:
+                ratio = energy / baseline
+                names = ", ".join(pumps_on)
+                return self.alerts.report(
+                    AlertKind.pump_silent, f"acoustic:{'+'.join(pumps_on)}", ratio,
+                    f"{names} commanded on but only {ratio:.1f}x background noise is heard (dry-running or failed pump?)",
+                    {"energy": energy, "baseline": baseline}, now=t
+                )
+        else:
+            self._suspect_blocks = 0
+        return None
+
+    def _deliver(self, t: float, features: dict):
+        try:
+            self.process(t, features)
+        except Exception as e:
+            logger.error(f"Acoustic check failed: {e}")
+
+    # --- Capture (thread) ---
+
+    def _read_block(self, stream) -> np.ndarray:
+        chunks = max(1, int(microphone.rate * ACOUSTIC_BLOCK_SECONDS / microphone.chunk))
+        data = b"".join(stream.read(microphone.chunk, exception_on_overflow=False) for _ in range(chunks))
+        return np.frombuffer(data, dtype=np.int16)
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                with microphone.claim():
+                    audio, stream = microphone.open_input()
+                    try:
+                        while not self._stop.is_set() and not microphone.contended:
+                            features = self.analyzer.features(self._read_block(stream))
+                            self._loop.call_soon_threadsafe(self._deliver, time.time(), features)
+                    finally:
+                        stream.stop_stream()
+                        stream.close()
+                        audio.terminate()
+            except Exception as e:
+                logger.error(f"Acoustic monitor capture error: {e}")
+                self._stop.wait(RETRY_SECONDS)
+            # Let the waiting recording take the device before reopening it
+            while microphone.contended and not self._stop.is_set():
+                self._stop.wait(0.1)
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._loop = asyncio.get_running_loop()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="acoustic-monitor", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=ACOUSTIC_BLOCK_SECONDS * 3)
+            self._thread = None
+
+    # --- Queries ---
+
+    def recent(self, seconds: Optional[float] = None) -> List[dict]:
+        rows = list(self.features)
+        if seconds is not None and rows:
+            rows = [row for row in rows if row["t"] >= rows[-1]["t"] - seconds]
+        return rows
+
+    def status(self) -> dict:
+        return {
+            "running": self._thread is not None and self._thread.is_alive(),
+            "calibrated": self.calibrated(bool(ac_relay.is_active)),
+            "baselines": {("relay_on" if on else "relay_off"): value for on, value in self.baselines.items()},
+            "latest": self.features[-1] if self.features else None,
+        }
+
+# Global instance (runs in the process that owns the microphone)
+acoustic_monitor = hardware_singleton("acoustic_monitor", AcousticMonitor)
@@ -0,0 +1,305 @@
+import asyncio
+import json
+import logging
+import os
+import time
+import uuid
+import warnings
+from collections import deque
+from typing import Dict, List, Optional, Set, Tuple
+
+import numpy as np
+
+from src.config import (
+    ANOMALY_WINDOW, ANOMALY_MIN_SAMPLES, ANOMALY_Z_THRESHOLD,
+    ANOMALY_SHIFT_SAMPLES, ANOMALY_SHIFT_THRESHOLD, ANOMALY_STUCK_SAMPLES,
+    ANOMALY_DROPOUT_SAMPLES, ANOMALY_MAX_RATE_PER_MINUTE, ANOMALY_MIN_STD,
+    ALERT_COOLDOWN_SECONDS, ALERTS_FILE, ALERT_HISTORY
+)
+from src.models import Alert, AlertKind, AlertSeverity
+from src.hardware.rpc import hardware_singleton
+from src.sse import EventLog
+
+logger = logging.getLogger("anomaly")
+
+# Sample fields watched by the engine (one column each)
+METRICS = ("tds_ppm", "ph", "temperature_f", "humidity_percent")
+# The DHT11 reports whole degrees/percent, so long runs of identical values are normal
+STUCK_METRICS = ("tds_ppm", "ph")
+# Rate of change is measured over this span
+RATE_SPAN_SECONDS = 60.0
+# Alerts buffered per push subscriber before the oldest are dropped
+SUBSCRIBER_QUEUE_SIZE = 100
+
+class SampleWindow:
+    """
+    Fixed-size ring of the last N samples, one column per metric (NaN = missing).
+    ordered() returns the filled part oldest-first for vectorized statistics.
+    """
+
+    def __init__(self, size: int, columns: int):
+        self.size = size
+        self.values = np.full((size, columns), np.nan)
+        self.times = np.full(size, np.nan)
+        self.index = 0
+        self.count = 0
+
+    def push(self, t: float, row: np.ndarray):
+        self.values[self.index] = row
+        self.times[self.index] = t
+        self.index = (self.index + 1) % self.size
+        self.count = min(self.count + 1, self.size)
+
+    def ordered(self) -> Tuple[np.ndarray, np.ndarray]:
+        if self.count < self.size:
+            return self.times[:self.count], self.values[:self.count]
+        order = np.r_[self.index:self.size, 0:self.index]
+        return self.times[order], self.values[order]
+
+class AnomalyEngine:
+    """
+    Online anomaly detection over the sensor sampler's stream.
+
+    Every sample updates a rolling window and runs, for all metrics at once:
+    - spike: rolling z-score of the new sample against the window
+    - change_point: mean of the most recent samples vs the rest of the window
+    - rate_of_change: change over the last minute vs a plausible maximum
+    - stuck: identical ADC readings for too long (dead or disconnected probe)
+    - dropout: a sensor producing no readings for several samples
+    Alerts are rate-limited per (metric, kind), kept in memory, appended to
+    ALERTS_FILE and pushed to subscribers.
+    """
+
+    # Alerts are raised and read on the loop of the process that owns the sampler
+    RPC_ON_LOOP = True
+
+    def __init__(self, window: int = ANOMALY_WINDOW, path: str = ALERTS_FILE):
+        self.path = path
+        self.window = SampleWindow(window, len(METRICS))
+        self.min_std = np.array([ANOMALY_MIN_STD[m] for m in METRICS])
+        self.max_rate = np.array([ANOMALY_MAX_RATE_PER_MINUTE[m] for m in METRICS])
+
+        self.alerts: deque = deque(maxlen=ALERT_HISTORY)
+        self._last_alert: Dict[Tuple[str, AlertKind], float] = {}
+        self._missing = np.zeros(len(METRICS), dtype=int)
+        self._subscribers: Set[asyncio.Queue] = set()
+        # The same pushes for subscribers in API workers (read_events)
+        self._events = EventLog(SUBSCRIBER_QUEUE_SIZE)
+        self._loaded = False
+
+    # --- Storage ---
+
+    def _ensure_loaded(self):
+        if self._loaded:
+            return
+        self._loaded = True
+        try:
+            with open(self.path, "r") as f:
+                lines = deque(f, maxlen=ALERT_HISTORY)
+        except FileNotFoundError:
+            return
+        for line in lines:
+            try:
+                self.alerts.append(Alert(**json.loads(line)))
+            except ValueError:
+                continue
+
+    def _persist(self, alert: Alert):
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(self.path, "a") as f:
+                f.write(alert.model_dump_json() + "\n")
+        except OSError as e:
+            logger.error(f"Failed to persist alert: {e}")
+
+    # --- Push ---
+
+    def subscribe(self) -> asyncio.Queue:
+        queue: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self._subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        self._subscribers.discard(queue)
+
+    async def read_events(self, after: Optional[int] = None, timeout: float = 0) -> dict:
+        """Alerts after cursor `after`, for subscribers in other processes (see EventLog.read)."""
+        return await self._events.read(after, timeout)
+
+    def _emit(self, alert: Alert):
+        self.alerts.append(alert)
+        self._persist(alert)
+        logger.warning(f"Alert [{alert.severity.value}] {alert.message}")
+        payload = alert.model_dump(mode="json")
+        self._events.append(payload)
+        for queue in self._subscribers:
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(payload)
+
+    # --- Detection ---
+
+    def _statistics(self, times: np.ndarray, values: np.ndarray) -> Dict[str, np.ndarray]:
+        """All checks for all metrics on the ordered window (last row = newest sample)."""
+        x = values[-1]
+        history = values[:-1]
+        with warnings.catch_warnings():
+            # Columns with no readings yet produce all-NaN slices
+            warnings.simplefilter("ignore", RuntimeWarning)
+            counts = np.sum(~np.isnan(history), axis=0)
+            mean = np.nanmean(history, axis=0)
+            std = np.maximum(np.nanstd(history, axis=0), self.min_std)
+            z = (x - mean) / std
+
+            recent = values[-ANOMALY_SHIFT_SAMPLES:]
+            before = values[:-ANOMALY_SHIFT_SAMPLES]
+            before_counts = np.sum(~np.isnan(before), axis=0)
+            before_std = np.maximum(np.nanstd(before, axis=0), self.min_std)
+            shift = (np.nanmean(recent, axis=0) - np.nanmean(before, axis=0)) / before_std
+
+            # Oldest sample within the rate span
+            start = np.searchsorted(times, times[-1] - RATE_SPAN_SECONDS)
+            span = times[-1] - times[start]
+            # Over a shorter span, quantization (DHT11 whole degrees) looks like a fast change
+            if span >= RATE_SPAN_SECONDS * 0.75:
+                rate = (x - values[start]) / span * 60.0
+            else:
+                rate = np.full(len(METRICS), np.nan)
+
+            tail = values[-ANOMALY_STUCK_SAMPLES:]
+            stuck = (
+                (len(tail) == ANOMALY_STUCK_SAMPLES)
+                & ~np.any(np.isnan(tail), axis=0)
+                & (np.nanmax(tail, axis=0) - np.nanmin(tail, axis=0) == 0)
+            )
+        return {
+            "x": x, "counts": counts, "mean": mean, "std": std, "z": z,
+            "before_counts": before_counts, "shift": shift, "rate": rate, "stuck": stuck,
+        }
+
+    def _alert(
+        self, kind: AlertKind, metric: str, value: Optional[float], message: str,
+        details: Dict[str, float], busy: bool, ratio: float, now: float
+    ) -> Optional[Alert]:
+        key = (metric, kind)
+        if now - self._last_alert.get(key, float("-inf")) < ALERT_COOLDOWN_SECONDS:
+            return None
+        self._last_alert[key] = now
+        if busy:
+            severity = AlertSeverity.info
+        elif ratio >= 2.0:
+            severity = AlertSeverity.critical
+        else:
+            severity = AlertSeverity.warning
+        return Alert(
+            alert_id=str(uuid.uuid4()),
+            kind=kind,
+            severity=severity,
+            metric=metric,
+            value=None if value is None else round(float(value), 3),
+            message=message + (" (while a job was running)" if busy else ""),
+            timestamp=now,
+            details={k: round(float(v), 4) for k, v in details.items()},
+        )
+
+    def process(self, sample: dict) -> List[Alert]:
+        """Feeds one sampler sample through every check; returns the alerts raised."""
+        self._ensure_loaded()
+        now = sample["t"]
+        busy = bool(sample.get("busy"))
+        row = np.array([np.nan if sample.get(m) is None else float(sample[m]) for m in METRICS])
+        self.window.push(now, row)
+
+        missing = np.isnan(row)
+        self._missing = np.where(missing, self._missing + 1, 0)
+
+        times, values = self.window.ordered()
+        stats = self._statistics(times, values)
+        raised = []
+
+        def add(alert: Optional[Alert]):
+            if alert is not None:
+                raised.append(alert)
+
+        for i, metric in enumerate(METRICS):
+            if self._missing[i] == ANOMALY_DROPOUT_SAMPLES:
+                add(self._alert(
+                    AlertKind.dropout, metric, None,
+                    f"{metric} has produced no readings for {ANOMALY_DROPOUT_SAMPLES} samples",
+                    {"missing_samples": float(self._missing[i])}, busy=False, ratio=1.0, now=now
+                ))
+            if missing[i]:
+                continue
+
+            x = stats["x"][i]
+            if stats["counts"][i] >= ANOMALY_MIN_SAMPLES and abs(stats["z"][i]) > ANOMALY_Z_THRESHOLD:
+                add(self._alert(
+                    AlertKind.spike, metric, x,
+                    f"{metric} reading {x:.2f} is {stats['z'][i]:+.1f} standard deviations from the recent mean {stats['mean'][i]:.2f}",
+                    {"z": stats["z"][i], "mean": stats["mean"][i], "std": stats["std"][i]},
+                    busy, abs(stats["z"][i]) / ANOMALY_Z_THRESHOLD, now
+                ))
+
+            if stats["before_counts"][i] >= ANOMALY_MIN_SAMPLES and abs(stats["shift"][i]) > ANOMALY_SHIFT_THRESHOLD:
+                add(self._alert(
+                    AlertKind.change_point, metric, x,
+                    f"{metric} level shifted by {stats['shift'][i]:+.1f} standard deviations over the last {ANOMALY_SHIFT_SAMPLES} samples",
+                    {"shift": stats["shift"][i]},
+                    busy, abs(stats["shift"][i]) / ANOMALY_SHIFT_THRESHOLD, now
+                ))
+
+            rate = stats["rate"][i]
+            if not np.isnan(rate) and abs(rate) > self.max_rate[i]:
+                add(self._alert(
+                    AlertKind.rate_of_change, metric, x,
+                    f"{metric} is changing at {rate:+.2f}/min (limit {self.max_rate[i]:g}/min)",
+                    {"rate_per_minute": rate, "limit": self.max_rate[i]},
+                    busy, abs(rate) / self.max_rate[i], now
+                ))
+
+            # A dry probe (empty tank) legitimately reads a constant value
+            if metric in STUCK_METRICS and stats["stuck"][i] and not sample.get("water_empty"):
+                add(self._alert(
+                    AlertKind.stuck, metric, x,
+                    f"{metric} has read exactly {x:g} for {ANOMALY_STUCK_SAMPLES} samples; the probe may be disconnected",
+                    {"samples": float(ANOMALY_STUCK_SAMPLES)}, busy=False, ratio=1.0, now=now
+                ))
+
+        for alert in raised:
+            self._emit(alert)
+        return raised
+
+    def report(
+        self, kind: AlertKind, metric: str, value: Optional[float], message: str,
+        details: Dict[str, float], ratio: float = 1.0, now: Optional[float] = None
+    ) -> Optional[Alert]:
+        """Raises an alert found by another detector (same cooldown, storage and push)."""
+        self._ensure_loaded()
+        alert = self._alert(kind, metric, value, message, details, False, ratio, time.time() if now is None else now)
+        if alert is not None:
+            self._emit(alert)
+        return alert
+
+    # --- Queries ---
+
+    def list_alerts(
+        self, since: Optional[float] = None, kind: Optional[AlertKind] = None,
+        metric: Optional[str] = None, limit: int = 100
+    ) -> List[Alert]:
+        """Most recent first."""
+        self._ensure_loaded()
+        result = []
+        for alert in reversed(self.alerts):
+            if since is not None and alert.timestamp < since:
+                break
+            if kind is not None and alert.kind != kind:
+                continue
+            if metric is not None and alert.metric != metric:
+                continue
+            result.append(alert)
+            if len(result) >= limit:
+                break
+        return result
+
+# Global instance (served by the hardware daemon to API workers)
+anomaly_engine = hardware_singleton("anomaly_engine", AnomalyEngine)
@@ -0,0 +1,252 @@
+import asyncio
+import logging
+import subprocess
+import threading
+from typing import List, Optional, Set
+
+from src.config import (
+    STREAM_WIDTH, STREAM_HEIGHT, STREAM_FRAMERATE, STREAM_QUALITY, STREAM_IDLE_SECONDS
+)
+from src.actuators.ac_relay import ac_relay
+from src.sensors.camera import camera
+from src.state import system_lock
+
+logger = logging.getLogger("camera_stream")
+
+SOI = b"\xff\xd8"
+EOI = b"\xff\xd9"
+READ_SIZE = 64 * 1024
+# Wait before restarting the pipeline after rpicam-vid failed
+RETRY_SECONDS = 5
+
+class JPEGSplitter:
+    """Splits a concatenated MJPEG byte stream into individual JPEG frames."""
+
+    def __init__(self):
+        self.buffer = bytearray()
+
+    def feed(self, data: bytes) -> List[bytes]:
+        self.buffer += data
+        frames = []
+        while True:
+            start = self.buffer.find(SOI)
+            if start < 0:
+                # Keep a trailing 0xff: it may be the first half of the next SOI
+                del self.buffer[:max(0, len(self.buffer) - 1)]
+                break
+            end = self.buffer.find(EOI, start + 2)
+            if end < 0:
+                del self.buffer[:start]
+                break
+            frames.append(bytes(self.buffer[start:end + 2]))
+            del self.buffer[:end + 2]
+        return frames
+
+class CameraStream:
+    """
+    Live MJPEG view shared by every viewer.
+
+    The first viewer starts one rpicam-vid pipeline; a reader thread splits
+    its output into frames and hands each to the event loop, which offers it
+    to every viewer's one-frame slot (a slow viewer skips frames instead of
+    holding the others back). The pipeline stops STREAM_IDLE_SECONDS after
+    the last viewer leaves, and pauses whenever a still capture claims the
+    camera.
+
+    Viewers may ask for light: the AC relay is held on while any of them is
+    watching and restored afterwards. Light schedule changes during that time
+    are deferred to the end of the stream (see defer_light). The relay is
+    switched on right away, but only switched back off once no routine holds
+    the system lock (a mix started while viewers watched relies on it), and
+    not at all if someone else switched it after the viewers did.
+    """
+
+    def __init__(self, idle_seconds: float = STREAM_IDLE_SECONDS):
+        self.idle_seconds = idle_seconds
+        self.frames = 0
+        self.latest: Optional[bytes] = None
+        self._viewers: Set[asyncio.Queue] = set()
+        self._light_viewers = 0
+        # True if the relay should go off once no viewer needs light
+        self._light_owned = False
+        # ac_relay.transitions after the stream switched the light on
+        self._light_transitions = 0
+        self._light_release: Optional[asyncio.Task] = None
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop: Optional[threading.Event] = None
+        self._process: Optional[subprocess.Popen] = None
+        self._idle_handle: Optional[asyncio.TimerHandle] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive() and not self._stop.is_set()
+
+    @property
+    def viewers(self) -> int:
+        return len(self._viewers)
+
+    @property
+    def holds_light(self) -> bool:
+        return self._light_viewers > 0
+
+    # --- Viewers (event loop) ---
+
+    def subscribe(self, light: bool = False) -> asyncio.Queue:
+        queue: asyncio.Queue = asyncio.Queue(maxsize=1)
+        self._viewers.add(queue)
+        if light:
+            if self._light_viewers == 0 and not ac_relay.is_active:
+                ac_relay.turn_on()
+                self._light_owned = True
+                self._light_transitions = ac_relay.transitions
+            self._light_viewers += 1
+        if self._idle_handle is not None:
+            self._idle_handle.cancel()
+            self._idle_handle = None
+        if not self.running:
+            self._start()
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue, light: bool = False):
+        if queue not in self._viewers:
+            return
+        self._viewers.discard(queue)
+        if light:
+            self._light_viewers -= 1
+            if self._light_viewers == 0 and self._light_owned:
+                if system_lock.locked():
+                    if self._light_release is None or self._light_release.done():
+                        self._light_release = asyncio.get_running_loop().create_task(
+                            self._release_light_after_routine(), name="camera-stream-light"
+                        )
+                else:
+                    self._release_light()
+        if not self._viewers and self._idle_handle is None:
+            self._idle_handle = asyncio.get_running_loop().call_later(self.idle_seconds, self._stop_if_idle)
+
+    def _release_light(self):
+        if self._light_viewers > 0 or not self._light_owned:
+            return
+        self._light_owned = False
+        if ac_relay.transitions == self._light_transitions:
+            ac_relay.turn_off()
+        else:
+            logger.info("Relay was switched while the stream held the light; leaving it as it is")
+
+    async def _release_light_after_routine(self):
+        async with system_lock:
+            self._release_light()
+
+    def defer_light(self, on: bool) -> bool:
+        """
+        Called by the light schedule. While viewers hold the light, the change
+        is applied when the last of them leaves instead of now (returns True).
+        """
+        if not self.holds_light:
+            return False
+        self._light_owned = not on
+        self._light_transitions = ac_relay.transitions
+        return True
+
+    def _broadcast(self, frame: bytes):
+        self.frames += 1
+        self.latest = frame
+        for queue in self._viewers:
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(frame)
+
+    def _stop_if_idle(self):
+        self._idle_handle = None
+        if not self._viewers:
+            self.stop()
+
+    # --- Pipeline (thread) ---
+
+    def _command(self) -> List[str]:
+        return [
+            "rpicam-vid", "-t", "0", "--nopreview",
+            "--codec", "mjpeg", "--quality", str(STREAM_QUALITY),
+            "--width", str(STREAM_WIDTH), "--height", str(STREAM_HEIGHT),
+            "--framerate", str(STREAM_FRAMERATE),
+            "-o", "-",
+        ]
+
+    def _run(self, stop: threading.Event):
+        while not stop.is_set():
+            try:
+                with camera.claim():
+                    process = subprocess.Popen(self._command(), stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+                    self._process = process
+                    try:
+                        splitter = JPEGSplitter()
+                        while not stop.is_set() and not camera.contended:
+                            data = process.stdout.read1(READ_SIZE)
+                            if not data:
+                                if stop.is_set():
+                                    break
+                                raise RuntimeError(f"rpicam-vid exited with {process.wait()}")
+                            for frame in splitter.feed(data):
+                                self._loop.call_soon_threadsafe(self._broadcast, frame)
+                    finally:
+                        process.terminate()
+                        try:
+                            process.wait(timeout=2)
+                        except subprocess.TimeoutExpired:
+                            process.kill()
+                        if self._process is process:
+                            self._process = None
+            except Exception as e:
+                logger.error(f"Camera stream error: {e}")
+                stop.wait(RETRY_SECONDS)
+            # A still capture is waiting for the camera: let it go first
+            while camera.contended and not stop.is_set():
+                stop.wait(0.1)
+
+    def _start(self):
+        self._loop = asyncio.get_running_loop()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, args=(self._stop,), name="camera-stream", daemon=True)
+        self._thread.start()
+        logger.info("Camera stream started")
+
+    def stop(self):
+        """Stops the pipeline without waiting for the reader thread (it exits on its own)."""
+        if self._stop is not None:
+            self._stop.set()
+        process = self._process
+        if process is not None:
+            # Unblocks the reader thread's read
+            process.terminate()
+        for queue in self._viewers:
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(None)
+        logger.info("Camera stream stopped")
+
+    # --- Viewer response ---
+
+    async def mjpeg(self, is_disconnected, light: bool = False, boundary: str = "frame"):
+        """multipart/x-mixed-replace body for one viewer."""
+        queue = self.subscribe(light)
+        try:
+            while True:
+                try:
+                    frame = await asyncio.wait_for(queue.get(), timeout=1.0)
+                except asyncio.TimeoutError:
+                    if await is_disconnected():
+                        break
+                    continue
+                if frame is None:
+                    break
+                yield (
+                    f"--{boundary}\r\nContent-Type: image/jpeg\r\nContent-Length: {len(frame)}\r\n\r\n".encode()
+                    + frame + b"\r\n"
+                )
+        finally:
+            self.unsubscribe(queue, light)
+
+# Global instance
+camera_stream = CameraStream()
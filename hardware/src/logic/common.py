@@ -2,6 +2,10 @@ import asyncio
 from fastapi import HTTPException
 from src.actuators.pumps import pump_controller
 from src.sensors.float_switches import water_level
+from src.logic.progress import report_progress
+
+# Poll loops report how long they have been running this often (seconds)
+PROGRESS_EVERY = 10
 
 async def fill_to_max_logic():
     """Internal logic to fill the tank to max and adjust."""
@@ -17,21 +21,27 @@ async def fill_to_max_logic():
     if not water_level.is_full:
         try:
             pump_controller.activate_pump(FILL_PUMP)
+            report_progress("filling")
             while not water_level.is_full and fill_duration < MAX_DURATION:
                 await asyncio.sleep(CHECK_INTERVAL)
                 fill_duration += CHECK_INTERVAL
+                if fill_duration % PROGRESS_EVERY == 0:
+                    report_progress(f"filling {int(fill_duration)} s")
             pump_controller.deactivate_pump(FILL_PUMP)
             
             if fill_duration >= MAX_DURATION:
                 raise HTTPException(status_code=500, detail="Fill timed out")
         except Exception as e:
-            pump_controller.deactivate_pump(FILL_PUMP)
             if isinstance(e, HTTPException): raise e
             raise HTTPException(status_code=500, detail=f"Fill Error: {str(e)}")
+        finally:
+            # Runs on cancellation too (CancelledError is not an Exception)
+            pump_controller.deactivate_pump(FILL_PUMP)
 
     if water_level.is_full:
         try:
             pump_controller.activate_pump(DRAIN_PUMP)
+            report_progress("leveling")
             while water_level.is_full and adjust_duration < ADJUST_TIMEOUT:
                 await asyncio.sleep(CHECK_INTERVAL)
                 adjust_duration += CHECK_INTERVAL
@@ -41,9 +51,10 @@ async def fill_to_max_logic():
                  raise HTTPException(status_code=500, detail="Adjustment Error: Could not lower water level below sensor (Sensor stuck or tank severely overfilled?)")
                  
         except Exception as e:
-            pump_controller.deactivate_pump(DRAIN_PUMP)
             if isinstance(e, HTTPException): raise e
             raise HTTPException(status_code=500, detail=f"Adjustment Error: {str(e)}")
+        finally:
+            pump_controller.deactivate_pump(DRAIN_PUMP)
 
     return {
         "status": "success", 
@@ -66,10 +77,13 @@ async def empty_tank_logic():
 
     try:
         pump_controller.activate_pump(PUMP_ID)
+        report_progress("emptying")
         elapsed = 0
         while not water_level.is_empty and elapsed < MAX_DURATION:
             await asyncio.sleep(CHECK_INTERVAL)
             elapsed += CHECK_INTERVAL
+            if elapsed % PROGRESS_EVERY == 0:
+                report_progress(f"emptying {int(elapsed)} s")
         pump_controller.deactivate_pump(PUMP_ID)
         
         if elapsed >= MAX_DURATION:
@@ -78,9 +92,10 @@ async def empty_tank_logic():
         return {"status": "success", "message": "Tank emptied", "duration": round(elapsed, 2)}
 
     except Exception as e:
-        pump_controller.deactivate_pump(PUMP_ID)
         if isinstance(e, HTTPException): raise e
         raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        pump_controller.deactivate_pump(PUMP_ID)
 
 async def fix_overflow_logic():
     """Internal logic to fix overflow."""
@@ -95,13 +110,25 @@ async def fix_overflow_logic():
             while water_level.is_full and adjust_duration < ADJUST_TIMEOUT:
                 await asyncio.sleep(CHECK_INTERVAL)
                 adjust_duration += CHECK_INTERVAL
-            pump_controller.deactivate_pump(DRAIN_PUMP)
         except Exception:
-            pump_controller.deactivate_pump(DRAIN_PUMP)
             # Log error but don't crash background task
             print("Error during overflow fix")
+        finally:
+            pump_controller.deactivate_pump(DRAIN_PUMP)
             
 from src.state import system_lock
+from src.logic.telemetry import telemetry_reader
+
+# Seconds between overflow checks; a telemetry sample older than this is not used
+OVERFLOW_CHECK_SECONDS = 5
+
+def _tank_full() -> bool:
+    # The sampler's latest reading while it is younger than one check (and was
+    # not taken mid-routine), else the float switch itself
+    sample = telemetry_reader.fresh(OVERFLOW_CHECK_SECONDS)
+    if sample is None or sample["busy"]:
+        return water_level.is_full
+    return sample["water_full"]
 
 async def monitor_overflow_task():
     """Background task to monitor and fix overflow every 5 seconds."""
@@ -110,10 +137,10 @@ async def monitor_overflow_task():
             # Try to acquire lock, if busy (e.g. filling), skip this check
             if not system_lock.locked():
                 async with system_lock:
-                    if water_level.is_full:
+                    if _tank_full():
                         print("Overflow detected by monitor. Fixing...")
                         await fix_overflow_logic()
         except Exception as e:
             print(f"Monitor Task Error: {e}")
-        await asyncio.sleep(5)
+        await asyncio.sleep(OVERFLOW_CHECK_SECONDS)
 
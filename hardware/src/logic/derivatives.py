@@ -0,0 +1,203 @@
+import asyncio
+import hashlib
+import logging
+import os
+import subprocess
+import tempfile
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from src.config import (
+    IMAGE_DERIVATIVE_SIZES, IMAGE_DERIVATIVE_CACHE_DIR,
+    IMAGE_DERIVATIVE_CACHE_BYTES, IMAGE_DERIVATIVE_WORKERS
+)
+from src.media import content_etag, CHUNK_SIZE
+from src.models import ImageSize
+
+logger = logging.getLogger("derivatives")
+
+class DerivativeCache:
+    """
+    Downscaled JPEG copies of captures, stored in an LRU disk cache.
+
+    Derivatives are keyed by the source's content hash, so a new capture
+    written to the same filename never serves a stale thumbnail. ffmpeg
+    reads a private copy of the source taken when the work is queued, and
+    the key is the hash of that copy, so a capture landing in between can't
+    end up cached under the previous one's key. Generation
+    runs in a small worker pool (ffmpeg) and each derivative is produced once
+    even if several requests ask for it at the same time.
+    """
+
+    def __init__(
+        self,
+        cache_dir: str = IMAGE_DERIVATIVE_CACHE_DIR,
+        max_bytes: int = IMAGE_DERIVATIVE_CACHE_BYTES,
+        sizes: Dict[str, dict] = IMAGE_DERIVATIVE_SIZES,
+        workers: int = IMAGE_DERIVATIVE_WORKERS
+    ):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.sizes = sizes
+        self.workers = workers
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+        # filename -> size in bytes, least recently used first
+        self._entries: "OrderedDict[str, int]" = OrderedDict()
+        self._total_bytes = 0
+        self._pending: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self._loaded = False
+
+    def _ensure_loaded(self):
+        # Caller holds self._lock
+        if self._loaded:
+            return
+        self._loaded = True
+        os.makedirs(self.cache_dir, exist_ok=True)
+        files = []
+        for name in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, name)
+            if name.startswith("src_"):
+                # Source copy left behind by a crash mid-generation
+                os.remove(path)
+                continue
+            if name.endswith(".jpg") and os.path.isfile(path):
+                stat = os.stat(path)
+                files.append((stat.st_mtime, name, stat.st_size))
+        for _, name, size in sorted(files):
+            self._entries[name] = size
+            self._total_bytes += size
+
+    def _pool(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="derivatives")
+        return self._executor
+
+    def _cache_name(self, source_path: str, size: str) -> str:
+        digest = content_etag(source_path).strip('"')
+        return f"{digest}_{size}.jpg"
+
+    def _snapshot(self, source_path: str) -> Tuple[str, str]:
+        """Copies the source into the cache directory: (hash of the copied bytes, copy path)."""
+        digest = hashlib.sha256()
+        fd, copy_path = tempfile.mkstemp(dir=self.cache_dir, prefix="src_", suffix=".source")
+        try:
+            with open(source_path, "rb") as source, os.fdopen(fd, "wb") as copy:
+                for chunk in iter(lambda: source.read(CHUNK_SIZE), b""):
+                    digest.update(chunk)
+                    copy.write(chunk)
+        except BaseException:
+            os.remove(copy_path)
+            raise
+        # Same key format as content_etag
+        return digest.hexdigest()[:32], copy_path
+
+    # --- Generation ---
+
+    def _generate(self, source_path: str, name: str, size: str) -> str:
+        spec = self.sizes[size]
+        dest = os.path.join(self.cache_dir, name)
+        temp_path = os.path.join(self.cache_dir, f"tmp_{name}")
+        # min(...) keeps small sources at their own resolution instead of upscaling
+        cmd = [
+            "ffmpeg", "-y",
+            "-i", source_path,
+            "-vf", f"scale='min({spec['width']},iw)':-2",
+            "-q:v", str(spec["quality"]),
+            temp_path
+        ]
+        try:
+            subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            os.replace(temp_path, dest)
+            with self._lock:
+                self._add(name, os.path.getsize(dest))
+            return dest
+        finally:
+            for path in (temp_path, source_path):
+                if os.path.exists(path):
+                    os.remove(path)
+            with self._lock:
+                self._pending.pop(name, None)
+
+    def _existing(self, name: str) -> Optional[Future]:
+        # Caller holds self._lock
+        if name in self._entries and os.path.exists(os.path.join(self.cache_dir, name)):
+            self._entries.move_to_end(name)
+            done: Future = Future()
+            done.set_result(os.path.join(self.cache_dir, name))
+            return done
+        return self._pending.get(name)
+
+    def _submit(self, source_path: str, size: str) -> Future:
+        name = self._cache_name(source_path, size)
+        with self._lock:
+            self._ensure_loaded()
+            future = self._existing(name)
+            if future is not None:
+                return future
+
+        # Miss: the key comes from the bytes ffmpeg will actually read
+        digest, copy_path = self._snapshot(source_path)
+        name = f"{digest}_{size}.jpg"
+        with self._lock:
+            future = self._existing(name)
+            if future is None:
+                future = self._pool().submit(self._generate, copy_path, name, size)
+                self._pending[name] = future
+                return future
+        os.remove(copy_path)
+        return future
+
+    def pregenerate(self, source_path: str) -> List[Future]:
+        """Queues every configured size for a fresh capture; returns immediately."""
+        futures = []
+        for size in self.sizes:
+            try:
+                futures.append(self._submit(source_path, size))
+            except OSError as e:
+                logger.error(f"Could not queue {size} derivative of {source_path}: {e}")
+        return futures
+
+    async def get(self, source_path: str, size: ImageSize) -> str:
+        """
+        Path of the requested derivative, generating it if needed.
+        Falls back to the original image if generation fails.
+        """
+        if size == ImageSize.full or size.value not in self.sizes:
+            return source_path
+        try:
+            future = await asyncio.to_thread(self._submit, source_path, size.value)
+            return await asyncio.wrap_future(future)
+        except Exception as e:
+            logger.error(f"Failed to generate {size.value} derivative of {source_path}: {e}")
+            return source_path
+
+    # --- LRU ---
+
+    def _add(self, name: str, size_bytes: int):
+        # Caller holds self._lock
+        if name in self._entries:
+            self._total_bytes -= self._entries.pop(name)
+        self._entries[name] = size_bytes
+        self._total_bytes += size_bytes
+        self._evict()
+
+    def _evict(self):
+        # Always keep the newest entry, even if it alone exceeds the budget
+        while self._total_bytes > self.max_bytes and len(self._entries) > 1:
+            name, size_bytes = self._entries.popitem(last=False)
+            self._total_bytes -= size_bytes
+            try:
+                os.remove(os.path.join(self.cache_dir, name))
+            except FileNotFoundError:
+                pass
+
+    @property
+    def total_bytes(self) -> int:
+        return self._total_bytes
+
+# Global instance
+image_derivatives = DerivativeCache()
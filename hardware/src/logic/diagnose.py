@@ -13,6 +13,8 @@ from src.sensors.dht import dht_sensor
 from src.sensors.float_switches import water_level
 from src.sensors.microphone import microphone
 from src.actuators.pumps import pump_controller
+from src.logic.progress import report_progress
+from src.logic.telemetry import telemetry_reader
 
 # Thresholds for valid sensor ranges
 # We narrow these slightly from physical limits (0-14) to detect rail-hitting (disconnected sensors)
@@ -27,10 +29,14 @@ NOISE_THRESHOLD_RMS = 0.01
 
 async def check_sensors() -> Dict[str, SensorCheckResult]:
     results = {}
+    # The sampler's latest probe readings while fresh, else the probes themselves
+    sample = telemetry_reader.fresh() or {}
 
     # 1. pH Check
     try:
-        ph_val = ph_sensor.get_ph()
+        ph_val = sample.get("ph")
+        if ph_val is None:
+            ph_val = ph_sensor.get_ph()
         passed = PH_MIN <= ph_val <= PH_MAX
         msg = "Normal" if passed else f"Out of bounds ({PH_MIN}-{PH_MAX})"
         results["ph"] = SensorCheckResult(passed=passed, value=ph_val, message=msg)
@@ -39,7 +45,9 @@ async def check_sensors() -> Dict[str, SensorCheckResult]:
 
     # 2. TDS Check
     try:
-        tds_val = tds_sensor.get_tds_ppm()
+        tds_val = sample.get("tds_ppm")
+        if tds_val is None:
+            tds_val = tds_sensor.get_tds_ppm()
         passed = tds_val >= TDS_MIN
         msg = "Normal" if passed else "Negative value"
         results["tds"] = SensorCheckResult(passed=passed, value=tds_val, message=msg)
@@ -59,7 +67,10 @@ async def check_sensors() -> Dict[str, SensorCheckResult]:
             passed_temp = TEMP_MIN_F <= temp <= TEMP_MAX_F
             passed_hum = HUMIDITY_MIN <= hum <= HUMIDITY_MAX
             
-            if passed_temp and passed_hum:
+            if env_data.get("quality") == "stale":
+                msg = f"Stale reading ({env_data['age_seconds']}s old)"
+                passed = False
+            elif passed_temp and passed_hum:
                 msg = "Normal"
                 passed = True
             else:
@@ -178,7 +189,9 @@ async def check_pump() -> PumpCheckResult:
 
 async def execute_diagnostic_check() -> DiagnosticResponse:
     # Run checks
+    report_progress("checking sensors")
     sensor_results = await check_sensors()
+    report_progress("testing pump")
     pump_result = await check_pump()
     
     # Determine overall status
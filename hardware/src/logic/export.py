@@ -0,0 +1,202 @@
+import csv
+import gzip
+import io
+import json
+import zipfile
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from src.config import EXPORT_CHUNK_ROWS
+from src.logic.sampler import sensor_sampler
+from src.logic.jobs import job_manager
+from src.logic.vision import frame_features
+from src.logic.phash import capture_hashes, SOURCE_TIMELAPSE
+
+FORMATS = {
+    "csv.gz": "application/gzip",
+    "arrow": "application/vnd.apache.arrow.stream",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+# --- Tables ---
+# Each table is a fixed column list (name, type) and a generator of rows in a
+# stable order for a time range, so `offset` means the same rows on every call.
+
+SENSOR_COLUMNS = [
+    ("t", "float"), ("tds_ppm", "float"), ("ph", "float"), ("temperature_f", "float"),
+    ("humidity_percent", "float"), ("water_full", "bool"), ("water_empty", "bool"), ("busy", "bool"),
+]
+
+JOB_COLUMNS = [
+    ("job_id", "string"), ("type", "string"), ("status", "string"), ("created_at", "float"),
+    ("started_at", "float"), ("completed_at", "float"), ("duration_seconds", "float"),
+    ("result", "string"), ("error", "string"),
+]
+
+FRAME_COLUMNS = [
+    ("timestamp", "int"), ("canopy_coverage", "float"), ("greenness", "float"), ("chlorosis", "float"),
+    ("bbox_x0", "float"), ("bbox_y0", "float"), ("bbox_x1", "float"), ("bbox_y1", "float"),
+    ("width", "int"), ("height", "int"), ("hash", "string"), ("change_score", "float"), ("changed", "bool"),
+]
+
+def sensor_rows(start: float, end: float) -> Iterator[dict]:
+    """Sampler history, oldest first (read one day file at a time)."""
+    return sensor_sampler.history(start, end)
+
+def job_rows(start: float, end: float) -> Iterator[dict]:
+    """Finished jobs created in the range, in the order they finished."""
+    try:
+        f = open(job_manager.history_path, "r")
+    except FileNotFoundError:
+        return
+    with f:
+        for line in f:
+            try:
+                job = json.loads(line)
+            except ValueError:
+                continue
+            if not start <= job["created_at"] <= end:
+                continue
+            started, completed = job.get("started_at"), job.get("completed_at")
+            result = job.get("result")
+            yield {
+                **job,
+                "duration_seconds": None if started is None or completed is None else round(completed - started, 3),
+                "result": None if result is None else json.dumps(result),
+            }
+
+def frame_rows(start: float, end: float) -> Iterator[dict]:
+    """Vision features of timelapse frames with their change-index entry, oldest first."""
+    for row in frame_features.list_features(int(start * 1000), int(end * 1000)):
+        bbox = row.get("bbox") or [None] * 4
+        change = capture_hashes.get(SOURCE_TIMELAPSE, row["timestamp"]) or {}
+        yield {
+            **row,
+            "bbox_x0": bbox[0], "bbox_y0": bbox[1], "bbox_x1": bbox[2], "bbox_y1": bbox[3],
+            "hash": change.get("hash"),
+            "change_score": change.get("score"),
+            "changed": change.get("changed"),
+        }
+
+TABLES: Dict[str, Tuple[List[Tuple[str, str]], Callable[[float, float], Iterable[dict]]]] = {
+    "sensors": (SENSOR_COLUMNS, sensor_rows),
+    "jobs": (JOB_COLUMNS, job_rows),
+    "frames": (FRAME_COLUMNS, frame_rows),
+}
+
+def chunks(table: str, start: float, end: float, offset: int = 0, size: Optional[int] = None) -> Iterator[List[dict]]:
+    """The table's rows in lists of at most `size` (EXPORT_CHUNK_ROWS), skipping the first `offset`."""
+    size = size or EXPORT_CHUNK_ROWS
+    _, rows = TABLES[table]
+    chunk = []
+    for i, row in enumerate(rows(start, end)):
+        if i < offset:
+            continue
+        chunk.append(row)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+# --- Encoders ---
+
+class _Sink:
+    """Write-only file that hands out what was written since the last take()."""
+
+    def __init__(self):
+        self._buffer = io.BytesIO()
+        self._position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._buffer.write(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def take(self) -> bytes:
+        data = self._buffer.getvalue()
+        self._buffer = io.BytesIO()
+        return data
+
+def _csv_gz(columns: List[Tuple[str, str]], row_chunks: Iterable[List[dict]], header: bool) -> Iterator[bytes]:
+    # One gzip member per chunk: concatenated members are a valid .gz, and an
+    # interrupted download still decompresses up to the last complete chunk
+    names = [name for name, _ in columns]
+    text = io.StringIO()
+    writer = csv.writer(text)
+    if header:
+        writer.writerow(names)
+    for chunk in row_chunks:
+        for row in chunk:
+            writer.writerow(["" if row.get(name) is None else row[name] for name in names])
+        yield gzip.compress(text.getvalue().encode(), compresslevel=6)
+        text.seek(0)
+        text.truncate()
+    if text.tell():
+        yield gzip.compress(text.getvalue().encode(), compresslevel=6)
+
+def _arrow(columns: List[Tuple[str, str]], row_chunks: Iterable[List[dict]], parquet: bool) -> Iterator[bytes]:
+    import pyarrow as pa
+    types = {"float": pa.float64(), "int": pa.int64(), "bool": pa.bool_(), "string": pa.string()}
+    schema = pa.schema([(name, types[kind]) for name, kind in columns])
+    sink = _Sink()
+    if parquet:
+        import pyarrow.parquet as pq
+        writer = pq.ParquetWriter(sink, schema, compression="zstd")
+    else:
+        writer = pa.ipc.new_stream(sink, schema)
+    for chunk in row_chunks:
+        batch = pa.record_batch(
+            [pa.array([row.get(name) for row in chunk], type=types[kind]) for name, kind in columns],
+            schema=schema
+        )
+        # A Parquet row group / Arrow record batch per chunk
+        if parquet:
+            writer.write_table(pa.Table.from_batches([batch]))
+        else:
+            writer.write_batch(batch)
+        yield sink.take()
+    writer.close()
+    yield sink.take()
+
+def arrow_available() -> bool:
+    try:
+        import pyarrow  # noqa: F401
+        import pyarrow.parquet  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+def encode_table(table: str, fmt: str, start: float, end: float, offset: int = 0) -> Iterator[bytes]:
+    """One table in one format, as a stream of byte chunks."""
+    columns, _ = TABLES[table]
+    row_chunks = chunks(table, start, end, offset)
+    if fmt == "csv.gz":
+        # Resumed downloads are appended to what the client already has
+        return _csv_gz(columns, row_chunks, header=offset == 0)
+    return _arrow(columns, row_chunks, parquet=fmt == "parquet")
+
+def filename(table: str, fmt: str) -> str:
+    return f"{table}.{fmt}"
+
+def export_zip(tables: List[str], fmt: str, start: float, end: float) -> Iterator[bytes]:
+    """Several tables as a streamed ZIP, one stored member per table (written without seeking)."""
+    sink = _Sink()
+    with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_STORED) as archive:
+        for table in tables:
+            with archive.open(filename(table, fmt), "w", force_zip64=True) as member:
+                for data in encode_table(table, fmt, start, end):
+                    member.write(data)
+                    yield sink.take()
+            yield sink.take()
+    yield sink.take()
@@ -6,7 +6,7 @@ from src.actuators.pumps import pump_controller
 from src.actuators.ac_relay import ac_relay
 from src.sensors.tds import tds_sensor
 from src.models import NutrientRecipe, FeedResponse, DoseResponse, PumpID
-from src.logic.common import empty_tank_logic, fill_to_max_logic
+from src.logic.pipeline import Pipeline, run_pipeline, empty, fill, dose, mix, measure
 
 # Standard recipes (in mL) - Placeholder values, should be calibrated to tank size
 RECIPES = {
@@ -14,7 +14,22 @@ RECIPES = {
     NutrientRecipe.flowering: {"flora_micro": 4.0, "flora_gro": 1.0, "flora_bloom": 5.0},
 }
 
-async def execute_feed_cycle(recipe: NutrientRecipe, custom_amounts: Optional[dict] = None) -> FeedResponse:
+# Air stones run at least this long after the fill (AC Relay ON)
+MIX_DURATION = 180  # 3 minutes
+
+def feed_pipeline(amounts: Dict[str, float]) -> Pipeline:
+    doses = [dose(nutrient, amount, after=["empty"]) for nutrient, amount in amounts.items() if amount > 0]
+    # The AC Relay is left ON after mixing: it also powers the air pump, and
+    # switching it off would stop oxygenating the roots.
+    return Pipeline("feed", [
+        empty(),
+        *doses,
+        fill(after=[d.name for d in doses] or ["empty"]),
+        mix(MIX_DURATION, after=["fill"]),
+        measure(["tds"], after=["mix"], label="verifying TDS"),
+    ])
+
+async def execute_feed_cycle(recipe: NutrientRecipe, custom_amounts: Optional[dict] = None, resume: bool = True) -> FeedResponse:
     # 1. Determine amounts
     if recipe == NutrientRecipe.custom:
         if not custom_amounts:
@@ -28,64 +43,17 @@ async def execute_feed_cycle(recipe: NutrientRecipe, custom_amounts: Optional[di
         if key not in ["flora_micro", "flora_gro", "flora_bloom"]:
             raise HTTPException(status_code=400, detail=f"Invalid nutrient type: {key}")
 
-    # 2. Empty Tank
-    await empty_tank_logic()
+    # 2. Empty -> pre-dose nutrients into the empty tank -> fill (turbulence mixes) -> mix -> verify
+    # Doses only depend on the empty tank, so the nutrient pumps run side by side.
+    pipeline = feed_pipeline(amounts)
+    run = await run_pipeline(pipeline, resume=resume)
 
-    # 3. Pre-Dose Nutrients (into empty tank)
-    # Dose sequentially to avoid power spikes or interference, though parallel is likely fine.
-    # Sequential is safer for precise timing.
+    # Doses cut short by an earlier interruption are not repeated and not reported as dispensed
     dispensed = {}
-    for nutrient, amount in amounts.items():
-        if amount > 0:
-            duration = amount / PUMP_CALIBRATION_ML_PER_SEC
-            
-            await pump_controller.dispense(nutrient, duration)
-            dispensed[nutrient] = amount
-
-    # 4. Fill to Max (Turbulence mixes nutrients)
-    await fill_to_max_logic()
-
-    # 5. Mix (Air Stones via AC Relay)
-    # Ensure AC is ON
-    was_active = ac_relay.is_active
-    if not was_active:
-        ac_relay.turn_on()
-    
-    # Mix for 3 minutes
-    MIX_DURATION = 180  # 3 minutes
-    await asyncio.sleep(MIX_DURATION)
-
-    # Restore AC state if it was off? 
-    # The plan says "Ensure AC Relay is ON...". It doesn't explicitly say to turn it off.
-    # Usually air stones should stay on for DWC. But if the user had it off, maybe they want it off?
-    # Logic 4.1.3 in plan says "Turn on AC Relay (Light) if off... Restore previous" for Visual Check.
-    # For Feed, it implies we want it mixed. I'll leave it ON if it's the air pump.
-    # But wait, the AC Relay controls "Main Grow Light + Air Pump".
-    # If we turn it on at night to mix, we flash the plant!
-    # "Control: AC Relay (Controls Main Grow Light + Air Pump with 2 Air Stones)."
-    # This is a hardware limitation.
-    # If we feed at night, we wake the plant.
-    # Users should schedule feeds during day cycle.
-    # I will leave it in the state strictly required for mixing (ON), and maybe revert if it was OFF?
-    # If I turn it off, the water goes stagnant. 
-    # I'll assume for now we leave it as is (ON) because mixing is critical.
-    # Or better: If it was OFF, turn it ON for mixing, then back OFF?
-    # "The air stones... mix nutrients within ~3 minutes when the AC Relay is active."
-    # If I turn it off after, I stop oxygenation.
-    # I'll leave it ON implies "Mixing", but if I turn it off, I stop mixing.
-    # I'll just ensure it's ON during the mix phase. 
-    # I won't turn it off automatically to avoid killing the roots (they need air), 
-    # unless the user explicitly manages the cycle elsewhere.
-    # Actually, if the user requested a feed, they probably expect the system to run.
-    # But if it's night?
-    # I'll stick to the plan: "Mix: Ensure AC Relay is ON for at least 3 minutes".
-    # I won't revert it.
-
-    # 6. Verify (Check TDS)
-    tds_ppm = tds_sensor.get_tds_ppm()
-    
-    # Optional: Logic to warn if TDS is too low (pump failure/empty bottle)?
-    # For now, just return the value.
+    for step in pipeline.steps.values():
+        if step.kind == "dose" and run.result(step.name) is not None:
+            dispensed[step.params["nutrient"]] = step.params["ml"]
+    tds_ppm = run.result("measure")["tds_ppm"]
 
     return FeedResponse(
         message="Feed cycle complete",
@@ -110,12 +78,15 @@ async def execute_dose(nutrient: PumpID, amount_ml: float, mix_seconds: int = 30
     if not was_active:
         ac_relay.turn_on()
         
-    await asyncio.sleep(mix_seconds)
-    
-    # Restore AC state if it was off (avoid leaving light on at night for a simple dose)
-    # Also, reading TDS is often more accurate without active bubbles.
+    try:
+        await asyncio.sleep(mix_seconds)
+    finally:
+        # Restore AC state if it was off (avoid leaving light on at night for a simple dose)
+        if not was_active:
+            ac_relay.turn_off()
+
+    # Reading TDS is often more accurate without active bubbles.
     if not was_active:
-        ac_relay.turn_off()
         await asyncio.sleep(2) # Let bubbles settle
 
     # Read TDS
@@ -1,36 +1,46 @@
-import asyncio
-from src.actuators.ac_relay import ac_relay
+from src.config import PUMP_CALIBRATION_ML_PER_SEC
 from src.models import FlushResponse
-from src.logic.common import empty_tank_logic, fill_to_max_logic
+from src.logic.pipeline import Pipeline, run_pipeline, empty, fill, dose, mix
 
-async def execute_system_flush(soak_duration: int = 180) -> FlushResponse:
-    # 1. Empty Tank (Drain dirty/old water)
-    await empty_tank_logic()
+# Nutrient pumps run this long each when priming their lines
+PRIME_SECONDS = 5
 
-    # 2. Fill to Max (Fresh water)
-    await fill_to_max_logic()
+def flush_pipeline(soak_duration: int) -> Pipeline:
+    return Pipeline("system_flush", [
+        # 1. Drain dirty/old water, 2. fill with fresh water
+        empty("drain"),
+        fill("fill", after=["drain"]),
+        # 3. Soak: air stones circulate fresh water through the roots to remove salts.
+        # If the AC Relay was OFF it is turned back OFF (avoid keeping light/air on if not desired).
+        mix(soak_duration, name="soak", after=["fill"], label="soaking", restore=True),
+        # 4. Drain the rinse water, 5. final fresh water fill
+        empty("drain_rinse", after=["soak"]),
+        fill("final_fill", after=["drain_rinse"]),
+    ])
 
-    # 3. Soak/Mix: Turn on AC Relay (Air Stones) for X minutes
-    # This circulates fresh water through roots to remove salts.
-    was_active = ac_relay.is_active
-    if not was_active:
-        ac_relay.turn_on()
-    
-    # Wait for the soak duration
-    await asyncio.sleep(soak_duration)
-
-    # Restore AC state (If it was OFF, turn it back OFF to avoid keeping light/air on if not desired)
-    # Note: If it was ON, we leave it ON.
-    if not was_active:
-        ac_relay.turn_off()
-
-    # 4. Empty Tank (Drain the rinse water)
-    await empty_tank_logic()
-
-    # 5. Fill to Max (Final fresh water fill)
-    final_fill = await fill_to_max_logic()
+def prime_flush_pipeline() -> Pipeline:
+    primes = [
+        dose(nutrient, PRIME_SECONDS * PUMP_CALIBRATION_ML_PER_SEC, name=f"prime_{nutrient}")
+        for nutrient in ("flora_micro", "flora_gro", "flora_bloom")
+    ]
+    return Pipeline("prime_flush", [
+        *primes,
+        fill("fill", after=[p.name for p in primes]),
+        empty("drain", after=["fill"]),
+        fill("final_fill", after=["drain"]),
+    ])
 
+async def execute_system_flush(soak_duration: int = 180, resume: bool = True) -> FlushResponse:
+    run = await run_pipeline(flush_pipeline(soak_duration), resume=resume)
     return FlushResponse(
         message=f"System flush complete (Soak: {soak_duration}s)",
-        final_fill_details=final_fill
+        final_fill_details=run.result("final_fill")
+    )
+
+async def execute_prime_flush(resume: bool = True) -> FlushResponse:
+    """Primes all 3 nutrient pumps, then fills, empties and fills the tank again."""
+    run = await run_pipeline(prime_flush_pipeline(), resume=resume)
+    return FlushResponse(
+        message="System flush complete",
+        final_fill_details=run.result("final_fill")
     )
@@ -1,33 +1,189 @@
 import asyncio
+import json
+import os
 import time
 import uuid
 import logging
 import traceback
-from typing import Dict, Optional, Union, Any
+from typing import Dict, List, Optional, Set, Tuple, Union, Any
 from src.models import (
     JobType, JobState, JobRequest, JobStatus,
     FillResponse, EmptyResponse, FlushResponse, FeedResponse, DiagnosticResponse, NutrientRecipe
 )
+from src.config import JOB_IDEMPOTENCY_TTL_SECONDS, JOB_RETENTION_SECONDS, JOBS_HISTORY_FILE
 from src.state import system_lock
+from src.hardware.rpc import hardware_singleton, passthrough
+from src.sse import EventLog
 from src.logic.common import fill_to_max_logic, empty_tank_logic
 from src.logic.flush import execute_system_flush
 from src.logic.feed import execute_feed_cycle
 from src.logic.diagnose import execute_diagnostic_check
+from src.logic.progress import current_job, add_listener
 
 # Setup logging
 logger = logging.getLogger("jobs")
 
+TERMINAL_STATES = (JobState.completed, JobState.failed)
+# Events buffered per SSE subscriber before the oldest are dropped
+SUBSCRIBER_QUEUE_SIZE = 100
+
+@passthrough
+class IdempotencyConflict(ValueError):
+    """An Idempotency-Key was reused with a different job request."""
+
+def job_fingerprint(job_type: JobType, params: Dict[str, Any]) -> str:
+    """Canonical (type, params) key; identical requests produce identical strings."""
+    return f"{job_type.value}:{json.dumps(params, sort_keys=True, default=str)}"
+
+def _flag(params: Dict[str, Any], key: str, default: bool = True) -> bool:
+    value = params.get(key, default)
+    if isinstance(value, str):
+        return value.lower() not in ("false", "0", "no")
+    return bool(value)
+
 class JobManager:
-    def __init__(self):
+    # Jobs are tasks on the loop of the process that owns the hardware
+    RPC_ON_LOOP = True
+
+    def __init__(self, history_path: str = JOBS_HISTORY_FILE):
+        self.history_path = history_path
         self.jobs: Dict[str, JobStatus] = {}
         self.tasks: Dict[str, asyncio.Task] = {}
+        # Set (and replaced) whenever a job changes; long-poll requests wait on it
+        self._changed: Dict[str, asyncio.Event] = {}
+        self._subscribers: Set[asyncio.Queue] = set()
+        # The same events for subscribers in API workers (read_events)
+        self._events = EventLog(SUBSCRIBER_QUEUE_SIZE)
+        # job_id -> (type, params) fingerprint, and fingerprint -> job_ids, oldest first
+        self._fingerprints: Dict[str, str] = {}
+        self._by_fingerprint: Dict[str, List[str]] = {}
+        # Archived finished jobs, job_id -> completed_at, in completion order;
+        # forgotten after JOB_RETENTION_SECONDS (see _evict_expired)
+        self._finished: Dict[str, float] = {}
+        # Finished jobs whose archiving failed, retried before they can be forgotten
+        self._unarchived: Dict[str, JobStatus] = {}
+        # Idempotency-Key -> (job_id, fingerprint, expires_at)
+        self._idempotency: Dict[str, Tuple[str, str, float]] = {}
+        add_listener(self._on_progress)
+
+    # --- Change notification ---
+
+    def _publish(self, job: JobStatus, event: str):
+        changed = self._changed.pop(job.job_id, None)
+        if changed:
+            changed.set()
+        if event == "status" and job.status in TERMINAL_STATES:
+            self._finish(job)
+
+        payload = {
+            "event": event,
+            "job_id": job.job_id,
+            "type": job.type.value,
+            "status": job.status.value,
+            "progress": job.progress,
+            "timestamp": time.time(),
+        }
+        self._events.append(payload)
+        for queue in self._subscribers:
+            if queue.full():
+                # Slow consumer: drop the oldest event rather than block the job
+                queue.get_nowait()
+            queue.put_nowait(payload)
+
+    def _archive(self, job: JobStatus) -> bool:
+        """Appends a finished job to the history file (jobs themselves only live in memory)."""
+        try:
+            os.makedirs(os.path.dirname(self.history_path) or ".", exist_ok=True)
+            with open(self.history_path, "a") as f:
+                f.write(job.model_dump_json() + "\n")
+        except OSError as e:
+            logger.error(f"Failed to archive job {job.job_id}: {e}")
+            return False
+        return True
+
+    def _finish(self, job: JobStatus):
+        if self._archive(job):
+            self._finished[job.job_id] = job.completed_at or time.time()
+        else:
+            self._unarchived[job.job_id] = job
+
+    def _evict_expired(self, now: float):
+        """Forgets archived jobs that finished more than JOB_RETENTION_SECONDS ago."""
+        for job_id, job in list(self._unarchived.items()):
+            if self._archive(job):
+                del self._unarchived[job_id]
+                self._finished[job_id] = job.completed_at or now
+        cutoff = now - JOB_RETENTION_SECONDS
+        expired = []
+        for job_id, completed_at in self._finished.items():
+            if completed_at > cutoff:
+                # Completion order: everything after this finished later
+                break
+            expired.append(job_id)
+        for job_id in expired:
+            del self._finished[job_id]
+            self.jobs.pop(job_id, None)
+            self.tasks.pop(job_id, None)
+            self._changed.pop(job_id, None)
+            fingerprint = self._fingerprints.pop(job_id, None)
+            same = self._by_fingerprint.get(fingerprint, [])
+            if job_id in same:
+                same.remove(job_id)
+                if not same:
+                    del self._by_fingerprint[fingerprint]
+
+    def _on_progress(self, job_id: str, step: str):
+        job = self.jobs.get(job_id)
+        if job is None:
+            return
+        job.progress = step
+        self._publish(job, "progress")
+
+    def subscribe(self) -> asyncio.Queue:
+        queue: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self._subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        self._subscribers.discard(queue)
+
+    async def read_events(self, after: Optional[int] = None, timeout: float = 0) -> dict:
+        """Events after cursor `after`, for subscribers in other processes (see EventLog.read)."""
+        return await self._events.read(after, timeout)
+
+    async def wait_for_change(self, job_id: str, timeout: float) -> Optional[JobStatus]:
+        """
+        Long-poll: returns as soon as the job's status differs from its status
+        at call time, or after `timeout` seconds. Finished jobs return immediately.
+        """
+        job = self.jobs.get(job_id)
+        if job is None:
+            return None
+        initial = job.status
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while job.status == initial and job.status not in TERMINAL_STATES:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            changed = self._changed.setdefault(job_id, asyncio.Event())
+            try:
+                await asyncio.wait_for(changed.wait(), timeout=remaining)
+            except asyncio.TimeoutError:
+                break
+        return job
+
+    # --- Execution ---
 
     async def _run_job(self, job_id: str, job_type: JobType, params: Dict[str, Any]):
         job = self.jobs[job_id]
+        # Lets logic code report progress without knowing its job ID
+        current_job.set(job_id)
         
         # Update status to running
         job.status = JobState.running
         job.started_at = time.time()
+        self._publish(job, "status")
         
         try:
             # Acquire system lock for all hardware jobs to prevent conflicts
@@ -43,7 +199,7 @@ class JobManager:
                 elif job_type == JobType.system_flush:
                     # Parse optional soak_duration from params, default to 180
                     soak = params.get("soak_duration", 180)
-                    result = await execute_system_flush(soak_duration=int(soak))
+                    result = await execute_system_flush(soak_duration=int(soak), resume=_flag(params, "resume"))
                 
                 elif job_type == JobType.feed:
                     recipe = params.get("recipe")
@@ -58,7 +214,9 @@ class JobManager:
                              raise ValueError(f"Invalid recipe: {recipe}")
                              
                     custom_amounts = params.get("amounts_ml")
-                    result = await execute_feed_cycle(recipe=recipe, custom_amounts=custom_amounts)
+                    result = await execute_feed_cycle(
+                        recipe=recipe, custom_amounts=custom_amounts, resume=_flag(params, "resume")
+                    )
                 
                 elif job_type == JobType.diagnose:
                     result = await execute_diagnostic_check()
@@ -70,11 +228,13 @@ class JobManager:
                 job.status = JobState.completed
                 job.completed_at = time.time()
                 job.result = result
+                self._publish(job, "status")
 
         except asyncio.CancelledError:
             job.status = JobState.failed
             job.error = "Job cancelled"
             job.completed_at = time.time()
+            self._publish(job, "status")
             logger.info(f"Job {job_id} cancelled")
             raise
 
@@ -82,26 +242,88 @@ class JobManager:
             job.status = JobState.failed
             job.error = str(e)
             job.completed_at = time.time()
+            self._publish(job, "status")
             logger.error(f"Job {job_id} failed: {e}")
             logger.error(traceback.format_exc())
             # We don't re-raise to avoid crashing the loop, the status captures the error
 
+    # --- Submission ---
+
+    def _find_duplicate(self, fingerprint: str, max_age: Optional[float]) -> Optional[str]:
+        """
+        An identical job that is still queued/running, or (with max_age) one
+        that completed successfully within the last max_age seconds.
+        """
+        now = time.time()
+        reusable = None
+        for job_id in self._by_fingerprint.get(fingerprint, []):
+            job = self.jobs[job_id]
+            if job.status not in TERMINAL_STATES:
+                return job_id
+            if (
+                max_age is not None
+                and job.status == JobState.completed
+                and job.completed_at is not None
+                and now - job.completed_at <= max_age
+            ):
+                # Keep scanning: a pending job still wins over a cached result
+                if reusable is None or job.completed_at > self.jobs[reusable].completed_at:
+                    reusable = job_id
+        return reusable
+
+    def submit(self, request: JobRequest, idempotency_key: Optional[str] = None) -> Tuple[str, bool]:
+        """
+        Returns (job_id, created). created is False when the request was
+        answered by an existing job instead of starting a new one:
+        - the same Idempotency-Key was seen before (within the TTL)
+        - an identical (type, params) job is still queued or running
+        - an identical job completed within request.max_age seconds
+        """
+        # Ensure params is a dict and cast to Dict[str, Any] to satisfy type checker invariance
+        job_params: Dict[str, Any] = request.params if request.params is not None else {}
+        fingerprint = job_fingerprint(request.type, job_params)
+        now = time.time()
+        self._evict_expired(now)
+
+        self._idempotency = {k: v for k, v in self._idempotency.items() if v[2] > now}
+        if idempotency_key is not None and idempotency_key in self._idempotency:
+            job_id, key_fp, _ = self._idempotency[idempotency_key]
+            if key_fp != fingerprint:
+                raise IdempotencyConflict("Idempotency-Key was already used for a different job request")
+            return job_id, False
+
+        job_id = self._find_duplicate(fingerprint, request.max_age)
+        created = job_id is None
+        if created:
+            job_id = self._start(request.type, job_params, fingerprint)
+        else:
+            logger.info(f"Coalesced {request.type.value} request into job {job_id}")
+
+        if idempotency_key is not None:
+            self._idempotency[idempotency_key] = (job_id, fingerprint, now + JOB_IDEMPOTENCY_TTL_SECONDS)
+        return job_id, created
+
     def submit_job(self, request: JobRequest) -> str:
+        job_id, _ = self.submit(request)
+        return job_id
+
+    def _start(self, job_type: JobType, job_params: Dict[str, Any], fingerprint: str) -> str:
         job_id = str(uuid.uuid4())
         
         job_status = JobStatus(
             job_id=job_id,
-            type=request.type,
+            type=job_type,
             status=JobState.queued,
             created_at=time.time()
         )
         
         self.jobs[job_id] = job_status
+        self._fingerprints[job_id] = fingerprint
+        self._by_fingerprint.setdefault(fingerprint, []).append(job_id)
+        self._publish(job_status, "status")
         
         # Create background task
-        # Ensure params is a dict and cast to Dict[str, Any] to satisfy type checker invariance
-        job_params: Dict[str, Any] = request.params if request.params is not None else {}
-        task = asyncio.create_task(self._run_job(job_id, request.type, job_params))
+        task = asyncio.create_task(self._run_job(job_id, job_type, job_params), name=f"job:{job_id}")
         self.tasks[job_id] = task
         
         return job_id
@@ -114,8 +336,15 @@ class JobManager:
             task = self.tasks[job_id]
             if not task.done():
                 task.cancel()
+                job = self.jobs[job_id]
+                if job.status == JobState.queued:
+                    # A task cancelled before its first step never runs _run_job
+                    job.status = JobState.failed
+                    job.error = "Job cancelled"
+                    job.completed_at = time.time()
+                    self._publish(job, "status")
                 return True
         return False
 
-# Global instance
-job_manager = JobManager()
+# Global instance (served by the hardware daemon to API workers)
+job_manager = hardware_singleton("job_manager", JobManager)
@@ -0,0 +1,224 @@
+import asyncio
+import json
+import logging
+import os
+import subprocess
+import tempfile
+import threading
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+from src.config import CAPTURE_HASHES_FILE, PHASH_CHANGE_THRESHOLD
+from src.storage import JsonlTail
+
+logger = logging.getLogger("phash")
+
+# dHash compares horizontally adjacent pixels of a 9x8 grayscale thumbnail -> 64 bits
+HASH_WIDTH = 9
+HASH_HEIGHT = 8
+HASH_BITS = (HASH_WIDTH - 1) * HASH_HEIGHT
+
+# Index sources
+SOURCE_TIMELAPSE = "timelapse"
+SOURCE_PLANT = "plant"
+# Plant photos are taken on demand; only the most recent are kept. Timelapse
+# entries live as long as their frame is in the timelapse index (see compact).
+MAX_PLANT_ENTRIES = 5000
+
+def decode_gray(path: str) -> np.ndarray:
+    """
+    Decimates an image to a 9x8 grayscale buffer. ffmpeg's area filter
+    averages whole pixel blocks, so this is cheap and ignores sensor noise.
+    """
+    cmd = [
+        "ffmpeg", "-v", "error",
+        "-i", path,
+        "-vf", f"scale={HASH_WIDTH}:{HASH_HEIGHT}:flags=area,format=gray",
+        "-f", "rawvideo", "-",
+    ]
+    raw = subprocess.run(cmd, check=True, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL).stdout
+    if len(raw) < HASH_WIDTH * HASH_HEIGHT:
+        raise ValueError(f"ffmpeg produced no pixels for {path}")
+    return np.frombuffer(raw[:HASH_WIDTH * HASH_HEIGHT], dtype=np.uint8).reshape(HASH_HEIGHT, HASH_WIDTH)
+
+def dhash(gray: np.ndarray) -> int:
+    """64-bit difference hash: one bit per 'left pixel brighter than right pixel'."""
+    bits = (gray[:, :-1] > gray[:, 1:]).flatten()
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+class CaptureHashIndex:
+    """
+    Perceptual hash of every timelapse frame and plant photo.
+
+    Each capture is compared to the last keyframe of its source (the most
+    recent capture that counted as changed). A capture whose distance reaches
+    PHASH_CHANGE_THRESHOLD becomes the new keyframe. Timelapse building and
+    API clients use the flag to skip near-duplicates.
+    """
+
+    def __init__(self, path: str = CAPTURE_HASHES_FILE, threshold: int = PHASH_CHANGE_THRESHOLD):
+        self.path = path
+        self.threshold = threshold
+        # source -> timestamp (ms) -> entry, in insertion (= capture) order
+        self.entries: Dict[str, Dict[int, dict]] = {}
+        self._keyframes: Dict[str, dict] = {}
+        # Lines in the file that are no longer indexed (plant photos past the cap)
+        self._evicted = 0
+        self._lock = threading.Lock()
+        self._tail = JsonlTail(path)
+
+    def _ensure_loaded(self):
+        # The daemon hashes timelapse frames and any API worker may hash a
+        # plant photo, all into the same file: every access picks up the
+        # lines other processes appended since the last one
+        with self._lock:
+            reset, records = self._tail.read()
+            if reset:
+                self.entries = {}
+                self._keyframes = {}
+                self._evicted = 0
+            for entry in records:
+                try:
+                    self._index(entry)
+                except KeyError:
+                    continue
+
+    def _index(self, entry: dict):
+        # Caller holds self._lock
+        source = self.entries.setdefault(entry["source"], {})
+        source[entry["timestamp"]] = entry
+        if entry["changed"]:
+            self._keyframes[entry["source"]] = entry
+        if entry["source"] == SOURCE_PLANT:
+            while len(source) > MAX_PLANT_ENTRIES:
+                del source[next(iter(source))]
+                self._evicted += 1
+
+    def record(self, source: str, timestamp: int, hash_value: int) -> dict:
+        """Adds a capture's hash, comparing it to the source's current keyframe."""
+        self._ensure_loaded()
+        with self._lock:
+            keyframe = self._keyframes.get(source)
+            if keyframe is None:
+                distance = HASH_BITS
+            else:
+                distance = hamming(int(keyframe["hash"], 16), hash_value)
+            entry = {
+                "source": source,
+                "timestamp": timestamp,
+                "hash": f"{hash_value:016x}",
+                "distance": distance,
+                "score": round(distance / HASH_BITS, 4),
+                "changed": distance >= self.threshold,
+                "keyframe": keyframe["timestamp"] if keyframe else None,
+            }
+            self._index(entry)
+            try:
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                with open(self.path, "a") as f:
+                    f.write(json.dumps(entry) + "\n")
+            except OSError as e:
+                logger.error(f"Failed to persist capture hash: {e}")
+            return entry
+
+    async def add(self, source: str, timestamp: int, path: str) -> Optional[dict]:
+        """Hashes a capture (ffmpeg decimation off the event loop) and records it."""
+        try:
+            gray = await asyncio.to_thread(decode_gray, path)
+        except Exception as e:
+            logger.error(f"Could not hash {path}: {e}")
+            return None
+        return self.record(source, timestamp, dhash(gray))
+
+    def compact(self, timelapse_frames: Iterable[int]) -> int:
+        """
+        Drops the hashes of timelapse frames that left the timelapse index
+        (thinned by its compaction) and rewrites the file without them or the
+        plant photos past the cap. Each source's keyframe is kept. Returns how
+        many entries were dropped; the file is only rewritten if any were.
+        """
+        self._ensure_loaded()
+        frames = set(timelapse_frames)
+        with self._lock:
+            timelapse = self.entries.get(SOURCE_TIMELAPSE, {})
+            keyframe = self._keyframes.get(SOURCE_TIMELAPSE)
+            stale = [
+                ts for ts in timelapse
+                if ts not in frames and (keyframe is None or ts != keyframe["timestamp"])
+            ]
+            if not stale and not self._evicted:
+                return 0
+            for ts in stale:
+                del timelapse[ts]
+            dropped = len(stale) + self._evicted
+            kept = sorted(
+                (entry for source in self.entries.values() for entry in source.values()),
+                key=lambda entry: entry["timestamp"]
+            )
+            directory = os.path.dirname(self.path) or "."
+            os.makedirs(directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp_", suffix=".jsonl")
+            try:
+                with os.fdopen(fd, "w") as f:
+                    for entry in kept:
+                        f.write(json.dumps(entry) + "\n")
+                os.replace(tmp_path, self.path)
+            except BaseException:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
+            self._evicted = 0
+        logger.info(f"Capture hash compaction: dropped {dropped} entries, kept {len(kept)}.")
+        return dropped
+
+    # --- Queries ---
+
+    def get(self, source: str, timestamp: int) -> Optional[dict]:
+        self._ensure_loaded()
+        return self.entries.get(source, {}).get(timestamp)
+
+    def latest(self, source: str) -> Optional[dict]:
+        self._ensure_loaded()
+        with self._lock:
+            source_entries = self.entries.get(source)
+            if not source_entries:
+                return None
+            return source_entries[next(reversed(source_entries))]
+
+    def changed_since(self, source: str, since: int) -> Optional[dict]:
+        """
+        Compares the latest capture with the one a client last saw (the newest
+        capture at or before `since`, ms). Unknown history counts as changed.
+        """
+        self._ensure_loaded()
+        with self._lock:
+            source_entries = list(self.entries.get(source, {}).values())
+        if not source_entries:
+            return None
+        latest = source_entries[-1]
+        seen = None
+        for entry in reversed(source_entries):
+            if entry["timestamp"] <= since:
+                seen = entry
+                break
+        distance = HASH_BITS if seen is None else hamming(int(seen["hash"], 16), int(latest["hash"], 16))
+        return {
+            "timestamp": latest["timestamp"],
+            "since": seen["timestamp"] if seen else None,
+            "distance": distance,
+            "score": round(distance / HASH_BITS, 4),
+            "changed": distance >= self.threshold,
+        }
+
+    def duplicates(self, source: str) -> List[int]:
+        """Timestamps of captures that did not differ from their keyframe."""
+        self._ensure_loaded()
+        with self._lock:
+            return [ts for ts, entry in self.entries.get(source, {}).items() if not entry["changed"]]
+
+# Global instance
+capture_hashes = CaptureHashIndex()
@@ -0,0 +1,352 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import time
+import uuid
+from glob import glob
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from src.config import (
+    PUMP_CALIBRATION_ML_PER_SEC, PIPELINE_STATE_DIR,
+    PIPELINE_RESUME_WINDOW_SECONDS, PIPELINE_HISTORY
+)
+from src.actuators.pumps import pump_controller
+from src.actuators.ac_relay import ac_relay
+from src.sensors.tds import tds_sensor
+from src.sensors.ph import ph_sensor
+from src.storage import load_json, atomic_write_json
+from src.logic.common import empty_tank_logic, fill_to_max_logic
+from src.logic.progress import report_progress, sleep_with_progress
+
+logger = logging.getLogger("pipeline")
+
+# Step states
+PENDING = "pending"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+# A non-repeatable step (dose) that started but never finished. It is not
+# run again on resume: under-dosing is recoverable, a double dose is not.
+INTERRUPTED = "interrupted"
+
+DONE_STATES = (COMPLETED, INTERRUPTED)
+
+# --- Step actions ---
+
+async def _run_empty() -> dict:
+    return await empty_tank_logic()
+
+async def _run_fill() -> dict:
+    return await fill_to_max_logic()
+
+async def _run_dose(nutrient: str, ml: float) -> dict:
+    report_progress(f"dosing {nutrient}")
+    await pump_controller.dispense(nutrient, ml / PUMP_CALIBRATION_ML_PER_SEC)
+    return {"nutrient": nutrient, "ml": ml}
+
+async def _run_mix(seconds: float, label: str = "mixing", restore: bool = False) -> dict:
+    # AC Relay powers the air stones (and the grow light)
+    was_active = ac_relay.is_active
+    if not was_active:
+        ac_relay.turn_on()
+    try:
+        await sleep_with_progress(seconds, label)
+    finally:
+        if restore and not was_active:
+            ac_relay.turn_off()
+    return {"seconds": seconds}
+
+async def _run_measure(sensors: List[str], label: str = "measuring") -> dict:
+    report_progress(label)
+    result = {}
+    if "tds" in sensors:
+        result["tds_ppm"] = tds_sensor.get_tds_ppm()
+    if "ph" in sensors:
+        result["ph"] = ph_sensor.get_ph()
+    return result
+
+STEP_ACTIONS = {
+    "empty": _run_empty,
+    "fill": _run_fill,
+    "dose": _run_dose,
+    "mix": _run_mix,
+    "measure": _run_measure,
+}
+
+# --- Steps ---
+
+class Step:
+    """
+    One node of a pipeline graph.
+
+    `resources` are the devices the step drives; steps whose dependencies are
+    done and whose resources are free run concurrently. `repeatable` steps are
+    simply run again when a pipeline resumes after being interrupted mid-step.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        kind: str,
+        params: Optional[Dict[str, Any]] = None,
+        after: Iterable[str] = (),
+        resources: Iterable[str] = (),
+        repeatable: bool = True
+    ):
+        if kind not in STEP_ACTIONS:
+            raise ValueError(f"Unknown step type: {kind}")
+        self.name = name
+        self.kind = kind
+        self.params = params or {}
+        self.after = list(after)
+        self.resources = set(resources)
+        self.repeatable = repeatable
+
+    def describe(self) -> dict:
+        return {"kind": self.kind, "params": self.params, "after": self.after}
+
+    async def run(self) -> dict:
+        return await STEP_ACTIONS[self.kind](**self.params)
+
+def empty(name: str = "empty", after: Iterable[str] = ()) -> Step:
+    return Step(name, "empty", after=after, resources={"water_out"})
+
+def fill(name: str = "fill", after: Iterable[str] = ()) -> Step:
+    # Leveling after the fill runs the drain pump too
+    return Step(name, "fill", after=after, resources={"water_in", "water_out"})
+
+def dose(nutrient: str, ml: float, name: Optional[str] = None, after: Iterable[str] = ()) -> Step:
+    return Step(
+        name or f"dose_{nutrient}", "dose", {"nutrient": nutrient, "ml": ml},
+        after=after, resources={nutrient}, repeatable=False
+    )
+
+def mix(seconds: float, name: str = "mix", after: Iterable[str] = (), label: str = "mixing", restore: bool = False) -> Step:
+    return Step(
+        name, "mix", {"seconds": seconds, "label": label, "restore": restore},
+        after=after, resources={"ac_relay"}
+    )
+
+def measure(sensors: Iterable[str] = ("tds",), name: str = "measure", after: Iterable[str] = (), label: str = "measuring") -> Step:
+    return Step(name, "measure", {"sensors": list(sensors), "label": label}, after=after, resources={"adc"})
+
+# --- Pipelines ---
+
+class Pipeline:
+    """A named graph of steps. Identical graphs share a key, which is what resume matches on."""
+
+    def __init__(self, name: str, steps: List[Step]):
+        self.name = name
+        self.steps: Dict[str, Step] = {}
+        for step in steps:
+            if step.name in self.steps:
+                raise ValueError(f"Duplicate step name: {step.name}")
+            self.steps[step.name] = step
+        for step in steps:
+            for dep in step.after:
+                if dep not in self.steps:
+                    raise ValueError(f"Step '{step.name}' depends on unknown step '{dep}'")
+        self._check_acyclic()
+
+        definition = json.dumps(
+            {"name": name, "steps": {s.name: s.describe() for s in steps}},
+            sort_keys=True, default=str
+        )
+        self.key = hashlib.sha256(definition.encode()).hexdigest()[:16]
+
+    def _check_acyclic(self):
+        visiting: Set[str] = set()
+        visited: Set[str] = set()
+
+        def visit(name: str):
+            if name in visited:
+                return
+            if name in visiting:
+                raise ValueError(f"Pipeline '{self.name}' has a dependency cycle at '{name}'")
+            visiting.add(name)
+            for dep in self.steps[name].after:
+                visit(dep)
+            visiting.discard(name)
+            visited.add(name)
+
+        for name in self.steps:
+            visit(name)
+
+class PipelineRun:
+    """Persisted outcome of every step of one pipeline run."""
+
+    def __init__(self, pipeline: Pipeline, state: dict, path: str):
+        self.pipeline = pipeline
+        self.state = state
+        self.path = path
+
+    @property
+    def run_id(self) -> str:
+        return self.state["run_id"]
+
+    @property
+    def steps(self) -> Dict[str, dict]:
+        return self.state["steps"]
+
+    def result(self, step_name: str) -> Optional[dict]:
+        """Result of a completed step (None if it did not complete)."""
+        step = self.steps.get(step_name)
+        if step is None or step["status"] != COMPLETED:
+            return None
+        return step["result"]
+
+    def save(self):
+        self.state["updated_at"] = time.time()
+        atomic_write_json(self.path, self.state)
+
+class PipelineStore:
+    """Run files under PIPELINE_STATE_DIR, one JSON document per run."""
+
+    def __init__(self, root: str = PIPELINE_STATE_DIR):
+        self.root = root
+
+    def _runs(self) -> List[dict]:
+        runs = []
+        for path in glob(os.path.join(self.root, "*.json")):
+            state = load_json(path)
+            if state is not None:
+                runs.append(state)
+        return sorted(runs, key=lambda s: s.get("created_at", 0))
+
+    def get(self, run_id: str) -> Optional[dict]:
+        return load_json(os.path.join(self.root, f"{run_id}.json"))
+
+    def list_runs(self, limit: Optional[int] = None) -> List[dict]:
+        """Most recent first."""
+        runs = list(reversed(self._runs()))
+        return runs[:limit] if limit is not None else runs
+
+    def _resumable(self, pipeline: Pipeline, now: float) -> Optional[dict]:
+        for state in self.list_runs():
+            if state.get("key") != pipeline.key:
+                continue
+            if state["status"] == COMPLETED or now - state.get("updated_at", 0) > PIPELINE_RESUME_WINDOW_SECONDS:
+                return None
+            return state
+        return None
+
+    def open(self, pipeline: Pipeline, resume: bool = True) -> PipelineRun:
+        """
+        Starts a run. With `resume`, the most recent unfinished run of the same
+        pipeline is continued: completed steps are kept, repeatable steps that
+        were cut short start over, non-repeatable ones are marked interrupted.
+        """
+        now = time.time()
+        previous = self._resumable(pipeline, now) if resume else None
+        if previous is not None:
+            for name, step in previous["steps"].items():
+                if step["status"] in DONE_STATES:
+                    continue
+                started = step.get("started_at") is not None
+                if started and not pipeline.steps[name].repeatable:
+                    step["status"] = INTERRUPTED
+                else:
+                    step.update(status=PENDING, started_at=None, completed_at=None, error=None)
+            previous["status"] = RUNNING
+            previous["resumed"] = previous.get("resumed", 0) + 1
+            run = PipelineRun(pipeline, previous, os.path.join(self.root, f"{previous['run_id']}.json"))
+            logger.info(f"Resuming pipeline {pipeline.name} run {run.run_id}")
+        else:
+            run_id = str(uuid.uuid4())
+            state = {
+                "run_id": run_id,
+                "pipeline": pipeline.name,
+                "key": pipeline.key,
+                "status": RUNNING,
+                "created_at": now,
+                "resumed": 0,
+                "steps": {
+                    name: {"status": PENDING, "started_at": None, "completed_at": None, "result": None, "error": None}
+                    for name in pipeline.steps
+                },
+            }
+            run = PipelineRun(pipeline, state, os.path.join(self.root, f"{run_id}.json"))
+        run.save()
+        self._prune()
+        return run
+
+    def _prune(self):
+        runs = self._runs()
+        for state in runs[:max(0, len(runs) - PIPELINE_HISTORY)]:
+            try:
+                os.remove(os.path.join(self.root, f"{state['run_id']}.json"))
+            except FileNotFoundError:
+                pass
+
+pipeline_store = PipelineStore()
+
+# --- Execution ---
+
+async def run_pipeline(pipeline: Pipeline, resume: bool = True) -> PipelineRun:
+    """
+    Runs the pipeline graph, persisting every step transition.
+
+    A step starts once all its dependencies are done and none of its resources
+    are held by a running step. On the first failure the remaining running steps
+    are cancelled and the original exception is re-raised; the run file keeps
+    the completed steps so the next identical run resumes after them.
+    """
+    run = pipeline_store.open(pipeline, resume=resume)
+    steps = run.steps
+    running: Dict[asyncio.Task, Step] = {}
+    held: Set[str] = set()
+
+    def start_ready():
+        for name, step in pipeline.steps.items():
+            if steps[name]["status"] != PENDING:
+                continue
+            if not all(steps[dep]["status"] in DONE_STATES for dep in step.after):
+                continue
+            if step.resources & held:
+                continue
+            held.update(step.resources)
+            steps[name].update(status=RUNNING, started_at=time.time())
+            running[asyncio.create_task(step.run())] = step
+        run.save()
+
+    try:
+        start_ready()
+        while running:
+            done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                step = running.pop(task)
+                held.difference_update(step.resources)
+                record = steps[step.name]
+                record["completed_at"] = time.time()
+                error = task.exception()
+                if error is not None:
+                    record.update(status=FAILED, error=str(error))
+                    run.state["status"] = FAILED
+                    run.save()
+                    logger.error(f"Pipeline {pipeline.name} step {step.name} failed: {error}")
+                    raise error
+                record.update(status=COMPLETED, result=task.result())
+            start_ready()
+    except BaseException:
+        # Failure or cancellation: stop the steps still running and record that they did not finish
+        for task in running:
+            task.cancel()
+        if running:
+            await asyncio.gather(*running, return_exceptions=True)
+        for step in running.values():
+            steps[step.name].update(status=FAILED, error="cancelled", completed_at=time.time())
+        run.state["status"] = FAILED
+        run.save()
+        raise
+
+    pending = [name for name, step in steps.items() if step["status"] not in DONE_STATES]
+    if pending:
+        run.state["status"] = FAILED
+        run.save()
+        raise RuntimeError(f"Pipeline {pipeline.name} could not run steps: {', '.join(pending)}")
+
+    run.state["status"] = COMPLETED
+    run.save()
+    return run
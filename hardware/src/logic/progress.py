@@ -0,0 +1,40 @@
+import asyncio
+import logging
+from contextvars import ContextVar
+from typing import Callable, List, Optional
+
+logger = logging.getLogger("progress")
+
+# Set by JobManager for the duration of a job; logic code does not need to know its job ID.
+current_job: ContextVar[Optional[str]] = ContextVar("current_job", default=None)
+
+_listeners: List[Callable[[str, str], None]] = []
+
+def add_listener(listener: Callable[[str, str], None]):
+    """Registers a callback receiving (job_id, step) for every progress report."""
+    _listeners.append(listener)
+
+def report_progress(step: str):
+    """
+    Reports a step-level progress message (e.g. "dosing flora_gro") for the
+    job running in the current task. No-op outside of a job (direct API calls).
+    """
+    job_id = current_job.get()
+    if job_id is None:
+        return
+    logger.debug(f"Job {job_id}: {step}")
+    for listener in _listeners:
+        try:
+            listener(job_id, step)
+        except Exception as e:
+            logger.error(f"Progress listener failed: {e}")
+
+async def sleep_with_progress(duration: float, label: str, interval: float = 10):
+    """asyncio.sleep that reports '<label> <elapsed>/<duration> s' every `interval` seconds."""
+    elapsed = 0.0
+    report_progress(f"{label} 0/{int(duration)} s")
+    while elapsed < duration:
+        chunk = min(interval, duration - elapsed)
+        await asyncio.sleep(chunk)
+        elapsed += chunk
+        report_progress(f"{label} {int(elapsed)}/{int(duration)} s")
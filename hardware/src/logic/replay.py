@@ -0,0 +1,392 @@
+"""
+Offline replay of the control logic against a recorded trace (see
+ReplayHarness).
+
+    python -m src.logic.replay <scenario> <from> <to> [--commands]
+
+The command line never touches the hardware. The hardware singletons are
+opened when src/ is imported, so before that it installs inert device
+libraries (src/hardware/offline.py) and forces HARDWARE_MODE=local: on the
+Pi it leaves the live daemon's GPIO, SPI and lock file alone, and it runs on
+a machine without the Pi's libraries. Code that imports this module itself
+(the tests) is responsible for its own device modules.
+"""
+import asyncio
+import json
+import selectors
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, Iterator, List, Optional
+
+if __name__ == "__main__":
+    # Before any src import: see the module docstring
+    from src.hardware import offline
+    offline.install()
+
+from src.config import PUMP_MAX_ON_SECONDS, DHT_STALE_AFTER
+from src.models import NutrientRecipe, PumpID
+from src.hardware.trace import Trace, LEVEL, ADC, DHT
+from src.hardware.adc import adc_device
+from src.actuators.pumps import pump_controller
+from src.actuators.ac_relay import ac_relay
+from src.sensors.float_switches import water_level
+from src.sensors.dht import dht_sensor
+from src.state import SystemLock, system_lock
+from src.logic.pipeline import PipelineStore, pipeline_store
+from src.logic.telemetry import telemetry_reader
+from src.logic.common import fill_to_max_logic, empty_tank_logic, monitor_overflow_task
+from src.logic.feed import execute_feed_cycle
+
+# --- Virtual time ---
+
+class _VirtualSelector(selectors.DefaultSelector):
+    """
+    Never sleeps while timers are pending: I/O that is already ready is
+    returned, otherwise the loop's clock jumps to the next timer. It only
+    blocks for real when there is nothing scheduled at all.
+    """
+
+    def __init__(self, loop: "VirtualTimeLoop"):
+        super().__init__()
+        self._loop = loop
+
+    def select(self, timeout=None):
+        ready = super().select(0)
+        if ready or timeout == 0:
+            return ready
+        if timeout is None:
+            return super().select(None)
+        self._loop.now += timeout
+        return []
+
+class VirtualTimeLoop(asyncio.SelectorEventLoop):
+    """Event loop whose time() starts at `start` and advances from timer to timer."""
+
+    def __init__(self, start: float):
+        self.now = start
+        super().__init__(_VirtualSelector(self))
+        # Timers due within this are run. At Unix-time magnitudes a float step
+        # is ~0.2 us, so the monotonic clock's 1 ns would never reach a timer.
+        self._clock_resolution = 1e-6
+
+    def time(self) -> float:
+        return self.now
+
+# --- Virtual hardware ---
+# Stand-ins with the public surface the logic uses. Inputs come from the
+# trace at the loop's current time; outputs are recorded as commands.
+
+class ReplayWaterLevel:
+    def __init__(self, harness: "ReplayHarness"):
+        self._harness = harness
+
+    def _state(self) -> dict:
+        return self._harness.trace.at(self._harness.now, LEVEL) or {"full": False, "empty": False}
+
+    @property
+    def is_full(self) -> bool:
+        return self._state()["full"]
+
+    @property
+    def is_empty(self) -> bool:
+        return self._state()["empty"]
+
+    def get_status(self):
+        state = self._state()
+        return {"full": state["full"], "empty": state["empty"]}
+
+    def trace_state(self):
+        pass
+
+class ReplayADC:
+    def __init__(self, harness: "ReplayHarness"):
+        self._harness = harness
+
+    def read(self, channel):
+        if channel < 0 or channel > 7:
+            return -1
+        event = self._harness.trace.at(self._harness.now, ADC, channel)
+        return event["raw"] if event else 0
+
+    def close(self):
+        pass
+
+class ReplayDHT:
+    def __init__(self, harness: "ReplayHarness"):
+        self._harness = harness
+        self.consecutive_failures = 0
+
+    @property
+    def is_running(self) -> bool:
+        return True
+
+    def start(self):
+        pass
+
+    def stop(self):
+        pass
+
+    def read(self):
+        event = self._harness.trace.at(self._harness.now, DHT)
+        if event is None:
+            return {"error": "No reading yet"}
+        age = self._harness.now - event["t"]
+        return {
+            "temperature_f": event["temperature_f"],
+            "humidity_percent": event["humidity_percent"],
+            "age_seconds": round(age, 1),
+            "quality": "good" if age <= DHT_STALE_AFTER else "stale"
+        }
+
+class ReplayTelemetry:
+    """No sampler runs in a replay: readers fall back to the stand-in hardware."""
+
+    def latest(self):
+        return None
+
+    def fresh(self, max_age=None):
+        return None
+
+class _Output:
+    def __init__(self):
+        self.value = False
+
+    def on(self):
+        self.value = True
+
+    def off(self):
+        self.value = False
+
+    @property
+    def is_active(self):
+        return self.value
+
+class ReplayPumps:
+    """PumpController on virtual time, including the watchdog deadlines."""
+
+    def __init__(self, harness: "ReplayHarness"):
+        self._harness = harness
+        self.pumps = {pump_id: _Output() for pump_id in PumpID.__members__}
+        self._deadlines: Dict[str, asyncio.TimerHandle] = {}
+
+    def _set(self, pump_id: str, on: bool):
+        if pump_id not in self.pumps:
+            raise ValueError(f"Pump {pump_id} not found.")
+        device = self.pumps[pump_id]
+        if device.is_active != on:
+            self._harness.command(pump_id, on)
+        if on:
+            device.on()
+        else:
+            device.off()
+
+    def _arm(self, pump_id: str, seconds: float):
+        self._disarm(pump_id)
+        self._deadlines[pump_id] = self._harness.loop.call_later(seconds, self._set, pump_id, False)
+
+    def _disarm(self, pump_id: str):
+        handle = self._deadlines.pop(pump_id, None)
+        if handle is not None:
+            handle.cancel()
+
+    def states(self) -> Dict[str, bool]:
+        return {pump_id: device.is_active for pump_id, device in self.pumps.items()}
+
+    def activate_pump(self, pump_id: str):
+        self._set(pump_id, True)
+        limit = PUMP_MAX_ON_SECONDS.get(pump_id)
+        if limit is not None:
+            self._arm(pump_id, limit)
+        return True
+
+    def deactivate_pump(self, pump_id: str):
+        self._set(pump_id, False)
+        self._disarm(pump_id)
+        return True
+
+    def all_off(self):
+        for pump_id in self.pumps:
+            self.deactivate_pump(pump_id)
+
+    async def dispense(self, pump_id: str, duration: float):
+        self._set(pump_id, True)
+        self._arm(pump_id, duration)
+        try:
+            await asyncio.sleep(duration)
+        finally:
+            self.deactivate_pump(pump_id)
+
+class ReplayRelay:
+    def __init__(self, harness: "ReplayHarness"):
+        self._harness = harness
+        self.device = _Output()
+
+    def _set(self, on: bool):
+        if self.device.is_active != on:
+            self._harness.command("ac_relay", on)
+        if on:
+            self.device.on()
+        else:
+            self.device.off()
+
+    def turn_on(self):
+        self._set(True)
+
+    def turn_off(self):
+        self._set(False)
+
+    @property
+    def is_active(self):
+        return self.device.is_active
+
+# --- Harness ---
+
+def duty(commands: List[dict], start: float, end: float) -> Dict[str, dict]:
+    """ON seconds and cycles per device in [start, end] (runs still open count up to `end`)."""
+    totals: Dict[str, dict] = {}
+    since: Dict[str, float] = {}
+    for command in commands:
+        device = command["device"]
+        counts = totals.setdefault(device, {"seconds": 0.0, "cycles": 0})
+        if command["on"] and device not in since:
+            since[device] = command["t"]
+            counts["cycles"] += 1
+        elif not command["on"] and device in since:
+            counts["seconds"] += command["t"] - since.pop(device)
+    for device, t in since.items():
+        totals[device]["seconds"] += end - t
+    return {device: {"seconds": round(c["seconds"], 3), "cycles": c["cycles"]} for device, c in totals.items()}
+
+class ReplayHarness:
+    """
+    Runs the real control logic (src/logic/*) against a recorded trace at
+    virtual time.
+
+    While a scenario runs, every module under src/ that holds one of the
+    hardware singletons (or the system lock / pipeline store) sees a replay
+    stand-in instead, and asyncio sleeps cost no wall time: a month of the
+    5 s overflow monitor replays in seconds. The replay is open loop: the
+    float switches follow the recording, not the replayed pumps, so the
+    commands are meant to be compared with the ones recorded alongside them
+    (see `duty` in the result).
+
+    Blocking calls (to_thread, time.sleep in the pH read) still take real
+    time, and wall-clock timestamps (time.time()) are not virtual.
+    """
+
+    def __init__(self, trace: Trace):
+        self.trace = trace
+        self.loop: Optional[VirtualTimeLoop] = None
+        self.commands: List[dict] = []
+
+    @property
+    def now(self) -> float:
+        return self.loop.now
+
+    def command(self, device: str, on: bool):
+        self.commands.append({"t": self.loop.now, "device": device, "on": on})
+
+    @contextmanager
+    def _installed(self, workdir: str) -> Iterator[None]:
+        stand_ins = {
+            id(water_level): ReplayWaterLevel(self),
+            id(adc_device): ReplayADC(self),
+            id(dht_sensor): ReplayDHT(self),
+            id(pump_controller): ReplayPumps(self),
+            id(ac_relay): ReplayRelay(self),
+            id(system_lock): SystemLock(),
+            id(pipeline_store): PipelineStore(workdir),
+            id(telemetry_reader): ReplayTelemetry(),
+        }
+        patched = []
+        for name, module in list(sys.modules.items()):
+            if module is None or not (name == "src" or name.startswith("src.")):
+                continue
+            for attr, value in list(vars(module).items()):
+                stand_in = stand_ins.get(id(value))
+                if stand_in is not None:
+                    setattr(module, attr, stand_in)
+                    patched.append((module, attr, value))
+        try:
+            yield
+        finally:
+            for module, attr, value in patched:
+                setattr(module, attr, value)
+
+    def run(
+        self, scenario: Callable[[], Awaitable], start: Optional[float] = None, until: Optional[float] = None
+    ) -> dict:
+        """
+        Runs `scenario()` from `start` (default: the trace's start) until it
+        returns or virtual time reaches `until` (default: the trace's end),
+        whichever comes first. Endless tasks like the overflow monitor are
+        cancelled at `until`.
+        """
+        start = self.trace.start if start is None else start
+        until = self.trace.end if until is None else until
+        self.loop = loop = VirtualTimeLoop(start)
+        self.commands = []
+        result, error = None, None
+        wall = time.perf_counter()
+        with tempfile.TemporaryDirectory() as workdir, self._installed(workdir):
+            task = loop.create_task(scenario())
+            loop.call_at(until, task.cancel)
+            try:
+                result = loop.run_until_complete(task)
+            except asyncio.CancelledError:
+                pass
+            except Exception as e:
+                error = f"{type(e).__name__}: {getattr(e, 'detail', e)}"
+            finally:
+                loop.run_until_complete(loop.shutdown_asyncgens())
+                loop.close()
+        wall = time.perf_counter() - wall
+        end = loop.now
+        recorded = [
+            {"t": c["t"], "device": c["device"], "on": c["on"]}
+            for c in self.trace.commands if start <= c["t"] <= end
+        ]
+        return {
+            "start": start,
+            "end": end,
+            "virtual_seconds": round(end - start, 3),
+            "wall_seconds": round(wall, 3),
+            "speedup": round((end - start) / wall) if wall > 0 else None,
+            "result": result.model_dump() if hasattr(result, "model_dump") else result,
+            "error": error,
+            "commands": self.commands,
+            "recorded_commands": recorded,
+            "duty": {
+                "replayed": duty(self.commands, start, end),
+                "recorded": duty(recorded, start, end),
+            },
+        }
+
+SCENARIOS: Dict[str, Callable[[], Awaitable]] = {
+    "overflow": monitor_overflow_task,
+    "fill": fill_to_max_logic,
+    "empty": empty_tank_logic,
+    "feed": lambda: execute_feed_cycle(NutrientRecipe.vegetative, resume=False),
+}
+
+def _parse_time(value: str) -> float:
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.fromisoformat(value).timestamp()
+
+if __name__ == "__main__":
+    # python -m src.logic.replay <scenario> <from> <to> [--commands]
+    # Times are Unix seconds or ISO dates, e.g. overflow 2026-09-01 2026-10-01
+    if len(sys.argv) < 4 or sys.argv[1] not in SCENARIOS:
+        sys.exit(f"Usage: python -m src.logic.replay {{{','.join(SCENARIOS)}}} <from> <to> [--commands]")
+    start, end = _parse_time(sys.argv[2]), _parse_time(sys.argv[3])
+    trace = Trace.load(start, end)
+    report = ReplayHarness(trace).run(SCENARIOS[sys.argv[1]], start, end)
+    if "--commands" not in sys.argv:
+        del report["commands"], report["recorded_commands"]
+    report["signals"] = trace.signals()
+    print(json.dumps(report, indent=2, default=str))
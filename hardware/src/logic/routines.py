@@ -0,0 +1,44 @@
+from typing import Optional
+
+from src.models import NutrientRecipe, PumpID
+from src.hardware.rpc import hardware_singleton
+from src.logic.common import fill_to_max_logic, empty_tank_logic, fix_overflow_logic
+from src.logic.feed import execute_feed_cycle, execute_dose
+from src.logic.flush import execute_system_flush, execute_prime_flush
+from src.logic.diagnose import execute_diagnostic_check
+
+class ControlRoutines:
+    """
+    The tank routines behind the /control and /tools endpoints, run by the
+    process that owns the hardware. They poll float switches and switch pumps
+    with blocking device calls; an API worker awaits the whole routine over
+    RPC instead of making those calls from its own event loop.
+    Callers hold the system lock.
+    """
+
+    async def fill_to_max(self):
+        return await fill_to_max_logic()
+
+    async def empty_tank(self):
+        return await empty_tank_logic()
+
+    async def fix_overflow(self):
+        await fix_overflow_logic()
+
+    async def prime_flush(self):
+        return await execute_prime_flush()
+
+    async def system_flush(self, soak_duration: int = 180):
+        return await execute_system_flush(soak_duration)
+
+    async def feed_cycle(self, recipe: NutrientRecipe, custom_amounts: Optional[dict] = None):
+        return await execute_feed_cycle(recipe, custom_amounts)
+
+    async def dose(self, nutrient: PumpID, amount_ml: float, mix_seconds: int = 30):
+        return await execute_dose(nutrient, amount_ml, mix_seconds)
+
+    async def diagnostic_check(self):
+        return await execute_diagnostic_check()
+
+# Global instance (served by the hardware daemon to API workers)
+control_routines = hardware_singleton("control_routines", ControlRoutines)
@@ -0,0 +1,145 @@
+import asyncio
+import json
+import logging
+import os
+import time
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Any, Callable, Iterator, List, Optional
+
+from src.config import SAMPLER_INTERVAL_SECONDS, SENSOR_HISTORY_DIR
+from src.sensors.tds import tds_sensor
+from src.sensors.ph import ph_sensor
+from src.sensors.float_switches import water_level
+from src.sensors.dht import dht_sensor
+from src.state import system_lock
+
+logger = logging.getLogger("sampler")
+
+# Most recent samples kept in memory (1 hour at 10 s)
+RECENT_SAMPLES = 360
+
+def _read_or_none(read: Callable[[], Any], name: str) -> Optional[Any]:
+    try:
+        return read()
+    except Exception as e:
+        logger.warning(f"Sampler could not read {name}: {e}")
+        return None
+
+def read_sensors() -> dict:
+    """
+    One sample of every sensor. Blocking (the pH read takes ~100 ms);
+    failed reads are recorded as None rather than skipping the sample.
+    """
+    environment = dht_sensor.read()
+    dht_ok = "error" not in environment and environment.get("quality") == "good"
+    # The voltages go to the telemetry ring too, so status reads can be served from it
+    tds = _read_or_none(tds_sensor.read, "TDS") or {}
+    ph = _read_or_none(ph_sensor.read, "pH") or {}
+    return {
+        "t": round(time.time(), 3),
+        "tds_ppm": tds.get("ppm"),
+        "ph": ph.get("ph"),
+        "tds_voltage": tds.get("voltage"),
+        "ph_voltage": ph.get("voltage"),
+        "temperature_f": environment.get("temperature_f") if dht_ok else None,
+        "humidity_percent": environment.get("humidity_percent") if dht_ok else None,
+        "water_full": water_level.is_full,
+        "water_empty": water_level.is_empty,
+        # Pumps or mixing may be changing the water right now
+        "busy": system_lock.locked(),
+    }
+
+class SensorSampler:
+    """
+    Samples every sensor on a fixed interval, appends each sample to a
+    per-day JSONL history file and hands it to registered consumers
+    (anomaly engine, shared ring buffer).
+    """
+
+    def __init__(self, interval: float = SAMPLER_INTERVAL_SECONDS, history_dir: str = SENSOR_HISTORY_DIR):
+        self.interval = interval
+        self.history_dir = history_dir
+        self.recent: deque = deque(maxlen=RECENT_SAMPLES)
+        self._consumers: List[Callable[[dict], None]] = []
+        self._task: Optional[asyncio.Task] = None
+
+    def add_consumer(self, consumer: Callable[[dict], None]):
+        self._consumers.append(consumer)
+
+    # --- History ---
+
+    def _history_path(self, day: str) -> str:
+        return os.path.join(self.history_dir, f"{day}.jsonl")
+
+    def _append_history(self, sample: dict):
+        os.makedirs(self.history_dir, exist_ok=True)
+        day = datetime.fromtimestamp(sample["t"]).strftime("%Y-%m-%d")
+        with open(self._history_path(day), "a") as f:
+            f.write(json.dumps(sample) + "\n")
+
+    def history(self, start: float, end: float) -> Iterator[dict]:
+        """Samples with start <= t <= end, oldest first, read one day file at a time."""
+        day = datetime.fromtimestamp(start).date()
+        last_day = datetime.fromtimestamp(end).date()
+        while day <= last_day:
+            try:
+                with open(self._history_path(day.strftime("%Y-%m-%d")), "r") as f:
+                    for line in f:
+                        try:
+                            sample = json.loads(line)
+                        except ValueError:
+                            continue
+                        if start <= sample["t"] <= end:
+                            yield sample
+            except FileNotFoundError:
+                pass
+            day += timedelta(days=1)
+
+    # --- Sampling ---
+
+    def publish(self, sample: dict):
+        self.recent.append(sample)
+        try:
+            self._append_history(sample)
+        except OSError as e:
+            logger.error(f"Failed to write sensor history: {e}")
+        for consumer in self._consumers:
+            try:
+                consumer(sample)
+            except Exception as e:
+                logger.error(f"Sample consumer failed: {e}")
+
+    async def sample_once(self) -> dict:
+        sample = await asyncio.to_thread(read_sensors)
+        self.publish(sample)
+        return sample
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        next_at = loop.time()
+        while True:
+            try:
+                await self.sample_once()
+            except Exception as e:
+                logger.error(f"Sampler error: {e}")
+            # Fixed cadence: a slow read doesn't push every later sample back
+            # (after a long stall, skip the missed slots instead of bursting)
+            next_at = max(next_at + self.interval, loop.time())
+            await asyncio.sleep(max(0.0, next_at - loop.time()))
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name="sensor-sampler")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+# Global instance
+sensor_sampler = SensorSampler()
@@ -0,0 +1,382 @@
+import asyncio
+import heapq
+import logging
+import os
+import shutil
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Set, Tuple
+
+from src.config import SCHEDULES_FILE, SCHEDULE_MISFIRE_GRACE_SECONDS
+from src.models import (
+    ScheduleKind, ScheduleAction, ScheduleRequest, ScheduleRule, RelayState
+)
+from src.storage import load_json, atomic_write_json
+from src.hardware.rpc import hardware_singleton
+from src.state import system_lock
+from src.actuators.ac_relay import ac_relay
+from src.logic.camera_stream import camera_stream
+from src.logic.jobs import job_manager
+from src.logic.timelapse import run_timelapse_cycle
+
+logger = logging.getLogger("scheduler")
+
+# Upper bound on a single wait so wall-clock jumps (NTP sync after boot) are noticed quickly.
+MAX_SLEEP = 60.0
+
+# Rules created the first time the scheduler runs (no schedules file yet).
+# Replaces the old hard-coded 30 minute timelapse loop.
+DEFAULT_RULES = [
+    ScheduleRequest(
+        name="Timelapse capture",
+        kind=ScheduleKind.cron,
+        cron="*/30 * * * *",
+        action=ScheduleAction.timelapse,
+    ),
+]
+
+# --- Cron ---
+
+def _parse_cron_field(field: str, low: int, high: int) -> Set[int]:
+    values = set()
+    for part in field.split(","):
+        step = 1
+        if "/" in part:
+            part, step_str = part.split("/", 1)
+            step = int(step_str)
+            if step <= 0:
+                raise ValueError(f"Invalid cron step: {step_str}")
+
+        if part == "*":
+            start, end = low, high
+        elif "-" in part:
+            start_str, end_str = part.split("-", 1)
+            start, end = int(start_str), int(end_str)
+        else:
+            start = int(part)
+            # "5/15" means "from 5 to the end, every 15"
+            end = high if step > 1 else start
+
+        if start < low or end > high or start > end:
+            raise ValueError(f"Cron field '{field}' out of range ({low}-{high})")
+        values.update(range(start, end + 1, step))
+    return values
+
+class CronExpression:
+    """Standard 5-field cron expression: minute hour day-of-month month day-of-week."""
+
+    def __init__(self, expression: str):
+        parts = expression.split()
+        if len(parts) != 5:
+            raise ValueError(f"Cron expression must have 5 fields, got {len(parts)}: '{expression}'")
+        try:
+            self.minutes = _parse_cron_field(parts[0], 0, 59)
+            self.hours = _parse_cron_field(parts[1], 0, 23)
+            self.days = _parse_cron_field(parts[2], 1, 31)
+            self.months = _parse_cron_field(parts[3], 1, 12)
+            # Both 0 and 7 mean Sunday
+            self.weekdays = {d % 7 for d in _parse_cron_field(parts[4], 0, 7)}
+        except ValueError as e:
+            raise ValueError(f"Invalid cron expression '{expression}': {e}")
+        self.any_day = parts[2] == "*"
+        self.any_weekday = parts[4] == "*"
+
+    def _day_matches(self, dt: datetime) -> bool:
+        day_ok = dt.day in self.days
+        # Python: Monday=0, cron: Sunday=0
+        weekday_ok = (dt.weekday() + 1) % 7 in self.weekdays
+        # Cron semantics: if both day fields are restricted, either may match.
+        if not self.any_day and not self.any_weekday:
+            return day_ok or weekday_ok
+        return day_ok and weekday_ok
+
+    def next_after(self, dt: datetime) -> datetime:
+        """Returns the first matching minute strictly after `dt` (naive local time)."""
+        t = dt.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = t + timedelta(days=366 * 5)
+        while t <= limit:
+            if t.month not in self.months:
+                t = (t.replace(day=1, hour=0, minute=0) + timedelta(days=32)).replace(day=1)
+                continue
+            if not self._day_matches(t):
+                t = t.replace(hour=0, minute=0) + timedelta(days=1)
+                continue
+            if t.hour not in self.hours:
+                t = t.replace(minute=0) + timedelta(hours=1)
+                continue
+            if t.minute not in self.minutes:
+                t += timedelta(minutes=1)
+                continue
+            return t
+        raise ValueError("Cron expression never fires")
+
+# --- Photoperiod ---
+
+def _parse_time_of_day(value: str) -> Tuple[int, int]:
+    try:
+        hour_str, minute_str = value.split(":")
+        hour, minute = int(hour_str), int(minute_str)
+    except ValueError:
+        raise ValueError(f"Invalid time of day '{value}', expected HH:MM")
+    if not (0 <= hour <= 23 and 0 <= minute <= 59):
+        raise ValueError(f"Invalid time of day '{value}', expected HH:MM")
+    return hour, minute
+
+def photoperiod_state(on_hours: float, lights_on: str, now: datetime) -> Tuple[bool, datetime]:
+    """
+    Returns (light should be on, time of the next transition) for a 24h photoperiod.
+    E.g. on_hours=18, lights_on="06:00" is an 18/6 cycle with lights off at midnight.
+    """
+    hour, minute = _parse_time_of_day(lights_on)
+    start = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+    if start > now:
+        start -= timedelta(days=1)
+    end = start + timedelta(hours=on_hours)
+    if now < end:
+        return True, end
+    return False, start + timedelta(days=1)
+
+# --- Scheduler ---
+
+def _set_light(on: bool):
+    # Live camera viewers that asked for light keep it on; the change is applied when they leave
+    if camera_stream.defer_light(on):
+        logger.info(f"Light change to {'on' if on else 'off'} deferred until the live stream ends")
+        return
+    if on:
+        ac_relay.turn_on()
+    else:
+        ac_relay.turn_off()
+
+def validate_rule(request: ScheduleRequest):
+    if request.kind == ScheduleKind.cron:
+        if not request.cron:
+            raise ValueError("Cron rules require a 'cron' expression")
+        CronExpression(request.cron)
+        if request.action is None:
+            raise ValueError("Cron rules require an 'action'")
+        if request.action == ScheduleAction.job and request.job is None:
+            raise ValueError("Action 'job' requires a 'job' request")
+        if request.action == ScheduleAction.ac_relay and request.relay_state is None:
+            raise ValueError("Action 'ac_relay' requires a 'relay_state'")
+    elif request.kind == ScheduleKind.photoperiod:
+        if request.on_hours is None:
+            raise ValueError("Photoperiod rules require 'on_hours'")
+        _parse_time_of_day(request.lights_on)
+
+class Scheduler:
+    """
+    In-process scheduler for cron and photoperiod rules.
+    Rules are persisted to disk; due times are kept in a min-heap and a single
+    task sleeps until the earliest one, so idle rules cost nothing.
+    """
+
+    # Rule changes wake the scheduler task; they are made on its loop
+    RPC_ON_LOOP = True
+
+    def __init__(self, path: str = SCHEDULES_FILE):
+        self.path = path
+        self.rules: Dict[str, ScheduleRule] = {}
+        self._heap: List[Tuple[float, str]] = []
+        self._loaded = False
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._running: Set[asyncio.Task] = set()
+
+    # --- Persistence ---
+
+    def _ensure_loaded(self):
+        if self._loaded:
+            return
+        self._loaded = True
+        if not os.path.exists(self.path):
+            # First run: seed the default light cycle and timelapse
+            for request in DEFAULT_RULES:
+                rule = ScheduleRule(rule_id=str(uuid.uuid4()), **request.model_dump())
+                self.rules[rule.rule_id] = rule
+            self._save()
+        else:
+            data = load_json(self.path)
+            if data is None:
+                # Unreadable or truncated: keep a copy rather than saving over the user's rules
+                backup = f"{self.path}.corrupt-{int(time.time())}"
+                try:
+                    shutil.copy2(self.path, backup)
+                except OSError as e:
+                    logger.error(f"Could not back up unreadable {self.path}: {e}")
+                logger.error(f"Schedule file {self.path} is unreadable; starting with no rules (copy kept at {backup}).")
+                data = {}
+            for item in data.get("rules", []):
+                try:
+                    rule = ScheduleRule(**item)
+                    self.rules[rule.rule_id] = rule
+                except Exception as e:
+                    logger.error(f"Skipping invalid schedule rule {item}: {e}")
+        now = time.time()
+        for rule in self.rules.values():
+            self._schedule(rule, now)
+
+    def _save(self):
+        atomic_write_json(self.path, {"rules": [r.model_dump(mode="json") for r in self.rules.values()]})
+
+    # --- Rule management ---
+
+    def list_rules(self) -> List[ScheduleRule]:
+        self._ensure_loaded()
+        return list(self.rules.values())
+
+    def get_rule(self, rule_id: str) -> Optional[ScheduleRule]:
+        self._ensure_loaded()
+        return self.rules.get(rule_id)
+
+    def add_rule(self, request: ScheduleRequest) -> ScheduleRule:
+        self._ensure_loaded()
+        validate_rule(request)
+        if request.kind == ScheduleKind.photoperiod and request.enabled:
+            for rule in self.rules.values():
+                if rule.kind == ScheduleKind.photoperiod and rule.enabled:
+                    raise ValueError(f"Photoperiod rule '{rule.name}' already exists; remove it first")
+
+        rule = ScheduleRule(rule_id=str(uuid.uuid4()), **request.model_dump())
+        self.rules[rule.rule_id] = rule
+        self._schedule(rule, time.time())
+        self._save()
+        self._wakeup.set()
+
+        # Apply a new light cycle right away instead of waiting for the next transition
+        if rule.kind == ScheduleKind.photoperiod and rule.enabled and self._task is not None:
+            self._spawn(rule)
+        return rule
+
+    def remove_rule(self, rule_id: str) -> bool:
+        self._ensure_loaded()
+        if self.rules.pop(rule_id, None) is None:
+            return False
+        # Stale heap entries are skipped when popped
+        self._save()
+        self._wakeup.set()
+        return True
+
+    # --- Timing ---
+
+    def _next_run(self, rule: ScheduleRule, now: float) -> Optional[float]:
+        if not rule.enabled:
+            return None
+        now_dt = datetime.fromtimestamp(now)
+        if rule.kind == ScheduleKind.cron:
+            return CronExpression(rule.cron).next_after(now_dt).timestamp()
+        _, transition = photoperiod_state(rule.on_hours, rule.lights_on, now_dt)
+        return transition.timestamp()
+
+    def _schedule(self, rule: ScheduleRule, now: float):
+        rule.next_run = self._next_run(rule, now)
+        if rule.next_run is not None:
+            heapq.heappush(self._heap, (rule.next_run, rule.rule_id))
+
+    def missed_rules(self, now: float) -> List[ScheduleRule]:
+        """
+        Cron rules whose last missed fire time is within the grace window.
+        Each is run once, however many fires were missed.
+        """
+        missed = []
+        now_dt = datetime.fromtimestamp(now)
+        for rule in self.rules.values():
+            if rule.kind != ScheduleKind.cron or not rule.enabled or not rule.catch_up or rule.last_run is None:
+                continue
+            cron = CronExpression(rule.cron)
+            due = cron.next_after(datetime.fromtimestamp(rule.last_run))
+            if due > now_dt:
+                continue
+            # Walk forward to the most recent missed fire (bounded for very frequent rules)
+            for _ in range(10000):
+                following = cron.next_after(due)
+                if following > now_dt:
+                    break
+                due = following
+            if now - due.timestamp() <= SCHEDULE_MISFIRE_GRACE_SECONDS:
+                missed.append(rule)
+            else:
+                logger.info(f"Skipping missed run of '{rule.name}' (outside grace window)")
+        return missed
+
+    # --- Execution ---
+
+    async def _execute(self, rule: ScheduleRule):
+        try:
+            if rule.kind == ScheduleKind.photoperiod:
+                should_be_on, _ = photoperiod_state(rule.on_hours, rule.lights_on, datetime.now())
+                # Wait for running jobs (e.g. a feed mixing with the air stones) to finish first
+                async with system_lock:
+                    _set_light(should_be_on)
+                logger.info(f"Photoperiod '{rule.name}': light {'on' if should_be_on else 'off'}")
+
+            elif rule.action == ScheduleAction.job:
+                job_id = job_manager.submit_job(rule.job)
+                logger.info(f"Schedule '{rule.name}' submitted job {job_id}")
+
+            elif rule.action == ScheduleAction.ac_relay:
+                async with system_lock:
+                    _set_light(rule.relay_state == RelayState.on)
+
+            elif rule.action == ScheduleAction.timelapse:
+                await run_timelapse_cycle()
+
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Scheduled rule '{rule.name}' failed: {e}")
+
+    def _spawn(self, rule: ScheduleRule):
+        task = asyncio.create_task(self._execute(rule), name=f"schedule:{rule.name}")
+        self._running.add(task)
+        task.add_done_callback(self._running.discard)
+
+    def _fire(self, rule: ScheduleRule, now: float):
+        rule.last_run = now
+        self._schedule(rule, now)
+        self._save()
+        self._spawn(rule)
+
+    async def _run(self):
+        while True:
+            now = time.time()
+            while self._heap and self._heap[0][0] <= now:
+                due, rule_id = heapq.heappop(self._heap)
+                rule = self.rules.get(rule_id)
+                # Entry is stale if the rule was removed, disabled or rescheduled
+                if rule is None or rule.next_run != due:
+                    continue
+                self._fire(rule, now)
+
+            timeout = MAX_SLEEP
+            if self._heap:
+                timeout = max(0.0, min(self._heap[0][0] - time.time(), MAX_SLEEP))
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def start(self):
+        self._ensure_loaded()
+        now = time.time()
+        for rule in self.missed_rules(now):
+            logger.info(f"Catching up missed run of '{rule.name}'")
+            self._fire(rule, now)
+        # Light cycles are state based: re-apply the current state after any restart
+        for rule in self.rules.values():
+            if rule.kind == ScheduleKind.photoperiod and rule.enabled:
+                self._spawn(rule)
+        self._task = asyncio.create_task(self._run(), name="scheduler")
+        logger.info(f"Scheduler started with {len(self.rules)} rules.")
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        for task in list(self._running):
+            task.cancel()
+
+# Global instance (served by the hardware daemon to API workers)
+scheduler = hardware_singleton("scheduler", Scheduler)
@@ -0,0 +1,243 @@
+import json
+import mmap
+import os
+import sys
+import time
+import zlib
+from typing import List, Optional
+
+import numpy as np
+
+from src.config import TELEMETRY_RING_FILE, TELEMETRY_RING_RECORDS, TELEMETRY_MAX_AGE_SECONDS
+
+MAGIC = b"ZPRING01"
+VERSION = 2
+
+# 64-byte header. `seq` is the seqlock counter (odd while a write is in
+# progress); `count` is the total number of records ever written.
+HEADER_DTYPE = np.dtype([
+    ("magic", "S8"),
+    ("version", "<u4"),
+    ("capacity", "<u4"),
+    ("record_size", "<u4"),
+    ("reserved0", "<u4"),
+    ("seq", "<u8"),
+    ("count", "<u8"),
+    ("reserved1", "S24"),
+])
+
+# One sampler sample (missing readings are NaN). `check` is the CRC-32 of
+# the record with `check` set to 0.
+RECORD_DTYPE = np.dtype([
+    ("t", "<f8"),
+    ("tds_ppm", "<f4"),
+    ("ph", "<f4"),
+    ("temperature_f", "<f4"),
+    ("humidity_percent", "<f4"),
+    ("tds_voltage", "<f4"),
+    ("ph_voltage", "<f4"),
+    ("flags", "<u4"),
+    ("check", "<u4"),
+])
+
+READINGS = ("tds_ppm", "ph", "temperature_f", "humidity_percent", "tds_voltage", "ph_voltage")
+FLAGS = {"water_full": 1, "water_empty": 2, "busy": 4}
+
+# A reader that keeps catching the writer mid-update gives up after this many tries
+READ_RETRIES = 100
+
+def _checksum(record) -> int:
+    unchecked = np.array(record, dtype=RECORD_DTYPE)
+    unchecked["check"] = 0
+    return zlib.crc32(unchecked.tobytes())
+
+def _to_sample(record: np.void) -> dict:
+    sample = {"t": round(float(record["t"]), 3)}
+    for name in READINGS:
+        value = float(record[name])
+        sample[name] = None if np.isnan(value) else round(value, 3)
+    for name, bit in FLAGS.items():
+        sample[name] = bool(record["flags"] & bit)
+    return sample
+
+class TelemetryRing:
+    """
+    Fixed-record ring of recent sensor samples in a memory-mapped file.
+
+    The process running the sampler publishes every sample; any local process
+    (API workers, diagnostics, external tools) maps the same file read-only and
+    reads the current state or a recent window with no syscalls and no
+    hardware I/O.
+
+    Reads never lock out the writer. A reader retries if the seqlock counter
+    was odd or changed while it copied, or if a copied record fails its
+    checksum. The counter alone is not enough here: the fields are plain
+    numpy stores into shared memory with no barriers, and a weakly ordered
+    CPU (the Pi's ARM64) may make the record bytes visible to another core
+    before or after the counter updates. The sequence re-check catches a
+    reader that overlapped a write, and the CRC catches a record copied
+    half-written. Together they give a consistent snapshot of each record,
+    but no ordering guarantee across records.
+    """
+
+    def __init__(self, path: str = TELEMETRY_RING_FILE, capacity: int = TELEMETRY_RING_RECORDS, writable: bool = False):
+        self.path = path
+        self.capacity = capacity
+        self.writable = writable
+        self._mmap: Optional[mmap.mmap] = None
+        self._header: Optional[np.ndarray] = None
+        self._records: Optional[np.ndarray] = None
+
+    @property
+    def size_bytes(self) -> int:
+        return HEADER_DTYPE.itemsize + self.capacity * RECORD_DTYPE.itemsize
+
+    # --- Mapping ---
+
+    def _map(self) -> bool:
+        if self._mmap is not None:
+            return True
+        if self.writable:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                if os.fstat(fd).st_size != self.size_bytes:
+                    os.ftruncate(fd, self.size_bytes)
+                self._mmap = mmap.mmap(fd, self.size_bytes)
+            finally:
+                os.close(fd)
+        else:
+            try:
+                fd = os.open(self.path, os.O_RDONLY)
+            except FileNotFoundError:
+                return False
+            try:
+                size = os.fstat(fd).st_size
+                if size < HEADER_DTYPE.itemsize:
+                    return False
+                self._mmap = mmap.mmap(fd, size, access=mmap.ACCESS_READ)
+            finally:
+                os.close(fd)
+
+        self._header = np.ndarray((), dtype=HEADER_DTYPE, buffer=self._mmap)
+        if self.writable:
+            self._initialize()
+        elif self._header["magic"] != MAGIC or self._header["record_size"] != RECORD_DTYPE.itemsize:
+            self.close()
+            return False
+        self.capacity = int(self._header["capacity"])
+        if len(self._mmap) < self.size_bytes:
+            # Resized by a writer with a different capacity after we mapped it
+            self.close()
+            return False
+        self._records = np.ndarray(
+            (self.capacity,), dtype=RECORD_DTYPE, buffer=self._mmap, offset=HEADER_DTYPE.itemsize
+        )
+        return True
+
+    def _initialize(self):
+        header = self._header
+        compatible = (
+            header["magic"] == MAGIC
+            and header["version"] == VERSION
+            and header["capacity"] == self.capacity
+            and header["record_size"] == RECORD_DTYPE.itemsize
+        )
+        # Keep the samples of a previous writer with the same layout; an odd
+        # seq left by a crashed writer is made even again
+        seq = int(header["seq"]) if compatible else 0
+        header["seq"] = seq | 1
+        if not compatible:
+            header["magic"] = MAGIC
+            header["version"] = VERSION
+            header["capacity"] = self.capacity
+            header["record_size"] = RECORD_DTYPE.itemsize
+            header["count"] = 0
+        header["seq"] = (seq | 1) + 1
+
+    def close(self):
+        self._header = None
+        self._records = None
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+
+    # --- Writer ---
+
+    def publish(self, sample: dict):
+        """Appends one sampler sample (sampler consumer). Writer process only."""
+        if not self.writable:
+            raise RuntimeError("Telemetry ring is opened read-only")
+        self._map()
+        record = np.zeros((), dtype=RECORD_DTYPE)
+        record["t"] = sample["t"]
+        for name in READINGS:
+            value = sample.get(name)
+            record[name] = np.nan if value is None else value
+        record["flags"] = sum(bit for name, bit in FLAGS.items() if sample.get(name))
+        record["check"] = _checksum(record)
+
+        header = self._header
+        seq = int(header["seq"])
+        count = int(header["count"])
+        header["seq"] = seq + 1
+        self._records[count % self.capacity] = record
+        header["count"] = count + 1
+        header["seq"] = seq + 2
+
+    # --- Readers ---
+
+    def _snapshot(self, limit: int) -> Optional[np.ndarray]:
+        """Copy of the newest `limit` records, oldest first (None if unavailable)."""
+        if not self._map():
+            return None
+        header = self._header
+        for _ in range(READ_RETRIES):
+            seq = int(header["seq"])
+            if seq & 1:
+                time.sleep(0)
+                continue
+            count = int(header["count"])
+            n = min(count, self.capacity, limit)
+            indices = np.arange(count - n, count) % self.capacity
+            records = self._records[indices]
+            if int(header["seq"]) == seq and all(int(r["check"]) == _checksum(r) for r in records):
+                return records
+        return None
+
+    def latest(self) -> Optional[dict]:
+        records = self._snapshot(1)
+        if records is None or len(records) == 0:
+            return None
+        return _to_sample(records[-1])
+
+    def fresh(self, max_age: float = TELEMETRY_MAX_AGE_SECONDS) -> Optional[dict]:
+        """latest() if it is at most `max_age` seconds old; None means: read the hardware."""
+        sample = self.latest()
+        if sample is None or time.time() - sample["t"] > max_age:
+            return None
+        return sample
+
+    def window(self, seconds: Optional[float] = None) -> np.ndarray:
+        """Records (RECORD_DTYPE) from the last `seconds` before the newest one, oldest first."""
+        records = self._snapshot(self.capacity)
+        if records is None:
+            return np.zeros(0, dtype=RECORD_DTYPE)
+        if seconds is not None and len(records):
+            records = records[records["t"] >= records["t"][-1] - seconds]
+        return records
+
+    def samples(self, seconds: Optional[float] = None) -> List[dict]:
+        return [_to_sample(record) for record in self.window(seconds)]
+
+# The sampler's process writes; API handlers (in any worker) read
+telemetry_ring = TelemetryRing(writable=True)
+telemetry_reader = TelemetryRing()
+
+if __name__ == "__main__":
+    # Current state for shell tools: python -m src.logic.telemetry [seconds]
+    reader = TelemetryRing()
+    if len(sys.argv) > 1:
+        print(json.dumps(reader.samples(float(sys.argv[1])), indent=2))
+    else:
+        print(json.dumps(reader.latest(), indent=2))
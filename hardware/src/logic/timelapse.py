@@ -2,19 +2,38 @@ import asyncio
 import os
 import time
 import subprocess
+import shutil
 import logging
 from datetime import datetime
-from glob import glob
 
 from src.sensors.camera import camera
 from src.actuators.ac_relay import ac_relay
 from src.state import system_lock
+from src.logic.timelapse_store import timelapse_store, TIMELAPSE_DIR
+from src.logic.vision import frame_features
+from src.logic.phash import capture_hashes, SOURCE_TIMELAPSE
+from src.config import TIMELAPSE_SKIP_DUPLICATES
 
 logger = logging.getLogger("timelapse")
 
-TIMELAPSE_DIR = "timeLapse"
-IMAGES_DIR = os.path.join(TIMELAPSE_DIR, "images")
-VIDEO_DIR = os.path.join(TIMELAPSE_DIR, "video")
+IMAGES_DIR = timelapse_store.images_dir
+VIDEO_DIR = timelapse_store.video_dir
+FRAME_LIST_PATH = os.path.join(TIMELAPSE_DIR, "frames.txt")
+# 1 day (48 images) = 5 seconds
+FRAMERATE = "9.6"
+
+# Timestamp overlay, drawn at video build time (bottom left).
+# box=1:boxcolor=black@0.5 creates a semi-transparent background for readability.
+# In drawtext, : is an option delimiter, so it is escaped as \: inside the expansion.
+FONT_PATH = "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf"
+OVERLAY_METADATA_KEY = "zp_capture_time"
+OVERLAY_FILTER = (
+    f"drawtext=fontfile={FONT_PATH}:text='%{{metadata\\:{OVERLAY_METADATA_KEY}}}'"
+    ":fontcolor=white:fontsize=48:box=1:boxcolor=black@0.5:boxborderw=5:x=20:y=h-th-20"
+)
+
+# Feature extraction tasks still running (the loop only keeps weak references)
+_analysis_tasks = set()
 
 # Ensure directories exist
 os.makedirs(IMAGES_DIR, exist_ok=True)
@@ -24,9 +43,12 @@ async def capture_timelapse_image():
     """
     Captures an image for the timelapse.
     Ensures the grow light is ON during capture for consistency.
+    The timestamp is not burned in here; it is drawn when the video is built,
+    so the lock (and forced light) is only held for the exposure itself.
     """
     timestamp = int(time.time() * 1000)
     filename = f"{timestamp}.jpg"
+    captured_path = None
     
     # We need to ensure light is on, similar to capture_plant_photo
     async with system_lock:
@@ -38,86 +60,68 @@ async def capture_timelapse_image():
                 # Give light a moment to stabilize/warm up if needed, though LED is instant
                 await asyncio.sleep(2)
             
-            # Let's use the global camera instance but handle the file movement.
-            temp_filename = "timelapse_temp.jpg"
-            # Use run_in_executor to prevent blocking the async loop during subprocess call
+            # Use a thread to prevent blocking the async loop during subprocess call
             captured_path = await asyncio.to_thread(
                 camera.capture_image, 
-                filename=temp_filename, 
+                filename=f"timelapse_{filename}", 
                 ev=-1.0, 
                 saturation=0.8, 
                 metering="average",
                 width=1920,
                 height=1080
             )
-            
-            if os.path.exists(captured_path) and not captured_path.startswith("Error"):
-                target_path = os.path.join(IMAGES_DIR, filename)
-                
-                # Add timestamp overlay using ffmpeg
-                try:
-                    date_str = datetime.now().strftime("%m/%d/%Y %H:%M")
-                    # Escape colons for ffmpeg filter syntax
-                    # In drawtext filter, : is a delimiter, so we need to escape it as \:
-                    # And since we are passing it in a string, we might need double escape depending on how it's parsed.
-                    # Usually just replacing : with \: works for the text parameter.
-                    # But also spaces sometimes need escaping if not quoted, but single quotes around text handles spaces.
-                    
-                    escaped_date_str = date_str.replace(":", r"\:")
-                    
-                    # We write to a temp file then move it over to be safe
-                    temp_overlay_path = os.path.join(IMAGES_DIR, f"temp_{filename}")
-                    
-                    font_path = "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf"
-                    
-                    # ffmpeg command to draw text in bottom left
-                    # box=1:boxcolor=black@0.5 creates a semi-transparent background for readability
-                    cmd = [
-                        "ffmpeg", "-y",
-                        "-i", captured_path,
-                        "-vf", f"drawtext=fontfile={font_path}:text='{escaped_date_str}':fontcolor=white:fontsize=48:box=1:boxcolor=black@0.5:boxborderw=5:x=20:y=h-th-20",
-                        temp_overlay_path
-                    ]
-                    
-                    # Run ffmpeg (quietly)
-                    subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-                    
-                    # If successful, use the overlaid image
-                    if os.path.exists(temp_overlay_path):
-                        os.rename(temp_overlay_path, target_path)
-                        os.remove(captured_path) # Remove the original raw capture
-                    else:
-                        # Fallback to original if overlay failed
-                        os.rename(captured_path, target_path)
-                        logger.warning("Overlay file creation failed, using original image.")
-                        
-                except Exception as e:
-                    logger.error(f"Failed to add timestamp overlay: {e}")
-                    # Fallback to original
-                    if os.path.exists(captured_path):
-                        os.rename(captured_path, target_path)
-
-                logger.info(f"Captured timelapse image: {target_path}")
-                return target_path
-            else:
-                logger.error(f"Camera capture failed: {captured_path}")
                 
         except Exception as e:
             logger.error(f"Failed to capture timelapse image: {e}")
+            return None
             
         finally:
             # Ensure light is restored to original state even if error occurs
             if not was_active:
                 ac_relay.turn_off()
 
+    if not captured_path or captured_path.startswith("Error") or not os.path.exists(captured_path):
+        logger.error(f"Camera capture failed: {captured_path}")
+        return None
+
+    target_path = os.path.join(IMAGES_DIR, filename)
+    shutil.move(captured_path, target_path)
+    timelapse_store.add_frame(timestamp, filename, annotated=False)
+    logger.info(f"Captured timelapse image: {target_path}")
+
+    # The hash is cheap (9x8 decimation) and the video build right after needs it
+    await capture_hashes.add(SOURCE_TIMELAPSE, timestamp, target_path)
+
+    # Canopy/colour features are computed in the background as each frame lands
+    task = asyncio.create_task(frame_features.analyze(timestamp, target_path), name=f"frame-features:{timestamp}")
+    _analysis_tasks.add(task)
+    task.add_done_callback(_analysis_tasks.discard)
+    return target_path
+
+def _frame_list_entry(timestamp: int, path: str, entry: dict) -> str:
+    """
+    concat demuxer lines for one frame. Frames that were not annotated at
+    capture time carry their capture time as packet metadata for drawtext.
+    """
+    rel_path = os.path.relpath(path, TIMELAPSE_DIR)
+    lines = f"file '{rel_path}'\n"
+    if not entry.get("annotated"):
+        date_str = datetime.fromtimestamp(timestamp / 1000).strftime("%m/%d/%Y %H:%M")
+        lines += f"file_packet_metadata '{OVERLAY_METADATA_KEY}={date_str}'\n"
+    return lines
+
 def generate_timelapse_video():
     """
-    Stitches all images in timeLapse/images into a video.
+    Stitches all frames still on disk (full and reduced tiers) into a video.
+    The frame list comes from the timelapse index instead of a directory glob.
+    Frames the capture hash index marks as near-duplicates are left out.
     """
     try:
-        # Get list of images to verify we have any
-        images = sorted(glob(os.path.join(IMAGES_DIR, "*.jpg")))
-        if not images:
+        frames = timelapse_store.frames_on_disk()
+        if TIMELAPSE_SKIP_DUPLICATES:
+            duplicates = set(capture_hashes.duplicates(SOURCE_TIMELAPSE))
+            frames = [frame for frame in frames if frame[0] not in duplicates]
+        if not frames:
             logger.info("No images to stitch.")
             return
 
@@ -125,24 +129,32 @@ def generate_timelapse_video():
         video_filename = f"{date_str}.mp4"
         video_path = os.path.join(VIDEO_DIR, video_filename)
 
-        # ffmpeg command using glob
-        # We use -framerate 48 to achieve "1 day (48 images) = 1 second"
+        # concat demuxer list; paths are relative to the list file
+        with open(FRAME_LIST_PATH, "w") as f:
+            for ts, path, entry in frames:
+                f.write(_frame_list_entry(ts, path, entry))
+
+        # One filter graph: setpts renumbers frames so every image lasts exactly
+        # 1/FRAMERATE seconds, scale normalizes reduced frames, and drawtext
+        # renders each frame's capture time from its packet metadata.
         cmd = [
             "ffmpeg",
             "-y",
-            "-framerate", "9.6",
-            "-pattern_type", "glob",
-            "-i", os.path.join(IMAGES_DIR, "*.jpg"),
+            "-f", "concat",
+            "-safe", "0",
+            "-i", FRAME_LIST_PATH,
+            "-r", FRAMERATE,
             "-c:v", "libx264",
             "-pix_fmt", "yuv420p",
-            "-vf", "scale=1920:-2",
+            "-vf", f"setpts=N/{FRAMERATE}/TB,scale=1920:-2,{OVERLAY_FILTER}",
             "-crf", "28",
             "-preset", "slow",
             video_path
         ]
         
-        logger.info(f"Starting video generation with {len(images)} images.")
+        logger.info(f"Starting video generation with {len(frames)} images.")
         subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        timelapse_store.add_video(video_filename)
         logger.info(f"Video generated: {video_path}")
         
     except subprocess.CalledProcessError as e:
@@ -150,28 +162,15 @@ def generate_timelapse_video():
     except Exception as e:
         logger.error(f"Video generation failed: {e}")
 
-async def timelapse_service():
+async def run_timelapse_cycle():
     """
-    Background service to run the timelapse logic.
-    Captures image every 30 minutes.
-    Updates video after capture.
+    Captures one timelapse frame and refreshes the video.
+    Invoked by the scheduler (every 30 minutes by default).
     """
-    logger.info("Timelapse service started.")
-    while True:
-        try:
-            await capture_timelapse_image()
-            # Offload video generation to thread or just run it (it might take a few seconds)
-            # Since this is an async loop, blocking for ffmpeg is bad if it takes long.
-            # But for a few images it's fine. For thousands, it might block the event loop.
-            # We should run it in an executor.
-            await asyncio.to_thread(generate_timelapse_video)
-            
-            # Sleep for 30 minutes
-            await asyncio.sleep(1800)
-            
-        except asyncio.CancelledError:
-            logger.info("Timelapse service stopped.")
-            break
-        except Exception as e:
-            logger.error(f"Error in timelapse service: {e}")
-            await asyncio.sleep(60) # Retry after a minute on error
+    await capture_timelapse_image()
+    # Retention (thin/downscale/archive old frames) and ffmpeg both touch many files
+    await asyncio.to_thread(timelapse_store.compact)
+    # Hashes of thinned frames go with them
+    await asyncio.to_thread(capture_hashes.compact, [ts for ts, _ in timelapse_store.list_frames()])
+    # Video generation runs ffmpeg over every frame, so keep it off the event loop.
+    await asyncio.to_thread(generate_timelapse_video)
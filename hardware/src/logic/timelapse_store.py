@@ -0,0 +1,292 @@
+import bisect
+import logging
+import os
+import subprocess
+import tarfile
+import threading
+import time
+from datetime import datetime
+from glob import glob
+from typing import Dict, List, Optional, Tuple
+
+from src.config import (
+    TIMELAPSE_FULL_RES_DAYS, TIMELAPSE_REDUCED_INTERVAL_MINUTES,
+    TIMELAPSE_REDUCED_WIDTH, TIMELAPSE_ARCHIVE_AFTER_DAYS
+)
+from src.storage import load_json, atomic_write_json, file_signature
+
+logger = logging.getLogger("timelapse")
+
+TIMELAPSE_DIR = "timeLapse"
+
+# Frame tiers
+TIER_FULL = "full"          # Original capture
+TIER_REDUCED = "reduced"    # Kept after thinning, downscaled
+TIER_ARCHIVED = "archived"  # Packed into archive/<day>.tar
+
+class TimelapseStore:
+    """
+    Index and retention manager for timelapse frames and videos.
+
+    The index (index.json) is the source of truth for listing and lookups,
+    so callers never scan the image or video directories. Frames move through
+    tiers as they age: full -> reduced (thinned + downscaled) -> archived.
+    """
+
+    def __init__(self, root: str = TIMELAPSE_DIR):
+        self.root = root
+        self.images_dir = os.path.join(root, "images")
+        self.video_dir = os.path.join(root, "video")
+        self.archive_dir = os.path.join(root, "archive")
+        self.index_path = os.path.join(root, "index.json")
+
+        # timestamp (ms) -> {"file", "tier", "annotated", "archive"}
+        self.frames: Dict[int, dict] = {}
+        # Sorted frame timestamps, for range queries
+        self.order: List[int] = []
+        self.videos: List[str] = []
+
+        self._lock = threading.RLock()
+        # One compaction at a time (it runs mostly outside _lock)
+        self._compact_lock = threading.Lock()
+        self._loaded = False
+        # index.json as last read or written by this process
+        self._signature = None
+
+    # --- Index ---
+
+    def _ensure_loaded(self):
+        # The daemon captures and compacts; API workers only read, and
+        # reload the index whenever the daemon has replaced it
+        with self._lock:
+            signature = file_signature(self.index_path)
+            if self._loaded and signature == self._signature:
+                return
+            first = not self._loaded
+            self._loaded = True
+            data = load_json(self.index_path)
+            if data is None:
+                if first:
+                    self._rebuild()
+                return
+            self._signature = signature
+            self.frames = {int(ts): entry for ts, entry in data.get("frames", {}).items()}
+            self.order = sorted(self.frames)
+            self.videos = data.get("videos", [])
+
+    def _rebuild(self):
+        """One-time directory scan for trees that predate the index."""
+        self.frames = {}
+        for path in glob(os.path.join(self.images_dir, "*.jpg")):
+            name = os.path.basename(path)
+            stem = os.path.splitext(name)[0]
+            if not stem.isdigit():
+                continue
+            # Frames captured before the index existed had the timestamp burned in
+            self.frames[int(stem)] = {"file": name, "tier": TIER_FULL, "annotated": True}
+        self.order = sorted(self.frames)
+        self.videos = sorted(os.path.basename(p) for p in glob(os.path.join(self.video_dir, "*.mp4")))
+        logger.info(f"Rebuilt timelapse index: {len(self.frames)} frames, {len(self.videos)} videos.")
+        self._save()
+
+    def _save(self):
+        atomic_write_json(self.index_path, {
+            "frames": {str(ts): self.frames[ts] for ts in self.order},
+            "videos": self.videos,
+        })
+        self._signature = file_signature(self.index_path)
+
+    # --- Frames ---
+
+    def add_frame(self, timestamp: int, filename: str, annotated: bool = False):
+        """Registers a frame saved in the images directory."""
+        self._ensure_loaded()
+        with self._lock:
+            if timestamp not in self.frames:
+                bisect.insort(self.order, timestamp)
+            self.frames[timestamp] = {"file": filename, "tier": TIER_FULL, "annotated": annotated}
+            self._save()
+
+    def get_frame(self, timestamp: int) -> Optional[dict]:
+        self._ensure_loaded()
+        return self.frames.get(timestamp)
+
+    def frame_path(self, timestamp: int) -> Optional[str]:
+        """Path of a frame still in the images directory (None if archived/unknown)."""
+        entry = self.get_frame(timestamp)
+        if entry is None or entry["tier"] == TIER_ARCHIVED:
+            return None
+        return os.path.join(self.images_dir, entry["file"])
+
+    def latest_frame(self) -> Optional[Tuple[int, dict]]:
+        self._ensure_loaded()
+        with self._lock:
+            if not self.order:
+                return None
+            ts = self.order[-1]
+            return ts, self.frames[ts]
+
+    def list_frames(self, start: Optional[int] = None, end: Optional[int] = None, limit: Optional[int] = None) -> List[Tuple[int, dict]]:
+        """Frames with start <= timestamp <= end (ms), oldest first."""
+        self._ensure_loaded()
+        with self._lock:
+            lo = bisect.bisect_left(self.order, start) if start is not None else 0
+            hi = bisect.bisect_right(self.order, end) if end is not None else len(self.order)
+            if limit is not None:
+                hi = min(hi, lo + limit)
+            return [(ts, dict(self.frames[ts])) for ts in self.order[lo:hi]]
+
+    def frames_on_disk(self) -> List[Tuple[int, str, dict]]:
+        """(timestamp, path, entry) of every non-archived frame, oldest first."""
+        self._ensure_loaded()
+        with self._lock:
+            return [
+                (ts, os.path.join(self.images_dir, self.frames[ts]["file"]), dict(self.frames[ts]))
+                for ts in self.order
+                if self.frames[ts]["tier"] != TIER_ARCHIVED
+            ]
+
+    # --- Videos ---
+
+    def add_video(self, filename: str):
+        self._ensure_loaded()
+        with self._lock:
+            if filename in self.videos:
+                self.videos.remove(filename)
+            self.videos.append(filename)
+            self._save()
+
+    def latest_video(self) -> Optional[str]:
+        self._ensure_loaded()
+        with self._lock:
+            if not self.videos:
+                return None
+            return os.path.join(self.video_dir, self.videos[-1])
+
+    # --- Retention ---
+
+    def _downscale(self, path: str):
+        temp_path = os.path.join(os.path.dirname(path), f"reduced_{os.path.basename(path)}")
+        cmd = [
+            "ffmpeg", "-y",
+            "-i", path,
+            "-vf", f"scale={TIMELAPSE_REDUCED_WIDTH}:-2",
+            "-q:v", "4",
+            temp_path
+        ]
+        subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        os.replace(temp_path, path)
+
+    def compact(self, now: Optional[float] = None) -> Dict[str, int]:
+        """
+        Applies the retention rules. Safe to call often; it only touches
+        frames that crossed a tier boundary since the last run.
+
+        The store lock is only held to pick frames and to commit index
+        changes; ffmpeg and tar run without it, so listings and lookups
+        aren't held up by a compaction.
+        """
+        self._ensure_loaded()
+        now = now if now is not None else time.time()
+        reduce_before = int((now - TIMELAPSE_FULL_RES_DAYS * 86400) * 1000)
+        archive_before = int((now - TIMELAPSE_ARCHIVE_AFTER_DAYS * 86400) * 1000)
+        bucket_ms = TIMELAPSE_REDUCED_INTERVAL_MINUTES * 60 * 1000
+        summary = {"reduced": 0, "thinned": 0, "archived": 0}
+
+        with self._compact_lock:
+            # 1. Full -> Reduced: keep the first frame per bucket, drop the rest
+            thinned: List[str] = []
+            to_reduce: List[Tuple[int, str]] = []
+            with self._lock:
+                seen_buckets = set()
+                for ts in list(self.order):
+                    entry = self.frames[ts]
+                    if ts >= reduce_before:
+                        break
+                    if entry["tier"] == TIER_ARCHIVED:
+                        continue
+                    bucket = ts // bucket_ms
+                    if bucket in seen_buckets:
+                        if entry["tier"] == TIER_FULL:
+                            # Out of the index first, so no reader is handed a deleted file
+                            thinned.append(entry["file"])
+                            del self.frames[ts]
+                            self.order.remove(ts)
+                            summary["thinned"] += 1
+                        continue
+                    seen_buckets.add(bucket)
+                    if entry["tier"] == TIER_FULL:
+                        to_reduce.append((ts, entry["file"]))
+                if thinned:
+                    self._save()
+            self._remove_files(thinned)
+
+            reduced = []
+            for ts, name in to_reduce:
+                try:
+                    self._downscale(os.path.join(self.images_dir, name))
+                    reduced.append((ts, name))
+                except Exception as e:
+                    logger.error(f"Failed to downscale frame {name}: {e}")
+
+            # 2. Reduced -> Archived: pack into per-day tar files
+            by_day: Dict[str, List[Tuple[int, str]]] = {}
+            with self._lock:
+                for ts, name in reduced:
+                    entry = self.frames.get(ts)
+                    if entry is not None and entry["file"] == name and entry["tier"] == TIER_FULL:
+                        entry["tier"] = TIER_REDUCED
+                        summary["reduced"] += 1
+                for ts in self.order:
+                    if ts >= archive_before:
+                        break
+                    if self.frames[ts]["tier"] == TIER_REDUCED:
+                        day = datetime.fromtimestamp(ts / 1000).strftime("%Y-%m-%d")
+                        by_day.setdefault(day, []).append((ts, self.frames[ts]["file"]))
+                if summary["reduced"]:
+                    self._save()
+
+            if by_day:
+                os.makedirs(self.archive_dir, exist_ok=True)
+            for day, frames in by_day.items():
+                archive_name = f"{day}.tar"
+                try:
+                    self._append_to_archive(os.path.join(self.archive_dir, archive_name), frames)
+                except Exception as e:
+                    logger.error(f"Failed to archive frames for {day}: {e}")
+                    continue
+                archived = []
+                with self._lock:
+                    for ts, name in frames:
+                        entry = self.frames.get(ts)
+                        if entry is None or entry["file"] != name or entry["tier"] != TIER_REDUCED:
+                            continue
+                        entry["tier"] = TIER_ARCHIVED
+                        entry["archive"] = archive_name
+                        archived.append(name)
+                    self._save()
+                summary["archived"] += len(archived)
+                self._remove_files(archived)
+
+        if any(summary.values()):
+            logger.info(f"Timelapse compaction: {summary}")
+        return summary
+
+    def _remove_files(self, names: List[str]):
+        for name in names:
+            path = os.path.join(self.images_dir, name)
+            if os.path.exists(path):
+                os.remove(path)
+
+    def _append_to_archive(self, archive_path: str, frames: List[Tuple[int, str]]):
+        # A compaction that crashed between the tar append and the index save
+        # is re-run with the same frames: skip the ones already packed
+        with tarfile.open(archive_path, "a") as tar:
+            packed = set(tar.getnames())
+            for _, name in frames:
+                path = os.path.join(self.images_dir, name)
+                if name not in packed and os.path.exists(path):
+                    tar.add(path, arcname=name)
+
+# Global instance
+timelapse_store = TimelapseStore()
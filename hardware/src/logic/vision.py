@@ -0,0 +1,184 @@
+import asyncio
+import json
+import logging
+import os
+import subprocess
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from src.config import (
+    VISION_ANALYSIS_WIDTH, VISION_WORKERS, FRAME_FEATURES_FILE,
+    VISION_EXG_THRESHOLD, VISION_MIN_BRIGHTNESS
+)
+from src.logic.timelapse_store import timelapse_store
+from src.storage import JsonlTail
+
+logger = logging.getLogger("vision")
+
+# Bumped when the feature definitions change, so old rows can be recomputed
+FEATURES_VERSION = 1
+
+def decode_rgb(path: str, width: int = VISION_ANALYSIS_WIDTH) -> np.ndarray:
+    """Decodes and downscales an image with ffmpeg into an (H, W, 3) uint8 array."""
+    cmd = [
+        "ffmpeg", "-v", "error",
+        "-i", path,
+        "-vf", f"scale={width}:-2",
+        "-f", "rawvideo", "-pix_fmt", "rgb24",
+        "-"
+    ]
+    raw = subprocess.run(cmd, check=True, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL).stdout
+    height = len(raw) // (width * 3)
+    if height == 0:
+        raise ValueError(f"ffmpeg produced no pixels for {path}")
+    return np.frombuffer(raw, dtype=np.uint8)[:height * width * 3].reshape(height, width, 3)
+
+def compute_features(rgb: np.ndarray) -> Dict[str, object]:
+    """
+    Canopy and colour features of one frame.
+    - canopy_coverage: fraction of pixels that are green foliage (excess green)
+    - greenness: mean green chromatic coordinate g/(r+g+b) over the canopy
+    - chlorosis: yellow foliage as a fraction of all foliage (green + yellow)
+    - bbox: [x0, y0, x1, y1] of the canopy, normalized to 0..1
+    """
+    pixels = rgb.astype(np.float32)
+    r, g, b = pixels[..., 0], pixels[..., 1], pixels[..., 2]
+    total = r + g + b
+    bright = total / 3 >= VISION_MIN_BRIGHTNESS
+    safe_total = np.where(total > 0, total, 1.0)
+    rc, gc, bc = r / safe_total, g / safe_total, b / safe_total
+
+    # Excess green alone also accepts yellow (high r and g); foliage must be green-dominant
+    green = bright & (2 * gc - rc - bc > VISION_EXG_THRESHOLD) & (g > r)
+    # Yellowing leaves: red and green both well above blue and close to each other
+    yellow = bright & ~green & (r > 1.4 * b) & (g > 1.4 * b) & (np.abs(r - g) < 0.25 * g)
+
+    canopy_pixels = int(green.sum())
+    foliage = canopy_pixels + int(yellow.sum())
+    height, width = green.shape
+
+    bbox = None
+    if canopy_pixels:
+        rows = np.flatnonzero(green.any(axis=1))
+        cols = np.flatnonzero(green.any(axis=0))
+        bbox = [
+            round(cols[0] / width, 4), round(rows[0] / height, 4),
+            round((cols[-1] + 1) / width, 4), round((rows[-1] + 1) / height, 4),
+        ]
+
+    return {
+        "canopy_coverage": round(canopy_pixels / green.size, 5),
+        "greenness": round(float(gc[green].mean()), 5) if canopy_pixels else None,
+        "chlorosis": round(int(yellow.sum()) / foliage, 5) if foliage else None,
+        "bbox": bbox,
+        "width": width,
+        "height": height,
+    }
+
+def analyze_frame(path: str) -> Dict[str, object]:
+    """Worker entry point (runs in the process pool)."""
+    return compute_features(decode_rgb(path))
+
+class FrameFeatureStore:
+    """
+    Per-frame vision features, appended as JSON lines and indexed by frame
+    timestamp. Extraction runs in a process pool so the NumPy work never
+    competes with the event loop for the GIL.
+    """
+
+    def __init__(self, path: str = FRAME_FEATURES_FILE, workers: int = VISION_WORKERS, executor: Optional[Executor] = None):
+        self.path = path
+        self.workers = workers
+        self._executor = executor
+        # timestamp (ms) -> feature row
+        self.features: Dict[int, dict] = {}
+        self._pending: Dict[int, asyncio.Task] = {}
+        self._lock = threading.Lock()
+        self._tail = JsonlTail(path)
+
+    def _pool(self) -> Executor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        return self._executor
+
+    def _ensure_loaded(self):
+        # The daemon analyzes new captures while API workers serve (and may
+        # backfill) the same file: pick up rows other processes appended
+        with self._lock:
+            reset, rows = self._tail.read()
+            if reset:
+                self.features = {}
+            for row in rows:
+                if row.get("version") == FEATURES_VERSION and "timestamp" in row:
+                    self.features[row["timestamp"]] = row
+
+    def _append(self, row: dict):
+        with self._lock:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(self.path, "a") as f:
+                f.write(json.dumps(row) + "\n")
+            self.features[row["timestamp"]] = row
+
+    # --- Extraction ---
+
+    async def analyze(self, timestamp: int, path: str) -> Optional[dict]:
+        """
+        Extracts and stores features for one frame. Concurrent calls for the
+        same frame (a backfill during a capture) await one shared task, so
+        they get the same row, or the same None if extraction failed.
+        """
+        self._ensure_loaded()
+        if timestamp in self.features:
+            return self.features[timestamp]
+        pending = self._pending.get(timestamp)
+        if pending is None:
+            pending = asyncio.create_task(self._extract(timestamp, path), name=f"frame-extract:{timestamp}")
+            self._pending[timestamp] = pending
+        # A cancelled caller doesn't cancel the work for the others
+        return await asyncio.shield(pending)
+
+    async def _extract(self, timestamp: int, path: str) -> Optional[dict]:
+        try:
+            loop = asyncio.get_running_loop()
+            try:
+                features = await loop.run_in_executor(self._pool(), analyze_frame, path)
+            except Exception as e:
+                logger.error(f"Feature extraction failed for frame {timestamp}: {e}")
+                return None
+            row = {"timestamp": timestamp, "version": FEATURES_VERSION, **features}
+            await asyncio.to_thread(self._append, row)
+            return row
+        finally:
+            self._pending.pop(timestamp, None)
+
+    def missing(self) -> List[tuple]:
+        """(timestamp, path) of frames on disk without features."""
+        self._ensure_loaded()
+        return [(ts, path) for ts, path, _ in timelapse_store.frames_on_disk() if ts not in self.features]
+
+    async def backfill(self) -> int:
+        """Analyzes every frame on disk that has no features yet; returns how many were stored."""
+        frames = self.missing()
+        if frames:
+            logger.info(f"Backfilling vision features for {len(frames)} frames.")
+        # The pool bounds parallelism; all frames are queued at once
+        results = await asyncio.gather(*(self.analyze(ts, path) for ts, path in frames))
+        return sum(1 for row in results if row is not None)
+
+    # --- Queries ---
+
+    def list_features(self, start: Optional[int] = None, end: Optional[int] = None, limit: Optional[int] = None) -> List[dict]:
+        """Feature rows with start <= timestamp <= end (ms), oldest first."""
+        self._ensure_loaded()
+        with self._lock:
+            rows = [
+                self.features[ts] for ts in sorted(self.features)
+                if (start is None or ts >= start) and (end is None or ts <= end)
+            ]
+        return rows[:limit] if limit is not None else rows
+
+# Global instance
+frame_features = FrameFeatureStore()
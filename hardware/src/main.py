@@ -1,21 +1,31 @@
-from fastapi import FastAPI, HTTPException, Body, Query
+from fastapi import FastAPI, HTTPException, Body, Query, Request
 from contextlib import asynccontextmanager
-from fastapi.responses import FileResponse, JSONResponse, HTMLResponse
+from fastapi.responses import JSONResponse, HTMLResponse, StreamingResponse
 import asyncio
 import os
 import datetime
-from typing import Dict, Union, Literal
+import time
+from typing import Dict, List, Optional, Union, Literal
 
 # Imports
 from src.state import system_lock
+from src.config import PLANT_PHOTO_CACHE_SECONDS, HARDWARE_MODE
+from src.media import media_response, CaptureCache
+from src.admission import admit, admission_queues
+from src.profiling import install_task_clock
 from src.models import (
     PumpID, RelayState, PumpCommand, StatusResponse, SuccessResponse,
     PumpResponse, ACRelayResponse, WaterLevelStatus, TDSStatus, PHStatus,
-    DHTSuccess, DHTError, HardwareStatusResponse, FillResponse,
-    EmptyResponse, FlushResponse, ErrorResponse, CameraErrorResponse
+    DHTSuccess, DHTError, HardwareStatusResponse, TelemetrySample, ActuatorReport, WatchdogStats, FillResponse,
+    EmptyResponse, FlushResponse, ErrorResponse, CameraErrorResponse, TimelapseFrame,
+    FrameFeatures, BackfillResponse, CaptureChange, AcousticFeatures, AcousticMonitorStatus,
+    ImageSize, AdmissionQueueStats, BatchRequest, BatchResponse
 )
 from src.actuators.pumps import pump_controller
 from src.actuators.ac_relay import ac_relay
+from src.actuators.journal import actuator_journal
+from src.actuators.watchdog import pump_watchdog
+from src.actuators.batch import actuator_batch, plan_batch
 from src.sensors.float_switches import water_level
 from src.sensors.tds import tds_sensor
 from src.sensors.ph import ph_sensor
@@ -23,17 +33,30 @@ from src.sensors.camera import camera
 from src.sensors.microphone import microphone
 from src.sensors.dht import dht_sensor
 
-from src.logic.common import (
-    fill_to_max_logic, empty_tank_logic, fix_overflow_logic, monitor_overflow_task
-)
-from src.logic.timelapse import timelapse_service
-from src.routers import tools, jobs
+from src.hardware.rpc import offload
+from src.logic.routines import control_routines
+from src.logic.timelapse_store import timelapse_store
+from src.logic.derivatives import image_derivatives
+from src.logic.vision import frame_features
+from src.logic.telemetry import telemetry_reader
+from src.logic.acoustic import acoustic_monitor
+from src.logic.camera_stream import camera_stream
+from src.logic.phash import capture_hashes, SOURCE_PLANT, SOURCE_TIMELAPSE
+from src.runtime import start_services, stop_services
+from src.routers import tools, jobs, schedules, alerts, stats, export, debug
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    asyncio.create_task(monitor_overflow_task())
-    asyncio.create_task(timelapse_service())
+    # Task ages for /debug/tasks
+    install_task_clock()
+    # API workers in front of a hardware daemon serve requests only;
+    # the daemon runs the background services
+    if HARDWARE_MODE == "client":
+        yield
+        return
+    await start_services()
     yield
+    await stop_services()
 
 app = FastAPI(
     title="Autonomous Hydroponic Plant API",
@@ -44,6 +67,23 @@ app = FastAPI(
 
 app.include_router(tools.router)
 app.include_router(jobs.router)
+app.include_router(schedules.router)
+app.include_router(alerts.router)
+app.include_router(stats.router)
+app.include_router(export.router)
+app.include_router(debug.router)
+
+# Strong references to fire-and-forget tasks (the loop only keeps weak ones)
+_background_tasks = set()
+
+def _spawn_background(coro):
+    task = asyncio.create_task(coro)
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+    return task
+
+# Last plant photo, reused for a short time so repeated polls don't re-trigger the camera
+plant_photo_cache = CaptureCache(ttl=PLANT_PHOTO_CACHE_SECONDS)
 
 @app.get("/", tags=["System"], response_model=StatusResponse)
 def read_root():
@@ -63,24 +103,57 @@ async def control_pump(command: PumpCommand = Body(...)):
 async def control_ac_relay(state: RelayState = Query(..., description="The desired state for the AC power.")):
     """Turn AC Power 'on' or 'off' for devices like the main grow light."""
     if state == RelayState.on:
-        ac_relay.turn_on()
+        await offload(ac_relay.turn_on)
     else:
-        ac_relay.turn_off()
+        await offload(ac_relay.turn_off)
     return {"status": "success", "ac_power": state}
 
+@app.post(
+    "/control/batch", tags=["Control"], response_model=BatchResponse,
+    responses={400: {"model": ErrorResponse}, 409: {"model": ErrorResponse}}
+)
+async def control_batch(request: BatchRequest = Body(...)):
+    """
+    Runs several pump and relay actions as one plan, e.g. priming all three
+    dosing pumps together or switching the light around a pump run. The whole
+    plan is validated before anything moves, then executed next to the
+    hardware on a single clock. The response has the planned and actual start
+    and stop time of every action.
+    """
+    actions = [action.model_dump(mode="json") for action in request.actions]
+    try:
+        plan_batch(actions, request.mode.value)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if system_lock.locked():
+        raise HTTPException(status_code=409, detail="System is busy with another operation.")
+    async with system_lock:
+        return await actuator_batch.run(actions, request.mode.value)
+
+def _ph_status(sample: Optional[dict]) -> dict:
+    if sample is not None and sample["ph"] is not None and sample["ph_voltage"] is not None:
+        return {"ph": sample["ph"], "voltage": sample["ph_voltage"]}
+    return ph_sensor.read()
+
+def _tds_status(sample: Optional[dict]) -> dict:
+    if sample is not None and sample["tds_ppm"] is not None and sample["tds_voltage"] is not None:
+        return {"ppm": sample["tds_ppm"], "voltage": sample["tds_voltage"]}
+    return tds_sensor.read()
+
 def _get_hardware_status_data():
+    # Probe and float switch readings come from the sampler's telemetry ring
+    # while its newest sample is fresh; the hardware is only read when it is
+    # stale (or that reading failed). The DHT read is already a cache.
+    sample = telemetry_reader.fresh()
     return {
-        "pumps": {id: pump.value for id, pump in pump_controller.pumps.items()},
+        "pumps": {pump_id: int(on) for pump_id, on in pump_controller.states().items()},
         "ac_power": "on" if ac_relay.is_active else "off",
-        "water_level": water_level.get_status(),
-        "tds": {
-            "ppm": tds_sensor.get_tds_ppm(),
-            "voltage": tds_sensor.read_voltage()
-        },
-        "ph": {
-            "ph": ph_sensor.get_ph(),
-            "voltage": ph_sensor.read_voltage()
-        },
+        "water_level": (
+            {"full": sample["water_full"], "empty": sample["water_empty"]}
+            if sample is not None else water_level.get_status()
+        ),
+        "tds": _tds_status(sample),
+        "ph": _ph_status(sample),
         "environment": dht_sensor.read()
     }
 
@@ -89,6 +162,34 @@ def hardware_status():
     """Retrieves the current status of all connected hardware."""
     return _get_hardware_status_data()
 
+@app.get("/hardware/telemetry", tags=["Status"], response_model=List[TelemetrySample])
+def get_telemetry(
+    seconds: Optional[float] = Query(None, gt=0, description="Only samples from the last N seconds (default: the whole ring, about an hour).")
+):
+    """
+    Recent sensor samples from the shared telemetry ring, oldest first.
+    Served from memory: no hardware is read, however often this is polled.
+    """
+    return telemetry_reader.samples(seconds)
+
+@app.get("/hardware/actuators", tags=["Status"], response_model=ActuatorReport)
+def get_actuator_report():
+    """Per-device ON time and activation counts, and operations interrupted by the last shutdown."""
+    return {
+        "runtime": actuator_journal.runtime(),
+        "interrupted": actuator_journal.interrupted,
+    }
+
+@app.get("/hardware/watchdog", tags=["Status"], response_model=WatchdogStats)
+def get_watchdog_stats():
+    """Pump shutoff lateness: how far past its deadline each timed pump run was switched off."""
+    return pump_watchdog.stats()
+
+@app.get("/hardware/admission", tags=["Status"], response_model=Dict[str, AdmissionQueueStats])
+def get_admission_stats():
+    """Queues in front of the camera, microphone and diagnostics: requests served and waiting, refusals and expected wait."""
+    return {name: queue.stats() for name, queue in admission_queues.items()}
+
 @app.get("/hardware/status/html", tags=["Status"], response_class=HTMLResponse)
 def hardware_status_html():
     """Returns a self-refreshing HTML page with hardware status."""
@@ -236,7 +337,7 @@ async def fill_to_max():
     then briefly activates Pump 1 (Water Out) until the switch releases.
     """
     async with system_lock:
-        return await fill_to_max_logic()
+        return await control_routines.fill_to_max()
 
 @app.post("/control/empty_tank", tags=["Control"], response_model=EmptyResponse)
 async def empty_tank():
@@ -245,7 +346,7 @@ async def empty_tank():
     Activates Pump 1 (Water Out) until the bottom float switch indicates empty.
     """
     async with system_lock:
-        return await empty_tank_logic()
+        return await control_routines.empty_tank()
 
 @app.post("/control/system_flush", tags=["Control"], response_model=FlushResponse)
 async def system_flush():
@@ -258,19 +359,7 @@ async def system_flush():
     """
     async with system_lock:
         try:
-            await pump_controller.dispense("flora_micro", 5)
-            await pump_controller.dispense("flora_gro", 5)
-            await pump_controller.dispense("flora_bloom", 5)
-            await fill_to_max_logic()
-            await empty_tank_logic()
-            result = await fill_to_max_logic()
-            
-            return {
-                "status": "success",
-                "message": "System flush complete",
-                "final_fill_details": result
-            }
-
+            return await control_routines.prime_flush()
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"System Flush Failed: {str(e)}")
 
@@ -278,18 +367,15 @@ async def system_flush():
 async def fix_overflow_endpoint():
     """Manually triggers the overflow fix logic."""
     async with system_lock:
-        await fix_overflow_logic()
+        await control_routines.fix_overflow()
         return {"status": "success"}
 
 # --- Sensor Endpoints ---
 
 @app.get("/sensors/ph", tags=["Sensors"], response_model=PHStatus)
 def read_ph():
-    """Reads the current pH level and raw voltage from the sensor."""
-    return {
-        "ph": ph_sensor.get_ph(),
-        "voltage": ph_sensor.read_voltage()
-    }
+    """Reads the current pH level and raw voltage from the sensor (the latest sample while it is fresh)."""
+    return _ph_status(telemetry_reader.fresh())
 
 @app.get(
     "/sensors/camera/capture", 
@@ -301,8 +387,10 @@ def read_ph():
     }
 )
 async def capture_photo(
+    request: Request,
     autofocus_mode: str = Query(None, description="Autofocus mode: default, manual, continuous"),
-    lens_position: float = Query(None, description="Lens position for manual focus (0.0 - infinity)")
+    lens_position: float = Query(None, description="Lens position for manual focus (0.0 - infinity)"),
+    size: ImageSize = Query(ImageSize.full, description="Image size to return: thumb, medium or full resolution.")
 ):
     """Captures an image with default camera settings."""
     kwargs = {}
@@ -311,11 +399,39 @@ async def capture_photo(
     if lens_position is not None:
         kwargs['lens_position'] = lens_position
 
-    path = camera.capture_image(**kwargs)
+    async with admit("camera", request):
+        path = await asyncio.to_thread(camera.capture_image, **kwargs)
     if os.path.exists(path):
-        return FileResponse(path, media_type="image/jpeg")
+        path = await image_derivatives.get(path, size)
+        return await media_response(request, path, media_type="image/jpeg")
     return JSONResponse(status_code=500, content={"error": "Capture failed"})
 
+@app.get(
+    "/sensors/camera/stream",
+    tags=["Sensors"],
+    summary="Live MJPEG view",
+    responses={
+        200: {"content": {"multipart/x-mixed-replace": {}}},
+        503: {"description": "Not available from API workers (client mode)"}
+    }
+)
+async def camera_live_stream(
+    request: Request,
+    light: bool = Query(False, description="Keep the grow light (AC relay) on while watching.")
+):
+    """
+    Live camera view (multipart MJPEG, viewable in a browser <img>). All viewers
+    share one camera pipeline, which starts on demand and stops a few seconds
+    after the last viewer leaves. Still captures briefly pause the stream.
+    """
+    if HARDWARE_MODE == "client":
+        raise HTTPException(status_code=503, detail="The live stream is only served by the process that owns the camera")
+    return StreamingResponse(
+        camera_stream.mjpeg(request.is_disconnected, light=light),
+        media_type="multipart/x-mixed-replace; boundary=frame",
+        headers={"Cache-Control": "no-store"}
+    )
+
 @app.get(
     "/sensors/camera/plant", 
     tags=["Sensors"],
@@ -325,25 +441,80 @@ async def capture_photo(
         500: {"model": CameraErrorResponse}
     }
 )
-async def capture_plant_photo():
+async def capture_plant_photo(
+    request: Request,
+    fresh: bool = Query(False, description=f"Always take a new photo instead of reusing one taken in the last {PLANT_PHOTO_CACHE_SECONDS}s."),
+    size: ImageSize = Query(ImageSize.full, description="Image size to return: thumb, medium or full resolution. Smaller sizes save bandwidth and vision tokens.")
+):
     """
     Captures an image with the main light (AC Relay) turned ON.
     Tuned for bright light: Lowers EV and Saturation.
+    A photo taken within the last few seconds is reused, and repeat
+    requests with a matching If-None-Match get a 304.
+    X-Capture-Time and X-Change-Score describe the photo's perceptual change
+    from the previous keyframe (see /sensors/camera/plant/changes).
+    """
+    path = await _plant_photo(request, fresh)
+    if os.path.exists(path):
+        path = await image_derivatives.get(path, size)
+        headers = None
+        latest = capture_hashes.latest(SOURCE_PLANT)
+        if latest is not None:
+            headers = {
+                "X-Capture-Time": str(latest["timestamp"]),
+                "X-Change-Score": str(latest["score"]),
+            }
+        return await media_response(request, path, media_type="image/jpeg", headers=headers)
+    return JSONResponse(status_code=500, content={"error": "Capture failed"})
+
+@app.get(
+    "/sensors/camera/plant/changes",
+    tags=["Sensors"],
+    response_model=CaptureChange,
+    responses={500: {"model": CameraErrorResponse}}
+)
+async def plant_photo_changes(
+    request: Request,
+    since: int = Query(..., description="Capture time (ms since epoch, from X-Capture-Time) of the photo the client already has.")
+):
+    """
+    Whether the plant looks different from the photo the client last fetched,
+    without transferring an image. Takes (or reuses) a photo like
+    /sensors/camera/plant and compares perceptual hashes.
     """
-    was_active = ac_relay.is_active
+    await _plant_photo(request)
+    change = capture_hashes.changed_since(SOURCE_PLANT, since)
+    if change is None:
+        return JSONResponse(status_code=500, content={"error": "Capture failed"})
+    return change
+
+async def _plant_photo(request: Request, fresh: bool = False) -> str:
+    # Reusing a recent photo doesn't need the camera, so it skips the queue
+    if not fresh and plant_photo_cache.is_fresh():
+        return plant_photo_cache.path
+    async with admit("camera", request):
+        return await plant_photo_cache.get(_capture_plant_photo, fresh=fresh)
+
+async def _capture_plant_photo() -> str:
+    was_active = await asyncio.to_thread(lambda: ac_relay.is_active)
     if not was_active:
-        ac_relay.turn_on()
+        await offload(ac_relay.turn_on)
         await asyncio.sleep(2)
         
     try:
-        path = camera.capture_image(filename="plant_latest.jpg", ev=-1.0, saturation=0.8, metering="average")
+        timestamp = int(time.time() * 1000)
+        path = await asyncio.to_thread(
+            camera.capture_image, filename="plant_latest.jpg", ev=-1.0, saturation=0.8, metering="average"
+        )
     finally:
         if not was_active:
-            ac_relay.turn_off()
+            await offload(ac_relay.turn_off)
 
     if os.path.exists(path):
-        return FileResponse(path, media_type="image/jpeg")
-    return JSONResponse(status_code=500, content={"error": "Capture failed"})
+        await capture_hashes.add(SOURCE_PLANT, timestamp, path)
+        # Thumbnails are built in the background so the next ?size= request is a cache hit
+        await asyncio.to_thread(image_derivatives.pregenerate, path)
+    return path
 
 @app.get(
     "/sensors/microphone/record", 
@@ -352,11 +523,25 @@ async def capture_plant_photo():
     responses={200: {"content": {"audio/wav": {}}}}
 )
 async def record_audio(
+    request: Request,
     duration: int = Query(5, gt=0, le=30, description="Recording duration in seconds.")
 ):
     """Records an audio clip, useful for detecting pump/system noises."""
-    path = microphone.record_clip(duration=duration)
-    return FileResponse(path, media_type="audio/wav")
+    async with admit("microphone", request):
+        path = await asyncio.to_thread(microphone.record_clip, duration=duration)
+    return await media_response(request, path, media_type="audio/wav")
+
+@app.get("/sensors/microphone/monitor", tags=["Sensors"], response_model=AcousticMonitorStatus)
+def acoustic_monitor_status():
+    """State of the background acoustic monitor: background noise levels and the latest analysed block."""
+    return acoustic_monitor.status()
+
+@app.get("/sensors/microphone/features", tags=["Sensors"], response_model=List[AcousticFeatures])
+def acoustic_features(
+    seconds: Optional[float] = Query(None, gt=0, description="Only blocks from the last N seconds (default: everything kept, 10 minutes).")
+):
+    """Per-second band energies heard by the acoustic monitor, with the pump states they were judged against."""
+    return acoustic_monitor.recent(seconds)
 
 @app.get(
     "/timelapse/latest",
@@ -364,23 +549,64 @@ async def record_audio(
     summary="Get the latest timelapse video",
     responses={
         200: {"content": {"video/mp4": {}}},
+        206: {"description": "Partial content (Range request)"},
+        304: {"description": "Not modified"},
         404: {"description": "No video found"}
     }
 )
-async def get_latest_timelapse():
+async def get_latest_timelapse(request: Request):
     """
     Returns the latest generated timelapse video.
+    Supports Range requests for seeking and ETag revalidation.
     """
-    from glob import glob
-    
-    video_dir = "timeLapse/video"
-    if not os.path.exists(video_dir):
-        raise HTTPException(status_code=404, detail="Timelapse directory not found")
-        
-    videos = sorted(glob(os.path.join(video_dir, "*.mp4")))
-    if not videos:
+    latest_video = timelapse_store.latest_video()
+    if not latest_video or not os.path.exists(latest_video):
         raise HTTPException(status_code=404, detail="No timelapse videos found")
-        
-    # Return the last one (latest by filename date)
-    latest_video = videos[-1]
-    return FileResponse(latest_video, media_type="video/mp4")
+    return await media_response(request, latest_video, media_type="video/mp4")
+
+@app.get("/timelapse/frames", tags=["Timelapse"], response_model=List[TimelapseFrame])
+async def list_timelapse_frames(
+    start: Optional[int] = Query(None, description="Only frames captured at or after this time (ms since epoch)."),
+    end: Optional[int] = Query(None, description="Only frames captured at or before this time (ms since epoch)."),
+    limit: int = Query(500, gt=0, le=5000, description="Maximum number of frames to return."),
+    changed_only: bool = Query(False, description="Skip frames that are near-duplicates of the previous keyframe.")
+):
+    """
+    Lists timelapse frames from the index, oldest first, with their storage tier
+    and perceptual change from the previous keyframe.
+    """
+    result = []
+    for ts, entry in timelapse_store.list_frames(start=start, end=end, limit=None if changed_only else limit):
+        change = capture_hashes.get(SOURCE_TIMELAPSE, ts)
+        if changed_only and change is not None and not change["changed"]:
+            continue
+        result.append(TimelapseFrame(
+            timestamp=ts,
+            changed=change["changed"] if change else None,
+            change_score=change["score"] if change else None,
+            **entry
+        ))
+        if len(result) >= limit:
+            break
+    return result
+
+@app.get("/timelapse/features", tags=["Timelapse"], response_model=List[FrameFeatures])
+async def list_frame_features(
+    start: Optional[int] = Query(None, description="Only frames captured at or after this time (ms since epoch)."),
+    end: Optional[int] = Query(None, description="Only frames captured at or before this time (ms since epoch)."),
+    limit: int = Query(500, gt=0, le=5000, description="Maximum number of rows to return.")
+):
+    """
+    Growth curve: canopy coverage, greenness, chlorosis and canopy bounding box
+    per timelapse frame, oldest first. No images are transferred.
+    """
+    return frame_features.list_features(start=start, end=end, limit=limit)
+
+@app.post("/timelapse/features/backfill", tags=["Timelapse"], response_model=BackfillResponse, status_code=202)
+async def backfill_frame_features():
+    """Analyzes, in the background, every frame on disk that has no features yet."""
+    queued = len(frame_features.missing())
+    if queued:
+        _spawn_background(frame_features.backfill())
+    return {"queued": queued}
+
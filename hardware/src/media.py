@@ -0,0 +1,190 @@
+import asyncio
+import hashlib
+import os
+import re
+import time
+from collections import OrderedDict
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Awaitable, Callable, Optional, Tuple
+
+from fastapi import Request
+from fastapi.responses import Response, StreamingResponse
+
+CHUNK_SIZE = 64 * 1024
+# Clients may keep media but must revalidate; a matching ETag costs a 304.
+CACHE_CONTROL = "no-cache"
+
+_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+class _ETagCache:
+    """Content hashes keyed by (path, size, mtime) so each file is hashed once."""
+
+    def __init__(self, max_entries: int = 64):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[str, int, int], str]" = OrderedDict()
+
+    def get(self, path: str, stat: os.stat_result) -> str:
+        key = (path, stat.st_size, stat.st_mtime_ns)
+        etag = self._entries.get(key)
+        if etag is not None:
+            self._entries.move_to_end(key)
+            return etag
+
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+                digest.update(chunk)
+        etag = f'"{digest.hexdigest()[:32]}"'
+
+        self._entries[key] = etag
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return etag
+
+etag_cache = _ETagCache()
+
+def content_etag(path: str) -> str:
+    """Strong ETag derived from the file content (cached per size/mtime)."""
+    return etag_cache.get(path, os.stat(path))
+
+def _etag_matches(header: str, etag: str) -> bool:
+    if header.strip() == "*":
+        return True
+    # Weak comparison: W/"x" matches "x"
+    candidates = [tag.strip().removeprefix("W/") for tag in header.split(",")]
+    return etag in candidates
+
+def _not_modified_since(header: str, mtime: float) -> bool:
+    try:
+        since = parsedate_to_datetime(header).timestamp()
+    except (TypeError, ValueError):
+        return False
+    # HTTP dates have 1 second resolution
+    return int(mtime) <= since
+
+def _parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """
+    Parses a single 'bytes=' range into an inclusive (start, end).
+    Returns None for syntax we ignore (e.g. multiple ranges) and raises
+    ValueError if the range cannot be satisfied.
+    """
+    match = _RANGE_RE.match(header.strip())
+    if not match:
+        return None
+    start_str, end_str = match.groups()
+    if not start_str and not end_str:
+        return None
+    if not start_str:
+        # Suffix range: last N bytes
+        length = int(end_str)
+        if length == 0:
+            raise ValueError("Empty suffix range")
+        return max(0, size - length), size - 1
+    start = int(start_str)
+    end = int(end_str) if end_str else size - 1
+    if start >= size or start > end:
+        raise ValueError("Range not satisfiable")
+    return start, min(end, size - 1)
+
+def _iter_file(path: str, start: int, length: int):
+    with open(path, "rb") as f:
+        f.seek(start)
+        remaining = length
+        while remaining > 0:
+            chunk = f.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+async def media_response(request: Request, path: str, media_type: str, headers: Optional[dict] = None) -> Response:
+    """
+    Serves a file with validators and byte-range support:
+    - ETag (content hash) and Last-Modified on every response
+    - 304 for a matching If-None-Match (or If-Modified-Since when no ETag is sent)
+    - 206 for a single Range request (honouring If-Range), 416 if unsatisfiable
+    """
+    stat = os.stat(path)
+    # Hashing large videos reads the whole file once; keep it off the event loop
+    etag = await asyncio.to_thread(etag_cache.get, path, stat)
+
+    base_headers = {
+        "ETag": etag,
+        "Last-Modified": formatdate(stat.st_mtime, usegmt=True),
+        "Accept-Ranges": "bytes",
+        "Cache-Control": CACHE_CONTROL,
+    }
+    if headers:
+        base_headers.update(headers)
+
+    if_none_match = request.headers.get("if-none-match")
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_none_match is not None:
+        if _etag_matches(if_none_match, etag):
+            return Response(status_code=304, headers=base_headers)
+    elif if_modified_since is not None and _not_modified_since(if_modified_since, stat.st_mtime):
+        return Response(status_code=304, headers=base_headers)
+
+    size = stat.st_size
+    byte_range = None
+    range_header = request.headers.get("range")
+    if range_header:
+        if_range = request.headers.get("if-range")
+        # A stale If-Range means the client's partial copy is outdated: send everything
+        if if_range is None or _etag_matches(if_range, etag) or _not_modified_since(if_range, stat.st_mtime):
+            try:
+                byte_range = _parse_range(range_header, size)
+            except ValueError:
+                return Response(
+                    status_code=416,
+                    headers={**base_headers, "Content-Range": f"bytes */{size}"}
+                )
+
+    if byte_range is None:
+        return StreamingResponse(
+            _iter_file(path, 0, size),
+            media_type=media_type,
+            headers={**base_headers, "Content-Length": str(size)}
+        )
+
+    start, end = byte_range
+    length = end - start + 1
+    return StreamingResponse(
+        _iter_file(path, start, length),
+        status_code=206,
+        media_type=media_type,
+        headers={
+            **base_headers,
+            "Content-Length": str(length),
+            "Content-Range": f"bytes {start}-{end}/{size}",
+        }
+    )
+
+class CaptureCache:
+    """
+    Reuses the most recent capture for `ttl` seconds. Concurrent callers
+    share a single capture instead of each triggering the camera.
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self.path: Optional[str] = None
+        self.captured_at = 0.0
+        self._lock = asyncio.Lock()
+
+    def is_fresh(self) -> bool:
+        return (
+            self.path is not None
+            and time.time() - self.captured_at < self.ttl
+            and os.path.exists(self.path)
+        )
+
+    async def get(self, capture: Callable[[], Awaitable[str]], fresh: bool = False) -> str:
+        async with self._lock:
+            if not fresh and self.is_fresh():
+                return self.path
+            path = await capture()
+            if path and os.path.exists(path):
+                self.path = path
+                self.captured_at = time.time()
+            return path
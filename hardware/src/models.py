@@ -1,6 +1,6 @@
 from enum import Enum
 from pydantic import BaseModel, Field
-from typing import Dict, Literal, Union, Optional, Any
+from typing import Dict, List, Literal, Union, Optional, Any
 
 # --- Enums ---
 
@@ -26,6 +26,28 @@ class PumpCommand(BaseModel):
     pump_id: PumpID = Field(..., description="The unique identifier for the pump.")
     duration: float = Field(..., gt=0, description="Duration in seconds for which to run the pump.", json_schema_extra={"example": 5.5})
 
+class BatchDevice(str, Enum):
+    water_out = "water_out"
+    water_in = "water_in"
+    flora_micro = "flora_micro"
+    flora_gro = "flora_gro"
+    flora_bloom = "flora_bloom"
+    ac_relay = "ac_relay"
+
+class BatchMode(str, Enum):
+    sequential = "sequential"
+    parallel = "parallel"
+
+class BatchAction(BaseModel):
+    device: BatchDevice = Field(..., description="A pump ID or ac_relay.")
+    state: RelayState = Field(RelayState.on, description="Pumps only run ON; the relay can be switched either way.")
+    duration: Optional[float] = Field(None, gt=0, description="Seconds to hold the state (required for pumps). The relay is switched back afterwards; without a duration it keeps the new state.")
+    delay: float = Field(0.0, ge=0, description="Seconds to wait before starting: after the previous action (sequential) or after the batch starts (parallel).")
+
+class BatchRequest(BaseModel):
+    mode: BatchMode = Field(BatchMode.sequential, description="sequential: each action starts when the previous one ends. parallel: all start together (plus their delay).")
+    actions: List[BatchAction] = Field(..., min_length=1)
+
 class FeedRequest(BaseModel):
     recipe: NutrientRecipe = Field(..., description="Nutrient recipe to apply.")
     amounts_ml: Optional[Dict[str, float]] = Field(None, description="Custom nutrient amounts in mL (required if recipe is custom). Keys: micro, gro, bloom.")
@@ -51,6 +73,20 @@ class PumpResponse(SuccessResponse):
 class ACRelayResponse(SuccessResponse):
     ac_power: RelayState
 
+class BatchActionResult(BaseModel):
+    device: BatchDevice
+    state: RelayState
+    planned_start: float = Field(..., description="Planned start (Unix time).")
+    planned_stop: float
+    started_at: Optional[float] = Field(None, description="When the device was actually switched (Unix time).")
+    stopped_at: Optional[float] = Field(None, description="When the action actually ended.")
+
+class BatchResponse(SuccessResponse):
+    mode: BatchMode
+    started_at: float
+    completed_at: float
+    actions: List[BatchActionResult] = Field(..., description="In request order.")
+
 class WaterLevelStatus(BaseModel):
     full: bool = Field(..., description="True if the top float switch is triggered.")
     empty: bool = Field(..., description="True if the bottom float switch is triggered.")
@@ -66,6 +102,8 @@ class PHStatus(BaseModel):
 class DHTSuccess(BaseModel):
     temperature_f: float = Field(..., description="Temperature in Fahrenheit")
     humidity_percent: float = Field(..., description="Relative Humidity in percent")
+    age_seconds: Optional[float] = Field(None, description="Seconds since this reading was taken.")
+    quality: Optional[Literal["good", "stale"]] = Field(None, description="'stale' if the sensor has not produced a good reading recently.")
 
 class DHTError(BaseModel):
     error: str
@@ -78,6 +116,74 @@ class HardwareStatusResponse(BaseModel):
     ph: PHStatus
     environment: Union[DHTSuccess, DHTError] = Field(..., description="Air temperature and humidity.")
 
+class TelemetrySample(BaseModel):
+    t: float = Field(..., description="Sample time (Unix seconds).")
+    tds_ppm: Optional[float] = None
+    ph: Optional[float] = None
+    temperature_f: Optional[float] = None
+    humidity_percent: Optional[float] = None
+    water_full: bool
+    water_empty: bool
+    busy: bool = Field(..., description="A routine held the system lock when the sample was taken.")
+
+class ActuatorRuntime(BaseModel):
+    seconds: float = Field(..., description="Total time ON, including a run in progress.")
+    cycles: int = Field(..., description="Number of times the device was switched ON.")
+    on: bool
+
+class InterruptedOperation(BaseModel):
+    device: str
+    since: float = Field(..., description="When the device was switched ON (Unix time).")
+    detected_at: float = Field(..., description="When startup found it still ON and forced it OFF.")
+
+class ActuatorReport(BaseModel):
+    runtime: Dict[str, ActuatorRuntime]
+    interrupted: List[InterruptedOperation] = Field(..., description="Devices left ON by the previous process, reported at startup.")
+
+class AdmissionQueueStats(BaseModel):
+    active: int = Field(..., description="Requests currently using the resource.")
+    waiting: int
+    clients_waiting: int = Field(..., description="Distinct clients with queued requests (served round-robin).")
+    rejected: int = Field(..., description="Requests refused since startup (queue full, per-client limit or deadline).")
+    service_seconds: float = Field(..., description="Running estimate of how long one request holds the resource.")
+    expected_wait_seconds: float = Field(..., description="How long a request arriving now would wait.")
+
+class DebugTask(BaseModel):
+    name: str = Field(..., description="Task name, e.g. job:<id>, scheduler, sensor-sampler, overflow-monitor.")
+    coroutine: str
+    age_seconds: Optional[float] = Field(None, description="Time since the task was created (None if it predates the task clock).")
+    cancelling: bool
+    stack: List[str] = Field(..., description="Coroutines the task is suspended in, outermost first.")
+
+class DutyCycleCounts(BaseModel):
+    seconds: float = Field(..., description="Time ON within the period.")
+    cycles: int = Field(..., description="Times switched ON within the period.")
+    ml: Optional[float] = Field(None, description="Volume dispensed, from the pump's flow calibration (None for devices without one).")
+
+class DutyCycleBucket(BaseModel):
+    start: float = Field(..., description="Start of the hour or local day (Unix time).")
+    label: str = Field(..., description="e.g. '2024-05-01 14:00' or '2024-05-01'.")
+    devices: Dict[str, DutyCycleCounts]
+
+class ActuatorStats(BaseModel):
+    period: Literal["hour", "day"]
+    totals: Dict[str, DutyCycleCounts] = Field(..., description="Lifetime counts per device.")
+    buckets: List[DutyCycleBucket] = Field(..., description="Oldest first; periods with no activity are omitted.")
+
+class Shutoff(BaseModel):
+    device: str
+    late_ms: float = Field(..., description="How long after its deadline the pump was switched off.")
+    by: Literal["caller", "watchdog"]
+    at: float
+
+class WatchdogStats(BaseModel):
+    shutoffs: int = Field(..., description="Timed shutoffs measured (dispenses and watchdog cut-offs).")
+    forced: int = Field(..., description="Shutoffs performed by the watchdog because the caller was late.")
+    max_late_ms: float
+    mean_late_ms: float
+    armed: Dict[str, float] = Field(..., description="Seconds until each running pump's hard deadline.")
+    recent: List[Shutoff]
+
 class FillResponse(SuccessResponse):
     message: str
     fill_duration: float
@@ -146,6 +252,7 @@ class JobState(str, Enum):
 class JobRequest(BaseModel):
     type: JobType
     params: Optional[Dict[str, Union[str, float, int, dict]]] = Field(default_factory=dict, description="Parameters for the job (e.g., recipe for feed).")
+    max_age: Optional[float] = Field(None, ge=0, description="Reuse the result of an identical job that completed within this many seconds instead of running it again (finished jobs are kept for JOB_RETENTION_SECONDS).")
 
 class JobStatus(BaseModel):
     job_id: str
@@ -154,5 +261,114 @@ class JobStatus(BaseModel):
     created_at: float
     started_at: Optional[float] = None
     completed_at: Optional[float] = None
+    progress: Optional[str] = Field(None, description="Latest step reported by the running job (e.g. 'mixing 120/180 s').")
     result: Optional[Union[Dict, str, FillResponse, EmptyResponse, FlushResponse, FeedResponse, DiagnosticResponse]] = None
     error: Optional[str] = None
+
+# --- Schedule Models ---
+
+class ScheduleKind(str, Enum):
+    cron = "cron"
+    photoperiod = "photoperiod"
+
+class ScheduleAction(str, Enum):
+    job = "job"
+    ac_relay = "ac_relay"
+    timelapse = "timelapse"
+
+class ScheduleRequest(BaseModel):
+    name: str = Field(..., description="Human readable name for the rule.", json_schema_extra={"example": "Weekly feed"})
+    kind: ScheduleKind
+    cron: Optional[str] = Field(None, description="Cron expression (minute hour day month weekday). Required for cron rules.", json_schema_extra={"example": "0 9 * * 1"})
+    action: Optional[ScheduleAction] = Field(None, description="What a cron rule does when it fires.")
+    job: Optional[JobRequest] = Field(None, description="Job to submit when action is 'job'.")
+    relay_state: Optional[RelayState] = Field(None, description="Relay state to apply when action is 'ac_relay'.")
+    on_hours: Optional[float] = Field(None, gt=0, lt=24, description="Photoperiod: hours of light per 24h day (e.g. 18 for 18/6).", json_schema_extra={"example": 18})
+    lights_on: str = Field("06:00", description="Photoperiod: local time (HH:MM) at which the light turns on.")
+    catch_up: bool = Field(True, description="If a run was missed (e.g. during a restart), run it once on startup when within the grace window.")
+    enabled: bool = True
+
+class ScheduleRule(ScheduleRequest):
+    rule_id: str
+    last_run: Optional[float] = None
+    next_run: Optional[float] = None
+
+# --- Timelapse Models ---
+
+class TimelapseTier(str, Enum):
+    full = "full"
+    reduced = "reduced"
+    archived = "archived"
+
+class TimelapseFrame(BaseModel):
+    timestamp: int = Field(..., description="Capture time in milliseconds since epoch.")
+    file: str
+    tier: TimelapseTier
+    archive: Optional[str] = Field(None, description="Archive tar containing the frame (archived tier only).")
+    changed: Optional[bool] = Field(None, description="False if the frame is a near-duplicate of the previous keyframe (None if not hashed).")
+    change_score: Optional[float] = Field(None, description="Perceptual distance to the previous keyframe (0 = identical, 1 = all hash bits differ).")
+
+class CaptureChange(BaseModel):
+    timestamp: int = Field(..., description="Capture time of the latest photo in milliseconds since epoch.")
+    since: Optional[int] = Field(None, description="Capture time of the photo it was compared with (None if no photo was taken by `since`).")
+    distance: int = Field(..., description="Hamming distance between the two 64-bit perceptual hashes.")
+    score: float = Field(..., description="distance / 64.")
+    changed: bool = Field(..., description="True if the latest photo differs visibly from the one at `since`.")
+
+class FrameFeatures(BaseModel):
+    timestamp: int = Field(..., description="Frame capture time in milliseconds since epoch.")
+    canopy_coverage: float = Field(..., description="Fraction of the frame covered by green foliage (0-1).")
+    greenness: Optional[float] = Field(None, description="Mean green chromatic coordinate g/(r+g+b) of the canopy.")
+    chlorosis: Optional[float] = Field(None, description="Yellow foliage as a fraction of all foliage (0-1).")
+    bbox: Optional[List[float]] = Field(None, description="Canopy bounding box [x0, y0, x1, y1], normalized to 0-1.")
+    width: int = Field(..., description="Width of the downscaled frame the features were computed on.")
+    height: int
+
+class BackfillResponse(BaseModel):
+    queued: int = Field(..., description="Frames queued for analysis.")
+
+class AcousticFeatures(BaseModel):
+    t: float = Field(..., description="End of the analysed block (Unix seconds).")
+    rms: float = Field(..., description="RMS amplitude of the block (full scale = 1).")
+    bands: Dict[str, float] = Field(..., description="Mean spectral energy per frequency band.")
+    pumps_on: List[str] = Field(..., description="Pumps commanded on while the block was analysed.")
+    relay_on: bool = Field(..., description="AC relay (air stones) state.")
+
+class AcousticMonitorStatus(BaseModel):
+    running: bool
+    calibrated: bool = Field(..., description="Enough quiet blocks have been heard to judge pump noise.")
+    baselines: Dict[str, float] = Field(..., description="Background pump-band energy with the relay off/on.")
+    latest: Optional[AcousticFeatures] = None
+
+# --- Image Models ---
+
+class ImageSize(str, Enum):
+    thumb = "thumb"
+    medium = "medium"
+    full = "full"
+
+# --- Alert Models ---
+
+class AlertKind(str, Enum):
+    spike = "spike"                    # Rolling z-score outlier
+    change_point = "change_point"      # Sustained level shift
+    rate_of_change = "rate_of_change"  # Faster than physically plausible
+    stuck = "stuck"                    # Identical readings for too long
+    dropout = "dropout"                # Sensor stopped producing readings
+    pump_silent = "pump_silent"        # Pump commanded on but not heard
+    unexpected_noise = "unexpected_noise"  # Pump-like noise while every pump is off
+
+class AlertSeverity(str, Enum):
+    info = "info"        # Detected while a job was changing the tank (often expected)
+    warning = "warning"
+    critical = "critical"
+
+class Alert(BaseModel):
+    alert_id: str
+    kind: AlertKind
+    severity: AlertSeverity
+    metric: str
+    value: Optional[float] = Field(None, description="Reading that triggered the alert.")
+    message: str
+    timestamp: float
+    details: Dict[str, float] = Field(default_factory=dict, description="Statistics behind the decision (z, mean, std, rate...).")
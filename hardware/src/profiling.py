@@ -0,0 +1,200 @@
+import asyncio
+import hashlib
+import os
+import sys
+import threading
+import time
+import weakref
+from collections import Counter
+from typing import Dict, List, Optional
+from xml.sax.saxutils import escape
+
+from src.config import PROFILE_SAMPLE_INTERVAL_SECONDS
+from src.hardware.rpc import hardware_singleton
+
+# Innermost frames of a thread that is waiting, not working: dropped unless idle=True
+IDLE_FRAMES = {
+    ("selectors.py", "select"),
+    ("threading.py", "wait"),
+    ("threading.py", "_wait_for_tstate_lock"),
+    ("queue.py", "get"),
+}
+# Frames shown per task in /debug/tasks
+TASK_STACK_LIMIT = 30
+
+# --- Task ages ---
+# asyncio doesn't record when a task was created; a task factory does.
+
+_task_created: "weakref.WeakKeyDictionary[asyncio.Task, float]" = weakref.WeakKeyDictionary()
+
+def _task_factory(loop, coro, **kwargs):
+    task = asyncio.Task(coro, loop=loop, **kwargs)
+    _task_created[task] = time.monotonic()
+    return task
+
+def install_task_clock(loop: Optional[asyncio.AbstractEventLoop] = None):
+    """Records the creation time of every task started on the loop from now on."""
+    (loop or asyncio.get_running_loop()).set_task_factory(_task_factory)
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    path = code.co_filename
+    # src/... for our code, the module file name for the standard library and packages
+    marker = f"{os.sep}src{os.sep}"
+    path = "src" + os.sep + path.split(marker, 1)[1] if marker in path else os.path.basename(path)
+    return f"{getattr(code, 'co_qualname', code.co_name)} ({path}:{code.co_firstlineno})"
+
+def _await_chain(coro) -> list:
+    """Frames of a task's coroutine and everything it is awaiting, outermost first."""
+    frames = []
+    while coro is not None:
+        frame = getattr(coro, "cr_frame", None) or getattr(coro, "gi_frame", None) or getattr(coro, "ag_frame", None)
+        if frame is None:
+            break
+        frames.append(frame)
+        coro = getattr(coro, "cr_await", None) or getattr(coro, "gi_yieldfrom", None) or getattr(coro, "ag_await", None)
+    return frames
+
+class ProcessProfiler:
+    """
+    On-demand view of what this process is doing.
+
+    profile() samples the stack of every thread (the event loop's included)
+    from a separate thread, so nothing is instrumented and nothing is slowed
+    down while no profile is running. Samples are aggregated into collapsed
+    stacks ("thread;outer;...;inner" -> count), the input format of the
+    usual flamegraph tools. One profile runs at a time.
+
+    tasks() lists the asyncio tasks of the process with the chain of
+    coroutines each one is suspended in.
+    """
+
+    def __init__(self):
+        self._busy = threading.Lock()
+
+    def _collect(self, seconds: float, interval: float, idle: bool) -> dict:
+        me = threading.get_ident()
+        stacks: Counter = Counter()
+        samples = 0
+        started = time.monotonic()
+        next_at = started
+        while True:
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                code = frame.f_code
+                if not idle and (os.path.basename(code.co_filename), code.co_name) in IDLE_FRAMES:
+                    continue
+                labels = []
+                while frame is not None:
+                    labels.append(_frame_label(frame))
+                    frame = frame.f_back
+                labels.append(names.get(ident, f"thread-{ident}"))
+                stacks[";".join(reversed(labels))] += 1
+            samples += 1
+            # Fixed cadence, like the sensor sampler
+            next_at += interval
+            remaining = next_at - time.monotonic()
+            if next_at - started >= seconds:
+                break
+            if remaining > 0:
+                time.sleep(remaining)
+        return {
+            "pid": os.getpid(),
+            "seconds": round(time.monotonic() - started, 3),
+            "interval": interval,
+            "samples": samples,
+            "stacks": dict(stacks.most_common()),
+        }
+
+    async def profile(self, seconds: float, interval: float = PROFILE_SAMPLE_INTERVAL_SECONDS, idle: bool = False) -> dict:
+        """Samples every thread for `seconds`; waiting threads are left out unless `idle`."""
+        if not self._busy.acquire(blocking=False):
+            raise RuntimeError("A profile is already running.")
+        try:
+            return await asyncio.to_thread(self._collect, seconds, interval, idle)
+        finally:
+            self._busy.release()
+
+    async def tasks(self) -> List[dict]:
+        """Every pending task of the running loop, oldest first (tasks of unknown age last)."""
+        now = time.monotonic()
+        current = asyncio.current_task()
+        result = []
+        for task in asyncio.all_tasks():
+            if task is current:
+                continue
+            created = _task_created.get(task)
+            coro = task.get_coro()
+            frames = _await_chain(coro)[:TASK_STACK_LIMIT]
+            result.append({
+                "name": task.get_name(),
+                "coroutine": getattr(coro, "__qualname__", repr(coro)),
+                "age_seconds": None if created is None else round(now - created, 1),
+                "cancelling": task.cancelling() > 0 if hasattr(task, "cancelling") else False,
+                "stack": [f"{_frame_label(frame)} line {frame.f_lineno}" for frame in frames],
+            })
+        result.sort(key=lambda task: (task["age_seconds"] is None, -(task["age_seconds"] or 0)))
+        return result
+
+# --- Flamegraph ---
+
+FLAME_WIDTH = 1200
+FLAME_ROW = 16
+FLAME_FONT = 11
+
+def _flame_color(name: str) -> str:
+    # Stable warm colours: the same function gets the same colour in every graph
+    h = int(hashlib.md5(name.encode()).hexdigest()[:4], 16)
+    return f"rgb({205 + h % 50},{90 + (h >> 6) % 120},{40 + (h >> 12) % 40})"
+
+def flamegraph_svg(stacks: Dict[str, int], title: str = "Flame Graph") -> str:
+    """Renders collapsed stacks as a standalone SVG flame graph (roots at the bottom)."""
+    # name -> [count, children]
+    root: list = [0, {}]
+    depth = 0
+    for stack, count in stacks.items():
+        node = root
+        node[0] += count
+        frames = stack.split(";")
+        depth = max(depth, len(frames))
+        for name in frames:
+            node = node[1].setdefault(name, [0, {}])
+            node[0] += count
+    total = root[0]
+    height = (depth + 3) * FLAME_ROW
+    rects = []
+
+    def draw(children: dict, x: float, level: int):
+        for name, (count, grandchildren) in sorted(children.items()):
+            width = count / total * FLAME_WIDTH
+            if width >= 0.5:
+                y = height - (level + 2) * FLAME_ROW
+                label = name if len(name) * FLAME_FONT * 0.6 < width - 4 else name[:max(0, int((width - 4) / (FLAME_FONT * 0.6)) - 2)] + ".."
+                tooltip = f"{name} ({count} samples, {count / total:.1%})"
+                rects.append(
+                    f'<g><title>{escape(tooltip)}</title>'
+                    f'<rect x="{x:.1f}" y="{y}" width="{width:.1f}" height="{FLAME_ROW - 1}" fill="{_flame_color(name)}" rx="2"/>'
+                    + (f'<text x="{x + 2:.1f}" y="{y + FLAME_ROW - 4}">{escape(label)}</text>' if width > 20 else "")
+                    + "</g>"
+                )
+                draw(grandchildren, x, level + 1)
+            x += width
+
+    if total:
+        draw(root[1], 0.0, 0)
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{FLAME_WIDTH}" height="{height}" '
+        f'viewBox="0 0 {FLAME_WIDTH} {height}" font-family="monospace" font-size="{FLAME_FONT}">'
+        f'<rect width="100%" height="100%" fill="#fdfdf6"/>'
+        f'<text x="{FLAME_WIDTH / 2}" y="{FLAME_ROW}" text-anchor="middle" font-size="{FLAME_FONT + 3}">'
+        f'{escape(title)} ({total} samples)</text>'
+        + "".join(rects)
+        + "</svg>"
+    )
+
+# This process (API worker), and the process that owns the hardware (the
+# daemon when there is one, else this process again)
+process_profiler = ProcessProfiler()
+hardware_profiler = hardware_singleton("hardware_profiler", ProcessProfiler)
@@ -0,0 +1,39 @@
+from typing import List, Optional
+from fastapi import APIRouter, Query, Request
+from fastapi.responses import StreamingResponse
+from src.models import Alert, AlertKind
+from src.logic.anomaly import anomaly_engine
+from src.hardware.rpc import offload
+from src.sse import event_stream, subscribe
+
+router = APIRouter(prefix="/alerts", tags=["Alerts"])
+
+@router.get("/", response_model=List[Alert])
+async def list_alerts(
+    since: Optional[float] = Query(None, description="Only alerts raised at or after this Unix time."),
+    kind: Optional[AlertKind] = Query(None),
+    metric: Optional[str] = Query(None, description="e.g. ph, tds_ppm, temperature_f, humidity_percent"),
+    limit: int = Query(100, ge=1, le=500)
+):
+    """
+    Anomalies detected in the sensor stream, most recent first.
+    Poll with `since` set to the last alert's timestamp to only get new ones.
+    """
+    return await offload(anomaly_engine.list_alerts, since=since, kind=kind, metric=metric, limit=limit)
+
+@router.get(
+    "/stream",
+    responses={200: {"content": {"text/event-stream": {}}}}
+)
+async def stream_alerts(
+    request: Request,
+    kind: Optional[AlertKind] = Query(None)
+):
+    """Server-Sent Events push of new alerts as they are raised (event name = alert kind)."""
+    queue, unsubscribe = subscribe(anomaly_engine)
+    stream = event_stream(
+        request, queue, unsubscribe,
+        event_name=lambda alert: alert["kind"],
+        accept=lambda alert: kind is None or alert["kind"] == kind.value
+    )
+    return StreamingResponse(stream, media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
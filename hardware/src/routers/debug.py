@@ -0,0 +1,59 @@
+import hmac
+from typing import List, Literal, Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from fastapi.responses import PlainTextResponse, Response
+from src.config import DEBUG_TOKEN, PROFILE_MAX_SECONDS, PROFILE_SAMPLE_INTERVAL_SECONDS
+from src.models import DebugTask
+from src.profiling import process_profiler, hardware_profiler, flamegraph_svg
+
+def require_debug_token(x_debug_token: Optional[str] = Header(None)):
+    if not DEBUG_TOKEN:
+        raise HTTPException(status_code=404, detail="Debug endpoints are disabled; set ZP_DEBUG_TOKEN to enable them.")
+    if x_debug_token is None or not hmac.compare_digest(x_debug_token, DEBUG_TOKEN):
+        raise HTTPException(status_code=403, detail="Missing or invalid X-Debug-Token.")
+
+router = APIRouter(prefix="/debug", tags=["Debug"], dependencies=[Depends(require_debug_token)])
+
+ProcessName = Literal["api", "hardware"]
+
+def _profiler(process: str):
+    # "hardware" is the daemon when there is one, else this process
+    return hardware_profiler if process == "hardware" else process_profiler
+
+@router.get(
+    "/profile",
+    responses={200: {"content": {"text/plain": {}, "image/svg+xml": {}}}}
+)
+async def profile(
+    seconds: float = Query(30, gt=0, le=PROFILE_MAX_SECONDS),
+    format: Literal["collapsed", "svg"] = Query("collapsed", description="Collapsed stacks (flamegraph.pl / speedscope input) or a rendered flame graph."),
+    process: ProcessName = Query("api", description="This API worker, or the process that owns the hardware."),
+    interval: float = Query(PROFILE_SAMPLE_INTERVAL_SECONDS, ge=0.001, le=1.0, description="Seconds between samples."),
+    idle: bool = Query(False, description="Include threads that are only waiting (idle event loop, blocked queues).")
+):
+    """
+    Samples the stack of every thread of a live process for `seconds` and
+    returns where it spent them: the event loop (coroutines, HTML rendering,
+    serialization) and every worker thread (camera, pH reads, ffmpeg
+    waits). The process keeps serving while it is profiled; one profile per
+    process runs at a time.
+    """
+    try:
+        result = await _profiler(process).profile(seconds, interval, idle)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    if format == "svg":
+        title = f"{process} (pid {result['pid']}), {result['seconds']}s at {interval}s"
+        return Response(flamegraph_svg(result["stacks"], title), media_type="image/svg+xml")
+    body = "".join(f"{stack} {count}\n" for stack, count in result["stacks"].items())
+    return PlainTextResponse(body)
+
+@router.get("/tasks", response_model=List[DebugTask])
+async def tasks(process: ProcessName = Query("api", description="This API worker, or the process that owns the hardware.")):
+    """
+    Every pending asyncio task with its age and the coroutines it is
+    suspended in: jobs (job:<id>), scheduled rules, the scheduler, sampler
+    and overflow monitor (in the process that owns the hardware), and
+    request handlers.
+    """
+    return await _profiler(process).tasks()
@@ -0,0 +1,44 @@
+import time
+from typing import Literal, Optional
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from src.logic.export import TABLES, FORMATS, arrow_available, encode_table, export_zip, filename
+
+router = APIRouter(tags=["Export"])
+
+@router.get(
+    "/export",
+    responses={200: {"content": {media_type: {} for media_type in [*FORMATS.values(), "application/zip"]}}}
+)
+def export_history(
+    start: float = Query(0, alias="from", description="Unix time of the first row (default: everything)."),
+    end: Optional[float] = Query(None, alias="to", description="Unix time of the last row (default: now)."),
+    tables: str = Query("sensors", description=f"Comma-separated: {', '.join(TABLES)}."),
+    format: Literal["csv.gz", "arrow", "parquet"] = Query("csv.gz", description="arrow/parquet need pyarrow installed."),
+    offset: int = Query(0, ge=0, description="Skip this many rows (single table only): resumes an interrupted download.")
+):
+    """
+    Streams sensor samples, finished jobs and timelapse frame features for
+    offline analysis, in chunks of EXPORT_CHUNK_ROWS rows (gzip members,
+    Arrow record batches or Parquet row groups), so any range is exported in
+    constant memory. Rows are in a stable order: a client that lost the
+    connection can ask again with `offset` set to the rows it already has.
+    Several tables come as a ZIP with one member per table.
+    """
+    names = [name.strip() for name in tables.split(",") if name.strip()]
+    unknown = [name for name in names if name not in TABLES]
+    if not names or unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown tables: {', '.join(unknown) or '(none)'}; choose from {', '.join(TABLES)}.")
+    if offset and len(names) > 1:
+        raise HTTPException(status_code=400, detail="offset can only be used when exporting a single table.")
+    if format != "csv.gz" and not arrow_available():
+        raise HTTPException(status_code=501, detail=f"{format} export needs pyarrow; install it or use format=csv.gz.")
+    end = time.time() if end is None else end
+
+    if len(names) == 1:
+        body = encode_table(names[0], format, start, end, offset)
+        media_type, name = FORMATS[format], filename(names[0], format)
+    else:
+        body = export_zip(names, format, start, end)
+        media_type, name = "application/zip", f"export.{format}.zip"
+    return StreamingResponse(body, media_type=media_type, headers={"Content-Disposition": f'attachment; filename="{name}"'})
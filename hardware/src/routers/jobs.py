@@ -1,30 +1,72 @@
-from fastapi import APIRouter, HTTPException, Path
+from typing import Optional
+from fastapi import APIRouter, Header, HTTPException, Path, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from src.models import (
     JobRequest, JobStatus
 )
-from src.logic.jobs import job_manager
+from src.logic.jobs import job_manager, IdempotencyConflict
+from src.hardware.rpc import offload
+from src.sse import event_stream, subscribe
 
 router = APIRouter(prefix="/jobs", tags=["Jobs"])
 
 @router.post("/", response_model=JobStatus, status_code=201)
-async def submit_job(request: JobRequest):
+async def submit_job(
+    request: JobRequest,
+    response: Response,
+    idempotency_key: Optional[str] = Header(None, max_length=255, description="Retries with the same key return the original job.")
+):
     """
     Submit a new background job.
-    Returns the initial job status (queued).
+    Returns the initial job status (queued) with 201.
+
+    Returns 200 with the existing job instead of starting a new one when the
+    Idempotency-Key was already used, an identical job is still pending, or an
+    identical job completed within `max_age` seconds.
     """
     try:
-        job_id = job_manager.submit_job(request)
-        job = job_manager.get_job(job_id)
-        return job
+        job_id, created = await offload(job_manager.submit, request, idempotency_key=idempotency_key)
+    except IdempotencyConflict as e:
+        raise HTTPException(status_code=409, detail=str(e))
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
+    if not created:
+        response.status_code = 200
+    return await offload(job_manager.get_job, job_id)
+
+@router.get(
+    "/events",
+    responses={200: {"content": {"text/event-stream": {}}}}
+)
+async def job_events(
+    request: Request,
+    job_id: Optional[str] = Query(None, description="Only stream events for this job.")
+):
+    """
+    Server-Sent Events stream of job status changes and step-level progress
+    (e.g. "emptying", "dosing flora_gro", "mixing 120/180 s", "verifying TDS").
+    """
+    queue, unsubscribe = subscribe(job_manager)
+    stream = event_stream(
+        request, queue, unsubscribe,
+        event_name=lambda event: event["event"],
+        accept=lambda event: job_id is None or event["job_id"] == job_id
+    )
+    return StreamingResponse(stream, media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
 
 @router.get("/{job_id}", response_model=JobStatus)
-async def get_job_status(job_id: str = Path(..., description="The ID of the job to retrieve")):
+async def get_job_status(
+    job_id: str = Path(..., description="The ID of the job to retrieve"),
+    wait: float = Query(0, ge=0, le=120, description="Long-poll: wait up to this many seconds for the job's status to change.")
+):
     """
     Get the status of a specific job.
+    With `wait`, the request is held until the status changes (or the wait expires).
     """
-    job = job_manager.get_job(job_id)
+    if wait > 0:
+        job = await job_manager.wait_for_change(job_id, wait)
+    else:
+        job = await offload(job_manager.get_job, job_id)
     if not job:
         raise HTTPException(status_code=404, detail="Job not found")
     return job
@@ -34,6 +76,6 @@ async def cancel_job(job_id: str):
     """
     Cancel a running or queued job.
     """
-    job_manager.cancel_job(job_id)
+    await offload(job_manager.cancel_job, job_id)
     # We return 204 regardless of whether it was running or not, standard idempotency
     return
@@ -0,0 +1,45 @@
+from typing import List
+from fastapi import APIRouter, HTTPException, Path
+from src.models import ScheduleRequest, ScheduleRule
+from src.logic.scheduler import scheduler
+from src.hardware.rpc import offload
+
+router = APIRouter(prefix="/schedules", tags=["Schedules"])
+
+@router.get("/", response_model=List[ScheduleRule])
+async def list_schedules():
+    """
+    List all schedule rules with their last and next run times.
+    """
+    return await offload(scheduler.list_rules)
+
+@router.post("/", response_model=ScheduleRule, status_code=201)
+async def create_schedule(request: ScheduleRequest):
+    """
+    Create a schedule rule.
+    - cron: runs an action (job, ac_relay, timelapse) on a cron expression.
+    - photoperiod: keeps the grow light on for `on_hours` starting at `lights_on` every day.
+    """
+    try:
+        return await offload(scheduler.add_rule, request)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/{rule_id}", response_model=ScheduleRule)
+async def get_schedule(rule_id: str = Path(..., description="The ID of the rule to retrieve")):
+    """
+    Get a specific schedule rule.
+    """
+    rule = await offload(scheduler.get_rule, rule_id)
+    if not rule:
+        raise HTTPException(status_code=404, detail="Schedule not found")
+    return rule
+
+@router.delete("/{rule_id}", status_code=204)
+async def delete_schedule(rule_id: str):
+    """
+    Delete a schedule rule.
+    """
+    if not await offload(scheduler.remove_rule, rule_id):
+        raise HTTPException(status_code=404, detail="Schedule not found")
+    return
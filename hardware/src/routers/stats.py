@@ -0,0 +1,19 @@
+from typing import Literal, Optional
+from fastapi import APIRouter, Query
+from src.models import ActuatorStats
+from src.actuators.journal import actuator_journal
+
+router = APIRouter(prefix="/stats", tags=["Stats"])
+
+@router.get("/actuators", response_model=ActuatorStats)
+def actuator_stats(
+    period: Literal["hour", "day"] = Query("hour"),
+    since: Optional[float] = Query(None, description="Only periods ending after this Unix time (default: the last 24 hours, or 30 days by day).")
+):
+    """
+    Duty cycle of every pump and the AC relay: time ON, activations and mL
+    dispensed per hour or per day, plus lifetime totals. Runs in progress are
+    included up to now. Hourly buckets are kept for a week, daily ones for
+    about a year.
+    """
+    return actuator_journal.duty_cycle(period, since)
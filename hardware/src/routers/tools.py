@@ -1,12 +1,12 @@
-from fastapi import APIRouter, Body, HTTPException, Query
+import asyncio
+from fastapi import APIRouter, Body, HTTPException, Query, Request
 from src.models import FeedRequest, FeedResponse, FlushResponse
-from src.logic.feed import execute_feed_cycle, execute_dose
-from src.logic.flush import execute_system_flush
-from src.logic.diagnose import execute_diagnostic_check
+from src.logic.routines import control_routines
 from src.models import (
     FeedRequest, FeedResponse, FlushResponse, DiagnosticResponse, DoseRequest, DoseResponse
 )
 from src.state import system_lock # Import lock from main to ensure exclusivity
+from src.admission import admit, admission_queues
 
 router = APIRouter(prefix="/tools", tags=["Tools"])
 
@@ -25,7 +25,7 @@ async def smart_feed_cycle(request: FeedRequest = Body(...)):
         raise HTTPException(status_code=409, detail="System is busy with another operation.")
         
     async with system_lock:
-        return await execute_feed_cycle(request.recipe, request.amounts_ml)
+        return await control_routines.feed_cycle(request.recipe, request.amounts_ml)
 
 @router.post("/dose", response_model=DoseResponse)
 async def smart_dose(request: DoseRequest = Body(...)):
@@ -39,7 +39,7 @@ async def smart_dose(request: DoseRequest = Body(...)):
         raise HTTPException(status_code=409, detail="System is busy with another operation.")
 
     async with system_lock:
-        return await execute_dose(request.nutrient, request.amount_ml, request.mix_seconds)
+        return await control_routines.dose(request.nutrient, request.amount_ml, request.mix_seconds)
 
 @router.post("/flush", response_model=FlushResponse)
 async def true_system_flush(
@@ -57,18 +57,30 @@ async def true_system_flush(
         raise HTTPException(status_code=409, detail="System is busy with another operation.")
 
     async with system_lock:
-        return await execute_system_flush(soak_duration)
+        return await control_routines.system_flush(soak_duration)
 
 @router.post("/diagnose", response_model=DiagnosticResponse)
-async def diagnostic_self_check():
+async def diagnostic_self_check(request: Request):
     """
     Performs a daily health check for the hardware.
     1. Checks Sensor bounds (pH, TDS, Environment).
     2. Runs a pump briefly and verifies operation via Microphone analysis.
     3. Returns a structured health report.
-    """
-    if system_lock.locked():
-        raise HTTPException(status_code=409, detail="System is busy with another operation.")
 
-    async with system_lock:
-        return await execute_diagnostic_check()
+    Unlike feeds and flushes, a check requested while the system is busy is
+    queued (bounded, see /hardware/admission) rather than refused: it runs
+    once the current operation finishes, or gets 503 with Retry-After.
+    """
+    async with admit("diagnose", request):
+        queue = admission_queues["diagnose"]
+        try:
+            await asyncio.wait_for(system_lock.acquire(), timeout=queue.deadline)
+        except asyncio.TimeoutError:
+            raise HTTPException(
+                status_code=503, detail="System is busy with another operation.",
+                headers={"Retry-After": str(queue.retry_after())}
+            )
+        try:
+            return await control_routines.diagnostic_check()
+        finally:
+            system_lock.release()
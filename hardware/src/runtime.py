@@ -0,0 +1,66 @@
+import asyncio
+from typing import Optional
+
+from src.actuators.pumps import pump_controller
+from src.actuators.ac_relay import ac_relay
+from src.actuators.journal import actuator_journal
+from src.actuators.watchdog import pump_watchdog
+from src.sensors.dht import dht_sensor
+from src.sensors.float_switches import water_level
+from src.hardware.trace import trace_recorder
+from src.logic.common import monitor_overflow_task
+from src.logic.scheduler import scheduler
+from src.logic.sampler import sensor_sampler
+from src.logic.anomaly import anomaly_engine
+from src.logic.telemetry import telemetry_ring
+from src.logic.acoustic import acoustic_monitor
+from src.logic.camera_stream import camera_stream
+from src.config import ACOUSTIC_MONITOR_ENABLED, TRACE_ENABLED
+
+# Strong reference to the overflow monitor (the loop only keeps weak ones)
+_overflow_task: Optional[asyncio.Task] = None
+
+def all_actuators_off():
+    pump_controller.all_off()
+    ac_relay.turn_off()
+
+async def start_services():
+    """
+    Background services that drive the hardware. They run in the one process
+    that owns it: the API in local mode, the hardware daemon otherwise.
+    """
+    global _overflow_task
+    # Inputs and commands are traced for offline replay (src/logic/replay.py),
+    # starting with the float switches' current state
+    if TRACE_ENABLED:
+        trace_recorder.start()
+        water_level.trace_state()
+    # Anything a crashed or killed process left ON is forced OFF and reported
+    actuator_journal.reconcile(safe_state=all_actuators_off)
+    # The DHT11 is slow and flaky: a dedicated thread reads it, endpoints serve the cache
+    dht_sensor.start()
+    _overflow_task = asyncio.create_task(monitor_overflow_task(), name="overflow-monitor")
+    # Light cycles, routine jobs and timelapse captures
+    await scheduler.start()
+    # Periodic sensor samples -> history files, anomaly alerts and the shared telemetry ring
+    sensor_sampler.add_consumer(anomaly_engine.process)
+    sensor_sampler.add_consumer(telemetry_ring.publish)
+    sensor_sampler.start()
+    # Listens for silent pumps and unexpected noise between diagnostics
+    if ACOUSTIC_MONITOR_ENABLED:
+        acoustic_monitor.start()
+
+async def stop_services():
+    global _overflow_task
+    acoustic_monitor.stop()
+    camera_stream.stop()
+    await sensor_sampler.stop()
+    await scheduler.stop()
+    if _overflow_task is not None:
+        _overflow_task.cancel()
+        _overflow_task = None
+    dht_sensor.stop()
+    telemetry_ring.close()
+    pump_watchdog.stop()
+    actuator_journal.close()
+    trace_recorder.stop()
@@ -1,11 +1,23 @@
 import subprocess
 import os
+from src.hardware.rpc import hardware_singleton
+from src.hardware.claim import DeviceClaim
 
 class CameraManager:
     def __init__(self, output_dir="captures"):
         self.output_dir = output_dir
         if not os.path.exists(self.output_dir):
             os.makedirs(self.output_dir)
+        # Only one rpicam process can hold the camera: a live stream pauses for stills
+        self.device = DeviceClaim()
+
+    def claim(self) -> DeviceClaim:
+        """Exclusive use of the camera."""
+        return self.device
+
+    @property
+    def contended(self) -> bool:
+        return self.device.contended
 
     def capture_image(self, filename="latest.jpg", **kwargs):
         """
@@ -53,9 +65,10 @@ class CameraManager:
 
         try:
             # Using rpicam-still for Raspberry Pi 5 compatibility (Bookworm+)
-            subprocess.run(cmd, check=True)
+            with self.claim():
+                subprocess.run(cmd, check=True)
             return path
         except subprocess.CalledProcessError as e:
             return f"Error capturing image: {e}"
 
-camera = CameraManager()
+camera = hardware_singleton("camera", CameraManager)
@@ -1,6 +1,14 @@
 import adafruit_dht
 import board
-from src.config import DHT11_GPIO
+import logging
+import threading
+import time
+from typing import Optional
+from src.config import DHT11_GPIO, DHT_READ_INTERVAL, DHT_MAX_BACKOFF, DHT_STALE_AFTER
+from src.hardware.rpc import hardware_singleton
+from src.hardware.trace import trace_recorder
+
+logger = logging.getLogger("dht")
 
 class DHTSensor:
     def __init__(self):
@@ -17,9 +25,21 @@ class DHTSensor:
         # Initialize the DHT11 device
         self.dht_device = adafruit_dht.DHT11(self.pin)
 
-    def read(self):
+        # Last good reading, shared between the reader thread and callers
+        self._lock = threading.Lock()
+        self._device_lock = threading.Lock()
+        self._last_good: Optional[dict] = None
+        self._last_good_at: Optional[float] = None
+        self._last_attempt_at: Optional[float] = None
+        self._last_error: Optional[str] = None
+        self.consecutive_failures = 0
+
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def _read_device(self):
         """
-        Returns a dictionary with temperature (C) and humidity (%).
+        Reads the sensor once and returns temperature (F) and humidity (%).
         DHT sensors can be flaky, so we handle errors gracefully.
         """
         try:
@@ -42,7 +62,80 @@ class DHTSensor:
         except Exception as error:
             return {"error": f"Critical DHT error: {error}"}
 
+    def poll(self) -> float:
+        """
+        Performs one device read, updates the cache and returns the delay
+        before the next read (backs off after consecutive failures).
+        """
+        with self._device_lock:
+            result = self._read_device()
+            now = time.monotonic()
+        with self._lock:
+            self._last_attempt_at = now
+            if "error" in result:
+                self.consecutive_failures += 1
+                self._last_error = result["error"]
+                # First retry at the normal rate (checksum errors are usually transient)
+                return min(DHT_READ_INTERVAL * 2 ** (self.consecutive_failures - 1), DHT_MAX_BACKOFF)
+            self.consecutive_failures = 0
+            self._last_good = result
+            self._last_good_at = now
+        trace_recorder.dht(result)
+        return DHT_READ_INTERVAL
+
+    def _run(self):
+        logger.info("DHT reader started.")
+        delay = 0.0
+        while not self._stop.wait(delay):
+            try:
+                delay = self.poll()
+            except Exception as e:
+                logger.error(f"DHT reader error: {e}")
+                delay = DHT_MAX_BACKOFF
+        logger.info("DHT reader stopped.")
+
+    @property
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """Starts the background reader that owns the device."""
+        if self.is_running:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="dht-reader", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def read(self):
+        """
+        Returns the last good reading with its age and a quality flag.
+        Never waits on the sensor while the reader thread is running; without it
+        (scripts, tests) the device is read directly, at most once per interval.
+        """
+        if not self.is_running:
+            with self._lock:
+                last_attempt = self._last_attempt_at
+            if last_attempt is None or time.monotonic() - last_attempt >= DHT_READ_INTERVAL:
+                self.poll()
+
+        with self._lock:
+            if self._last_good is None:
+                return {"error": self._last_error or "No reading yet"}
+            age = time.monotonic() - self._last_good_at
+            return {
+                **self._last_good,
+                "age_seconds": round(age, 1),
+                "quality": "good" if age <= DHT_STALE_AFTER else "stale"
+            }
+
     def cleanup(self):
+        self.stop()
         self.dht_device.exit()
 
-dht_sensor = DHTSensor()
+dht_sensor = hardware_singleton("dht_sensor", DHTSensor)
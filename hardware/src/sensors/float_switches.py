@@ -1,5 +1,7 @@
 from gpiozero import Button
 from src.config import FLOAT_SWITCH_FULL_GPIO, FLOAT_SWITCH_EMPTY_GPIO
+from src.hardware.rpc import hardware_singleton
+from src.hardware.trace import trace_recorder
 
 class WaterLevelSensors:
     def __init__(self):
@@ -7,6 +9,13 @@ class WaterLevelSensors:
         # The switch should connect the pin to GND when triggered.
         self.full_switch = Button(FLOAT_SWITCH_FULL_GPIO, pull_up=True)
         self.empty_switch = Button(FLOAT_SWITCH_EMPTY_GPIO, pull_up=True)
+        # Every edge of either switch goes to the trace (runs on gpiozero's thread)
+        for switch in (self.full_switch, self.empty_switch):
+            switch.when_pressed = self.trace_state
+            switch.when_released = self.trace_state
+
+    def trace_state(self):
+        trace_recorder.level(self.is_full, self.is_empty)
 
     @property
     def is_full(self) -> bool:
@@ -25,4 +34,4 @@ class WaterLevelSensors:
             "empty": self.is_empty
         }
 
-water_level = WaterLevelSensors()
+water_level = hardware_singleton("water_level", WaterLevelSensors)
@@ -1,6 +1,8 @@
 import wave
 import pyaudio
 import os
+from src.hardware.rpc import hardware_singleton
+from src.hardware.claim import DeviceClaim
 
 class MicrophoneManager:
     def __init__(self):
@@ -9,26 +11,42 @@ class MicrophoneManager:
         self.rate = 44100
         self.chunk = 1024
 
-    def record_clip(self, duration=5, filename="clip.wav"):
-        """
-        Records a short audio clip from the USB Microphone.
-        """
+        # The USB microphone can only be opened once: the background acoustic
+        # monitor hands it over whenever an on-demand recording is waiting
+        self.device = DeviceClaim()
+
+    def claim(self) -> DeviceClaim:
+        """Exclusive use of the microphone device."""
+        return self.device
+
+    @property
+    def contended(self) -> bool:
+        return self.device.contended
+
+    def open_input(self):
+        """Opens a 16-bit mono input stream. Returns (audio, stream); the caller closes both."""
         audio = pyaudio.PyAudio()
-        
-        # Open stream
         stream = audio.open(format=self.format, channels=self.channels,
                             rate=self.rate, input=True,
                             frames_per_buffer=self.chunk)
-        
-        frames = []
-        for _ in range(0, int(self.rate / self.chunk * duration)):
-            data = stream.read(self.chunk, exception_on_overflow=False)
-            frames.append(data)
-        
-        # Stop and close the stream
-        stream.stop_stream()
-        stream.close()
-        audio.terminate()
+        return audio, stream
+
+    def record_clip(self, duration=5, filename="clip.wav"):
+        """
+        Records a short audio clip from the USB Microphone.
+        """
+        with self.claim():
+            audio, stream = self.open_input()
+
+            frames = []
+            for _ in range(0, int(self.rate / self.chunk * duration)):
+                data = stream.read(self.chunk, exception_on_overflow=False)
+                frames.append(data)
+
+            # Stop and close the stream
+            stream.stop_stream()
+            stream.close()
+            audio.terminate()
         
         # Save to file
         with wave.open(filename, 'wb') as wf:
@@ -39,4 +57,4 @@ class MicrophoneManager:
             
         return filename
 
-microphone = MicrophoneManager()
+microphone = hardware_singleton("microphone", MicrophoneManager)
@@ -1,4 +1,6 @@
 from src.hardware.adc import adc_device
+from src.hardware.flight import SingleFlight
+from src.hardware.rpc import hardware_singleton
 
 class PHSensor:
     def __init__(self, channel=1):
@@ -10,8 +12,14 @@ class PHSensor:
         # m (slope) is typically negative for pH sensors (-59.16mV/pH at 25C).
         # We start with generic values that can be tuned.
         self.calibration_value = 0.0  # Offset adjustment
-        
+        # Concurrent readers share one 20-sample acquisition
+        self._flight = SingleFlight()
+
     def read_voltage(self):
+        """Filtered probe voltage; callers arriving during an acquisition share its result."""
+        return self._flight.do(self.channel, self._sample_voltage)
+
+    def _sample_voltage(self):
         """
         Reads the voltage with noise filtering.
         Takes 20 samples, sorts them, removes top/bottom outliers, 
@@ -43,13 +51,19 @@ class PHSensor:
         voltage = (avg_raw / 1023.0) * self.v_ref
         return round(voltage, 3)
 
+    def read(self, temperature=25):
+        """pH and the voltage it was calculated from, from a single acquisition."""
+        voltage = self.read_voltage()
+        return {"ph": self.ph_from_voltage(voltage, temperature), "voltage": voltage}
+
     def get_ph(self, temperature=25):
+        return self.read(temperature)["ph"]
+
+    def ph_from_voltage(self, voltage, temperature=25):
         """
         Calculate pH value based on calibrated hardware.
         Neutral (pH 7.0) = 2.5V
         """
-        voltage = self.read_voltage()
-        
         # Calibration Constants
         # Calibrated 2026-01-17 using 3-point buffer solution:
         # 9.18 pH @ 1.278V | 6.86 pH @ 1.678V | 4.01 pH @ 2.171V
@@ -63,4 +77,4 @@ class PHSensor:
         
         return max(0.0, min(14.0, round(ph_value, 2)))
 
-ph_sensor = PHSensor(channel=1)
+ph_sensor = hardware_singleton("ph_sensor", PHSensor, channel=1)
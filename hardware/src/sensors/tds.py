@@ -1,23 +1,36 @@
 from src.hardware.adc import adc_device
+from src.hardware.flight import SingleFlight
+from src.hardware.rpc import hardware_singleton
 
 class TDSSensor:
     def __init__(self, channel=0):
         self.channel = channel
         self.v_ref = 3.3  # System voltage (usually 3.3V or 5V depending on ADC VREF)
+        # Concurrent readers share one ADC conversion
+        self._flight = SingleFlight()
 
     def read_voltage(self):
+        return self._flight.do(self.channel, self._sample_voltage)
+
+    def _sample_voltage(self):
         raw = adc_device.read(self.channel)
         voltage = (raw / 1023.0) * self.v_ref
         return voltage
 
+    def read(self, temperature=25):
+        """TDS and the voltage it was calculated from, from a single conversion."""
+        voltage = self.read_voltage()
+        return {"ppm": self.ppm_from_voltage(voltage, temperature), "voltage": voltage}
+
     def get_tds_ppm(self, temperature=25):
+        return self.read(temperature)["ppm"]
+
+    def ppm_from_voltage(self, voltage, temperature=25):
         """
         Calculate TDS in PPM (Parts Per Million).
         Includes basic temperature compensation.
         Formula based on standard analog TDS sensors.
         """
-        voltage = self.read_voltage()
-        
         # Temperature Compensation Coefficient
         compensation_coefficient = 1.0 + 0.02 * (temperature - 25.0)
         compensation_voltage = voltage / compensation_coefficient
@@ -30,4 +43,4 @@ class TDSSensor:
         return max(0, round(tds_value, 2))
 
 # Assuming TDS is connected to ADC Channel 0
-tds_sensor = TDSSensor(channel=0)
+tds_sensor = hardware_singleton("tds_sensor", TDSSensor, channel=0)
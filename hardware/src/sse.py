@@ -0,0 +1,123 @@
+import asyncio
+import json
+import logging
+import threading
+from collections import deque
+from typing import Any, AsyncIterator, Callable, Deque, Optional, Tuple
+
+from fastapi import Request
+
+from src.hardware.rpc import RemoteProxy
+
+logger = logging.getLogger("sse")
+
+# Comment line sent on idle streams so proxies don't close them
+KEEPALIVE_SECONDS = 15
+# Events kept for subscribers in other processes, and buffered per relayed subscriber
+EVENT_LOG_SIZE = 100
+# Pause before polling a publisher again after the hardware daemon went away
+RELAY_RETRY_SECONDS = 2
+
+class EventLog:
+    """
+    A publisher's last events, numbered, for subscribers in other processes
+    (API workers in front of the hardware daemon): they poll read() with the
+    number of the last event they have seen. append() may be called from any
+    thread.
+    """
+
+    def __init__(self, size: int = EVENT_LOG_SIZE):
+        self._events: Deque[Tuple[int, dict]] = deque(maxlen=size)
+        self._next = 0
+        self._lock = threading.Lock()
+        # (event, loop) of the readers currently waiting for something new
+        self._waiter: Optional[Tuple[asyncio.Event, asyncio.AbstractEventLoop]] = None
+
+    def append(self, payload: dict):
+        with self._lock:
+            self._events.append((self._next, payload))
+            self._next += 1
+            waiter, self._waiter = self._waiter, None
+        if waiter is not None:
+            event, loop = waiter
+            loop.call_soon_threadsafe(event.set)
+
+    async def read(self, after: Optional[int] = None, timeout: float = 0) -> dict:
+        """
+        {"cursor", "events"}: the events numbered above `after`, waiting up to
+        `timeout` seconds for one. Without `after` (or with one from before a
+        restart), only the cursor to start from.
+        """
+        with self._lock:
+            if after is not None and after >= self._next:
+                after = None
+            if after is not None and after + 1 >= self._next and timeout > 0:
+                if self._waiter is None:
+                    self._waiter = (asyncio.Event(), asyncio.get_running_loop())
+                waiter = self._waiter[0]
+            else:
+                waiter = None
+        if waiter is not None:
+            try:
+                await asyncio.wait_for(waiter.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        with self._lock:
+            events = [] if after is None else [payload for n, payload in self._events if n > after]
+            return {"cursor": self._next - 1, "events": events}
+
+async def _relay(source: Any, queue: asyncio.Queue):
+    cursor = None
+    while True:
+        try:
+            batch = await source.read_events(cursor, KEEPALIVE_SECONDS)
+        except (ConnectionError, TimeoutError) as e:
+            logger.warning(f"Event relay from {source!r} interrupted: {e}")
+            await asyncio.sleep(RELAY_RETRY_SECONDS)
+            continue
+        cursor = batch["cursor"]
+        for payload in batch["events"]:
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(payload)
+
+def subscribe(source: Any) -> Tuple[asyncio.Queue, Callable[[asyncio.Queue], None]]:
+    """
+    A subscriber queue on `source` (job manager, anomaly engine) and the call
+    that ends the subscription. When the source lives in the hardware daemon,
+    its events are polled over RPC and relayed into a local queue.
+    """
+    if not isinstance(source, RemoteProxy):
+        return source.subscribe(), source.unsubscribe
+    queue: asyncio.Queue = asyncio.Queue(maxsize=EVENT_LOG_SIZE)
+    task = asyncio.create_task(_relay(source, queue), name="sse-relay")
+    return queue, lambda _: task.cancel()
+
+def format_sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+async def event_stream(
+    request: Request,
+    queue: asyncio.Queue,
+    unsubscribe: Callable[[asyncio.Queue], None],
+    event_name: Callable[[dict], str],
+    accept: Optional[Callable[[dict], bool]] = None
+) -> AsyncIterator[str]:
+    """
+    Relays payloads from a subscriber queue as Server-Sent Events until the
+    client disconnects, then unsubscribes the queue.
+    """
+    try:
+        while True:
+            if await request.is_disconnected():
+                break
+            try:
+                payload = await asyncio.wait_for(queue.get(), timeout=KEEPALIVE_SECONDS)
+            except asyncio.TimeoutError:
+                yield ": keepalive\n\n"
+                continue
+            if accept is not None and not accept(payload):
+                continue
+            yield format_sse(event_name(payload), payload)
+    finally:
+        unsubscribe(queue)
@@ -1,4 +1,73 @@
 import asyncio
+import fcntl
+import os
+from typing import Optional
 
-# Global lock for hardware exclusivity
-system_lock = asyncio.Lock()
+from src.config import HARDWARE_MODE, SYSTEM_LOCK_FILE
+
+# How often a waiter retries the cross-process lock
+LOCK_POLL_SECONDS = 0.05
+
+class SystemLock:
+    """
+    asyncio.Lock-compatible hardware lock.
+
+    With a hardware daemon and several API workers, each process would have
+    its own asyncio.Lock, so the lock also takes an flock() on a shared file.
+    The flock is polled rather than waited on in a thread, so a cancelled
+    waiter can never acquire it after giving up.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self._lock = asyncio.Lock()
+        self._fd: Optional[int] = None
+
+    def _file(self) -> int:
+        if self._fd is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o666)
+        return self._fd
+
+    def _try_flock(self) -> bool:
+        try:
+            fcntl.flock(self._file(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return True
+        except BlockingIOError:
+            return False
+
+    def locked(self) -> bool:
+        if self._lock.locked():
+            return True
+        if self.path is None:
+            return False
+        if not self._try_flock():
+            return True
+        fcntl.flock(self._fd, fcntl.LOCK_UN)
+        return False
+
+    async def acquire(self) -> bool:
+        await self._lock.acquire()
+        if self.path is None:
+            return True
+        try:
+            while not self._try_flock():
+                await asyncio.sleep(LOCK_POLL_SECONDS)
+        except BaseException:
+            self._lock.release()
+            raise
+        return True
+
+    def release(self):
+        if self.path is not None and self._fd is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+        self._lock.release()
+
+    async def __aenter__(self):
+        await self.acquire()
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.release()
+
+# Global lock for hardware exclusivity (shared across processes unless everything runs in one)
+system_lock = SystemLock(SYSTEM_LOCK_FILE if HARDWARE_MODE != "local" else None)
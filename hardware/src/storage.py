@@ -0,0 +1,88 @@
+import json
+import os
+import tempfile
+from typing import List, Optional, Tuple
+
+
+def load_json(path: str, default=None):
+    """Reads a JSON file, returning `default` if it is missing or unreadable."""
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return default
+    except (OSError, ValueError):
+        return default
+
+
+def atomic_write_json(path: str, data) -> None:
+    """
+    Writes JSON to a temp file in the same directory, then renames it over the target.
+    A crash mid-write leaves the previous file intact instead of a truncated one.
+    """
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp_", suffix=".json")
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(data, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def file_signature(path: str) -> Optional[Tuple[int, int, int]]:
+    """(inode, size, mtime in ns) of a file, None if it is missing. Changes when any process rewrites it."""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_ino, stat.st_size, stat.st_mtime_ns
+
+
+class JsonlTail:
+    """
+    Follows a JSON-lines file that several processes append to.
+
+    read() returns the records appended since the previous call; only
+    complete lines are consumed, so a line another process is still writing
+    is picked up next time. When the file was replaced or truncated, `reset`
+    is True and the records are the whole file again.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._inode: Optional[int] = None
+        self._offset = 0
+
+    def read(self) -> Tuple[bool, List[dict]]:
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            reset = self._inode is not None
+            self._inode, self._offset = None, 0
+            return reset, []
+        reset = stat.st_ino != self._inode or stat.st_size < self._offset
+        if reset:
+            self._inode, self._offset = stat.st_ino, 0
+        if stat.st_size == self._offset:
+            return reset, []
+        try:
+            with open(self.path, "rb") as f:
+                f.seek(self._offset)
+                data = f.read()
+        except FileNotFoundError:
+            return reset, []
+        end = data.rfind(b"\n") + 1
+        self._offset += end
+        records = []
+        for line in data[:end].splitlines():
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                continue
+        return reset, records
@@ -167,3 +167,62 @@ async def async_client(mock_hardware):
     # Use ASGITransport to properly bind the app
     async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
         yield ac
+
+@pytest.fixture(autouse=True)
+def pipeline_state(tmp_path, monkeypatch):
+    """Keeps pipeline run files out of data/ and stops runs resuming across tests."""
+    from src.logic.pipeline import pipeline_store
+    monkeypatch.setattr(pipeline_store, "root", str(tmp_path / "pipelines"))
+    return pipeline_store
+
+@pytest.fixture(autouse=True)
+def actuator_journal_file(tmp_path, monkeypatch):
+    """Journals actuator transitions to a temp file instead of data/."""
+    from src.actuators.journal import actuator_journal
+    from src.actuators.duty import DutyCycleStats
+    monkeypatch.setattr(actuator_journal, "stats", DutyCycleStats(str(tmp_path / "actuator_stats.json")))
+    actuator_journal.close()
+    monkeypatch.setattr(actuator_journal, "path", str(tmp_path / "actuators.journal"))
+    yield actuator_journal
+    actuator_journal.close()
+
+@pytest.fixture(autouse=True)
+def capture_hash_index(tmp_path, monkeypatch):
+    """Starts every test with an empty capture hash index stored in a temp file."""
+    from src.logic.phash import capture_hashes
+    from src.storage import JsonlTail
+    path = str(tmp_path / "capture_hashes.jsonl")
+    monkeypatch.setattr(capture_hashes, "path", path)
+    monkeypatch.setattr(capture_hashes, "entries", {})
+    monkeypatch.setattr(capture_hashes, "_keyframes", {})
+    monkeypatch.setattr(capture_hashes, "_tail", JsonlTail(path))
+    return capture_hashes
+
+@pytest.fixture(autouse=True)
+def job_history_file(tmp_path, monkeypatch):
+    """Archives finished jobs to a temp file instead of data/."""
+    from src.logic.jobs import job_manager
+    monkeypatch.setattr(job_manager, "history_path", str(tmp_path / "jobs.jsonl"))
+    return job_manager
+
+@pytest.fixture(autouse=True)
+def trace_dir(tmp_path, monkeypatch):
+    """Writes replay traces (if a test starts the recorder) to a temp dir."""
+    from src.hardware.trace import trace_recorder
+    trace_recorder.stop()
+    monkeypatch.setattr(trace_recorder, "root", str(tmp_path / "traces"))
+    monkeypatch.setattr(trace_recorder, "_adc_last", {})
+    yield trace_recorder
+    trace_recorder.stop()
+
+@pytest.fixture(autouse=True)
+def telemetry_file(tmp_path, monkeypatch):
+    """Points the telemetry ring (writer and readers) at an empty temp file instead of /dev/shm."""
+    from src.logic.telemetry import telemetry_ring, telemetry_reader
+    path = str(tmp_path / "telemetry.ring")
+    for ring in (telemetry_ring, telemetry_reader):
+        ring.close()
+        monkeypatch.setattr(ring, "path", path)
+    yield path
+    for ring in (telemetry_ring, telemetry_reader):
+        ring.close()
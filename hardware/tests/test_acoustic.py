@@ -0,0 +1,73 @@
+import numpy as np
+import pytest
+from src.logic.acoustic import AcousticMonitor, BandAnalyzer
+from src.logic.anomaly import AnomalyEngine
+from src.models import AlertKind
+
+RATE = 44100
+
+def tone(freq, amplitude, seconds=1.0, noise=0.001, seed=0):
+    t = np.arange(int(RATE * seconds)) / RATE
+    rng = np.random.default_rng(seed)
+    x = amplitude * np.sin(2 * np.pi * freq * t) + rng.normal(0, noise, len(t))
+    return (np.clip(x, -1, 1) * 32767).astype(np.int16)
+
+@pytest.fixture
+def monitor(tmp_path, monkeypatch):
+    monkeypatch.setattr("src.logic.acoustic.ACOUSTIC_SETTLE_SECONDS", 0)
+    monkeypatch.setattr("src.logic.acoustic.ACOUSTIC_BASELINE_BLOCKS", 5)
+    monkeypatch.setattr("src.logic.acoustic.ACOUSTIC_ALERT_BLOCKS", 3)
+    return AcousticMonitor(alerts=AnomalyEngine(path=str(tmp_path / "alerts.jsonl")), analyzer=BandAnalyzer(RATE))
+
+def test_band_energies():
+    analyzer = BandAnalyzer(RATE)
+    hum = analyzer.features(tone(500, 0.3))
+    assert max(hum["bands"], key=hum["bands"].get) == "pump"
+    assert hum["rms"] == pytest.approx(0.3 / np.sqrt(2), rel=0.02)
+    hiss = analyzer.features(tone(4500, 0.3))
+    assert max(hiss["bands"], key=hiss["bands"].get) == "high"
+
+def run(monitor, blocks, state, start=0):
+    alerts = []
+    for i, pcm in enumerate(blocks):
+        alert = monitor.process(1000.0 + start + i, monitor.analyzer.features(pcm), state=state)
+        if alert is not None:
+            alerts.append(alert)
+    return alerts
+
+QUIET = ((), False)
+FILLING = (("water_in",), False)
+
+def test_silent_pump(monitor):
+    # Nothing is judged until the background is known
+    assert run(monitor, [tone(500, 0.0, seed=i) for i in range(3)], FILLING) == []
+    assert run(monitor, [tone(500, 0.0, seed=i) for i in range(5)], QUIET, start=10) == []
+    assert monitor.calibrated(False)
+
+    # A humming pump is fine
+    assert run(monitor, [tone(500, 0.2, seed=i) for i in range(5)], FILLING, start=20) == []
+    # A pump that makes no sound is flagged once per cooldown
+    alerts = run(monitor, [tone(500, 0.0, seed=i) for i in range(6)], FILLING, start=30)
+    assert [a.kind for a in alerts] == [AlertKind.pump_silent]
+    assert alerts[0].metric == "acoustic:water_in"
+    assert monitor.alerts.list_alerts()[0].alert_id == alerts[0].alert_id
+
+def test_unexpected_noise_not_learned(monitor):
+    run(monitor, [tone(500, 0.0, seed=i) for i in range(5)], QUIET)
+    baseline = monitor.baselines[False]
+
+    alerts = run(monitor, [tone(800, 0.2, seed=i) for i in range(4)], QUIET, start=10)
+    assert [a.kind for a in alerts] == [AlertKind.unexpected_noise]
+    # The noise did not become the new background
+    assert monitor.baselines[False] == baseline
+    # The relay (air stones) has its own background
+    assert not monitor.calibrated(True)
+
+def test_monitor_endpoints(client, monkeypatch):
+    from src.main import acoustic_monitor
+    monkeypatch.setattr(acoustic_monitor, "features", type(acoustic_monitor.features)(maxlen=10))
+    acoustic_monitor.process(50.0, {"rms": 0.1, "bands": {"low": 0.0, "pump": 1.0, "mid": 0.0, "high": 0.0}}, state=QUIET)
+    status = client.get("/sensors/microphone/monitor").json()
+    assert status["running"] is False
+    assert status["latest"]["t"] == 50.0
+    assert client.get("/sensors/microphone/features?seconds=5").json()[0]["pumps_on"] == []
@@ -0,0 +1,108 @@
+import asyncio
+import pytest
+from fastapi import HTTPException
+from src.admission import ResourceQueue
+
+async def hold(queue, client, order, release, deadline=None):
+    async with queue.admit(client, deadline):
+        order.append(client)
+        await release.wait()
+
+@pytest.mark.asyncio
+async def test_round_robin_between_clients():
+    queue = ResourceQueue("camera", max_waiting=10, max_per_client=5)
+    order = []
+    gate = asyncio.Event()
+    gate.set()
+    blocker = asyncio.Event()
+
+    first = asyncio.create_task(hold(queue, "a", order, blocker))
+    await asyncio.sleep(0)
+    # A bursts before b arrives; b still goes second
+    tasks = [asyncio.create_task(hold(queue, "a", order, gate)) for _ in range(3)]
+    await asyncio.sleep(0)
+    tasks.append(asyncio.create_task(hold(queue, "b", order, gate)))
+    await asyncio.sleep(0)
+    assert queue.stats()["waiting"] == 4
+
+    blocker.set()
+    await asyncio.gather(first, *tasks)
+    assert order == ["a", "a", "b", "a", "a"]
+    assert queue.active == 0 and queue.waiting == 0
+
+@pytest.mark.asyncio
+async def test_bounded_queues_refuse_with_retry_after():
+    queue = ResourceQueue("microphone", max_waiting=2, max_per_client=1, estimate=10)
+    release = asyncio.Event()
+    order = []
+    running = asyncio.create_task(hold(queue, "a", order, release))
+    waiting = asyncio.create_task(hold(queue, "b", order, release))
+    await asyncio.sleep(0)
+
+    with pytest.raises(HTTPException) as per_client:
+        await hold(queue, "b", order, release)
+    assert per_client.value.status_code == 429
+
+    other = asyncio.create_task(hold(queue, "c", order, release))
+    await asyncio.sleep(0)
+    with pytest.raises(HTTPException) as full:
+        await hold(queue, "d", order, release)
+    assert full.value.status_code == 503
+    # Two queued ahead of one in service at ~10s each
+    assert full.value.headers["Retry-After"] == "30"
+
+    release.set()
+    await asyncio.gather(running, waiting, other)
+    assert queue.stats()["rejected"] == 2
+
+@pytest.mark.asyncio
+async def test_deadlines():
+    queue = ResourceQueue("camera", estimate=5)
+    release = asyncio.Event()
+    running = asyncio.create_task(hold(queue, "a", [], release))
+    await asyncio.sleep(0)
+
+    # Can't start within 1s: refused without queueing
+    with pytest.raises(HTTPException) as early:
+        await hold(queue, "b", [], release, deadline=1)
+    assert early.value.status_code == 503
+    assert queue.waiting == 0
+
+    # Looked feasible but the holder overran
+    queue.service_seconds = 0.01
+    with pytest.raises(HTTPException) as late:
+        await hold(queue, "b", [], release, deadline=0.05)
+    assert late.value.status_code == 503
+    assert queue.waiting == 0
+
+    release.set()
+    await running
+    assert queue.active == 0
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_leaves_the_queue():
+    queue = ResourceQueue("camera")
+    release = asyncio.Event()
+    order = []
+    running = asyncio.create_task(hold(queue, "a", order, release))
+    await asyncio.sleep(0)
+    waiter = asyncio.create_task(hold(queue, "b", order, release))
+    await asyncio.sleep(0)
+    waiter.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiter
+    assert queue.waiting == 0
+
+    release.set()
+    await running
+    assert order == ["a"]
+    async with queue.admit("c"):
+        assert queue.active == 1
+
+def test_admission_endpoints(client, mock_hardware):
+    stats = client.get("/hardware/admission").json()
+    assert set(stats) == {"camera", "microphone", "diagnose"}
+    assert stats["camera"]["active"] == 0
+
+    response = client.get("/sensors/microphone/record", headers={"X-Max-Wait": "soon"})
+    assert response.status_code == 400
@@ -0,0 +1,103 @@
+import random
+import pytest
+from src.logic.anomaly import AnomalyEngine
+from src.logic.sampler import SensorSampler
+from src.models import AlertKind, AlertSeverity
+
+def sample(t, ph=6.0, tds=600.0, temp=75.0, hum=55.0, **extra):
+    return {"t": t, "ph": ph, "tds_ppm": tds, "temperature_f": temp, "humidity_percent": hum,
+            "water_full": False, "water_empty": False, "busy": False, **extra}
+
+@pytest.fixture
+def engine(tmp_path):
+    return AnomalyEngine(path=str(tmp_path / "alerts.jsonl"))
+
+def feed_noise(engine, n, start=0.0, rng=None):
+    rng = rng or random.Random(1)
+    for i in range(n):
+        raised = engine.process(sample(
+            start + i * 10,
+            ph=6.0 + rng.gauss(0, 0.03),
+            tds=600 + rng.gauss(0, 8),
+            temp=75 + rng.choice([0, 1]),
+            hum=55 + rng.choice([0, 1]),
+        ))
+        assert raised == [], f"False alarm at sample {i}: {raised}"
+    return start + n * 10
+
+class TestAnomalyEngine:
+    def test_quiet_signal_raises_nothing(self, engine):
+        feed_noise(engine, 200)
+
+    def test_tds_spike(self, engine):
+        t = feed_noise(engine, 60)
+        # Sediment stirred up by a refill
+        raised = engine.process(sample(t, tds=1400))
+        kinds = {a.kind for a in raised if a.metric == "tds_ppm"}
+        assert AlertKind.spike in kinds
+        assert AlertKind.rate_of_change in kinds
+        spike = next(a for a in raised if a.kind == AlertKind.spike)
+        assert spike.severity == AlertSeverity.critical
+        assert spike.details["z"] > 4
+
+        # Cooldown: the same alert is not repeated immediately
+        assert not [a for a in engine.process(sample(t + 10, tds=1450)) if a.kind == AlertKind.spike]
+
+    def test_busy_alerts_are_info(self, engine):
+        t = feed_noise(engine, 60)
+        raised = engine.process(sample(t, tds=1400, busy=True))
+        assert raised and all(a.severity == AlertSeverity.info for a in raised)
+
+    def test_ph_drift_change_point(self, engine):
+        rng = random.Random(2)
+        t = feed_noise(engine, 60, rng=rng)
+        raised = []
+        # Slow drift: too slow for the rate check, but a clear level shift
+        for i in range(30):
+            raised += engine.process(sample(t + i * 10, ph=6.0 + 0.02 * i + rng.gauss(0, 0.03)))
+        assert any(a.kind == AlertKind.change_point and a.metric == "ph" for a in raised)
+        assert not any(a.kind == AlertKind.rate_of_change and a.metric == "ph" for a in raised)
+
+    def test_stuck_probe(self, engine):
+        rng = random.Random(3)
+        raised = []
+        for i in range(100):
+            raised += engine.process(sample(i * 10, ph=7.0, tds=600 + rng.gauss(0, 8)))
+        assert [a.metric for a in raised if a.kind == AlertKind.stuck] == ["ph"]
+
+    def test_dht_dropout(self, engine):
+        t = feed_noise(engine, 10)
+        raised = []
+        for i in range(8):
+            raised += engine.process(sample(t + i * 10, temp=None, hum=None))
+        dropouts = [a.metric for a in raised if a.kind == AlertKind.dropout]
+        assert sorted(dropouts) == ["humidity_percent", "temperature_f"]
+
+    def test_alerts_persist_and_filter(self, engine, tmp_path):
+        t = feed_noise(engine, 60)
+        engine.process(sample(t, tds=1400))
+
+        reloaded = AnomalyEngine(path=str(tmp_path / "alerts.jsonl"))
+        alerts = reloaded.list_alerts(kind=AlertKind.spike)
+        assert [a.metric for a in alerts] == ["tds_ppm"]
+        assert reloaded.list_alerts(since=t + 1) == []
+
+class TestSampler:
+    @pytest.mark.asyncio
+    async def test_sample_history_and_consumers(self, tmp_path, mock_hardware):
+        sampler = SensorSampler(history_dir=str(tmp_path / "history"))
+        received = []
+        sampler.add_consumer(received.append)
+
+        first = await sampler.sample_once()
+        second = await sampler.sample_once()
+
+        assert received == [first, second]
+        assert {"tds_ppm", "ph", "temperature_f", "water_full", "busy"} <= set(first)
+        history = list(sampler.history(first["t"] - 1, second["t"] + 1))
+        assert [s["t"] for s in history] == [first["t"], second["t"]]
+
+    def test_alerts_endpoint(self, client):
+        response = client.get("/alerts/?limit=5")
+        assert response.status_code == 200
+        assert isinstance(response.json(), list)
@@ -0,0 +1,70 @@
+import pytest
+from src.actuators.batch import plan_batch
+
+def action(device, duration=None, state="on", delay=0.0):
+    return {"device": device, "state": state, "duration": duration, "delay": delay}
+
+class TestPlan:
+    def test_sequential_and_parallel_timelines(self):
+        actions = [action("ac_relay", 2), action("flora_gro", 3, delay=1), action("ac_relay", state="off")]
+        sequential = plan_batch(actions, "sequential")
+        assert [(s["start"], s["stop"]) for s in sequential] == [(0, 2), (3, 6), (6, 6)]
+        parallel = plan_batch([action("flora_micro", 3), action("flora_gro", 3), action("flora_bloom", 3, delay=1)], "parallel")
+        assert [(s["start"], s["stop"]) for s in parallel] == [(0, 3), (0, 3), (1, 4)]
+
+    @pytest.mark.parametrize("actions, mode", [
+        ([action("flora_gro")], "sequential"),                          # pump without duration
+        ([action("flora_gro", 5, state="off")], "sequential"),          # pumps only run ON
+        ([action("flora_gro", 600)], "sequential"),                     # over PUMP_MAX_ON_SECONDS
+        ([action("flora_gro", 5), action("flora_gro", 5, delay=1)], "parallel"),  # overlapping
+        ([action("nope", 1)], "sequential"),
+    ])
+    def test_invalid_plans(self, actions, mode):
+        with pytest.raises(ValueError):
+            plan_batch(actions, mode)
+
+class TestBatchEndpoint:
+    def test_parallel_pumps_start_together(self, client, mock_hardware):
+        response = client.post("/control/batch", json={
+            "mode": "parallel",
+            "actions": [{"device": p, "duration": 0.05} for p in ("flora_micro", "flora_gro", "flora_bloom")],
+        })
+        assert response.status_code == 200
+        results = response.json()["actions"]
+        starts = [r["started_at"] for r in results]
+        assert max(starts) - min(starts) < 0.02
+        for r in results:
+            assert r["stopped_at"] - r["started_at"] == pytest.approx(0.05, abs=0.03)
+        assert not any(mock_hardware.pumps.pumps[p].value for p in ("flora_micro", "flora_gro", "flora_bloom"))
+
+    def test_sequential_relay_and_pump(self, client, mock_hardware):
+        from src.actuators.ac_relay import ac_relay
+        ac_relay.turn_off()
+        response = client.post("/control/batch", json={"actions": [
+            {"device": "ac_relay", "duration": 0.05},
+            {"device": "water_in", "duration": 0.05},
+            {"device": "water_in", "duration": 0.05},
+        ]})
+        assert response.status_code == 200
+        relay, first, second = response.json()["actions"]
+        assert relay["stopped_at"] <= first["started_at"] + 0.01
+        assert first["stopped_at"] <= second["started_at"]
+        assert second["planned_start"] - relay["planned_start"] == pytest.approx(0.1)
+        assert not ac_relay.is_active
+        assert mock_hardware.pumps.pumps["water_in"].value is False
+
+    def test_timed_relay_restores_the_state_it_found(self, client, mock_hardware):
+        from src.actuators.ac_relay import ac_relay
+        ac_relay.turn_on()
+        response = client.post("/control/batch", json={"actions": [{"device": "ac_relay", "duration": 0.05}]})
+        assert response.status_code == 200
+        assert ac_relay.is_active
+        ac_relay.turn_off()
+
+    def test_invalid_plan_moves_nothing(self, client, mock_hardware):
+        response = client.post("/control/batch", json={"actions": [
+            {"device": "flora_gro", "duration": 0.05},
+            {"device": "flora_gro", "duration": 0.05, "state": "off"},
+        ]})
+        assert response.status_code == 400
+        assert client.get("/stats/actuators").json()["totals"] == {}
@@ -0,0 +1,144 @@
+import asyncio
+import threading
+import pytest
+from unittest.mock import patch
+from src.logic.camera_stream import CameraStream, JPEGSplitter
+from src.actuators.ac_relay import ac_relay
+
+def jpeg(n: int) -> bytes:
+    return b"\xff\xd8" + bytes([n]) * 10 + b"\xff\xd9"
+
+def test_splitter_handles_chunk_boundaries():
+    splitter = JPEGSplitter()
+    data = b"junk" + jpeg(1) + jpeg(2) + jpeg(3)
+    frames = []
+    for i in range(0, len(data), 5):
+        frames += splitter.feed(data[i:i + 5])
+    assert frames == [jpeg(1), jpeg(2), jpeg(3)]
+
+class FakeStdout:
+    def __init__(self, process):
+        self.process = process
+        self.n = 0
+
+    def read1(self, size):
+        if self.process.terminated.wait(0.01):
+            return b""
+        self.n += 1
+        return jpeg(self.n % 250)
+
+class FakeProcess:
+    instances = []
+
+    def __init__(self, cmd, **kwargs):
+        self.cmd = cmd
+        self.terminated = threading.Event()
+        self.stdout = FakeStdout(self)
+        FakeProcess.instances.append(self)
+
+    def terminate(self):
+        self.terminated.set()
+
+    def wait(self, timeout=None):
+        return 0
+
+    def kill(self):
+        self.terminated.set()
+
+@pytest.fixture
+def fake_vid():
+    FakeProcess.instances = []
+    with patch("src.logic.camera_stream.subprocess.Popen", FakeProcess):
+        yield FakeProcess.instances
+
+async def next_frame(queue):
+    return await asyncio.wait_for(queue.get(), timeout=2)
+
+@pytest.mark.asyncio
+async def test_shared_pipeline_started_and_stopped_on_demand(fake_vid):
+    stream = CameraStream(idle_seconds=0.05)
+    first = stream.subscribe()
+    second = stream.subscribe()
+    assert (await next_frame(first)).startswith(b"\xff\xd8")
+    assert (await next_frame(second)).startswith(b"\xff\xd8")
+    # One pipeline for every viewer
+    assert len(fake_vid) == 1
+    assert "mjpeg" in fake_vid[0].cmd
+
+    # A viewer that doesn't read only ever holds the newest frame
+    await asyncio.sleep(0.1)
+    assert first.qsize() == 1
+
+    stream.unsubscribe(first)
+    stream.unsubscribe(second)
+    await asyncio.sleep(0.2)
+    assert not stream.running
+    assert fake_vid[0].terminated.is_set()
+
+@pytest.mark.asyncio
+async def test_still_capture_pauses_stream(fake_vid):
+    from src.sensors.camera import camera
+    stream = CameraStream(idle_seconds=0.05)
+    queue = stream.subscribe()
+    await next_frame(queue)
+
+    with patch("src.sensors.camera.subprocess.run") as run:
+        path = await asyncio.wait_for(asyncio.to_thread(camera.capture_image, filename="still.jpg"), timeout=2)
+    assert run.called and path.endswith("still.jpg")
+    # The pipeline gave the camera up for the still and came back
+    assert fake_vid[0].terminated.is_set()
+    while queue.qsize():
+        queue.get_nowait()
+    await next_frame(queue)
+    assert len(fake_vid) == 2
+
+    stream.unsubscribe(queue)
+    stream.stop()
+
+@pytest.mark.asyncio
+async def test_light_held_for_viewers(fake_vid):
+    from src.logic.scheduler import _set_light
+    ac_relay.turn_off()
+    stream = CameraStream(idle_seconds=0.05)
+    with patch("src.logic.scheduler.camera_stream", stream):
+        queue = stream.subscribe(light=True)
+        assert ac_relay.is_active
+        # Lights-out from the schedule waits for the viewer
+        _set_light(False)
+        assert ac_relay.is_active
+        stream.unsubscribe(queue, light=True)
+        assert not ac_relay.is_active
+
+        # Lights-on during the stream keeps them on afterwards
+        queue = stream.subscribe(light=True)
+        _set_light(True)
+        stream.unsubscribe(queue, light=True)
+        assert ac_relay.is_active
+    stream.stop()
+    ac_relay.turn_off()
+
+@pytest.mark.asyncio
+async def test_light_left_to_a_routine_using_it(fake_vid):
+    from src.state import system_lock
+    ac_relay.turn_off()
+    stream = CameraStream(idle_seconds=0.05)
+    queue = stream.subscribe(light=True)
+    # A mix starts while the viewer watches: it finds the relay on and relies on it
+    await system_lock.acquire()
+    try:
+        stream.unsubscribe(queue, light=True)
+        await asyncio.sleep(0.05)
+        assert ac_relay.is_active
+    finally:
+        system_lock.release()
+    await stream._light_release
+    assert not ac_relay.is_active
+
+    # Switched off and on again by someone else meanwhile: theirs now
+    queue = stream.subscribe(light=True)
+    ac_relay.turn_off()
+    ac_relay.turn_on()
+    stream.unsubscribe(queue, light=True)
+    assert ac_relay.is_active
+    stream.stop()
+    ac_relay.turn_off()
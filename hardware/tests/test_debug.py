@@ -0,0 +1,68 @@
+import asyncio
+import threading
+
+import pytest
+
+from src.profiling import flamegraph_svg, install_task_clock
+
+TOKEN = {"X-Debug-Token": "secret"}
+
+@pytest.fixture
+def debug_token(monkeypatch):
+    from src.routers import debug
+    monkeypatch.setattr(debug, "DEBUG_TOKEN", "secret")
+
+def spin_for_profile(stop: threading.Event):
+    while not stop.is_set():
+        sum(range(1000))
+
+def test_disabled_without_token(client):
+    assert client.get("/debug/tasks").status_code == 404
+
+def test_rejects_wrong_token(client, debug_token):
+    assert client.get("/debug/tasks").status_code == 403
+    assert client.get("/debug/tasks", headers={"X-Debug-Token": "guess"}).status_code == 403
+
+def test_profile_collapsed_stacks(client, debug_token):
+    stop = threading.Event()
+    worker = threading.Thread(target=spin_for_profile, args=(stop,), name="spinner")
+    worker.start()
+    try:
+        response = client.get("/debug/profile", params={"seconds": 0.3}, headers=TOKEN)
+    finally:
+        stop.set()
+        worker.join()
+    assert response.status_code == 200
+    lines = [line for line in response.text.splitlines() if line.startswith("spinner;")]
+    assert lines
+    stack, count = lines[0].rsplit(" ", 1)
+    assert "spin_for_profile (" in stack and int(count) > 0
+
+def test_profile_svg(client, debug_token):
+    response = client.get("/debug/profile", params={"seconds": 0.05, "format": "svg", "idle": True}, headers=TOKEN)
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("image/svg+xml")
+    assert response.text.startswith("<svg") and "<rect" in response.text
+
+def test_flamegraph_escapes_and_nests():
+    svg = flamegraph_svg({"main;a <b>;c": 3, "main;a <b>": 1})
+    assert "a &lt;b&gt;" in svg
+    assert "(4 samples, 100.0%)" in svg and "(3 samples, 75.0%)" in svg
+
+@pytest.mark.asyncio
+async def test_tasks_lists_named_tasks_with_stack(async_client, debug_token):
+    install_task_clock()
+
+    async def wait_for_tank():
+        await asyncio.sleep(60)
+
+    task = asyncio.create_task(wait_for_tank(), name="job:test")
+    await asyncio.sleep(0)
+    try:
+        response = await async_client.get("/debug/tasks", headers=TOKEN)
+    finally:
+        task.cancel()
+    assert response.status_code == 200
+    job = next(t for t in response.json() if t["name"] == "job:test")
+    assert job["age_seconds"] is not None and job["cancelling"] is False
+    assert "wait_for_tank" in job["stack"][0]
@@ -0,0 +1,108 @@
+import os
+import numpy as np
+import pytest
+from unittest.mock import patch
+from src.logic.derivatives import DerivativeCache
+from src.models import ImageSize
+
+def fake_ffmpeg(calls):
+    """subprocess.run stand-in that writes a small JPEG to the output path (last arg)."""
+    def run(cmd, **kwargs):
+        calls.append(cmd)
+        with open(cmd[-1], "wb") as f:
+            f.write(b"x" * 100)
+    return run
+
+@pytest.fixture
+def source(tmp_path):
+    path = tmp_path / "plant.jpg"
+    path.write_bytes(b"full resolution jpeg")
+    return str(path)
+
+@pytest.mark.asyncio
+async def test_generated_once_and_cached(tmp_path, source):
+    cache = DerivativeCache(cache_dir=str(tmp_path / "cache"), max_bytes=10_000)
+    calls = []
+    with patch("src.logic.derivatives.subprocess.run", side_effect=fake_ffmpeg(calls)):
+        thumb = await cache.get(source, ImageSize.thumb)
+        again = await cache.get(source, ImageSize.thumb)
+
+    assert thumb == again
+    assert os.path.dirname(thumb) == str(tmp_path / "cache")
+    assert len(calls) == 1
+    assert "scale='min(320,iw)':-2" in calls[0]
+
+    # Full size is the original file, no work done
+    assert await cache.get(source, ImageSize.full) == source
+
+@pytest.mark.asyncio
+async def test_new_capture_gets_new_derivative(tmp_path, source):
+    cache = DerivativeCache(cache_dir=str(tmp_path / "cache"), max_bytes=10_000)
+    calls = []
+    with patch("src.logic.derivatives.subprocess.run", side_effect=fake_ffmpeg(calls)):
+        first = await cache.get(source, ImageSize.medium)
+        with open(source, "wb") as f:
+            f.write(b"a different capture")
+        second = await cache.get(source, ImageSize.medium)
+    assert first != second
+    assert len(calls) == 2
+
+@pytest.mark.asyncio
+async def test_capture_replaced_after_lookup_is_keyed_by_its_own_content(tmp_path, source):
+    import hashlib
+    cache = DerivativeCache(cache_dir=str(tmp_path / "cache"), max_bytes=10_000)
+    calls = []
+    stale = '"' + hashlib.sha256(b"full resolution jpeg").hexdigest()[:32] + '"'
+    with open(source, "wb") as f:
+        f.write(b"a newer capture")
+    # The ETag was taken just before the new capture landed
+    with patch("src.logic.derivatives.content_etag", return_value=stale), \
+         patch("src.logic.derivatives.subprocess.run", side_effect=fake_ffmpeg(calls)):
+        thumb = await cache.get(source, ImageSize.thumb)
+
+    assert os.path.basename(thumb).startswith(hashlib.sha256(b"a newer capture").hexdigest()[:32])
+    # ffmpeg read a private copy, removed afterwards
+    input_path = calls[0][calls[0].index("-i") + 1]
+    assert input_path != source and not os.path.exists(input_path)
+    assert os.listdir(tmp_path / "cache") == [os.path.basename(thumb)]
+
+def test_pregenerate_and_lru_eviction(tmp_path, source):
+    # Room for two 100 byte derivatives
+    cache = DerivativeCache(cache_dir=str(tmp_path / "cache"), max_bytes=250)
+    calls = []
+    with patch("src.logic.derivatives.subprocess.run", side_effect=fake_ffmpeg(calls)):
+        for future in cache.pregenerate(source):
+            future.result()
+        assert cache.total_bytes == 200
+
+        with open(source, "wb") as f:
+            f.write(b"next capture")
+        for future in cache.pregenerate(source):
+            future.result()
+
+    assert len(calls) == 4
+    assert cache.total_bytes <= 250
+    assert len(os.listdir(tmp_path / "cache")) == 2
+
+def test_plant_endpoint_size_param(client, tmp_path, monkeypatch):
+    from src.main import plant_photo_cache
+    from src.logic import derivatives
+    monkeypatch.setattr(plant_photo_cache, "path", None)
+    monkeypatch.setattr(derivatives.image_derivatives, "cache_dir", str(tmp_path / "cache"))
+    monkeypatch.setattr(derivatives.image_derivatives, "_loaded", False)
+    photo = tmp_path / "plant_latest.jpg"
+
+    def fake_capture(filename, **kwargs):
+        photo.write_bytes(b"full resolution jpeg")
+        return str(photo)
+
+    calls = []
+    with patch("src.main.camera.capture_image", side_effect=fake_capture), \
+         patch("src.main.asyncio.sleep", return_value=None), \
+         patch("src.logic.phash.decode_gray", return_value=np.zeros((8, 9), dtype=np.uint8)), \
+         patch("src.logic.derivatives.subprocess.run", side_effect=fake_ffmpeg(calls)):
+        response = client.get("/sensors/camera/plant?size=thumb")
+
+    assert response.status_code == 200
+    assert response.content == b"x" * 100
+    assert client.get("/sensors/camera/plant?size=huge").status_code == 422
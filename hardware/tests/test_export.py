@@ -0,0 +1,105 @@
+import csv
+import gzip
+import io
+import json
+import zipfile
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+from src.logic.sampler import sensor_sampler
+from src.logic.vision import frame_features, FEATURES_VERSION
+from src.models import JobStatus, JobState, JobType
+from src.storage import JsonlTail
+
+DAY = 1_700_000_000.0
+
+@pytest.fixture
+def history(tmp_path, monkeypatch):
+    monkeypatch.setattr(sensor_sampler, "history_dir", str(tmp_path / "history"))
+    monkeypatch.setattr("src.logic.export.EXPORT_CHUNK_ROWS", 4)
+    for i in range(10):
+        sensor_sampler._append_history({
+            "t": DAY + i * 10, "tds_ppm": 500.0 + i, "ph": None, "temperature_f": 70.0,
+            "humidity_percent": 40.0, "water_full": True, "water_empty": False, "busy": False,
+        })
+
+def read_csv(content: bytes):
+    return list(csv.reader(io.StringIO(gzip.decompress(content).decode())))
+
+def test_sensor_csv_in_chunks_and_resumable(client, history):
+    response = client.get("/export", params={"from": DAY, "to": DAY + 1000})
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/gzip"
+    rows = read_csv(response.content)
+    assert rows[0][:3] == ["t", "tds_ppm", "ph"]
+    assert len(rows) == 11
+    assert rows[1][1] == "500.0" and rows[1][2] == ""
+    # 10 rows in chunks of 4: three gzip members
+    assert response.content.count(b"\x1f\x8b\x08") == 3
+
+    resumed = read_csv(client.get("/export", params={"from": DAY, "to": DAY + 1000, "offset": 7}).content)
+    assert resumed == rows[8:]
+
+def test_jobs_and_frames_as_zip(client, history, job_history_file, tmp_path, monkeypatch):
+    job = JobStatus(
+        job_id="j1", type=JobType.fill_to_max, status=JobState.completed,
+        created_at=DAY, started_at=DAY + 1, completed_at=DAY + 31, result={"status": "success"}
+    )
+    job_history_file._archive(job)
+    path = str(tmp_path / "features.jsonl")
+    monkeypatch.setattr(frame_features, "path", path)
+    monkeypatch.setattr(frame_features, "features", {})
+    monkeypatch.setattr(frame_features, "_tail", JsonlTail(path))
+    frame_features._append({
+        "timestamp": int(DAY * 1000), "version": FEATURES_VERSION, "canopy_coverage": 0.5, "greenness": 0.4,
+        "chlorosis": 0.1, "bbox": [0, 0, 1, 1], "width": 320, "height": 240,
+    })
+
+    response = client.get("/export", params={"from": DAY, "to": DAY + 1000, "tables": "jobs,frames"})
+    assert response.headers["content-type"] == "application/zip"
+    archive = zipfile.ZipFile(io.BytesIO(response.content))
+    assert archive.namelist() == ["jobs.csv.gz", "frames.csv.gz"]
+
+    jobs = read_csv(archive.read("jobs.csv.gz"))
+    record = dict(zip(jobs[0], jobs[1]))
+    assert record["duration_seconds"] == "30.0"
+    assert json.loads(record["result"]) == {"status": "success"}
+    frames = read_csv(archive.read("frames.csv.gz"))
+    assert dict(zip(frames[0], frames[1]))["bbox_x1"] == "1"
+
+def test_rejects_bad_requests(client, history):
+    assert client.get("/export", params={"tables": "sensors,nope"}).status_code == 400
+    assert client.get("/export", params={"tables": "sensors,jobs", "offset": 3}).status_code == 400
+
+def test_arrow_stream(client, history):
+    response = client.get("/export", params={"from": DAY, "to": DAY + 1000, "format": "arrow"})
+    assert response.headers["content-type"] == "application/vnd.apache.arrow.stream"
+    table = pa.ipc.open_stream(response.content).read_all()
+    assert table.num_rows == 10
+    assert table.column("tds_ppm").to_pylist()[0] == 500.0
+
+    # A resumed download is a complete stream of the remaining rows
+    resumed = client.get("/export", params={"from": DAY, "to": DAY + 1000, "format": "arrow", "offset": 7})
+    assert pa.ipc.open_stream(resumed.content).read_all().column("tds_ppm").to_pylist() == [507.0, 508.0, 509.0]
+
+def test_parquet_row_groups_and_resume(client, history):
+    response = client.get("/export", params={"from": DAY, "to": DAY + 1000, "format": "parquet"})
+    assert response.headers["content-type"] == "application/vnd.apache.parquet"
+    parquet = pq.ParquetFile(io.BytesIO(response.content))
+    # One row group per EXPORT_CHUNK_ROWS (4) rows, written through the non-seekable sink
+    assert parquet.metadata.num_row_groups == 3
+    table = parquet.read()
+    assert table.num_rows == 10
+    assert table.schema.field("water_full").type == pa.bool_()
+    assert table.column("t").to_pylist() == [DAY + i * 10 for i in range(10)]
+
+    resumed = client.get("/export", params={"from": DAY, "to": DAY + 1000, "format": "parquet", "offset": 7})
+    assert pq.read_table(io.BytesIO(resumed.content)).column("tds_ppm").to_pylist() == [507.0, 508.0, 509.0]
+
+def test_parquet_tables_in_zip(client, history, job_history_file):
+    response = client.get("/export", params={"from": DAY, "to": DAY + 1000, "format": "parquet", "tables": "sensors,jobs"})
+    archive = zipfile.ZipFile(io.BytesIO(response.content))
+    assert archive.namelist() == ["sensors.parquet", "jobs.parquet"]
+    assert pq.read_table(io.BytesIO(archive.read("sensors.parquet"))).num_rows == 10
+    jobs = pq.read_table(io.BytesIO(archive.read("jobs.parquet")))
+    assert jobs.num_rows == 0 and "duration_seconds" in jobs.column_names
@@ -70,3 +70,164 @@ class TestJobs:
         data = response.json()
         assert data["status"] == "failed"
         assert "cancelled" in data["error"].lower()
+
+    @pytest.mark.asyncio
+    async def test_long_poll_returns_on_status_change(self, async_client, mock_hardware):
+        client = async_client
+        mock_hardware.set_water_level(full=False, empty=False)
+
+        response = await client.post("/jobs/", json={"type": "fill_to_max"})
+        job_id = response.json()["job_id"]
+        await asyncio.sleep(0.1)
+
+        # Cancel shortly after the long-poll starts waiting
+        async def cancel_later():
+            await asyncio.sleep(0.2)
+            await client.delete(f"/jobs/{job_id}")
+
+        canceller = asyncio.create_task(cancel_later())
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        response = await client.get(f"/jobs/{job_id}?wait=10")
+        elapsed = loop.time() - started
+        await canceller
+
+        assert response.json()["status"] == "failed"
+        assert elapsed < 5
+
+    @pytest.mark.asyncio
+    async def test_long_poll_finished_job_returns_immediately(self, async_client, mock_hardware):
+        client = async_client
+        mock_hardware.set_water_level(full=False, empty=True)
+        response = await client.post("/jobs/", json={"type": "empty_tank"})
+        job_id = response.json()["job_id"]
+        await asyncio.sleep(0.1)
+
+        response = await client.get(f"/jobs/{job_id}?wait=30")
+        assert response.json()["status"] == "completed"
+
+    @pytest.mark.asyncio
+    async def test_progress_events(self, mock_hardware):
+        from src.logic.jobs import job_manager
+        from src.models import JobRequest
+        from src.sse import format_sse
+
+        # Tank drains and fills instantly
+        original_activate = mock_hardware.pumps.activate_pump
+        def side_effect_activate(pump_id):
+            if pump_id == "water_out":
+                mock_hardware.set_water_level(full=False, empty=True)
+            elif pump_id == "water_in":
+                mock_hardware.set_water_level(full=True, empty=False)
+            return original_activate(pump_id)
+
+        queue = job_manager.subscribe()
+        try:
+            with patch.object(mock_hardware.pumps, "activate_pump", side_effect=side_effect_activate), \
+                 patch("src.logic.feed.asyncio.sleep", new_callable=AsyncMock):
+                job_id = job_manager.submit_job(JobRequest(type=JobType.feed, params={"recipe": "vegetative"}))
+                await job_manager.tasks[job_id]
+        finally:
+            job_manager.unsubscribe(queue)
+
+        events = []
+        while not queue.empty():
+            events.append(queue.get_nowait())
+        steps = [e["progress"] for e in events if e["event"] == "progress" and e["job_id"] == job_id]
+
+        assert "emptying" in steps
+        assert "dosing flora_gro" in steps
+        assert "mixing 120/180 s" in steps
+        assert steps[-1] == "verifying TDS"
+        assert events[-1]["status"] == "completed"
+        assert job_manager.get_job(job_id).progress == "verifying TDS"
+        assert format_sse("status", events[-1]).startswith("event: status\ndata: {")
+
+class TestJobDeduplication:
+    @pytest.mark.asyncio
+    async def test_identical_pending_jobs_coalesce(self, async_client, mock_hardware):
+        client = async_client
+        mock_hardware.set_water_level(full=False, empty=False)
+
+        first = await client.post("/jobs/", json={"type": "fill_to_max"})
+        second = await client.post("/jobs/", json={"type": "fill_to_max"})
+        assert first.status_code == 201
+        assert second.status_code == 200
+        assert second.json()["job_id"] == first.json()["job_id"]
+
+        await client.delete(f"/jobs/{first.json()['job_id']}")
+        await asyncio.sleep(0.1)
+
+        # Once the first job has finished, a new request starts a new job
+        third = await client.post("/jobs/", json={"type": "fill_to_max"})
+        assert third.status_code == 201
+        assert third.json()["job_id"] != first.json()["job_id"]
+        await client.delete(f"/jobs/{third.json()['job_id']}")
+        await asyncio.sleep(0.1)
+
+    @pytest.mark.asyncio
+    async def test_different_params_do_not_coalesce(self, async_client, mock_hardware):
+        from src.logic.jobs import job_fingerprint
+        assert job_fingerprint(JobType.feed, {"recipe": "vegetative", "x": 1}) == \
+            job_fingerprint(JobType.feed, {"x": 1, "recipe": "vegetative"})
+        assert job_fingerprint(JobType.feed, {"recipe": "vegetative"}) != \
+            job_fingerprint(JobType.feed, {"recipe": "flowering"})
+
+    @pytest.mark.asyncio
+    async def test_idempotency_key(self, async_client, mock_hardware):
+        client = async_client
+        mock_hardware.set_water_level(full=False, empty=True)
+        headers = {"Idempotency-Key": "retry-empty-1"}
+
+        first = await client.post("/jobs/", json={"type": "empty_tank"}, headers=headers)
+        await asyncio.sleep(0.1)
+        assert (await client.get(f"/jobs/{first.json()['job_id']}")).json()["status"] == "completed"
+
+        # A retry after completion still returns the original job
+        retry = await client.post("/jobs/", json={"type": "empty_tank"}, headers=headers)
+        assert retry.status_code == 200
+        assert retry.json()["job_id"] == first.json()["job_id"]
+
+        conflict = await client.post("/jobs/", json={"type": "diagnose"}, headers=headers)
+        assert conflict.status_code == 409
+
+    @pytest.mark.asyncio
+    async def test_result_reuse_within_max_age(self, async_client, mock_hardware):
+        client = async_client
+        mock_hardware.set_water_level(full=False, empty=True)
+
+        first = await client.post("/jobs/", json={"type": "empty_tank"})
+        await asyncio.sleep(0.1)
+
+        reused = await client.post("/jobs/", json={"type": "empty_tank", "max_age": 120})
+        assert reused.status_code == 200
+        assert reused.json()["job_id"] == first.json()["job_id"]
+        assert reused.json()["status"] == "completed"
+
+        # Without max_age a finished job is never reused
+        fresh = await client.post("/jobs/", json={"type": "empty_tank"})
+        assert fresh.status_code == 201
+        await asyncio.sleep(0.1)
+
+    @pytest.mark.asyncio
+    async def test_finished_jobs_are_forgotten_after_retention(self, mock_hardware, tmp_path, monkeypatch):
+        from src.logic.jobs import JobManager, job_fingerprint
+        from src.models import JobRequest
+        manager = JobManager(history_path=str(tmp_path / "jobs.jsonl"))
+        mock_hardware.set_water_level(full=False, empty=True)
+        fingerprint = job_fingerprint(JobType.empty_tank, {})
+
+        first, _ = manager.submit(JobRequest(type=JobType.empty_tank))
+        await manager.tasks[first]
+        reused, created = manager.submit(JobRequest(type=JobType.empty_tank, max_age=60))
+        assert reused == first and not created
+
+        # Past the retention the job is only in the history file
+        monkeypatch.setattr("src.logic.jobs.JOB_RETENTION_SECONDS", 0)
+        second, created = manager.submit(JobRequest(type=JobType.empty_tank, max_age=60))
+        assert created and second != first
+        assert manager.get_job(first) is None and first not in manager.tasks
+        assert manager._by_fingerprint[fingerprint] == [second]
+        await manager.tasks[second]
+        with open(tmp_path / "jobs.jsonl") as f:
+            assert first in f.readline()
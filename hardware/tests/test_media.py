@@ -0,0 +1,76 @@
+import pytest
+from unittest.mock import patch
+
+@pytest.fixture
+def video_file(tmp_path):
+    path = tmp_path / "2026-01-01.mp4"
+    path.write_bytes(bytes(range(256)) * 4)  # 1024 bytes
+    with patch("src.main.timelapse_store") as mock_store:
+        mock_store.latest_video.return_value = str(path)
+        yield path
+
+class TestMediaServing:
+    def test_validators_and_304(self, client, video_file):
+        response = client.get("/timelapse/latest")
+        assert response.status_code == 200
+        assert response.content == video_file.read_bytes()
+        etag = response.headers["etag"]
+        assert response.headers["accept-ranges"] == "bytes"
+        assert "last-modified" in response.headers
+
+        response = client.get("/timelapse/latest", headers={"If-None-Match": etag})
+        assert response.status_code == 304
+        assert response.content == b""
+
+        response = client.get("/timelapse/latest", headers={"If-None-Match": '"other"'})
+        assert response.status_code == 200
+
+    def test_etag_follows_content(self, client, video_file):
+        etag = client.get("/timelapse/latest").headers["etag"]
+        video_file.write_bytes(b"new video")
+        assert client.get("/timelapse/latest").headers["etag"] != etag
+
+    def test_range_requests(self, client, video_file):
+        data = video_file.read_bytes()
+
+        response = client.get("/timelapse/latest", headers={"Range": "bytes=100-199"})
+        assert response.status_code == 206
+        assert response.headers["content-range"] == "bytes 100-199/1024"
+        assert response.content == data[100:200]
+
+        response = client.get("/timelapse/latest", headers={"Range": "bytes=-24"})
+        assert response.status_code == 206
+        assert response.content == data[-24:]
+
+        response = client.get("/timelapse/latest", headers={"Range": "bytes=2000-"})
+        assert response.status_code == 416
+        assert response.headers["content-range"] == "bytes */1024"
+
+    def test_if_range_mismatch_sends_full_body(self, client, video_file):
+        response = client.get("/timelapse/latest", headers={"Range": "bytes=0-9", "If-Range": '"stale"'})
+        assert response.status_code == 200
+        assert len(response.content) == 1024
+
+class TestPlantPhotoCache:
+    def test_recent_photo_reused(self, client, tmp_path, monkeypatch):
+        from src.main import plant_photo_cache
+        monkeypatch.setattr(plant_photo_cache, "path", None)
+        photo = tmp_path / "plant_latest.jpg"
+        calls = []
+
+        def fake_capture(filename, **kwargs):
+            calls.append(filename)
+            photo.write_bytes(f"jpeg {len(calls)}".encode())
+            return str(photo)
+
+        with patch("src.main.camera.capture_image", side_effect=fake_capture), \
+             patch("src.main.asyncio.sleep", return_value=None):
+            first = client.get("/sensors/camera/plant")
+            second = client.get("/sensors/camera/plant", headers={"If-None-Match": first.headers["etag"]})
+            third = client.get("/sensors/camera/plant?fresh=true")
+
+        assert first.status_code == 200
+        assert second.status_code == 304
+        assert third.status_code == 200
+        assert third.content == b"jpeg 2"
+        assert len(calls) == 2
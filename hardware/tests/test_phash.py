@@ -0,0 +1,126 @@
+import numpy as np
+import pytest
+from unittest.mock import patch
+from src.logic.phash import CaptureHashIndex, dhash, hamming, HASH_BITS
+
+def gradient(reverse_rows=0):
+    """9x8 grayscale buffer brightening left to right; the first rows can be reversed."""
+    gray = np.tile(np.arange(0, 90, 10, dtype=np.uint8), (8, 1))
+    gray[:reverse_rows] = gray[:reverse_rows, ::-1]
+    return gray
+
+class TestDHash:
+    def test_bits(self):
+        assert dhash(gradient()) == 0
+        assert dhash(gradient(reverse_rows=8)) == 2 ** HASH_BITS - 1
+        # One reversed row flips its 8 bits
+        assert hamming(dhash(gradient()), dhash(gradient(reverse_rows=1))) == 8
+
+    def test_robust_to_brightness(self):
+        assert dhash(gradient()) == dhash(gradient() + 100)
+
+class TestCaptureHashIndex:
+    def test_keyframes_and_persistence(self, tmp_path):
+        index = CaptureHashIndex(path=str(tmp_path / "hashes.jsonl"), threshold=6)
+        base = dhash(gradient())
+
+        first = index.record("timelapse", 1000, base)
+        assert first["changed"] and first["keyframe"] is None
+
+        # 3 bits from the keyframe: a near-duplicate
+        near = index.record("timelapse", 2000, base ^ 0b111)
+        assert not near["changed"]
+        assert near["distance"] == 3 and near["keyframe"] == 1000
+
+        # Distance is measured from the keyframe, so slow drift still registers
+        drift = index.record("timelapse", 3000, base ^ 0b111111)
+        assert drift["changed"] and drift["keyframe"] == 1000
+        after = index.record("timelapse", 4000, base ^ 0b111111)
+        assert not after["changed"] and after["keyframe"] == 3000
+
+        assert index.duplicates("timelapse") == [2000, 4000]
+        assert index.duplicates("plant") == []
+
+        reloaded = CaptureHashIndex(path=str(tmp_path / "hashes.jsonl"), threshold=6)
+        assert reloaded.duplicates("timelapse") == [2000, 4000]
+        assert reloaded.latest("timelapse")["timestamp"] == 4000
+
+    def test_changed_since(self, tmp_path):
+        index = CaptureHashIndex(path=str(tmp_path / "hashes.jsonl"), threshold=6)
+        assert index.changed_since("plant", 0) is None
+
+        base = dhash(gradient())
+        index.record("plant", 1000, base)
+        index.record("plant", 2000, base ^ 0b1)
+        index.record("plant", 3000, base ^ 0xFF)
+
+        # Client holding the 2000 photo (or anything newer before 3000)
+        change = index.changed_since("plant", 2500)
+        assert change["since"] == 2000 and change["distance"] == 7 and change["changed"]
+
+        assert not index.changed_since("plant", 3000)["changed"]
+        # Nothing seen yet counts as changed
+        assert index.changed_since("plant", 500)["changed"]
+
+    def test_compact_drops_thinned_frames_and_old_plant_photos(self, tmp_path, monkeypatch):
+        monkeypatch.setattr("src.logic.phash.MAX_PLANT_ENTRIES", 2)
+        path = str(tmp_path / "hashes.jsonl")
+        index = CaptureHashIndex(path=path, threshold=6)
+        base = dhash(gradient())
+        for ts in range(1000, 6000, 1000):
+            index.record("timelapse", ts, base)
+        for ts in range(1000, 5000, 1000):
+            index.record("plant", ts, base)
+        # The cap only applies to plant photos
+        assert index.duplicates("timelapse") == [2000, 3000, 4000, 5000]
+        assert list(index.entries["plant"]) == [3000, 4000]
+
+        # 2000 and 3000 were thinned; 1000 is gone too but is still the keyframe
+        assert index.compact([4000, 5000]) == 4
+        with open(path) as f:
+            assert len(f.readlines()) == 5
+        reloaded = CaptureHashIndex(path=path, threshold=6)
+        assert reloaded.duplicates("timelapse") == [4000, 5000]
+        assert list(reloaded.entries["timelapse"]) == [1000, 4000, 5000]
+        assert list(reloaded.entries["plant"]) == [3000, 4000]
+        assert index.record("timelapse", 6000, base)["keyframe"] == 1000
+        # Nothing left to drop: the file is not rewritten
+        assert index.compact([4000, 5000, 6000]) == 0
+
+    @pytest.mark.asyncio
+    async def test_add_skips_undecodable(self, tmp_path):
+        index = CaptureHashIndex(path=str(tmp_path / "hashes.jsonl"))
+        with patch("src.logic.phash.decode_gray", side_effect=ValueError("no pixels")):
+            assert await index.add("plant", 1000, "broken.jpg") is None
+        with patch("src.logic.phash.decode_gray", return_value=gradient()):
+            entry = await index.add("plant", 2000, "ok.jpg")
+        assert entry["hash"] == "0000000000000000"
+        assert index.latest("plant")["timestamp"] == 2000
+
+def test_plant_changes_endpoint(client, tmp_path, monkeypatch):
+    from src.main import plant_photo_cache
+    monkeypatch.setattr(plant_photo_cache, "path", None)
+    photo = tmp_path / "plant_latest.jpg"
+    frames = iter([gradient(), gradient(), gradient(reverse_rows=2)])
+
+    def fake_capture(filename, **kwargs):
+        photo.write_bytes(b"jpeg")
+        return str(photo)
+
+    with patch("src.main.camera.capture_image", side_effect=fake_capture), \
+         patch("src.main.asyncio.sleep", return_value=None), \
+         patch("src.logic.phash.decode_gray", side_effect=lambda path: next(frames)):
+        first = client.get("/sensors/camera/plant")
+        seen = int(first.headers["x-capture-time"])
+        assert float(first.headers["x-change-score"]) == 1.0
+
+        same = client.get(f"/sensors/camera/plant/changes?since={seen}")
+        client.get("/sensors/camera/plant?fresh=true")
+        unchanged = client.get(f"/sensors/camera/plant/changes?since={seen}")
+        client.get("/sensors/camera/plant?fresh=true")
+        moved = client.get(f"/sensors/camera/plant/changes?since={seen}")
+
+    assert same.json()["distance"] == 0 and same.json()["changed"] is False
+    assert unchanged.json()["changed"] is False
+    assert moved.json()["changed"] is True
+    assert moved.json()["distance"] == 16 and moved.json()["since"] == seen
@@ -0,0 +1,121 @@
+import asyncio
+import pytest
+from src.logic import pipeline as pl
+from src.logic.pipeline import (
+    Pipeline, Step, run_pipeline, empty, fill, dose, mix, measure,
+    COMPLETED, FAILED, INTERRUPTED
+)
+from src.logic.feed import feed_pipeline
+
+@pytest.fixture
+def fake_actions(monkeypatch):
+    """Replaces the hardware step actions with recorders; `fail` makes a step kind raise."""
+    calls = []
+    active = set()
+    overlaps = []
+    fail = set()
+
+    def make(kind):
+        async def action(**params):
+            label = params.get("nutrient", kind)
+            if active:
+                overlaps.append((label, set(active)))
+            active.add(label)
+            calls.append(label)
+            try:
+                await asyncio.sleep(0.01)
+                if label in fail:
+                    raise RuntimeError(f"{label} failed")
+            finally:
+                active.discard(label)
+            return {"done": label}
+        return action
+
+    for kind in pl.STEP_ACTIONS:
+        monkeypatch.setitem(pl.STEP_ACTIONS, kind, make(kind))
+    return calls, overlaps, fail
+
+class TestPipelineGraph:
+    def test_unknown_dependency(self):
+        with pytest.raises(ValueError):
+            Pipeline("bad", [fill(after=["missing"])])
+
+    def test_cycle(self):
+        with pytest.raises(ValueError):
+            Pipeline("bad", [empty(after=["fill"]), fill(after=["empty"])])
+
+    def test_key_depends_on_params(self):
+        assert feed_pipeline({"flora_gro": 5.0}).key == feed_pipeline({"flora_gro": 5.0}).key
+        assert feed_pipeline({"flora_gro": 5.0}).key != feed_pipeline({"flora_gro": 4.0}).key
+
+class TestRunPipeline:
+    @pytest.mark.asyncio
+    async def test_independent_doses_run_in_parallel(self, fake_actions, pipeline_state):
+        calls, overlaps, _ = fake_actions
+        run = await run_pipeline(feed_pipeline({"flora_micro": 4.0, "flora_gro": 5.0, "flora_bloom": 1.0}))
+
+        assert calls[0] == "empty"
+        assert calls[-3:] == ["fill", "mix", "measure"]
+        # Doses overlapped each other but nothing else
+        assert overlaps
+        for label, others in overlaps:
+            assert label.startswith("flora_") and all(o.startswith("flora_") for o in others)
+
+        saved = pipeline_state.get(run.run_id)
+        assert saved["status"] == COMPLETED
+        assert all(step["status"] == COMPLETED for step in saved["steps"].values())
+
+    @pytest.mark.asyncio
+    async def test_resume_skips_completed_steps(self, fake_actions, pipeline_state):
+        calls, _, fail = fake_actions
+        pipeline = Pipeline("flush", [empty("drain"), fill("fill", after=["drain"]), mix(5, after=["fill"])])
+
+        fail.add("fill")
+        with pytest.raises(RuntimeError):
+            await run_pipeline(pipeline)
+        assert calls == ["empty", "fill"]
+
+        fail.clear()
+        calls.clear()
+        run = await run_pipeline(pipeline)
+        assert calls == ["fill", "mix"]
+        assert run.state["resumed"] == 1
+
+        # A completed run is never resumed
+        calls.clear()
+        await run_pipeline(pipeline)
+        assert calls == ["empty", "fill", "mix"]
+
+    @pytest.mark.asyncio
+    async def test_interrupted_dose_is_not_repeated(self, fake_actions, pipeline_state):
+        calls, _, _ = fake_actions
+        pipeline = feed_pipeline({"flora_gro": 5.0})
+
+        task = asyncio.create_task(run_pipeline(pipeline))
+        while "flora_gro" not in calls:
+            await asyncio.sleep(0.001)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+        saved = pipeline_state.list_runs()[0]
+        assert saved["status"] == FAILED
+        assert saved["steps"]["dose_flora_gro"]["error"] == "cancelled"
+
+        calls.clear()
+        run = await run_pipeline(pipeline)
+        assert "flora_gro" not in calls
+        assert run.steps["dose_flora_gro"]["status"] == INTERRUPTED
+        assert run.result("dose_flora_gro") is None
+
+    @pytest.mark.asyncio
+    async def test_resume_disabled(self, fake_actions, pipeline_state):
+        calls, _, fail = fake_actions
+        pipeline = Pipeline("drain", [empty(), measure(after=["empty"])])
+        fail.add("measure")
+        with pytest.raises(RuntimeError):
+            await run_pipeline(pipeline)
+        fail.clear()
+        calls.clear()
+        await run_pipeline(pipeline, resume=False)
+        assert calls == ["empty", "measure"]
@@ -0,0 +1,209 @@
+import asyncio
+import pytest
+import pytest_asyncio
+from src.hardware.rpc import RPCServer, RPCClient, RemoteProxy, RemoteError
+from src.state import SystemLock
+
+class FakeDevice:
+    def __init__(self):
+        self.channel = 3
+        self.state = False
+
+    def turn_on(self):
+        self.state = True
+        return True
+
+    @property
+    def is_active(self) -> bool:
+        return self.state
+
+    async def dispense(self, seconds: float):
+        await asyncio.sleep(seconds)
+        return {"seconds": seconds}
+
+    def fail(self, kind: str):
+        if kind == "value":
+            raise ValueError("bad pump")
+        raise OSError("SPI gone")
+
+    def _secret(self):
+        return "internal"
+
+@pytest_asyncio.fixture
+async def rpc(tmp_path):
+    device = FakeDevice()
+    server = RPCServer(str(tmp_path / "hw.sock"), {"device": device})
+    await server.start()
+    client = RPCClient(server.path, timeout=5)
+    yield device, server, client
+    client.close()
+    await server.close()
+
+@pytest.mark.asyncio
+async def test_proxy_forwards_calls_and_properties(rpc):
+    device, _, client = rpc
+    proxy = RemoteProxy("device", FakeDevice, client=client)
+
+    assert await asyncio.to_thread(lambda: proxy.is_active) is False
+    assert await asyncio.to_thread(proxy.turn_on) is True
+    assert device.state is True
+    assert await asyncio.to_thread(lambda: proxy.is_active) is True
+    # Instance attributes are read remotely too
+    assert await asyncio.to_thread(lambda: proxy.channel) == 3
+    # Coroutine methods stay awaitable
+    assert await proxy.dispense(0.01) == {"seconds": 0.01}
+
+@pytest.mark.asyncio
+async def test_errors_and_private_names(rpc):
+    _, _, client = rpc
+    proxy = RemoteProxy("device", FakeDevice, client=client)
+
+    with pytest.raises(ValueError, match="bad pump"):
+        await asyncio.to_thread(proxy.fail, "value")
+    with pytest.raises(RemoteError, match="SPI gone"):
+        await asyncio.to_thread(proxy.fail, "os")
+    with pytest.raises(AttributeError):
+        proxy._secret
+    with pytest.raises(ValueError, match="Unknown hardware call"):
+        await asyncio.to_thread(client.call, "device", "_secret")
+    with pytest.raises(ValueError, match="Unknown hardware call"):
+        await asyncio.to_thread(client.call, "camera", "capture_image")
+
+@pytest.mark.asyncio
+async def test_client_reconnects_after_daemon_restart(rpc, tmp_path):
+    device, server, client = rpc
+    assert await asyncio.to_thread(client.call, "device", "turn_on") is True
+
+    await server.close()
+    restarted = RPCServer(server.path, {"device": device})
+    await restarted.start()
+    try:
+        # The stale connection is replaced transparently
+        assert await asyncio.to_thread(client.call, "device", "is_active", get=True) is True
+    finally:
+        await restarted.close()
+
+    with pytest.raises(ConnectionError):
+        await asyncio.to_thread(client.call, "device", "is_active", get=True)
+
+@pytest.mark.asyncio
+async def test_system_lock_spans_processes(tmp_path):
+    # Two instances on one file behave like two processes sharing the lock
+    path = str(tmp_path / "system.lock")
+    worker, daemon = SystemLock(path), SystemLock(path)
+
+    async with worker:
+        assert worker.locked() and daemon.locked()
+        waiter = asyncio.create_task(daemon.acquire())
+        await asyncio.sleep(0.1)
+        assert not waiter.done()
+    await asyncio.wait_for(waiter, 1)
+    assert worker.locked()
+    daemon.release()
+    assert not worker.locked() and not daemon.locked()
+
+    # A cancelled waiter never ends up holding the lock
+    await worker.acquire()
+    waiter = asyncio.create_task(daemon.acquire())
+    await asyncio.sleep(0.1)
+    waiter.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiter
+    worker.release()
+    assert not daemon.locked()
+
+@pytest.mark.asyncio
+async def test_pump_states_cross_rpc(tmp_path):
+    from src.actuators.pumps import PumpController
+    pumps = PumpController()
+    server = RPCServer(str(tmp_path / "pumps.sock"), {"pump_controller": pumps})
+    await server.start()
+    client = RPCClient(server.path, timeout=5)
+    try:
+        proxy = RemoteProxy("pump_controller", PumpController, client=client)
+        await asyncio.to_thread(proxy.activate_pump, "water_in")
+        states = await asyncio.to_thread(proxy.states)
+        assert states["water_in"] is True and states["water_out"] is False
+        # The gpiozero devices themselves can't be sent
+        with pytest.raises(RemoteError):
+            await asyncio.to_thread(lambda: proxy.pumps)
+    finally:
+        pumps.all_off()
+        client.close()
+        await server.close()
+
+@pytest.mark.asyncio
+async def test_loop_bound_targets_take_and_return_models(tmp_path):
+    from src.logic.scheduler import Scheduler
+    from src.models import ScheduleRequest, ScheduleKind
+    from src.hardware.rpc import offload
+    schedules = Scheduler(str(tmp_path / "schedules.json"))
+    server = RPCServer(str(tmp_path / "hw.sock"), {"scheduler": schedules})
+    await server.start()
+    client = RPCClient(server.path, timeout=5)
+    try:
+        proxy = RemoteProxy("scheduler", Scheduler, client=client)
+        # Another worker's view: one scheduler, so nothing it saves loses this rule
+        rule = await offload(proxy.add_rule, ScheduleRequest(
+            name="Dose", kind=ScheduleKind.cron, cron="0 9 * * *", action="ac_relay", relay_state="on"
+        ))
+        assert rule["name"] == "Dose" and rule["rule_id"] in schedules.rules
+        assert [r["rule_id"] for r in await offload(proxy.list_rules)] == list(schedules.rules)
+        with pytest.raises(ValueError):
+            await offload(proxy.add_rule, {"name": "Bad", "kind": "cron", "cron": "not cron"})
+    finally:
+        client.close()
+        await server.close()
+
+@pytest.mark.asyncio
+async def test_alerts_are_relayed_to_other_processes(tmp_path):
+    from src.logic.anomaly import AnomalyEngine
+    from src.models import AlertKind
+    from src.sse import subscribe
+    engine = AnomalyEngine(path=str(tmp_path / "alerts.jsonl"))
+    server = RPCServer(str(tmp_path / "hw.sock"), {"anomaly_engine": engine})
+    await server.start()
+    client = RPCClient(server.path, timeout=5)
+    proxy = RemoteProxy("anomaly_engine", AnomalyEngine, client=client)
+    queue, unsubscribe = subscribe(proxy)
+    try:
+        await asyncio.sleep(0.1)
+        engine.report(AlertKind.spike, "ph", 9.1, "pH spike", {})
+        payload = await asyncio.wait_for(queue.get(), timeout=5)
+        assert payload["metric"] == "ph" and payload["kind"] == "spike"
+    finally:
+        unsubscribe(queue)
+        client.close()
+        await server.close()
+
+@pytest.mark.asyncio
+async def test_blocking_calls_are_refused_on_the_loop(rpc):
+    from src.hardware.rpc import offload
+    device, _, client = rpc
+    proxy = RemoteProxy("device", FakeDevice, client=client)
+    with pytest.raises(RuntimeError, match="event loop"):
+        proxy.turn_on()
+    with pytest.raises(RuntimeError, match="event loop"):
+        proxy.is_active
+    assert device.state is False
+    assert await offload(proxy.turn_on) is True
+    assert device.state is True
+
+@pytest.mark.asyncio
+async def test_http_errors_keep_their_status(tmp_path):
+    from fastapi import HTTPException
+
+    class Routine:
+        async def fill(self):
+            raise HTTPException(status_code=500, detail="Fill timed out")
+
+    server = RPCServer(str(tmp_path / "hw.sock"), {"routine": Routine()})
+    await server.start()
+    client = RPCClient(server.path, timeout=5)
+    try:
+        with pytest.raises(HTTPException) as raised:
+            await RemoteProxy("routine", Routine, client=client).fill()
+        assert raised.value.status_code == 500 and raised.value.detail == "Fill timed out"
+    finally:
+        client.close()
+        await server.close()
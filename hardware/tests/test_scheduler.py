@@ -0,0 +1,134 @@
+import json
+import time
+import pytest
+from datetime import datetime, timedelta
+from src.logic.scheduler import CronExpression, Scheduler, photoperiod_state, scheduler
+from src.models import ScheduleRequest, ScheduleKind, ScheduleAction, JobRequest, JobType
+
+@pytest.fixture
+def temp_scheduler(tmp_path, monkeypatch):
+    """Points the global scheduler at an empty temp file so tests never touch data/."""
+    monkeypatch.setattr(scheduler, "path", str(tmp_path / "schedules.json"))
+    monkeypatch.setattr(scheduler, "rules", {})
+    monkeypatch.setattr(scheduler, "_heap", [])
+    monkeypatch.setattr(scheduler, "_loaded", False)
+    return scheduler
+
+class TestCron:
+    def test_every_30_minutes(self):
+        cron = CronExpression("*/30 * * * *")
+        assert cron.next_after(datetime(2026, 1, 1, 10, 5)) == datetime(2026, 1, 1, 10, 30)
+        assert cron.next_after(datetime(2026, 1, 1, 10, 30)) == datetime(2026, 1, 1, 11, 0)
+
+    def test_weekday(self):
+        # 2026-01-01 is a Thursday; next Monday 09:00 is Jan 5th
+        cron = CronExpression("0 9 * * 1")
+        assert cron.next_after(datetime(2026, 1, 1, 12, 0)) == datetime(2026, 1, 5, 9, 0)
+
+    def test_month_rollover(self):
+        cron = CronExpression("0 0 1 * *")
+        assert cron.next_after(datetime(2026, 12, 15)) == datetime(2027, 1, 1, 0, 0)
+
+    @pytest.mark.parametrize("expr", ["* * * *", "61 * * * *", "*/0 * * * *", "a * * * *"])
+    def test_invalid(self, expr):
+        with pytest.raises(ValueError):
+            CronExpression(expr)
+
+class TestPhotoperiod:
+    def test_18_6_cycle(self):
+        # Lights on 06:00, off at 00:00
+        on, transition = photoperiod_state(18, "06:00", datetime(2026, 1, 1, 12, 0))
+        assert on is True
+        assert transition == datetime(2026, 1, 2, 0, 0)
+
+        on, transition = photoperiod_state(18, "06:00", datetime(2026, 1, 2, 3, 0))
+        assert on is False
+        assert transition == datetime(2026, 1, 2, 6, 0)
+
+    def test_window_spanning_midnight(self):
+        # Lights on 20:00 for 12h -> on until 08:00
+        on, transition = photoperiod_state(12, "20:00", datetime(2026, 1, 2, 7, 0))
+        assert on is True
+        assert transition == datetime(2026, 1, 2, 8, 0)
+
+class TestScheduler:
+    def test_default_rules_seeded_and_persisted(self, tmp_path):
+        sched = Scheduler(path=str(tmp_path / "schedules.json"))
+        rules = sched.list_rules()
+        assert any(r.action == ScheduleAction.timelapse for r in rules)
+        assert all(r.next_run is not None for r in rules)
+
+        with open(tmp_path / "schedules.json") as f:
+            assert len(json.load(f)["rules"]) == len(rules)
+
+        # A second instance reloads the same rules from disk
+        reloaded = Scheduler(path=str(tmp_path / "schedules.json"))
+        assert {r.rule_id for r in reloaded.list_rules()} == {r.rule_id for r in rules}
+
+    def test_unreadable_file_is_not_replaced_by_defaults(self, tmp_path):
+        path = tmp_path / "schedules.json"
+        path.write_text('{"rules": [{"rule_id": "x", ')
+        sched = Scheduler(path=str(path))
+        assert sched.list_rules() == []
+        assert path.read_text() == '{"rules": [{"rule_id": "x", '
+        backups = list(tmp_path.glob("schedules.json.corrupt-*"))
+        assert len(backups) == 1 and backups[0].read_text() == path.read_text()
+
+    def test_missed_run_within_grace(self, tmp_path):
+        sched = Scheduler(path=str(tmp_path / "schedules.json"))
+        rule = sched.add_rule(ScheduleRequest(
+            name="Hourly diagnose", kind=ScheduleKind.cron, cron="0 * * * *",
+            action=ScheduleAction.job, job=JobRequest(type=JobType.diagnose)
+        ))
+        now = time.time()
+        # Last ran 90 minutes ago -> at least one fire missed, most recent < 1h ago
+        rule.last_run = now - 5400
+        assert rule in sched.missed_rules(now)
+
+        rule.catch_up = False
+        assert rule not in sched.missed_rules(now)
+
+    def test_missed_run_outside_grace(self, tmp_path):
+        sched = Scheduler(path=str(tmp_path / "schedules.json"))
+        rule = sched.add_rule(ScheduleRequest(
+            name="Weekly feed", kind=ScheduleKind.cron, cron="0 9 * * 1",
+            action=ScheduleAction.job, job=JobRequest(type=JobType.feed, params={"recipe": "vegetative"})
+        ))
+        now = time.time()
+        rule.last_run = now - 30 * 86400
+        # Most recent missed Monday is more than an hour ago unless it is Monday 09:xx right now
+        last_monday_9 = CronExpression("0 9 * * 1").next_after(datetime.fromtimestamp(now) - timedelta(days=7))
+        if now - last_monday_9.timestamp() > 3600:
+            assert rule not in sched.missed_rules(now)
+
+    def test_single_photoperiod(self, tmp_path):
+        sched = Scheduler(path=str(tmp_path / "schedules.json"))
+        sched.add_rule(ScheduleRequest(name="Veg light", kind=ScheduleKind.photoperiod, on_hours=18))
+        with pytest.raises(ValueError):
+            sched.add_rule(ScheduleRequest(name="Other light", kind=ScheduleKind.photoperiod, on_hours=12))
+
+class TestScheduleAPI:
+    def test_crud(self, client, temp_scheduler):
+        payload = {
+            "name": "Weekly flush",
+            "kind": "cron",
+            "cron": "0 10 * * 0",
+            "action": "job",
+            "job": {"type": "system_flush", "params": {"soak_duration": 120}}
+        }
+        response = client.post("/schedules/", json=payload)
+        assert response.status_code == 201
+        rule = response.json()
+        assert rule["next_run"] is not None
+
+        response = client.get("/schedules/")
+        assert rule["rule_id"] in [r["rule_id"] for r in response.json()]
+
+        response = client.delete(f"/schedules/{rule['rule_id']}")
+        assert response.status_code == 204
+        assert client.get(f"/schedules/{rule['rule_id']}").status_code == 404
+
+    def test_invalid_rule(self, client, temp_scheduler):
+        response = client.post("/schedules/", json={"name": "Broken", "kind": "cron", "cron": "bad", "action": "timelapse"})
+        assert response.status_code == 400
+        assert "cron" in response.json()["detail"].lower()
@@ -1,3 +1,4 @@
+import pytest
 from src.sensors.float_switches import water_level
 
 class TestWaterLevelSensors:
@@ -26,3 +27,141 @@ class TestWaterLevelSensors:
         status = water_level.get_status()
         assert status["full"] is True
         assert status["empty"] is False
+
+class FlakyDHT11:
+    """DHT11 stand-in that fails a set number of reads before succeeding."""
+    def __init__(self, failures):
+        self.failures = failures
+        self.reads = 0
+
+    @property
+    def temperature(self):
+        self.reads += 1
+        if self.failures > 0:
+            self.failures -= 1
+            raise RuntimeError("Checksum did not validate. Try again.")
+        return 20.0
+
+    @property
+    def humidity(self):
+        return 40.0
+
+    def exit(self): pass
+
+class TestDHTSensor:
+    def make_sensor(self, failures=0):
+        from src.sensors.dht import DHTSensor
+        sensor = DHTSensor()
+        sensor.dht_device = FlakyDHT11(failures)
+        return sensor
+
+    def test_backoff_on_consecutive_failures(self):
+        from src.config import DHT_READ_INTERVAL, DHT_MAX_BACKOFF
+        sensor = self.make_sensor(failures=10)
+        delays = [sensor.poll() for _ in range(6)]
+        assert delays[0] == DHT_READ_INTERVAL
+        assert delays[1] == DHT_READ_INTERVAL * 2
+        assert delays[2] == DHT_READ_INTERVAL * 4
+        assert delays[-1] == DHT_MAX_BACKOFF
+        assert sensor.read()["error"].startswith("Checksum")
+
+    def test_serves_last_good_value_after_failure(self):
+        sensor = self.make_sensor()
+        sensor.poll()
+        sensor.dht_device.failures = 1
+        sensor.poll()
+
+        reading = sensor.read()
+        assert reading["temperature_f"] == 68.0
+        assert reading["quality"] == "good"
+        assert reading["age_seconds"] >= 0
+        assert sensor.consecutive_failures == 1
+
+    def test_stale_quality(self):
+        from src.config import DHT_STALE_AFTER
+        sensor = self.make_sensor()
+        sensor.poll()
+        sensor._last_good_at -= DHT_STALE_AFTER + 1
+        # Pretend the reader thread is running so read() does not poll
+        sensor._thread = type("Alive", (), {"is_alive": lambda self: True})()
+        assert sensor.read()["quality"] == "stale"
+
+    def test_read_is_rate_limited_without_thread(self):
+        sensor = self.make_sensor()
+        sensor.read()
+        sensor.read()
+        assert sensor.dht_device.reads == 1
+
+    def test_reader_thread(self):
+        import time
+        sensor = self.make_sensor()
+        sensor.start()
+        try:
+            deadline = time.time() + 2
+            while sensor._last_good is None and time.time() < deadline:
+                time.sleep(0.01)
+            reads_before = sensor.dht_device.reads
+            reading = sensor.read()
+            # Cached value served without touching the device
+            assert sensor.dht_device.reads == reads_before
+            assert reading["humidity_percent"] == 40.0
+        finally:
+            sensor.stop()
+        assert not sensor.is_running
+
+class TestSingleFlightReads:
+    def slow_adc(self, mock_hardware, delay=0.005):
+        import time
+        reads = []
+        def read(channel):
+            reads.append(channel)
+            time.sleep(delay)
+            return 512
+        mock_hardware.adc.read.side_effect = read
+        return reads
+
+    def test_concurrent_ph_reads_share_one_acquisition(self, mock_hardware):
+        from concurrent.futures import ThreadPoolExecutor
+        from src.sensors.ph import ph_sensor
+        reads = self.slow_adc(mock_hardware)
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            results = list(pool.map(lambda _: ph_sensor.read(), range(8)))
+
+        # Each acquisition is 20 samples; the 8 callers overlap the first one
+        assert len(reads) < 20 * 8
+        assert all(r == results[0] for r in results)
+        # Nothing is cached afterwards
+        ph_sensor.read_voltage()
+        assert len(reads) % 20 == 0
+
+    def test_errors_reach_every_waiter(self, mock_hardware):
+        from concurrent.futures import ThreadPoolExecutor
+        from src.hardware.flight import SingleFlight
+        import threading
+        import time
+        flight = SingleFlight()
+        started = threading.Event()
+        release = threading.Event()
+        def fail():
+            started.set()
+            release.wait()
+            raise ValueError("Failed to read from ADC")
+
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            leader = pool.submit(flight.do, "ph", fail)
+            started.wait()
+            follower = pool.submit(flight.do, "ph", lambda: 1.0)
+            time.sleep(0.05)
+            release.set()
+            for future in (leader, follower):
+                with pytest.raises(ValueError):
+                    future.result()
+        assert flight.do("ph", lambda: 2.0) == 2.0
+
+    def test_status_reads_each_probe_once(self, client, mock_hardware):
+        reads = self.slow_adc(mock_hardware, delay=0)
+        data = client.get("/hardware/status").json()
+        assert reads.count(1) == 20  # pH
+        assert reads.count(0) == 1   # TDS
+        assert data["ph"]["voltage"] == round(512 / 1023 * 3.3, 3)
@@ -0,0 +1,94 @@
+import numpy as np
+import pytest
+from src.logic.telemetry import TelemetryRing, RECORD_DTYPE
+
+def sample(t, tds=500.0, **extra):
+    return {
+        "t": t, "tds_ppm": tds, "ph": 6.1, "temperature_f": None, "humidity_percent": 55.0,
+        "water_full": False, "water_empty": True, "busy": False, **extra
+    }
+
+@pytest.fixture
+def ring_path(tmp_path):
+    return str(tmp_path / "telemetry.ring")
+
+def test_reader_sees_writer_samples(ring_path):
+    reader = TelemetryRing(ring_path)
+    assert reader.latest() is None
+
+    writer = TelemetryRing(ring_path, capacity=4, writable=True)
+    writer.publish(sample(100.0, busy=True))
+    latest = reader.latest()
+    assert latest == {
+        "t": 100.0, "tds_ppm": 500.0, "ph": 6.1, "temperature_f": None, "humidity_percent": 55.0,
+        "tds_voltage": None, "ph_voltage": None, "water_full": False, "water_empty": True, "busy": True,
+    }
+    # Capacity comes from the header, not the reader's default
+    assert reader.capacity == 4
+
+def test_wraparound_and_window(ring_path):
+    writer = TelemetryRing(ring_path, capacity=4, writable=True)
+    for i in range(10):
+        writer.publish(sample(100.0 + 10 * i, tds=float(i)))
+
+    reader = TelemetryRing(ring_path)
+    window = reader.window()
+    assert window.dtype == RECORD_DTYPE
+    assert list(window["tds_ppm"]) == [6.0, 7.0, 8.0, 9.0]
+    assert [s["t"] for s in reader.samples(seconds=15)] == [180.0, 190.0]
+
+def test_reopen_keeps_samples_and_repairs_torn_write(ring_path):
+    writer = TelemetryRing(ring_path, capacity=4, writable=True)
+    writer.publish(sample(100.0))
+    # Writer died between the two seq increments
+    writer._header["seq"] += 1
+    reader = TelemetryRing(ring_path)
+    assert reader.latest() is None
+    writer.close()
+
+    TelemetryRing(ring_path, capacity=4, writable=True).publish(sample(110.0))
+    assert [s["t"] for s in reader.samples()] == [100.0, 110.0]
+
+    # A different layout starts over
+    TelemetryRing(ring_path, capacity=8, writable=True).publish(sample(120.0))
+    assert [s["t"] for s in TelemetryRing(ring_path).samples()] == [120.0]
+
+def test_telemetry_endpoint(client, ring_path, monkeypatch):
+    from src.logic import telemetry
+    monkeypatch.setattr(telemetry.telemetry_reader, "path", ring_path)
+    monkeypatch.setattr(telemetry.telemetry_reader, "_mmap", None)
+    assert client.get("/hardware/telemetry").json() == []
+
+    writer = TelemetryRing(ring_path, capacity=4, writable=True)
+    writer.publish(sample(100.0))
+    writer.publish(sample(200.0, tds=None))
+    response = client.get("/hardware/telemetry?seconds=50")
+    assert response.status_code == 200
+    assert [(s["t"], s["tds_ppm"]) for s in response.json()] == [(200.0, None)]
+    telemetry.telemetry_reader.close()
+
+def test_half_written_record_fails_its_checksum(ring_path):
+    writer = TelemetryRing(ring_path, capacity=4, writable=True)
+    writer.publish(sample(100.0))
+    # Record bytes seen before the writer's stores all landed, with an even seq
+    writer._records[0]["ph"] = 7.5
+    assert TelemetryRing(ring_path).latest() is None
+
+def test_status_served_from_fresh_sample(client, mock_hardware, telemetry_file):
+    import time
+    reads = []
+    mock_hardware.adc.read.side_effect = lambda channel: reads.append(channel) or 512
+    writer = TelemetryRing(telemetry_file, writable=True)
+    writer.publish(sample(time.time(), ph_voltage=1.65, tds_voltage=0.9, water_full=True))
+
+    data = client.get("/hardware/status").json()
+    assert reads == []
+    assert data["ph"] == {"ph": 6.1, "voltage": 1.65}
+    assert data["tds"]["ppm"] == 500.0 and data["water_level"]["full"] is True
+    assert client.get("/sensors/ph").json()["ph"] == 6.1
+
+    # Stale: the probes are read again
+    writer.publish(sample(time.time() - 3600, ph_voltage=1.65, tds_voltage=0.9))
+    assert client.get("/sensors/ph").json()["voltage"] == round(512 / 1023 * 3.3, 3)
+    assert reads
+    writer.close()
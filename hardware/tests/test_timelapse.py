@@ -1,14 +1,20 @@
+import asyncio
 
 import os
 import subprocess
-from unittest.mock import patch, MagicMock
+import pytest
+from unittest.mock import patch, MagicMock, AsyncMock
 from src.logic.timelapse import generate_timelapse_video
 
-@patch("src.logic.timelapse.glob")
+@patch("src.logic.timelapse.timelapse_store")
 @patch("src.logic.timelapse.subprocess.run")
-def test_generate_timelapse_video_framerate(mock_run, mock_glob):
-    # Setup mock images
-    mock_glob.return_value = ["img1.jpg", "img2.jpg"]
+def test_generate_timelapse_video_framerate(mock_run, mock_store, tmp_path, monkeypatch):
+    # Setup mock images from the index
+    monkeypatch.setattr("src.logic.timelapse.FRAME_LIST_PATH", str(tmp_path / "frames.txt"))
+    mock_store.frames_on_disk.return_value = [
+        (1, "timeLapse/images/1.jpg", {"tier": "full", "annotated": True}),
+        (2, "timeLapse/images/2.jpg", {"tier": "full", "annotated": False}),
+    ]
     
     # Run the function
     generate_timelapse_video()
@@ -21,13 +27,21 @@ def test_generate_timelapse_video_framerate(mock_run, mock_glob):
     cmd = args[0]
     
     # Check for framerate 9.6
-    assert "-framerate" in cmd
-    idx = cmd.index("-framerate")
+    assert "-r" in cmd
+    idx = cmd.index("-r")
     assert cmd[idx + 1] == "9.6"
     
-    # Check other critical flags
-    assert "-pattern_type" in cmd
-    assert "glob" in cmd
+    # Frames come from a concat list built from the index, not a directory glob
+    assert "-f" in cmd
+    assert cmd[cmd.index("-f") + 1] == "concat"
+    assert "-pattern_type" not in cmd
+    with open(tmp_path / "frames.txt") as f:
+        lines = f.read().splitlines()
+    assert lines[0] == "file 'images/1.jpg'"
+    assert lines[1] == "file 'images/2.jpg'"
+    # Only frames without a burned-in timestamp get the overlay metadata
+    assert len(lines) == 3
+    assert lines[2].startswith("file_packet_metadata 'zp_capture_time=")
 
     # Check optimization flags
     assert "-crf" in cmd
@@ -36,14 +50,73 @@ def test_generate_timelapse_video_framerate(mock_run, mock_glob):
     assert cmd[cmd.index("-preset") + 1] == "slow"
     assert "-vf" in cmd
     assert "scale=1920:-2" in cmd[cmd.index("-vf") + 1]
+    assert "drawtext=" in cmd[cmd.index("-vf") + 1]
 
-@patch("src.logic.timelapse.glob")
+    # The new video is registered so /timelapse/latest needs no directory scan
+    mock_store.add_video.assert_called_once()
+
+@patch("src.logic.timelapse.timelapse_store")
 @patch("src.logic.timelapse.subprocess.run")
-def test_generate_timelapse_no_images(mock_run, mock_glob):
+def test_generate_timelapse_no_images(mock_run, mock_store):
     # Setup empty images
-    mock_glob.return_value = []
+    mock_store.frames_on_disk.return_value = []
     
     generate_timelapse_video()
     
     # Should not run ffmpeg if no images
     assert not mock_run.called
+
+@pytest.mark.asyncio
+async def test_capture_skips_overlay_encode(tmp_path, monkeypatch):
+    from src.logic import timelapse
+    from src.state import system_lock
+
+    monkeypatch.setattr(timelapse, "IMAGES_DIR", str(tmp_path))
+    raw_path = tmp_path / "raw.jpg"
+    lock_held_during_capture = []
+
+    def fake_capture(filename, **kwargs):
+        lock_held_during_capture.append(system_lock.locked())
+        raw_path.write_bytes(b"jpeg")
+        return str(raw_path)
+
+    with patch.object(timelapse.camera, "capture_image", side_effect=fake_capture), \
+         patch("src.logic.timelapse.subprocess.run") as mock_run, \
+         patch("src.logic.timelapse.timelapse_store") as mock_store, \
+         patch("src.logic.timelapse.frame_features") as mock_features, \
+         patch("src.logic.timelapse.capture_hashes") as mock_hashes, \
+         patch("src.logic.timelapse.asyncio.sleep", return_value=None):
+        mock_features.analyze = AsyncMock()
+        mock_hashes.add = AsyncMock()
+        target = await timelapse.capture_timelapse_image()
+        await asyncio.gather(*timelapse._analysis_tasks)
+
+    # No ffmpeg re-encode in the capture path
+    assert not mock_run.called
+    assert lock_held_during_capture == [True]
+    assert not system_lock.locked()
+    assert os.path.exists(target) and not raw_path.exists()
+    mock_store.add_frame.assert_called_once()
+    assert mock_store.add_frame.call_args.kwargs["annotated"] is False
+    # Vision features are extracted for the new frame
+    mock_features.analyze.assert_awaited_once_with(mock_store.add_frame.call_args.args[0], target)
+    # ...and hashed before the video build that follows
+    mock_hashes.add.assert_awaited_once_with("timelapse", mock_store.add_frame.call_args.args[0], target)
+
+@patch("src.logic.timelapse.timelapse_store")
+@patch("src.logic.timelapse.subprocess.run")
+def test_generate_skips_duplicate_frames(mock_run, mock_store, tmp_path, monkeypatch, capture_hash_index):
+    monkeypatch.setattr("src.logic.timelapse.FRAME_LIST_PATH", str(tmp_path / "frames.txt"))
+    mock_store.frames_on_disk.return_value = [
+        (1, "timeLapse/images/1.jpg", {"tier": "full", "annotated": True}),
+        (2, "timeLapse/images/2.jpg", {"tier": "full", "annotated": True}),
+        (3, "timeLapse/images/3.jpg", {"tier": "full", "annotated": True}),
+    ]
+    capture_hash_index.record("timelapse", 1, 0)
+    capture_hash_index.record("timelapse", 2, 0b1)
+    capture_hash_index.record("timelapse", 3, 0xFFFF)
+
+    generate_timelapse_video()
+
+    with open(tmp_path / "frames.txt") as f:
+        assert f.read().splitlines() == ["file 'images/1.jpg'", "file 'images/3.jpg'"]
@@ -0,0 +1,147 @@
+import os
+import tarfile
+import time
+import pytest
+from src.logic.timelapse_store import TimelapseStore, TIER_FULL, TIER_REDUCED, TIER_ARCHIVED
+
+DAY_MS = 86400 * 1000
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    store = TimelapseStore(root=str(tmp_path))
+    os.makedirs(store.images_dir)
+    os.makedirs(store.video_dir)
+    # Downscaling shells out to ffmpeg; mark it as done without touching the file
+    monkeypatch.setattr(store, "_downscale", lambda path: None)
+    return store
+
+def write_frame(store, ts):
+    name = f"{ts}.jpg"
+    with open(os.path.join(store.images_dir, name), "wb") as f:
+        f.write(b"jpeg")
+    store.add_frame(ts, name)
+    return name
+
+def test_index_rebuilt_from_existing_files(tmp_path):
+    images = tmp_path / "images"
+    videos = tmp_path / "video"
+    images.mkdir()
+    videos.mkdir()
+    (images / "1000.jpg").write_bytes(b"a")
+    (images / "2000.jpg").write_bytes(b"b")
+    (videos / "2026-01-01.mp4").write_bytes(b"v")
+
+    store = TimelapseStore(root=str(tmp_path))
+    assert [ts for ts, _ in store.list_frames()] == [1000, 2000]
+    assert store.get_frame(1000)["annotated"] is True
+    assert store.latest_video().endswith("2026-01-01.mp4")
+    assert (tmp_path / "index.json").exists()
+
+def test_lookups_use_index(store):
+    for ts in (3000, 1000, 2000):
+        write_frame(store, ts)
+    store.add_video("a.mp4")
+    store.add_video("b.mp4")
+
+    assert [ts for ts, _ in store.list_frames(start=1500, end=3000)] == [2000, 3000]
+    assert store.latest_frame()[0] == 3000
+    assert store.latest_video().endswith("b.mp4")
+
+    # Reloading from index.json gives the same view
+    reloaded = TimelapseStore(root=store.root)
+    assert [ts for ts, _ in reloaded.list_frames()] == [1000, 2000, 3000]
+
+def test_compact_thins_downscales_and_archives(store):
+    now = time.time()
+    now_ms = int(now * 1000)
+    bucket_ms = 120 * 60 * 1000
+
+    # Recent frame stays at full resolution
+    recent = now_ms - DAY_MS
+    # Two frames in the same 2h bucket, 10 days old: first kept (reduced), second thinned
+    old_bucket_start = ((now_ms - 10 * DAY_MS) // bucket_ms) * bucket_ms
+    kept, thinned = old_bucket_start + 1000, old_bucket_start + 60000
+    # 90 day old frame gets archived
+    ancient = now_ms - 90 * DAY_MS
+    for ts in (ancient, kept, thinned, recent):
+        write_frame(store, ts)
+
+    summary = store.compact(now)
+    assert summary == {"reduced": 2, "thinned": 1, "archived": 1}
+
+    assert store.get_frame(recent)["tier"] == TIER_FULL
+    assert store.get_frame(kept)["tier"] == TIER_REDUCED
+    assert store.get_frame(thinned) is None
+    assert not os.path.exists(os.path.join(store.images_dir, f"{thinned}.jpg"))
+
+    archived = store.get_frame(ancient)
+    assert archived["tier"] == TIER_ARCHIVED
+    assert not os.path.exists(os.path.join(store.images_dir, f"{ancient}.jpg"))
+    with tarfile.open(os.path.join(store.archive_dir, archived["archive"])) as tar:
+        assert tar.getnames() == [f"{ancient}.jpg"]
+
+    # Archived frames are excluded from the video input
+    assert [ts for ts, _, _ in store.frames_on_disk()] == [kept, recent]
+
+    # Nothing left to do on a second pass
+    assert store.compact(now) == {"reduced": 0, "thinned": 0, "archived": 0}
+
+def test_compact_does_not_hold_the_store_lock_during_ffmpeg(store, monkeypatch):
+    import threading
+    now = time.time()
+    ts = int(now * 1000) - 10 * DAY_MS
+    write_frame(store, ts)
+
+    listed = []
+    def slow_downscale(path):
+        # A reader on another thread gets through while the frame is being downscaled
+        reader = threading.Thread(target=lambda: listed.append(store.list_frames()))
+        reader.start()
+        reader.join(timeout=2)
+        assert not reader.is_alive()
+    monkeypatch.setattr(store, "_downscale", slow_downscale)
+
+    assert store.compact(now)["reduced"] == 1
+    assert [t for t, _ in listed[0]] == [ts]
+
+def test_compact_rerun_after_crash_does_not_duplicate_archive_entries(store):
+    now = time.time()
+    ancient = int(now * 1000) - 90 * DAY_MS
+    name = write_frame(store, ancient)
+    store.get_frame(ancient)["tier"] = TIER_REDUCED
+
+    # Crashed after packing the frame, before the index was saved
+    os.makedirs(store.archive_dir)
+    day_archive = os.path.join(store.archive_dir, time.strftime("%Y-%m-%d", time.localtime(ancient / 1000)) + ".tar")
+    with tarfile.open(day_archive, "w") as tar:
+        tar.add(os.path.join(store.images_dir, name), arcname=name)
+
+    assert store.compact(now)["archived"] == 1
+    with tarfile.open(day_archive) as tar:
+        assert tar.getnames() == [name]
+
+def test_api_worker_sees_what_the_daemon_adds(client, store, capture_hash_index, tmp_path, monkeypatch):
+    # Client mode: the daemon's scheduler captures, hashes and analyzes into
+    # the shared files; the API worker's own store instances serve them
+    from src import main
+    from src.logic.phash import CaptureHashIndex, SOURCE_TIMELAPSE
+    from src.logic.vision import FrameFeatureStore, FEATURES_VERSION
+    monkeypatch.setattr(main, "timelapse_store", TimelapseStore(root=store.root))
+    monkeypatch.setattr(main, "frame_features", FrameFeatureStore(path=str(tmp_path / "features.jsonl")))
+    daemon_hashes = CaptureHashIndex(path=capture_hash_index.path)
+    daemon_features = FrameFeatureStore(path=str(tmp_path / "features.jsonl"))
+
+    write_frame(store, 1000)
+    daemon_hashes.record(SOURCE_TIMELAPSE, 1000, 0)
+    assert [f["timestamp"] for f in client.get("/timelapse/frames").json()] == [1000]
+    assert client.get("/timelapse/features").json() == []
+
+    write_frame(store, 2000)
+    daemon_hashes.record(SOURCE_TIMELAPSE, 2000, 0)
+    daemon_features._append({
+        "timestamp": 2000, "version": FEATURES_VERSION, "canopy_coverage": 0.5,
+        "greenness": 0.4, "chlorosis": 0.1, "bbox": None, "width": 320, "height": 240,
+    })
+    frames = client.get("/timelapse/frames").json()
+    assert [(f["timestamp"], f["changed"]) for f in frames] == [(1000, True), (2000, False)]
+    assert [row["timestamp"] for row in client.get("/timelapse/features").json()] == [2000]
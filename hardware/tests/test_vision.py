@@ -0,0 +1,75 @@
+import asyncio
+import json
+import numpy as np
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+from src.logic.vision import FrameFeatureStore, compute_features, FEATURES_VERSION
+
+def synthetic_frame():
+    """100x200 dark background with a green canopy patch and a yellow leaf."""
+    frame = np.full((100, 200, 3), 20, dtype=np.uint8)
+    frame[20:60, 50:150] = (40, 160, 40)    # green foliage: 40x100 px
+    frame[60:70, 50:70] = (200, 190, 60)    # yellowing leaf: 10x20 px
+    return frame
+
+class TestComputeFeatures:
+    def test_canopy_and_chlorosis(self):
+        features = compute_features(synthetic_frame())
+        assert features["canopy_coverage"] == pytest.approx(4000 / 20000)
+        assert features["chlorosis"] == pytest.approx(200 / 4200, abs=1e-4)
+        assert features["greenness"] == pytest.approx(160 / 240, abs=1e-4)
+        assert features["bbox"] == [0.25, 0.2, 0.75, 0.6]
+        assert (features["width"], features["height"]) == (200, 100)
+
+    def test_no_plant(self):
+        features = compute_features(np.full((10, 10, 3), 20, dtype=np.uint8))
+        assert features["canopy_coverage"] == 0
+        assert features["bbox"] is None
+        assert features["greenness"] is None
+
+class TestFrameFeatureStore:
+    @pytest.mark.asyncio
+    async def test_analyze_persists_and_backfills(self, tmp_path):
+        store = FrameFeatureStore(path=str(tmp_path / "features.jsonl"), executor=ThreadPoolExecutor(2))
+        frames = [(1000, "a.jpg", {}), (2000, "b.jpg", {}), (3000, "c.jpg", {})]
+
+        with patch("src.logic.vision.decode_rgb", return_value=synthetic_frame()) as decode, \
+             patch("src.logic.vision.timelapse_store") as mock_store:
+            mock_store.frames_on_disk.return_value = frames
+            row = await store.analyze(1000, "a.jpg")
+            assert row["canopy_coverage"] > 0
+
+            assert [ts for ts, _ in store.missing()] == [2000, 3000]
+            assert await store.backfill() == 2
+            assert store.missing() == []
+            assert decode.call_count == 3
+
+        with open(tmp_path / "features.jsonl") as f:
+            rows = [json.loads(line) for line in f]
+        assert sorted(r["timestamp"] for r in rows) == [1000, 2000, 3000]
+        assert all(r["version"] == FEATURES_VERSION for r in rows)
+
+        # Reloaded from disk
+        reloaded = FrameFeatureStore(path=str(tmp_path / "features.jsonl"))
+        assert [r["timestamp"] for r in reloaded.list_features(start=1500)] == [2000, 3000]
+
+    @pytest.mark.asyncio
+    async def test_failed_decode_is_not_stored(self, tmp_path):
+        store = FrameFeatureStore(path=str(tmp_path / "features.jsonl"), executor=ThreadPoolExecutor(1))
+        with patch("src.logic.vision.decode_rgb", side_effect=ValueError("no pixels")):
+            assert await store.analyze(1000, "broken.jpg") is None
+        assert store.list_features() == []
+
+    @pytest.mark.asyncio
+    async def test_concurrent_callers_share_the_result(self, tmp_path):
+        store = FrameFeatureStore(path=str(tmp_path / "features.jsonl"), executor=ThreadPoolExecutor(2))
+        with patch("src.logic.vision.decode_rgb", return_value=synthetic_frame()) as decode:
+            capture, backfill = await asyncio.gather(store.analyze(1000, "a.jpg"), store.analyze(1000, "a.jpg"))
+        assert capture == backfill
+        assert capture["timestamp"] == 1000 and capture["version"] == FEATURES_VERSION
+        assert decode.call_count == 1
+
+        with patch("src.logic.vision.decode_rgb", side_effect=ValueError("no pixels")):
+            results = await asyncio.gather(store.analyze(2000, "b.jpg"), store.analyze(2000, "b.jpg"))
+        assert results == [None, None]
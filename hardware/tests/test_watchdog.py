@@ -0,0 +1,107 @@
+import asyncio
+import threading
+import time
+import pytest
+from src.actuators.watchdog import PumpWatchdog
+
+class TestPumpWatchdog:
+    def test_cuts_off_when_caller_is_stalled(self):
+        watchdog = PumpWatchdog()
+        switched_off = []
+        watchdog.arm("water_in", 0.05, switched_off.append, exact=True)
+
+        # The caller never comes back (blocked event loop)
+        time.sleep(0.3)
+        watchdog.stop()
+
+        assert switched_off == ["water_in"]
+        stats = watchdog.stats()
+        assert stats["forced"] == 1
+        assert stats["recent"][0]["by"] == "watchdog"
+        assert stats["max_late_ms"] < 250
+        assert stats["armed"] == {}
+
+    def test_caller_stopping_at_the_deadline_is_not_forced(self):
+        watchdog = PumpWatchdog(grace=0.2)
+        switched_off = []
+        watchdog.arm("flora_micro", 0.05, switched_off.append, exact=True)
+        # The caller's sleep ends just after the deadline, as a normal dispense does
+        time.sleep(0.08)
+        watchdog.disarm("flora_micro")
+        watchdog.stop()
+
+        assert switched_off == []
+        stats = watchdog.stats()
+        assert stats["forced"] == 0
+        assert stats["recent"][0]["by"] == "caller"
+
+    def test_disarm_before_deadline(self):
+        watchdog = PumpWatchdog()
+        switched_off = []
+        watchdog.arm("water_out", 0.1, switched_off.append)
+        watchdog.disarm("water_out")
+        time.sleep(0.2)
+        watchdog.stop()
+
+        assert switched_off == []
+        # Safety limits (not exact deadlines) are not part of the lateness metric
+        assert watchdog.stats()["shutoffs"] == 0
+
+    def test_rearm_supersedes_old_deadline(self):
+        watchdog = PumpWatchdog()
+        switched_off = []
+        watchdog.arm("flora_gro", 0.05, switched_off.append)
+        watchdog.arm("flora_gro", 10, switched_off.append)
+        time.sleep(0.2)
+        assert switched_off == []
+        assert 9 < watchdog.armed()["flora_gro"] <= 10
+        watchdog.stop()
+
+    @pytest.mark.asyncio
+    async def test_dispense_stops_on_time_despite_blocked_loop(self, mock_hardware):
+        from src.actuators.watchdog import pump_watchdog
+        pump = mock_hardware.pumps.pumps["flora_micro"]
+        before = pump_watchdog.stats()["forced"]
+
+        task = asyncio.create_task(mock_hardware.pumps.dispense("flora_micro", 0.05))
+        await asyncio.sleep(0)
+        assert pump.value is True
+
+        # Block the event loop well past the dispense duration
+        time.sleep(0.3)
+        assert pump.value is False
+        assert pump_watchdog.stats()["forced"] == before + 1
+
+        await task
+        assert pump.value is False
+
+    def test_reactivation_at_the_deadline_keeps_the_pump_on(self, mock_hardware, monkeypatch):
+        from src.actuators import pumps
+        controller = mock_hardware.pumps
+        watchdog = PumpWatchdog()
+        monkeypatch.setattr(pumps, "pump_watchdog", watchdog)
+        monkeypatch.setitem(pumps.PUMP_MAX_ON_SECONDS, "water_in", 0.01)
+        switching_off = threading.Event()
+        watchdog_off = controller._watchdog_off
+
+        def slow_off(pump_id):
+            # The re-activation arrives while the watchdog is switching the old run off
+            switching_off.set()
+            time.sleep(0.1)
+            watchdog_off(pump_id)
+
+        monkeypatch.setattr(controller, "_watchdog_off", slow_off)
+        controller.activate_pump("water_in")
+        assert switching_off.wait(2)
+        monkeypatch.setitem(pumps.PUMP_MAX_ON_SECONDS, "water_in", 10)
+        controller.activate_pump("water_in")
+        try:
+            assert controller.pumps["water_in"].value is True
+            assert 9 < watchdog.armed()["water_in"] <= 10
+        finally:
+            controller.deactivate_pump("water_in")
+            watchdog.stop()
+
+    def test_watchdog_endpoint(self, client):
+        data = client.get("/hardware/watchdog").json()
+        assert {"shutoffs", "forced", "max_late_ms", "mean_late_ms", "armed", "recent"} <= set(data)